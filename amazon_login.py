@@ -7,7 +7,8 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+from resource_policy import apply_resource_policy
+from browser_sessions import attach_session, driver_path
 
 # Cookie file path
 COOKIE_FILE = 'amazon_cookies.pkl'
@@ -27,8 +28,12 @@ def setup_driver():
     chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
     chrome_options.add_experimental_option('useAutomationExtension', False)
 
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # detail 크롤러와 같은 세션에 로그인 -> 이후 크롤러는 로그인된 Chrome에 attach
+    driver = attach_session('amazon_detail', 'amazon', chrome_options)
+    if driver is None:
+        service = Service(driver_path())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    apply_resource_policy(driver, 'amazon', 'login')  # captcha 이미지는 허용
 
     # Anti-detection
     driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
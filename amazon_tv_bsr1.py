@@ -1,8 +1,6 @@
-import time
 import random
 import re
 import sys
-import psycopg2
 from datetime import datetime
 import pytz
 from selenium import webdriver
@@ -18,8 +16,12 @@ from lxml import html
 if sys.stdout.encoding != 'utf-8':
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
 
-# Import database configuration
-from config import DB_CONFIG
+# Shared pooled database layer
+from db_manager import get_connection
+from snapshot_store import SnapshotStore, RecordingDriver, ReplayDriver, get_reparse_batch_id, disable_delays
+from pacing import get_pacer
+from crawl_schema import mark_batch_complete
+from selector_registry import get_selectors
 
 class AmazonBSRCrawler:
     def __init__(self):
@@ -30,11 +32,14 @@ class AmazonBSRCrawler:
         self.total_collected = 0
         self.error_messages = []
         self.batch_id = None  # Batch ID for this crawling session
+        self.snapshots = None  # Raw page source store for --reparse
+        self.reparse_batch_id = get_reparse_batch_id()  # --reparse <batch_id>: rebuild rows from snapshots
+        self.pacer = get_pacer('amazon_bsr')  # Adaptive page / retry delays (BSR policy: ~10s minimum)
 
     def connect_db(self):
         """Connect to PostgreSQL database"""
         try:
-            self.db_conn = psycopg2.connect(**DB_CONFIG)
+            self.db_conn = get_connection(autocommit=False)
             print("[OK] Database connected")
             return True
         except Exception as e:
@@ -42,22 +47,9 @@ class AmazonBSRCrawler:
             return False
 
     def load_xpaths(self):
-        """Load XPath selectors for BSR page from database"""
+        """Load XPath selectors for BSR page (selector registry cache, refreshed when xpath_selectors changes)"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute("""
-                SELECT data_field, xpath, css_selector
-                FROM xpath_selectors
-                WHERE mall_name = 'Amazon' AND page_type = 'bsr_page' AND is_active = TRUE
-            """)
-
-            for row in cursor.fetchall():
-                self.xpaths[row[0]] = {
-                    'xpath': row[1],
-                    'css': row[2]
-                }
-
-            cursor.close()
+            self.xpaths = get_selectors('Amazon', 'bsr_page')
             print(f"[OK] Loaded {len(self.xpaths)} XPath selectors for BSR page")
 
             if len(self.xpaths) == 0:
@@ -117,7 +109,8 @@ class AmazonBSRCrawler:
         chrome_options.add_experimental_option("prefs", prefs)
 
         service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        # page_source를 읽을 때마다 snapshot 저장
+        self.driver = RecordingDriver(webdriver.Chrome(service=service, options=chrome_options), self.snapshots)
         self.wait = WebDriverWait(self.driver, 20)
 
         # More comprehensive webdriver property masking
@@ -157,12 +150,12 @@ class AmazonBSRCrawler:
                 scroll_position = (i + 1) * 20  # 20%, 40%, 60%, 80%, 100%
                 self.driver.execute_script(f"window.scrollTo(0, document.body.scrollHeight * {scroll_position / 100});")
                 print(f"[DEBUG] Scrolled to {scroll_position}%")
-                time.sleep(scroll_pause_time)
+                self.pacer.pause(scroll_pause_time)
 
             # Scroll to absolute bottom
             for i in range(3):
                 self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(scroll_pause_time)
+                self.pacer.pause(scroll_pause_time)
 
                 # Calculate new height
                 new_height = self.driver.execute_script("return document.body.scrollHeight")
@@ -176,10 +169,10 @@ class AmazonBSRCrawler:
 
             # Scroll back to top to ensure all elements are in DOM
             self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(1)
+            self.pacer.pause(1)
 
             # Wait for any lazy-loaded content
-            time.sleep(2)
+            self.pacer.pause(2)
 
             print("[OK] Scrolling completed")
             return True
@@ -224,12 +217,13 @@ class AmazonBSRCrawler:
             # Check for throttling message
             if "request was throttled" in page_source or "please wait a moment and refresh" in page_source:
                 print(f"[WARNING] Throttling detected on page {page_number} (attempt {retry + 1}/{max_retries})")
+                self.pacer.report_block('throttled')
                 print("[INFO] Waiting before refresh...")
-                time.sleep(random.uniform(15, 20))
+                self.pacer.wait('retry')
 
                 print("[INFO] Refreshing page...")
                 self.driver.refresh()
-                time.sleep(random.uniform(8, 12))
+                self.pacer.pause(random.uniform(8, 12))
             else:
                 print("[OK] No throttling detected")
                 return True
@@ -238,11 +232,12 @@ class AmazonBSRCrawler:
         page_source = self.driver.page_source.lower()
         if "request was throttled" in page_source or "please wait a moment and refresh" in page_source:
             print(f"[WARNING] Still throttled after {max_retries} refreshes. Trying direct URL access...")
-            time.sleep(random.uniform(20, 25))
+            self.pacer.report_block('throttled')
+            self.pacer.wait('retry')
 
             print(f"[INFO] Accessing URL directly: {url[:80]}...")
             self.driver.get(url)
-            time.sleep(random.uniform(10, 15))
+            self.pacer.pause(random.uniform(10, 15))
 
             # Check one more time
             page_source = self.driver.page_source.lower()
@@ -275,12 +270,13 @@ class AmazonBSRCrawler:
 
             if is_sorry_page:
                 print(f"  [WARNING] Sorry/Robot check page detected (attempt {attempt + 1}/{max_retries})")
+                self.pacer.report_block('robot check')
                 if attempt < max_retries - 1:
-                    print(f"  [INFO] Refreshing page in 3-5 seconds...")
-                    time.sleep(random.uniform(3, 5))  # Wait before refresh
+                    delay = self.pacer.wait('retry')  # Wait before refresh
+                    print(f"  [INFO] Waited {delay:.1f} seconds, refreshing page...")
                     self.driver.refresh()
                     print(f"  [INFO] Page refreshed, waiting for load...")
-                    time.sleep(random.uniform(4, 6))  # Wait after refresh
+                    self.pacer.pause(random.uniform(4, 6))  # Wait after refresh
                     continue
                 else:
                     print(f"  [ERROR] Still sorry page after {max_retries} retries, skipping this page...")
@@ -300,7 +296,7 @@ class AmazonBSRCrawler:
 
             # Wait longer for initial page load
             print("[INFO] Waiting for page to load...")
-            time.sleep(random.uniform(8, 12))
+            self.pacer.pause(random.uniform(8, 12))
 
             # Check and handle sorry page with refresh retries
             if not self.check_and_handle_sorry_page(max_retries=3):
@@ -314,13 +310,16 @@ class AmazonBSRCrawler:
                 print(f"[ERROR] Page still throttled. Screenshot saved to {screenshot_path}")
                 return False
 
+            # Page passed the block checks - let the pacer speed up again
+            self.pacer.observe()
+
             # Check if page loaded properly
             page_height = self.driver.execute_script("return document.body.scrollHeight")
             print(f"[DEBUG] Initial page height: {page_height}")
 
             if page_height < 1000:
                 print("[WARNING] Page may not have loaded properly, waiting longer...")
-                time.sleep(15)
+                self.pacer.pause(15)
                 page_height = self.driver.execute_script("return document.body.scrollHeight")
                 print(f"[DEBUG] Page height after wait: {page_height}")
 
@@ -472,6 +471,19 @@ class AmazonBSRCrawler:
             self.error_messages.append(f"DB save error: {e}")
             return False
 
+    def clear_batch_rows(self):
+        """Delete existing rows of the batch being re-parsed"""
+        try:
+            cursor = self.db_conn.cursor()
+            cursor.execute("DELETE FROM amazon_tv_bsr WHERE batch_id = %s", (self.batch_id,))
+            deleted = cursor.rowcount
+            self.db_conn.commit()
+            cursor.close()
+            print(f"[INFO] Cleared batch {self.batch_id}: {deleted} rows")
+        except Exception as e:
+            self.db_conn.rollback()
+            print(f"[WARNING] Failed to clear batch {self.batch_id}: {e}")
+
     def run(self):
         """Main execution"""
         try:
@@ -483,25 +495,43 @@ class AmazonBSRCrawler:
             if not self.connect_db():
                 return
 
-            # Generate batch_id for this session (Korea timezone)
-            korea_tz = pytz.timezone('Asia/Seoul')
-            self.batch_id = datetime.now(korea_tz).strftime('%Y%m%d_%H%M%S')
-            print(f"[OK] Batch ID: {self.batch_id}")
+            # Generate batch_id for this session (Korea timezone), or reuse the batch being re-parsed
+            if self.reparse_batch_id:
+                self.batch_id = self.reparse_batch_id
+                print(f"[OK] Re-parse mode - Batch ID: {self.batch_id}")
+            else:
+                korea_tz = pytz.timezone('Asia/Seoul')
+                self.batch_id = datetime.now(korea_tz).strftime('%Y%m%d_%H%M%S')
+                print(f"[OK] Batch ID: {self.batch_id}")
+            self.snapshots = SnapshotStore('amazon_tv_bsr1', self.batch_id)
 
             # Load XPaths
             if not self.load_xpaths():
                 print("[ERROR] Please add XPath selectors first!")
                 return
 
-            # Load page URLs
-            page_urls = self.load_page_urls()
+            if self.reparse_batch_id:
+                # Re-parse stored pages with the current XPaths - no network access
+                if not self.snapshots.exists():
+                    print(f"[ERROR] No snapshots found for batch {self.batch_id}")
+                    return
+                page_urls = self.snapshots.load_manifest('page_urls', [])
+                disable_delays(self.pacer)
+                self.clear_batch_rows()
+                self.driver = ReplayDriver(self.snapshots)
+                self.wait = WebDriverWait(self.driver, 1)
+            else:
+                # Load page URLs
+                page_urls = self.load_page_urls()
+                self.snapshots.save_manifest('page_urls', page_urls)
+
+                # Setup WebDriver
+                self.setup_driver()
+
             if not page_urls:
                 print("[ERROR] No BSR page URLs found")
                 return
 
-            # Setup WebDriver
-            self.setup_driver()
-
             # Scrape each page
             for page_number, url in page_urls:
                 if not self.scrape_page(url, page_number):
@@ -509,12 +539,14 @@ class AmazonBSRCrawler:
 
                 # Random delay between pages (longer to avoid throttling)
                 if page_number < len(page_urls):
-                    delay = random.uniform(10, 15)
-                    print(f"[INFO] Waiting {delay:.1f} seconds before next page...")
-                    time.sleep(delay)
+                    delay = self.pacer.wait()
+                    print(f"[INFO] Waited {delay:.1f} seconds before next page")
 
             print("\n" + "="*80)
             print(f"BSR Crawling completed! Total collected: {self.total_collected} items")
+            if self.total_collected:
+                mark_batch_complete(self.db_conn, 'amazon_tv_bsr', self.batch_id)
+            print(self.pacer.summary())
             print("="*80)
 
             if self.error_messages:
@@ -1,6 +1,3 @@
-import time
-import random
-import psycopg2
 import pickle
 import json
 import os
@@ -12,15 +9,34 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
 from lxml import html
 import re
 
 # Cookie file path
 COOKIE_FILE = 'amazon_cookies.pkl'
 
-# Import database configuration
-from config import DB_CONFIG
+# Shared pooled database layer
+from db_manager import get_connection
+from detail_worker_pool import get_worker_count, run_detail_workers
+from pacing import get_pacer
+from page_waits import PageWaits
+from selector_registry import get_xpaths
+from browser_sessions import attach_session, driver_path
+from crawl_schema import get_latest_batches, mark_batch_complete
+from detail_ingest import DetailIngestor
+from review_harvest import SEEN_TABLE, SEEN_TABLE_SPEC, ReviewHarvester, amazon_review_id, ensure_seen_table, review_list_url
+from snapshot_store import SnapshotStore, RecordingDriver, ReplayDriver, get_reparse_batch_id, disable_delays
+
+# Columns written by the ingestor (same order as the save_to_db row)
+DETAIL_COLUMNS = [
+    'batch_id', 'mother', '"order"', 'product_url', 'Retailer_SKU_Name', 'Star_Rating',
+    'SKU_Popularity', 'Retailer_Membership_Discounts', 'Samsung_SKU_Name',
+    'Rank_1', 'Rank_2', 'Count_of_Star_Ratings', 'Summarized_Review_Content',
+    'Detailed_Review_Content', 'calendar_week',
+]
+
+# Review page is ready once a review card (or a bare review body) is rendered
+REVIEW_CARD_XPATH = '//div[starts-with(@id, "customer_review-")] | //span[@data-hook="review-body"]'
 
 class AmazonDetailCrawler:
     def __init__(self):
@@ -28,53 +44,36 @@ class AmazonDetailCrawler:
         self.db_conn = None
         self.xpaths = {}
         self.total_collected = 0
-        # Generate batch_id using Korea timezone
+        self.profile_dir = None  # Chrome profile (set per worker in worker-pool mode)
+        self.pacer = get_pacer('amazon')  # Adaptive delay between detail pages (shared by workers)
+        self.waits = PageWaits()  # Readiness waits after navigation / clicks (shared by workers)
+        # COPY buffer (shared by workers) - new review IDs go in the same record as the detail row
+        self.ingestor = DetailIngestor('amazon', {'Amazon_tv_detail_crawled': DETAIL_COLUMNS, SEEN_TABLE: SEEN_TABLE_SPEC})
+        # Generate batch_id using Korea timezone (--reparse reuses the original batch)
+        self.reparse_batch_id = get_reparse_batch_id()
         korea_tz = pytz.timezone('Asia/Seoul')
-        self.batch_id = datetime.now(korea_tz).strftime('%Y%m%d_%H%M%S')
+        self.batch_id = self.reparse_batch_id or datetime.now(korea_tz).strftime('%Y%m%d_%H%M%S')
+        self.snapshots = SnapshotStore('amazon_tv_detail', self.batch_id)  # Raw page source store for --reparse
 
     def connect_db(self):
         """Connect to PostgreSQL database"""
         try:
-            self.db_conn = psycopg2.connect(**DB_CONFIG)
-            self.db_conn.autocommit = True
+            self.db_conn = get_connection(autocommit=True)
             print("[OK] Database connected (autocommit enabled)")
+            with self.db_conn.transaction() as cursor:
+                ensure_seen_table(cursor)
             return True
         except Exception as e:
             print(f"[ERROR] Database connection failed: {e}")
             return False
 
     def load_xpaths(self):
-        """Load XPath selectors from database"""
+        """Load XPath selectors (selector registry cache, refreshed when xpath_selectors changes)"""
         try:
-            print("[INFO] Loading XPath selectors from database...")
-            cursor = self.db_conn.cursor()
-
-            # Check if table exists
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables
-                    WHERE table_name = 'xpath_selectors'
-                )
-            """)
-            table_exists = cursor.fetchone()[0]
-
-            if not table_exists:
-                print("[ERROR] Table 'xpath_selectors' does not exist")
-                cursor.close()
-                return False
-
-            cursor.execute("""
-                SELECT data_field, xpath
-                FROM xpath_selectors
-                WHERE mall_name = 'Amazon' AND page_type = 'detail_page' AND is_active = TRUE
-            """)
-
-            rows = cursor.fetchall()
-            for row in rows:
-                self.xpaths[row[0]] = row[1]
-                print(f"  [DEBUG] Loaded XPath: {row[0]} = {row[1][:50]}...")
-
-            cursor.close()
+            print("[INFO] Loading XPath selectors from selector registry...")
+            self.xpaths = get_xpaths('Amazon', 'detail_page')
+            for data_field, xpath in self.xpaths.items():
+                print(f"  [DEBUG] Loaded XPath: {data_field} = {(xpath or '')[:50]}...")
 
             if len(self.xpaths) == 0:
                 print("[WARNING] No XPath selectors found for Amazon detail_page")
@@ -96,51 +95,8 @@ class AmazonDetailCrawler:
             print("[INFO] Loading product URLs from database...")
             cursor = self.db_conn.cursor()
 
-            # Check if amazon_tv_main_crawled table exists
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables
-                    WHERE table_name = 'amazon_tv_main_crawled'
-                )
-            """)
-            main_crawled_exists = cursor.fetchone()[0]
-            print(f"[DEBUG] Table 'amazon_tv_main_crawled' exists: {main_crawled_exists}")
-
-            # Check if amazon_tv_bsr table exists
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables
-                    WHERE table_name = 'amazon_tv_bsr'
-                )
-            """)
-            bsr_exists = cursor.fetchone()[0]
-            print(f"[DEBUG] Table 'amazon_tv_bsr' exists: {bsr_exists}")
-
-            # Get latest batch_id from amazon_tv_main_crawled
-            main_batch_id = None
-            if main_crawled_exists:
-                cursor.execute("""
-                    SELECT batch_id
-                    FROM amazon_tv_main_crawled
-                    WHERE batch_id IS NOT NULL
-                    ORDER BY batch_id DESC
-                    LIMIT 1
-                """)
-                main_batch_result = cursor.fetchone()
-                main_batch_id = main_batch_result[0] if main_batch_result else None
-
-            # Get latest batch_id from amazon_tv_bsr
-            bsr_batch_id = None
-            if bsr_exists:
-                cursor.execute("""
-                    SELECT batch_id
-                    FROM amazon_tv_bsr
-                    WHERE batch_id IS NOT NULL
-                    ORDER BY batch_id DESC
-                    LIMIT 1
-                """)
-                bsr_batch_result = cursor.fetchone()
-                bsr_batch_id = bsr_batch_result[0] if bsr_batch_result else None
+            # Latest completed batch_id of amazon_tv_main_crawled / amazon_tv_bsr (None if the table does not exist)
+            main_batch_id, bsr_batch_id = get_latest_batches(cursor, ['amazon_tv_main_crawled', 'amazon_tv_bsr'])
 
             print(f"[INFO] Latest batch_id - Main: {main_batch_id}, BSR: {bsr_batch_id}")
 
@@ -209,10 +165,16 @@ class AmazonDetailCrawler:
             chrome_options.add_argument('--window-size=1920,1080')
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
+            if self.profile_dir:
+                chrome_options.add_argument(f'--user-data-dir={self.profile_dir}')
 
-            print("[INFO] Installing ChromeDriver...")
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # 실행 중인 warm Chrome 세션 (로그인 / cookie 적용된 상태)에 attach, 없으면 새로 띄움
+            driver = attach_session('amazon_detail', 'amazon', chrome_options, profile_dir=self.profile_dir)
+            if driver is None:
+                service = Service(driver_path())
+                driver = webdriver.Chrome(service=service, options=chrome_options)
+            # page_source를 읽을 때마다 snapshot 저장
+            self.driver = RecordingDriver(driver, self.snapshots)
 
             # Anti-detection scripts
             print("[INFO] Applying anti-detection scripts...")
@@ -226,8 +188,9 @@ class AmazonDetailCrawler:
 
             print("[OK] WebDriver setup complete")
 
-            # Load cookies for login
-            self.load_cookies()
+            # Load cookies for login (warm 세션은 이미 cookie 적용됨)
+            if not getattr(driver, 'cookies_loaded', False):
+                self.load_cookies()
 
         except Exception as e:
             print(f"[ERROR] Failed to setup WebDriver: {e}")
@@ -248,7 +211,7 @@ class AmazonDetailCrawler:
         try:
             print("[INFO] Accessing Amazon.com to set cookies...")
             self.driver.get("https://www.amazon.com")
-            time.sleep(2)
+            self.pacer.pause(2)
 
             with open(COOKIE_FILE, 'rb') as f:
                 cookies = pickle.load(f)
@@ -261,7 +224,7 @@ class AmazonDetailCrawler:
 
             print("[INFO] Refreshing page with cookies...")
             self.driver.refresh()
-            time.sleep(2)
+            self.pacer.pause(2)
             print(f"[OK] Cookies loaded successfully")
             return True
 
@@ -364,8 +327,31 @@ class AmazonDetailCrawler:
         except Exception as e:
             return None
 
+    def extract_review_cards(self, tree):
+        """Review cards on a review page -> [(review_id, text)] in page order"""
+        cards = []
+        for card in tree.xpath('//div[starts-with(@id, "customer_review-")]'):
+            body = card.xpath('.//span[@data-hook="review-body"]/span')
+            review_text = body[0].text_content().strip() if body else ''
+            if review_text and len(review_text) > 10:
+                cards.append((amazon_review_id(card.get('id')), review_text))
+        if cards:
+            return cards
+
+        # Fallback: review bodies without card IDs (hashed by text)
+        for elem in tree.xpath('//span[@data-hook="review-body"]/span'):
+            review_text = elem.text_content().strip() if hasattr(elem, 'text_content') else str(elem).strip()
+            if review_text and len(review_text) > 10:
+                cards.append((None, review_text))
+        return cards
+
     def extract_detailed_reviews(self, product_url):
-        """Extract up to 20 detailed reviews from review pages"""
+        """
+        Extract new detailed reviews (newest first, stop at the first review seen in an earlier run)
+
+        Returns:
+            (formatted reviews or None, review ID rows for SEEN_TABLE - recorded with the detail row)
+        """
         try:
             # Get current page HTML
             tree = html.fromstring(self.driver.page_source)
@@ -386,41 +372,25 @@ class AmazonDetailCrawler:
 
             if not review_link:
                 print("  [WARNING] Could not find review page link")
-                return None
+                return None, []
 
-            # Navigate to review page
+            # Navigate to review page (sorted by most recent)
             if review_link.startswith('http'):
                 review_url = review_link
             else:
                 review_url = "https://www.amazon.com" + review_link
 
-            self.driver.get(review_url)
-            time.sleep(random.uniform(3, 4))
+            harvester = ReviewHarvester('amazon', product_url, self.batch_id)
+            self.driver.get(review_list_url('amazon', review_url))
+            self.waits.for_count(self.driver, By.XPATH, REVIEW_CARD_XPATH, timeout=10, name='review_cards')
 
-            # Collect reviews from multiple pages
-            all_reviews = []
+            # Collect reviews page by page until a known review or the limit
             page_num = 1
             max_pages = 3  # Max 3 pages to get 20+ reviews
 
-            while len(all_reviews) < 20 and page_num <= max_pages:
+            while page_num <= max_pages:
                 tree = html.fromstring(self.driver.page_source)
-
-                # Extract reviews from current page
-                review_xpath = '//span[@data-hook="review-body"]/span'
-                review_elements = tree.xpath(review_xpath)
-
-                if review_elements:
-                    for elem in review_elements:
-                        # Check if we already have 20 reviews
-                        if len(all_reviews) >= 20:
-                            break
-
-                        review_text = elem.text_content().strip() if hasattr(elem, 'text_content') else str(elem).strip()
-                        if review_text and len(review_text) > 10:
-                            all_reviews.append(review_text)
-
-                # Check if we have enough reviews after this page
-                if len(all_reviews) >= 20:
+                if not harvester.add_page(self.extract_review_cards(tree)):
                     break
 
                 # Find next page link
@@ -437,31 +407,33 @@ class AmazonDetailCrawler:
                         next_link = result[0]
                         break
 
-                if next_link:
+                if next_link and page_num < max_pages:
                     if next_link.startswith('http'):
                         next_url = next_link
                     else:
                         next_url = "https://www.amazon.com" + next_link
 
                     self.driver.get(next_url)
-                    time.sleep(random.uniform(2, 3))
+                    self.waits.for_count(self.driver, By.XPATH, REVIEW_CARD_XPATH, timeout=10, name='review_cards')
                     page_num += 1
                 else:
                     break
 
-            # Limit to 20 reviews and format as "1-review, 2-review, ..."
-            reviews = all_reviews[:20]
+            print(f"  {harvester.summary()}")
+
+            # Format new reviews as "1-review, 2-review, ..."
+            reviews = harvester.texts()
             if reviews:
                 formatted_reviews = []
                 for idx, review in enumerate(reviews, 1):
                     formatted_reviews.append(f"{idx}-{review}")
-                return ", ".join(formatted_reviews)
+                return ", ".join(formatted_reviews), harvester.seen_rows()
             else:
-                return None
+                return None, []
 
         except Exception as e:
             print(f"  [WARNING] Failed to extract detailed reviews: {e}")
-            return None
+            return None, []
 
     def scrape_detail_page(self, url_data):
         """Scrape detail page and extract information"""
@@ -472,8 +444,10 @@ class AmazonDetailCrawler:
 
             print(f"\n[{mother.upper()}][{order}] Accessing: {url[:80]}...")
 
-            self.driver.get(url)
-            time.sleep(random.uniform(3, 5))
+            self.pacer.timed_get(self.driver, url)
+            # Title first, then let late-rendered sections (reviews summary, item details) settle
+            self.waits.for_count(self.driver, By.ID, 'productTitle', timeout=10, name='product_title')
+            self.waits.for_dom_quiet(self.driver, quiet=0.5, timeout=4)
 
             # Click "Item details" section to expand it (needed for samsung_sku_name, rank_1, rank_2)
             try:
@@ -484,7 +458,9 @@ class AmazonDetailCrawler:
                     aria_expanded = item_details_button.get_attribute("aria-expanded")
                     if aria_expanded != "true":
                         self.driver.execute_script("arguments[0].click();", item_details_button)
-                        time.sleep(1)
+                        self.waits.until('item_details_expand',
+                                         lambda: item_details_button.get_attribute("aria-expanded") == "true",
+                                         timeout=3)
                         print("  [INFO] Expanded 'Item details' section")
                     else:
                         print("  [INFO] 'Item details' already expanded")
@@ -561,7 +537,7 @@ class AmazonDetailCrawler:
                 print(f"  [WARNING] Summarized review not found (may not exist for this product): {str(e)[:100]}")
 
             # Extract detailed review content (20 reviews in JSON format)
-            detailed_review_content = self.extract_detailed_reviews(url)
+            detailed_review_content, review_seen_rows = self.extract_detailed_reviews(url)
 
             data = {
                 'mother': mother,
@@ -576,7 +552,8 @@ class AmazonDetailCrawler:
                 'Rank_2': rank_2,
                 'Count_of_Star_Ratings': count_of_star_ratings,
                 'Summarized_Review_Content': summarized_review_content,
-                'Detailed_Review_Content': detailed_review_content
+                'Detailed_Review_Content': detailed_review_content,
+                'review_seen_rows': review_seen_rows
             }
 
             # Save to database
@@ -609,26 +586,12 @@ class AmazonDetailCrawler:
             return False
 
     def save_to_db(self, data):
-        """Save collected data to database"""
-        cursor = None
-        try:
-            # Temporarily disable autocommit for transaction
-            self.db_conn.autocommit = False
-
-            cursor = self.db_conn.cursor()
+        """Buffer collected data for Amazon_tv_detail_crawled (written with COPY by the ingestor)"""
+        # Calculate calendar week
+        calendar_week = f"w{datetime.now().isocalendar().week}"
 
-            # Calculate calendar week
-            calendar_week = f"w{datetime.now().isocalendar().week}"
-
-            # Insert to Amazon_tv_detail_crawled
-            cursor.execute("""
-                INSERT INTO Amazon_tv_detail_crawled
-                (batch_id, mother, "order", product_url, Retailer_SKU_Name, Star_Rating,
-                 SKU_Popularity, Retailer_Membership_Discounts, Samsung_SKU_Name,
-                 Rank_1, Rank_2, Count_of_Star_Ratings, Summarized_Review_Content,
-                 Detailed_Review_Content, calendar_week)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
+        try:
+            self.ingestor.add({'Amazon_tv_detail_crawled': (
                 self.batch_id,
                 data['mother'],
                 data['order'],
@@ -644,39 +607,23 @@ class AmazonDetailCrawler:
                 data['Summarized_Review_Content'],
                 data['Detailed_Review_Content'],
                 calendar_week
-            ))
-
-            # Commit transaction
-            self.db_conn.commit()
-
-            cursor.close()
-
-            # Re-enable autocommit
-            self.db_conn.autocommit = True
-
+            ), SEEN_TABLE: data['review_seen_rows']})
             return True
 
         except Exception as e:
-            # Rollback on any error
-            try:
-                self.db_conn.rollback()
-            except:
-                pass
-
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-
-            # Re-enable autocommit
-            self.db_conn.autocommit = True
-
-            if 'duplicate key' not in str(e):
-                print(f"[ERROR] Failed to save to DB: {e}")
-
+            print(f"[ERROR] Failed to save to DB: {e}")
             return False
 
+    def clear_batch_rows(self):
+        """Delete existing rows of the batch being re-parsed"""
+        try:
+            with self.db_conn.transaction() as cursor:
+                cursor.execute("DELETE FROM Amazon_tv_detail_crawled WHERE batch_id = %s", (self.batch_id,))
+                deleted = cursor.rowcount
+            print(f"[INFO] Cleared batch {self.batch_id}: {deleted} rows")
+        except Exception as e:
+            print(f"[WARNING] Failed to clear batch {self.batch_id}: {e}")
+
     def run(self):
         """Main execution"""
         try:
@@ -711,33 +658,63 @@ class AmazonDetailCrawler:
 
             # Step 3: Load product URLs
             print("\n[STEP 3/5] Loading product URLs...")
-            product_urls = self.load_product_urls()
+            if self.reparse_batch_id:
+                if not self.snapshots.exists():
+                    print(f"[ERROR] No snapshots found for batch {self.batch_id}. Stopping.")
+                    return
+                product_urls = self.snapshots.load_manifest('product_urls', [])
+            else:
+                product_urls = self.load_product_urls()
+                self.snapshots.save_manifest('product_urls', product_urls)
             if not product_urls:
                 print("[ERROR] No product URLs found. Stopping.")
                 return
 
-            # Step 4: Setup WebDriver
-            print("\n[STEP 4/5] Setting up WebDriver...")
-            self.setup_driver()
-            print("[OK] WebDriver ready")
+            # Step 4/5: Worker-pool mode - each worker sets up its own WebDriver
+            num_workers = get_worker_count()
+            if self.reparse_batch_id:
+                # Re-parse mode: stored page sources instead of a browser, no delays
+                print(f"\n[STEP 4/5] Re-parse mode: replaying snapshots of batch {self.batch_id}")
+                disable_delays(self.pacer, self.waits)
+                self.clear_batch_rows()
+                self.driver = ReplayDriver(self.snapshots)
+                for idx, url_data in enumerate(product_urls, 1):
+                    print(f"\n{'='*80}")
+                    print(f"Processing {idx}/{len(product_urls)}")
+                    self.scrape_detail_page(url_data)
+            elif num_workers > 1:
+                print(f"\n[STEP 4/5] Worker-pool mode: {num_workers} browser sessions")
+                print(f"[INFO] Total pages to scrape: {len(product_urls)}")
+                run_detail_workers(self, product_urls, num_workers, delay_range=(2, 4),
+                                   profile_name='amazon_detail')
+            else:
+                # Step 4: Setup WebDriver
+                print("\n[STEP 4/5] Setting up WebDriver...")
+                self.setup_driver()
+                print("[OK] WebDriver ready")
 
-            # Step 5: Scrape each detail page
-            print("\n[STEP 5/5] Starting to scrape detail pages...")
-            print(f"[INFO] Total pages to scrape: {len(product_urls)}")
+                # Step 5: Scrape each detail page
+                print("\n[STEP 5/5] Starting to scrape detail pages...")
+                print(f"[INFO] Total pages to scrape: {len(product_urls)}")
 
-            for idx, url_data in enumerate(product_urls, 1):
-                print(f"\n{'='*80}")
-                print(f"Processing {idx}/{len(product_urls)}")
+                for idx, url_data in enumerate(product_urls, 1):
+                    print(f"\n{'='*80}")
+                    print(f"Processing {idx}/{len(product_urls)}")
 
-                self.scrape_detail_page(url_data)
+                    self.scrape_detail_page(url_data)
 
-                # Random delay between requests
-                delay = random.uniform(2, 4)
-                print(f"[INFO] Waiting {delay:.1f} seconds before next request...")
-                time.sleep(delay)
+                    # Adaptive delay between requests
+                    delay = self.pacer.wait()
+                    print(f"[INFO] Waited {delay:.1f} seconds before next request")
 
             print("\n" + "="*80)
             print(f"Detail Crawling completed! Total collected: {self.total_collected}/{len(product_urls)}")
+            self.ingestor.flush()
+            if self.total_collected:
+                mark_batch_complete(self.db_conn, 'amazon_tv_detail_crawled', self.batch_id)
+            print(self.pacer.summary())
+            print(self.waits.summary())
+            print(self.ingestor.summary())
             print("="*80)
 
         except Exception as e:
@@ -747,6 +724,8 @@ class AmazonDetailCrawler:
 
         finally:
             print("\n[INFO] Cleaning up...")
+            # Write remaining records (kept in a spill file if the DB is unreachable)
+            self.ingestor.close()
             if self.driver:
                 try:
                     self.driver.quit()
@@ -26,6 +26,32 @@ COOKIE_FILE = 'amazon_cookies.pkl'
 
 # Import database configuration
 from config import DB_CONFIG
+from detail_ingest import DetailIngestor
+from selector_registry import get_xpaths
+from review_store import REVIEW_REF_COLUMNS, REVIEW_TABLE, REVIEW_TABLE_SPEC, ensure_review_store, review_refs
+from value_normalizer import TYPED_COLUMNS, ensure_typed_columns, parse_count, parse_star_counts, typed_values
+
+# Columns written by the ingestor (same order as the save_to_db rows)
+DETAIL_COLUMNS = [
+    'account_name', 'batch_id', 'page_type', 'product_url', 'Retailer_SKU_Name', 'Star_Rating',
+    'SKU_Popularity', 'Retailer_Membership_Discounts', 'item',
+    'Rank_1', 'Rank_2', 'screen_size', 'count_of_reviews', 'Count_of_Star_Ratings',
+    'Summarized_Review_Content', 'Detailed_Review_Content', 'calendar_week', 'crawl_datetime',
+    'main_rank', 'bsr_rank', 'final_sku_price', 'original_sku_price',
+]
+
+TV_RETAIL_COLUMNS = [
+    'item', 'account_name', 'page_type', 'count_of_reviews', 'retailer_sku_name', 'product_url',
+    'star_rating', 'count_of_star_ratings', 'screen_size', 'sku_popularity',
+    'final_sku_price', 'original_sku_price', 'savings', 'discount_type', 'offer',
+    'pick_up_availability', 'shipping_availability', 'delivery_availability', 'shipping_info',
+    'available_quantity_for_purchase', 'inventory_status', 'sku_status', 'retailer_membership_discounts',
+    'recommendation_intent',
+    'main_rank', 'bsr_rank', 'rank_1', 'rank_2', 'promotion_rank', 'trend_rank',
+    'number_of_ppl_purchased_yesterday', 'number_of_ppl_added_to_carts', 'retailer_sku_name_similar',
+    'estimated_annual_electricity_use', 'promotion_type',
+    'calendar_week', 'crawl_datetime',
+] + TYPED_COLUMNS + REVIEW_REF_COLUMNS  # typed price / rating values + retail_reviews hash references
 
 class AmazonDetailCrawler:
     def __init__(self):
@@ -36,6 +62,10 @@ class AmazonDetailCrawler:
         # Generate batch_id using Korea timezone
         korea_tz = pytz.timezone('Asia/Seoul')
         self.batch_id = datetime.now(korea_tz).strftime('%Y%m%d_%H%M%S')
+        # Record buffer -> retail_reviews + amazon_tv_detail_crawled + tv_retail_com (journal / COPY)
+        self.ingestor = DetailIngestor('amazon_dt1', {REVIEW_TABLE: REVIEW_TABLE_SPEC,  # reviews first (stored once)
+                                                      'amazon_tv_detail_crawled': DETAIL_COLUMNS,
+                                                      'tv_retail_com': TV_RETAIL_COLUMNS})
 
     def connect_db(self):
         """Connect to PostgreSQL database"""
@@ -43,43 +73,24 @@ class AmazonDetailCrawler:
             self.db_conn = psycopg2.connect(**DB_CONFIG)
             self.db_conn.autocommit = True
             print("[OK] Database connected (autocommit enabled)")
+            # retail_reviews table / tv_retail_com reference columns (lookup only if they already exist)
+            cursor = self.db_conn.cursor()
+            ensure_review_store(cursor)
+            # tv_retail_com typed price / rating columns (lookup only if they already exist)
+            ensure_typed_columns(cursor)
+            cursor.close()
             return True
         except Exception as e:
             print(f"[ERROR] Database connection failed: {e}")
             return False
 
     def load_xpaths(self):
-        """Load XPath selectors from database"""
+        """Load XPath selectors (selector registry cache, refreshed when xpath_selectors changes)"""
         try:
-            print("[INFO] Loading XPath selectors from database...")
-            cursor = self.db_conn.cursor()
-
-            # Check if table exists
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables
-                    WHERE table_name = 'xpath_selectors'
-                )
-            """)
-            table_exists = cursor.fetchone()[0]
-
-            if not table_exists:
-                print("[ERROR] Table 'xpath_selectors' does not exist")
-                cursor.close()
-                return False
-
-            cursor.execute("""
-                SELECT data_field, xpath
-                FROM xpath_selectors
-                WHERE mall_name = 'Amazon' AND page_type = 'detail_page' AND is_active = TRUE
-            """)
-
-            rows = cursor.fetchall()
-            for row in rows:
-                self.xpaths[row[0]] = row[1]
-                print(f"  [DEBUG] Loaded XPath: {row[0]} = {row[1][:50]}...")
-
-            cursor.close()
+            print("[INFO] Loading XPath selectors from selector registry...")
+            self.xpaths = get_xpaths('Amazon', 'detail_page')
+            for data_field, xpath in self.xpaths.items():
+                print(f"  [DEBUG] Loaded XPath: {data_field} = {(xpath or '')[:50]}...")
 
             if len(self.xpaths) == 0:
                 print("[WARNING] No XPath selectors found for Amazon detail_page")
@@ -857,18 +868,12 @@ class AmazonDetailCrawler:
             return False
 
     def save_to_db(self, data):
-        """Save collected data to database"""
-        cursor = None
+        """Buffer amazon_tv_detail_crawled + tv_retail_com records (written with COPY by the ingestor)"""
         try:
-            print(f"  [DB] Saving to database...")
+            print(f"  [DB] Buffering record...")
             print(f"       Product: {data.get('Retailer_SKU_Name', 'N/A')[:60]}...")
             print(f"       Item (SKU): {data.get('item', 'N/A')}")
 
-            # Temporarily disable autocommit for transaction
-            self.db_conn.autocommit = False
-
-            cursor = self.db_conn.cursor()
-
             # Calculate calendar week
             calendar_week = f"w{datetime.now().isocalendar().week}"
 
@@ -876,16 +881,7 @@ class AmazonDetailCrawler:
             now = datetime.now()
             crawl_datetime = now.strftime('%Y-%m-%d %H:%M:%S')
 
-            # Insert to amazon_tv_detail_crawled
-            cursor.execute("""
-                INSERT INTO amazon_tv_detail_crawled
-                (account_name, batch_id, page_type, product_url, Retailer_SKU_Name, Star_Rating,
-                 SKU_Popularity, Retailer_Membership_Discounts, item,
-                 Rank_1, Rank_2, screen_size, count_of_reviews, Count_of_Star_Ratings,
-                 Summarized_Review_Content, Detailed_Review_Content, calendar_week, crawl_datetime,
-                 main_rank, bsr_rank, final_sku_price, original_sku_price)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
+            detail_row = (
                 'Amazon',
                 self.batch_id,
                 data['page_type'],
@@ -908,44 +904,14 @@ class AmazonDetailCrawler:
                 data['bsr_rank'],
                 data['final_sku_price'],
                 data['original_sku_price']
-            ))
-
-            # Also insert into unified tv_retail_com table
-            # Convert count_of_reviews to integer (remove commas if present)
-            count_of_reviews_int = None
-            if data['count_of_reviews']:
-                try:
-                    count_of_reviews_int = int(str(data['count_of_reviews']).replace(',', ''))
-                except:
-                    count_of_reviews_int = None
+            )
 
-            # Parse count_of_star_ratings to get total count
+            # tv_retail_com count columns are integers
+            count_of_reviews_int = parse_count(data['count_of_reviews'])
             # Example: "5star:2634, 4star:445, 3star:148, 2star:74, 1star:408" -> 3709
-            count_of_star_ratings_int = None
-            if data['Count_of_Star_Ratings']:
-                try:
-                    import re
-                    # Extract numbers after colons (handle both comma and space separators)
-                    numbers = re.findall(r':(\d+)', str(data['Count_of_Star_Ratings']))
-                    if numbers:
-                        count_of_star_ratings_int = sum(int(n) for n in numbers)
-                except:
-                    count_of_star_ratings_int = None
+            count_of_star_ratings_int = parse_star_counts(data['Count_of_Star_Ratings'])
 
-            cursor.execute("""
-                INSERT INTO tv_retail_com
-                (item, account_name, page_type, count_of_reviews, retailer_sku_name, product_url,
-                 star_rating, count_of_star_ratings, screen_size, sku_popularity,
-                 final_sku_price, original_sku_price, savings, discount_type, offer,
-                 pick_up_availability, shipping_availability, delivery_availability, shipping_info,
-                 available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts,
-                 detailed_review_content, summarized_review_content, top_mentions, recommendation_intent,
-                 main_rank, bsr_rank, rank_1, rank_2, promotion_rank, trend_rank,
-                 number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar,
-                 estimated_annual_electricity_use, promotion_type,
-                 calendar_week, crawl_datetime)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
+            retail_row = (
                 data['item'],
                 'Amazon',  # account_name
                 data['page_type'],
@@ -969,9 +935,6 @@ class AmazonDetailCrawler:
                 None,  # inventory_status (Amazon doesn't have this)
                 None,  # sku_status (Amazon doesn't have this)
                 data['Retailer_Membership_Discounts'],
-                data['Detailed_Review_Content'],
-                data['Summarized_Review_Content'],
-                None,  # top_mentions (Amazon doesn't have this)
                 None,  # recommendation_intent (Amazon doesn't have this)
                 data['main_rank'],
                 data['bsr_rank'],
@@ -986,45 +949,24 @@ class AmazonDetailCrawler:
                 None,  # promotion_type (Amazon doesn't have this)
                 calendar_week,
                 crawl_datetime
-            ))
-
-            # Commit transaction
-            self.db_conn.commit()
-
-            cursor.close()
+            ) + typed_values(data['final_sku_price'], data['original_sku_price'], data['savings'], data['Star_Rating'], 'USD')
 
-            # Re-enable autocommit
-            self.db_conn.autocommit = True
+            # Review texts are stored once in retail_reviews; tv_retail_com keeps hash references
+            review_ref_values, review_rows = review_refs(
+                'Amazon', data['product_url'], data['Detailed_Review_Content'], data['Summarized_Review_Content'], None, self.batch_id)
+            retail_row += review_ref_values
 
-            print(f"  [DB] ✓ Successfully saved to amazon_tv_detail_crawled + tv_retail_com")
+            # retail_reviews + amazon_tv_detail_crawled + tv_retail_com go in one transaction (journaled first)
+            self.ingestor.add({REVIEW_TABLE: review_rows, 'amazon_tv_detail_crawled': detail_row,
+                               'tv_retail_com': retail_row})
+            print(f"  [DB] ✓ Buffered for amazon_tv_detail_crawled + tv_retail_com ({self.ingestor.pending} pending)")
 
             return True
 
         except Exception as e:
-            # Rollback on any error
-            try:
-                self.db_conn.rollback()
-            except:
-                pass
-
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-
-            # Re-enable autocommit
-            self.db_conn.autocommit = True
-
-            # 모든 에러를 명확하게 출력 (중복 키 포함)
-            if 'duplicate key' in str(e):
-                print(f"  [WARNING] Duplicate key - product already exists in DB")
-                print(f"            URL: {data.get('product_url', 'N/A')[:80]}...")
-            else:
-                print(f"  [ERROR] Failed to save to DB: {e}")
-                import traceback
-                traceback.print_exc()
-
+            print(f"  [ERROR] Failed to buffer record: {e}")
+            import traceback
+            traceback.print_exc()
             return False
 
     def run(self):
@@ -1075,6 +1017,8 @@ class AmazonDetailCrawler:
 
             print("\n" + "="*80)
             print(f"Detail Crawling completed! Total collected: {self.total_collected}/{len(product_urls)}")
+            self.ingestor.flush()
+            print(self.ingestor.summary())
             print("="*80)
 
         except Exception as e:
@@ -1084,6 +1028,8 @@ class AmazonDetailCrawler:
 
         finally:
             print("\n[INFO] Cleaning up...")
+            # Write remaining records (kept in a spill file if the database is unreachable)
+            self.ingestor.close()
             if self.driver:
                 try:
                     self.driver.quit()
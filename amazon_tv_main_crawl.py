@@ -1,7 +1,5 @@
-import time
-import random
 import re
-import psycopg2
+from psycopg2.extras import execute_values
 from datetime import datetime
 import pytz
 from selenium import webdriver
@@ -9,12 +7,28 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from lxml import html
 
-# Import database configuration
-from config import DB_CONFIG
+# Shared pooled database layer
+from db_manager import get_connection, CONNECTION_ERRORS
+from page_fetcher import PageFetcher
+from pacing import get_pacer
+from crawl_schema import mark_batch_complete
+from page_waits import PageWaits, enable_network_log
+from resource_policy import apply_resource_policy
+from browser_sessions import attach_session, driver_path
+from dom_capture import capture_html, captured_count
+from selector_registry import get_selectors, get_field_map
+from xpath_engine import xpath_text
+from snapshot_store import SnapshotStore, ReplayFetcher, get_reparse_batch_id, disable_delays
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# A result page with fewer containers than this is treated as not fully loaded
+MIN_RESULT_CONTAINERS = 10
+
+# Fields evaluated against every result container (product_name has its own fallbacks)
+CONTAINER_FIELDS = ('product_url', 'deal_badge', 'final_price', 'purchase_history',
+                    'original_price', 'shipping_info', 'stock_availability')
 
 class AmazonTVCrawler:
     def __init__(self):
@@ -22,16 +36,23 @@ class AmazonTVCrawler:
         self.wait = None
         self.db_conn = None
         self.xpaths = {}
+        self.fields = None  # Compiled container field map (built in load_xpaths)
         self.total_collected = 0
         self.max_skus = 300
         self.sequential_id = 1  # ID counter for 1-300
         self.batch_id = None  # Batch ID for this crawling session
+        self.pending_rows = []  # Rows waiting for the next multi-row insert
+        self.flush_size = 50  # Flush buffered rows every N products (and at the end of every page)
+        self.fetcher = None  # HTTP-first page fetcher (browser only as fallback)
+        self.pacer = get_pacer('amazon')  # Adaptive delay between pages
+        self.waits = PageWaits()  # Readiness waits after browser page loads
+        self.snapshots = None  # Raw page source store for --reparse
+        self.reparse_batch_id = get_reparse_batch_id()  # --reparse <batch_id>: rebuild rows from snapshots
 
     def connect_db(self):
         """Connect to PostgreSQL database"""
         try:
-            self.db_conn = psycopg2.connect(**DB_CONFIG)
-            self.db_conn.autocommit = True  # Enable autocommit mode
+            self.db_conn = get_connection(autocommit=True)
             print("[OK] Database connected (autocommit enabled)")
             return True
         except Exception as e:
@@ -39,22 +60,10 @@ class AmazonTVCrawler:
             return False
 
     def load_xpaths(self):
-        """Load XPath selectors from database"""
+        """Load XPath selectors (selector registry cache, refreshed when xpath_selectors changes)"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute("""
-                SELECT data_field, xpath, css_selector
-                FROM xpath_selectors
-                WHERE mall_name = 'Amazon' AND page_type = 'main_page' AND is_active = TRUE
-            """)
-
-            for row in cursor.fetchall():
-                self.xpaths[row[0]] = {
-                    'xpath': row[1],
-                    'css': row[2]
-                }
-
-            cursor.close()
+            self.xpaths = get_selectors('Amazon', 'main_page')
+            self.fields = get_field_map('Amazon', 'main_page', CONTAINER_FIELDS, name='AmazonContainer')
             print(f"[OK] Loaded {len(self.xpaths)} XPath selectors")
             return True
 
@@ -86,13 +95,18 @@ class AmazonTVCrawler:
         """Setup Chrome WebDriver"""
         chrome_options = Options()
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        chrome_options.add_argument(f'--user-agent={USER_AGENT}')
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
+        enable_network_log(chrome_options)  # CDP network events for network-idle waits
 
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        # 실행 중인 warm Chrome 세션에 attach, 없으면 새로 띄움
+        self.driver = attach_session('amazon_main', 'amazon', chrome_options)
+        if self.driver is None:
+            service = Service(driver_path())
+            self.driver = webdriver.Chrome(service=service, options=chrome_options)
         self.wait = WebDriverWait(self.driver, 10)
+        apply_resource_policy(self.driver, 'amazon', 'main')  # images / media / fonts / trackers 차단
 
         self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
             'source': '''
@@ -105,19 +119,8 @@ class AmazonTVCrawler:
         print("[OK] WebDriver setup complete")
 
     def extract_text_safe(self, element, xpath):
-        """Safely extract text from element using xpath"""
-        try:
-            result = element.xpath(xpath)
-            if result:
-                # Handle attribute extraction (e.g., @href)
-                if isinstance(result[0], str):
-                    return result[0].strip()
-                # Handle element extraction
-                else:
-                    return result[0].text_content().strip()
-            return None
-        except Exception as e:
-            return None
+        """Safely extract text from element using xpath (compiled once, cached)"""
+        return xpath_text(element, xpath)
 
     def convert_purchase_count(self, text):
         """Convert purchase count format: '10K+ bought in past month' -> '10,000'"""
@@ -165,38 +168,49 @@ class AmazonTVCrawler:
 
         return None
 
+    def load_page_with_browser(self, url, page_number):
+        """Load page in Chrome (fallback when plain HTTP fetch is blocked or incomplete)"""
+        if self.driver is None:
+            self.setup_driver()
+
+        self.driver.get(url)
+
+        # Wait for search results to actually load
+        print(f"[INFO] Waiting for search results to load...")
+        if self.waits.for_count(self.driver, By.CSS_SELECTOR, "[data-component-type='s-search-result']",
+                                min_count=MIN_RESULT_CONTAINERS, timeout=15, name='search_results'):
+            print(f"[OK] Search results detected")
+
+            # Prices / badges render after the containers - wait until requests and DOM settle
+            self.waits.for_network_idle(self.driver, max_inflight=2, timeout=6)
+            self.waits.for_dom_quiet(self.driver, quiet=0.5, timeout=4)
+        else:
+            print(f"[WARNING] Timeout waiting for search results")
+            # Still try to parse, might be blocked or error page
+            self.waits.for_dom_quiet(self.driver, quiet=0.5, timeout=3)
+
+        # DEBUG: Verify current URL after load
+        current_url = self.driver.current_url
+        print(f"[DEBUG] Current URL after load: {current_url[:100]}...")
+        if current_url != url:
+            print(f"[WARNING] URL changed! Expected: {url[:50]}, Got: {current_url[:50]}")
+
+        # Pull only the result containers out of the browser, not the multi-MB page source
+        # (PageFetcher saves the snapshot, so no recording here)
+        document = capture_html(self.driver, [self.xpaths['base_container']['xpath']], record=False)
+        if captured_count(document) == 0:
+            # No containers (block / error page) - keep the full source for diagnostics and block detection
+            return self.driver.page_source
+        return document
+
     def scrape_page(self, url, page_number):
         """Scrape a single page"""
         try:
             print(f"\n[PAGE {page_number}] Accessing: {url[:80]}...")
-            self.driver.get(url)
-
-            # Wait for search results to actually load
-            print(f"[INFO] Waiting for search results to load...")
-            try:
-                # Wait up to 15 seconds for search result containers to appear
-                WebDriverWait(self.driver, 15).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "[data-component-type='s-search-result']"))
-                )
-                print(f"[OK] Search results detected")
-
-                # Additional wait for all elements to render
-                time.sleep(random.uniform(4, 6))
-
-            except Exception as e:
-                print(f"[WARNING] Timeout waiting for search results: {e}")
-                # Still try to parse, might be blocked or error page
-                time.sleep(3)
-
-            # DEBUG: Verify current URL after load
-            current_url = self.driver.current_url
-            print(f"[DEBUG] Current URL after load: {current_url[:100]}...")
-            if current_url != url:
-                print(f"[WARNING] URL changed! Expected: {url[:50]}, Got: {current_url[:50]}")
 
-            # Get page source and parse with lxml
-            page_source = self.driver.page_source
-            tree = html.fromstring(page_source)
+            # Plain HTTP first, Chrome only if the result containers are missing
+            page_source, tree, source = self.fetcher.fetch(url, page_number)
+            print(f"[INFO] Page fetched via {source}")
 
             # DEBUG: Check page source size
             print(f"[DEBUG] Page source size: {len(page_source)} bytes")
@@ -273,11 +287,15 @@ class AmazonTVCrawler:
             collected_count = 0
             for idx, product in enumerate(valid_products, 1):
                 if self.total_collected >= self.max_skus:
-                    print(f"[INFO] Reached maximum SKU limit ({self.max_skus})")
-                    return False
+                    # Buffered rows may still be rejected as duplicates, so flush before deciding
+                    collected_count -= self.flush_to_db()
+                    if self.total_collected >= self.max_skus:
+                        print(f"[INFO] Reached maximum SKU limit ({self.max_skus})")
+                        return False
 
-                # Extract data
-                product_url_path = self.extract_text_safe(product, self.xpaths['product_url']['xpath'])
+                # Extract all container fields in one pass
+                record = self.fields.extract(product)
+                product_url_path = record.product_url
 
                 # DEBUG: Print URL extraction result for first product
                 if idx == 1:
@@ -291,7 +309,7 @@ class AmazonTVCrawler:
                     print(f"[DEBUG] Final URL: {product_url}\n")
 
                 # Extract discount type and validate
-                discount_type_raw = self.extract_text_safe(product, self.xpaths['deal_badge']['xpath'])
+                discount_type_raw = record.deal_badge
                 # Only keep "Limited time deal", set others to None
                 discount_type = discount_type_raw if discount_type_raw == "Limited time deal" else None
 
@@ -331,10 +349,10 @@ class AmazonTVCrawler:
                     continue
 
                 # Extract price
-                final_price = self.extract_text_safe(product, self.xpaths['final_price']['xpath'])
+                final_price = record.final_price
 
                 # Extract and convert purchase count
-                purchase_count_raw = self.extract_text_safe(product, self.xpaths['purchase_history']['xpath'])
+                purchase_count_raw = record.purchase_history
                 purchase_count = self.convert_purchase_count(purchase_count_raw)
 
                 data = {
@@ -343,31 +361,30 @@ class AmazonTVCrawler:
                     'Retailer_SKU_Name': product_name,
                     'Number_of_units_purchased_past_month': purchase_count,
                     'Final_SKU_Price': final_price,
-                    'Original_SKU_Price': self.extract_text_safe(product, self.xpaths['original_price']['xpath']),
-                    'Shipping_Info': self.extract_text_safe(product, self.xpaths['shipping_info']['xpath']),
-                    'Available_Quantity_for_Purchase': self.extract_text_safe(product, self.xpaths['stock_availability']['xpath']),
+                    'Original_SKU_Price': record.original_price,
+                    'Shipping_Info': record.shipping_info,
+                    'Available_Quantity_for_Purchase': record.stock_availability,
                     'Discount_Type': discount_type,
                     'Product_URL': product_url,
                     'ASIN': asin
                 }
 
-                # Save to database
-                if self.save_to_db(data):
-                    collected_count += 1
-                    self.total_collected += 1
+                # Queue for the next multi-row insert
+                self.save_to_db(data)
+                collected_count += 1
+                self.total_collected += 1
 
-                    # Track this ASIN
-                    if asin:
-                        self._seen_asins[asin] = page_number
+                # Track this ASIN (released again if the row is rejected on flush)
+                if asin:
+                    self._seen_asins[asin] = page_number
 
-                    # DEBUG: Show detailed saved data
-                    print(f"  [{idx}] ✓ SAVED (Order #{self.sequential_id - 1}):")
-                    print(f"           Name: {data['Retailer_SKU_Name'][:60] if data['Retailer_SKU_Name'] else '[NO NAME]'}...")
-                    print(f"           ASIN: {asin or 'N/A'}")
-                    print(f"           Price: {final_price or 'N/A'}")
-                    print(f"           URL: {product_url[:60] if product_url else 'NULL'}...")
-                else:
-                    print(f"  [{idx}] ✗ FAILED: {data['Retailer_SKU_Name'][:40]}... (ASIN: {asin or 'N/A'}) - DB save error")
+                print(f"  [{idx}] QUEUED: {product_name[:60]}... (ASIN: {asin or 'N/A'})")
+
+                if len(self.pending_rows) >= self.flush_size:
+                    collected_count -= self.flush_to_db()
+
+            # Flush whatever is left for this page
+            collected_count -= self.flush_to_db()
 
             print(f"\n[PAGE {page_number}] Summary:")
             print(f"  - Collected: {collected_count} products")
@@ -383,30 +400,39 @@ class AmazonTVCrawler:
             return True  # Continue to next page
 
     def save_to_db(self, data):
-        """Save collected data with collection order (1-300)"""
-        cursor = None
-        try:
-            # Temporarily disable autocommit for transaction
-            self.db_conn.autocommit = False
-
-            # Use sequential_id (1-300) for collection order
-            collection_order = self.sequential_id
-
-            # Calculate calendar week
-            calendar_week = f"w{datetime.now().isocalendar().week}"
-
-            cursor = self.db_conn.cursor()
-
-            # Try INSERT to amazon_tv_main_raw_data
-            cursor.execute("""
-                INSERT INTO amazon_tv_main_raw_data
-                ("order", mall_name, page_number, Retailer_SKU_Name, Number_of_units_purchased_past_month,
-                 Final_SKU_Price, Original_SKU_Price, Shipping_Info,
-                 Available_Quantity_for_Purchase, Discount_Type, Product_URL, ASIN, batch_id, calendar_week)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """, (
-                collection_order,
+        """Buffer collected data; rows are written by flush_to_db() in one transaction"""
+        self.pending_rows.append(data)
+        return True
+
+    def flush_to_db(self):
+        """
+        Write buffered rows to amazon_tv_main_raw_data and Amazon_tv_main_crawled
+        as one multi-row INSERT per table in a single transaction.
+
+        Rows are inserted with temporary negative order values and ON CONFLICT DO NOTHING,
+        so duplicate keys are skipped row by row. A row is kept only if both tables accepted it,
+        and the kept rows are then renumbered from sequential_id so the 1-300 collection order
+        has no gaps, exactly as with per-row commits.
+
+        Returns:
+            Number of buffered rows that were NOT saved (duplicates or DB error)
+        """
+        if not self.pending_rows:
+            return 0
+
+        rows = self.pending_rows
+        self.pending_rows = []
+
+        # Calculate calendar week
+        calendar_week = f"w{datetime.now().isocalendar().week}"
+
+        # Temporary order -1, -2, ... identifies each buffered row inside this batch
+        raw_values = []
+        crawled_values = {}
+        for position, data in enumerate(rows, 1):
+            temp_order = -position
+            raw_values.append((
+                temp_order,
                 data['mall_name'],
                 data['page_number'],
                 data['Retailer_SKU_Name'],
@@ -421,17 +447,8 @@ class AmazonTVCrawler:
                 self.batch_id,
                 calendar_week
             ))
-            raw_data_result = cursor.fetchone()
-
-            # Try INSERT to Amazon_tv_main_crawled
-            cursor.execute("""
-                INSERT INTO Amazon_tv_main_crawled
-                ("order", mall_name, Retailer_SKU_Name, Number_of_units_purchased_past_month,
-                 Final_SKU_Price, Original_SKU_Price, Shipping_Info,
-                 Available_Quantity_for_Purchase, Discount_Type, Product_URL, ASIN, batch_id, calendar_week)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                collection_order,
+            crawled_values[temp_order] = (
+                temp_order,
                 data['mall_name'],
                 data['Retailer_SKU_Name'],
                 data['Number_of_units_purchased_past_month'],
@@ -444,42 +461,101 @@ class AmazonTVCrawler:
                 data['ASIN'],
                 self.batch_id,
                 calendar_week
-            ))
-
-            # Commit transaction
-            self.db_conn.commit()
-
-            # Increment sequential ID for next product
-            self.sequential_id += 1
-
-            cursor.close()
+            )
 
-            # Re-enable autocommit
-            self.db_conn.autocommit = True
-
-            return True
-
-        except Exception as e:
-            # Rollback on any error (including duplicate)
+        mapping = []
+        for attempt in range(2):
             try:
-                self.db_conn.rollback()
-            except:
-                pass
-
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-
-            # Re-enable autocommit
-            self.db_conn.autocommit = True
-
-            # Don't print error for duplicate keys (expected behavior)
-            if 'duplicate key' not in str(e):
-                print(f"[ERROR] Failed to save to DB: {e}")
+                with self.db_conn.transaction() as cursor:
+                    # Multi-row INSERT to amazon_tv_main_raw_data
+                    inserted_raw = execute_values(cursor, """
+                        INSERT INTO amazon_tv_main_raw_data
+                        ("order", mall_name, page_number, Retailer_SKU_Name, Number_of_units_purchased_past_month,
+                         Final_SKU_Price, Original_SKU_Price, Shipping_Info,
+                         Available_Quantity_for_Purchase, Discount_Type, Product_URL, ASIN, batch_id, calendar_week)
+                        VALUES %s
+                        ON CONFLICT DO NOTHING
+                        RETURNING "order"
+                    """, raw_values, page_size=len(raw_values), fetch=True)
+                    raw_orders = {row[0] for row in inserted_raw}
+
+                    # Multi-row INSERT to Amazon_tv_main_crawled (only rows accepted by raw_data)
+                    crawled_orders = set()
+                    if raw_orders:
+                        inserted_crawled = execute_values(cursor, """
+                            INSERT INTO Amazon_tv_main_crawled
+                            ("order", mall_name, Retailer_SKU_Name, Number_of_units_purchased_past_month,
+                             Final_SKU_Price, Original_SKU_Price, Shipping_Info,
+                             Available_Quantity_for_Purchase, Discount_Type, Product_URL, ASIN, batch_id, calendar_week)
+                            VALUES %s
+                            ON CONFLICT DO NOTHING
+                            RETURNING "order"
+                        """, [crawled_values[o] for o in sorted(raw_orders, reverse=True)],
+                            page_size=len(raw_orders), fetch=True)
+                        crawled_orders = {row[0] for row in inserted_crawled}
+
+                    # Rows rejected by Amazon_tv_main_crawled must not stay in raw_data either
+                    orphaned = list(raw_orders - crawled_orders)
+                    if orphaned:
+                        cursor.execute("""
+                            DELETE FROM amazon_tv_main_raw_data
+                            WHERE batch_id = %s AND "order" = ANY(%s)
+                        """, (self.batch_id, orphaned))
+
+                    # Assign final collection order (sequential_id onwards) in buffer order
+                    accepted = sorted(crawled_orders, reverse=True)
+                    mapping = [(temp_order, self.sequential_id + i) for i, temp_order in enumerate(accepted)]
+                    if mapping:
+                        renumber_values = [(temp_order, final_order, self.batch_id) for temp_order, final_order in mapping]
+                        for table in ('amazon_tv_main_raw_data', 'Amazon_tv_main_crawled'):
+                            execute_values(cursor, f"""
+                                UPDATE {table} AS t
+                                SET "order" = m.final_order
+                                FROM (VALUES %s) AS m(temp_order, final_order, batch_id)
+                                WHERE t.batch_id = m.batch_id AND t."order" = m.temp_order
+                            """, renumber_values, page_size=len(renumber_values))
+                break
+
+            except CONNECTION_ERRORS as e:
+                # Connection dropped mid-flush: transaction was rolled back, retry once on a fresh connection
+                mapping = []
+                if attempt == 0:
+                    print(f"[WARNING] Connection lost while saving, retrying: {e}")
+                    continue
+                print(f"[ERROR] Failed to save {len(rows)} buffered rows to DB: {e}")
 
-            return False
+            except Exception as e:
+                # Rollback on any other error - the whole buffer is lost
+                mapping = []
+                print(f"[ERROR] Failed to save {len(rows)} buffered rows to DB: {e}")
+                break
+
+        saved_temp_orders = {temp_order: final_order for temp_order, final_order in mapping}
+        failed_count = 0
+        for position, data in enumerate(rows, 1):
+            final_order = saved_temp_orders.get(-position)
+            if final_order is None:
+                failed_count += 1
+                if data['ASIN'] and hasattr(self, '_seen_asins'):
+                    self._seen_asins.pop(data['ASIN'], None)
+                print(f"  ✗ SKIPPED (duplicate or DB error): {data['Retailer_SKU_Name'][:40]}... (ASIN: {data['ASIN'] or 'N/A'})")
+            else:
+                print(f"  ✓ SAVED (Order #{final_order}): {data['Retailer_SKU_Name'][:60]}... | Price: {data['Final_SKU_Price'] or 'N/A'}")
+
+        # Increment sequential ID past the rows actually saved
+        self.sequential_id += len(mapping)
+        self.total_collected -= failed_count
+
+        return failed_count
+
+    def clear_batch_rows(self):
+        """Delete existing rows of the batch being re-parsed"""
+        with self.db_conn.transaction() as cursor:
+            cursor.execute("DELETE FROM amazon_tv_main_raw_data WHERE batch_id = %s", (self.batch_id,))
+            raw_deleted = cursor.rowcount
+            cursor.execute("DELETE FROM Amazon_tv_main_crawled WHERE batch_id = %s", (self.batch_id,))
+            crawled_deleted = cursor.rowcount
+        print(f"[INFO] Cleared batch {self.batch_id}: {raw_deleted} raw rows, {crawled_deleted} crawled rows")
 
     def run(self):
         """Main execution"""
@@ -492,33 +568,48 @@ class AmazonTVCrawler:
             if not self.connect_db():
                 return
 
-            # Close and reconnect to ensure clean connection state
-            try:
-                self.db_conn.close()
-                print("[INFO] Closed existing connection")
-            except:
-                pass
-
-            if not self.connect_db():
-                return
-
-            # Generate batch_id for this session (Korea timezone)
-            korea_tz = pytz.timezone('Asia/Seoul')
-            self.batch_id = datetime.now(korea_tz).strftime('%Y%m%d_%H%M%S')
-            print(f"[OK] Batch ID: {self.batch_id}")
+            # Generate batch_id for this session (Korea timezone), or reuse the batch being re-parsed
+            if self.reparse_batch_id:
+                self.batch_id = self.reparse_batch_id
+                print(f"[OK] Re-parse mode - Batch ID: {self.batch_id}")
+            else:
+                korea_tz = pytz.timezone('Asia/Seoul')
+                self.batch_id = datetime.now(korea_tz).strftime('%Y%m%d_%H%M%S')
+                print(f"[OK] Batch ID: {self.batch_id}")
+            self.snapshots = SnapshotStore('amazon_tv_main', self.batch_id)
 
             # Load XPaths and URLs
             if not self.load_xpaths():
                 return
 
-            page_urls = self.load_page_urls()
+            if self.reparse_batch_id:
+                # Re-parse stored pages with the current XPaths - no network access
+                if not self.snapshots.exists():
+                    print(f"[ERROR] No snapshots found for batch {self.batch_id}")
+                    return
+                page_urls = self.snapshots.load_manifest('page_urls', [])
+                disable_delays(self.pacer, self.waits)
+                self.clear_batch_rows()
+                self.fetcher = ReplayFetcher(self.snapshots)
+            else:
+                page_urls = self.load_page_urls()
+                self.snapshots.save_manifest('page_urls', page_urls)
+
+                # WebDriver is started lazily, only if a page needs the browser fallback
+                self.fetcher = PageFetcher(
+                    self.xpaths['base_container']['xpath'],
+                    browser_fetch=self.load_page_with_browser,
+                    get_driver=lambda: self.driver,
+                    user_agent=USER_AGENT,
+                    min_containers=MIN_RESULT_CONTAINERS,
+                    snapshot_store=self.snapshots,
+                    pacer=self.pacer
+                )
+
             if not page_urls:
                 print("[ERROR] No page URLs found")
                 return
 
-            # Setup WebDriver
-            self.setup_driver()
-
             # Scrape each page
             for page_number, url in page_urls:
                 if self.total_collected >= self.max_skus:
@@ -527,11 +618,20 @@ class AmazonTVCrawler:
                 if not self.scrape_page(url, page_number):
                     break
 
-                # Random delay between pages
-                time.sleep(random.uniform(2, 4))
+                # Adaptive delay between pages
+                self.pacer.wait()
+
+            # Write any rows still buffered (e.g. page failed mid-way)
+            self.flush_to_db()
 
             print("\n" + "="*80)
             print(f"Crawling completed! Total collected: {self.total_collected} SKUs")
+            if self.total_collected:
+                mark_batch_complete(self.db_conn, 'amazon_tv_main_crawled', self.batch_id)
+            print(f"[INFO] Pages fetched - HTTP: {self.fetcher.stats['http']}, Browser: {self.fetcher.stats['browser']}, "
+                  f"Snapshot: {self.fetcher.stats.get('snapshot', 0)}")
+            print(self.pacer.summary())
+            print(self.waits.summary())
 
             # DEBUG: Show duplicate statistics
             if hasattr(self, '_seen_asins'):
@@ -0,0 +1,91 @@
+"""
+Attribute Backfill
+비어 있는 속성 컬럼을 같은 key (product_name 등)의 가장 최근 값으로 채우기 - UPDATE 한 번
+
+row마다 SELECT ... LIMIT 1 + UPDATE 하던 방식 대신
+    UPDATE <table> SET <value> = src.<value>
+    FROM (SELECT DISTINCT ON (<key>) <key>, <value> ... ORDER BY <key>, <order> DESC) src
+로 한 번에 처리하고, (<key>, <order> DESC) index로 key 별 최신 row를 바로 찾는다.
+DISTINCT ON 대상은 값이 비어 있는 row의 key로 제한 (테이블 전체를 정렬하지 않음)
+
+새 backfill은 BACKFILLS에 (table, key, value[, order]) 추가
+
+사용법:
+    from attribute_backfill import backfill_latest
+
+    with self.db_conn.transaction() as cursor:
+        updated = backfill_latest(cursor, 'bby_tv_mst', 'product_name', 'item')
+
+Usage (CLI):
+    python attribute_backfill.py                    # BACKFILLS 전체
+    python attribute_backfill.py bby_tv_mst.item    # 1개만
+"""
+
+import sys
+
+# name -> (table, key 컬럼, 채울 컬럼, 최신 순서 컬럼)
+BACKFILLS = {
+    'bby_tv_mst.item': ('bby_tv_mst', 'product_name', 'item', 'id'),
+}
+
+
+def ensure_key_index(cursor, table, key_column, order_column='id'):
+    """(key, order DESC) index가 없으면 생성 (있으면 catalog 조회만 - table lock 없음)"""
+    index_name = f"idx_{table}_{key_column}"
+    cursor.execute("SELECT to_regclass(%s)", (index_name,))
+    if cursor.fetchone()[0] is None:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({key_column}, {order_column} DESC)")
+        print(f"[OK] Index created: {index_name}")
+    return index_name
+
+
+def backfill_latest(cursor, table, key_column, value_column, order_column='id'):
+    """
+    value_column이 NULL인 row를 같은 key_column의 가장 최근 (order_column 큰) NOT NULL 값으로 채움
+
+    Returns:
+        갱신된 row 수
+    """
+    ensure_key_index(cursor, table, key_column, order_column)
+    cursor.execute(f"""
+        UPDATE {table} AS t
+        SET {value_column} = src.{value_column}
+        FROM (
+            SELECT DISTINCT ON ({key_column}) {key_column}, {value_column}
+            FROM {table}
+            WHERE {value_column} IS NOT NULL
+            AND {key_column} IN (
+                SELECT {key_column}
+                FROM {table}
+                WHERE {value_column} IS NULL
+                AND {key_column} IS NOT NULL
+            )
+            ORDER BY {key_column}, {order_column} DESC
+        ) AS src
+        WHERE t.{key_column} = src.{key_column}
+        AND t.{value_column} IS NULL
+    """)
+    return cursor.rowcount
+
+
+def run_backfill(cursor, name):
+    table, key_column, value_column, order_column = BACKFILLS[name]
+    updated = backfill_latest(cursor, table, key_column, value_column, order_column)
+    print(f"[OK] {name}: {updated} rows filled from latest {key_column} match")
+    return updated
+
+
+def main():
+    from db_manager import transaction
+
+    names = sys.argv[1:] or list(BACKFILLS)
+    for name in names:
+        if name not in BACKFILLS:
+            print(f"[ERROR] Unknown backfill: {name} (available: {', '.join(BACKFILLS)})")
+            continue
+        with transaction() as cursor:
+            run_backfill(cursor, name)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import psycopg2
 from config import DB_CONFIG
+from crawl_schema import get_latest_batches
+from value_normalizer import ensure_typed_columns, normalize_tv_retail_com
 
 def backfill_amazon_prices():
     """
@@ -17,16 +19,9 @@ def backfill_amazon_prices():
         # Step 1: Get latest batch_ids for each table
         print("\n[STEP 1] Finding latest batch_ids for each table...")
 
-        # amazon_tv_detail_crawled latest batch_id
-        cursor.execute("""
-            SELECT batch_id
-            FROM amazon_tv_detail_crawled
-            WHERE batch_id IS NOT NULL
-            ORDER BY batch_id DESC
-            LIMIT 1
-        """)
-        detail_batch = cursor.fetchone()
-        detail_batch_id = detail_batch[0] if detail_batch else None
+        # latest completed batch_id of detail / main / bsr (latest_batches, MAX(batch_id) if not recorded)
+        detail_batch_id, main_batch_id, bsr_batch_id = get_latest_batches(
+            cursor, ['amazon_tv_detail_crawled', 'amazon_tv_main_crawled', 'amazon_tv_bsr'])
         print(f"  amazon_tv_detail_crawled latest batch_id: {detail_batch_id}")
 
         # tv_retail_com latest batch_id (Amazon only, using crawl_strdatetime)
@@ -42,28 +37,7 @@ def backfill_amazon_prices():
         retail_batch_id = retail_batch[0] if retail_batch else None
         print(f"  tv_retail_com latest batch_id: {retail_batch_id}")
 
-        # amazon_tv_main_crawled latest batch_id
-        cursor.execute("""
-            SELECT batch_id
-            FROM amazon_tv_main_crawled
-            WHERE batch_id IS NOT NULL
-            ORDER BY batch_id DESC
-            LIMIT 1
-        """)
-        main_batch = cursor.fetchone()
-        main_batch_id = main_batch[0] if main_batch else None
         print(f"  amazon_tv_main_crawled latest batch_id: {main_batch_id}")
-
-        # amazon_tv_bsr latest batch_id
-        cursor.execute("""
-            SELECT batch_id
-            FROM amazon_tv_bsr
-            WHERE batch_id IS NOT NULL
-            ORDER BY batch_id DESC
-            LIMIT 1
-        """)
-        bsr_batch = cursor.fetchone()
-        bsr_batch_id = bsr_batch[0] if bsr_batch else None
         print(f"  amazon_tv_bsr latest batch_id: {bsr_batch_id}")
 
         if not all([detail_batch_id, main_batch_id, bsr_batch_id]):
@@ -149,6 +123,11 @@ def backfill_amazon_prices():
                 retail_updated = cursor.rowcount
                 print(f"  Updated from amazon_tv_detail_crawled: {retail_updated} rows")
 
+                # typed price columns follow the backfilled strings
+                ensure_typed_columns(cursor)
+                normalize_tv_retail_com(cursor, "account_name = 'Amazon' AND crawl_strdatetime = %s",
+                                        (retail_batch_id,))
+
                 conn.commit()
                 print(f"  [OK] Total updated: {retail_updated} rows")
             else:
@@ -1,11 +1,100 @@
-import psycopg2
-from config import DB_CONFIG
+"""
+TV Retail Price Backfill
+tv_retail_com의 NULL 가격을 main / BSR / promotion 테이블에서 채움
+
+Set-based 방식:
+1. NULL 가격 row를 한 번에 읽음
+2. source 테이블 별 batch timestamp index (정렬된 list)를 한 번만 만들고 bisect로 가장 가까운 batch (48h 이내) 검색
+3. 필요한 batch / URL / SKU의 가격만 한 번에 읽어서 메모리에서 매칭
+4. 결과를 임시 테이블에 bulk insert 후 UPDATE ... FROM 한 번으로 반영
+5. 갱신된 row의 typed 가격 컬럼 (final_sku_price_amount 등)을 같은 transaction에서 다시 계산
+6. Amazon은 savings를 typed 금액 (original_sku_price_amount - final_sku_price_amount)으로 계산해 savings_amount / savings 문자열 갱신
+"""
+
+import bisect
+from collections import defaultdict
 from datetime import datetime
 
+from psycopg2.extras import execute_values
+
+# Shared pooled database layer
+from db_manager import get_connection
+from value_normalizer import ensure_typed_columns, normalize_tv_retail_com
+
+# Nearest batch window (before or after)
+MAX_BATCH_DISTANCE = 48 * 3600
+
+# Time-based fallback window (same as the original per-row queries)
+TIME_MATCH_MIN = 24 * 3600
+TIME_MATCH_MAX = 48 * 3600
+
+
+def parse_batch_id(batch_id):
+    """'YYYYMMDD_HHMMSS' batch_id -> epoch seconds (None if not parseable)"""
+    try:
+        return datetime.strptime(str(batch_id)[:15], '%Y%m%d_%H%M%S').timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_strdatetime(crawl_strdatetime):
+    """crawl_strdatetime ('YYYYMMDDHHMMSS...') -> epoch seconds (None if not parseable)"""
+    try:
+        return datetime.strptime(str(crawl_strdatetime)[:14], '%Y%m%d%H%M%S').timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def is_missing(value):
+    """Same truthiness rule as the original per-row backfill (None / '' / 0 count as missing)"""
+    return not value
+
+
+class TimeIndex:
+    """Sorted (timestamp, value) index with nearest-neighbour lookup"""
+
+    def __init__(self, pairs):
+        pairs = sorted((ts, value) for ts, value in pairs if ts is not None)
+        self.timestamps = [ts for ts, _ in pairs]
+        self.values = [value for _, value in pairs]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def nearest(self, ts, max_distance):
+        """Closest value with |ts - t| <= max_distance (None if nothing in range)"""
+        if ts is None or not self.timestamps:
+            return None
+        pos = bisect.bisect_left(self.timestamps, ts)
+        best = None
+        best_distance = None
+        for candidate in (pos - 1, pos):
+            if 0 <= candidate < len(self.timestamps):
+                distance = abs(self.timestamps[candidate] - ts)
+                if distance <= max_distance and (best_distance is None or distance < best_distance):
+                    best, best_distance = self.values[candidate], distance
+        return best
+
+    def nearest_between(self, ts, min_distance, max_distance):
+        """Closest value with min_distance <= |ts - t| <= max_distance"""
+        if ts is None or not self.timestamps:
+            return None
+        lo = bisect.bisect_left(self.timestamps, ts - max_distance)
+        hi = bisect.bisect_right(self.timestamps, ts + max_distance)
+        best = None
+        best_distance = None
+        for idx in range(lo, hi):
+            distance = abs(self.timestamps[idx] - ts)
+            if min_distance <= distance and (best_distance is None or distance < best_distance):
+                best, best_distance = self.values[idx], distance
+        return best
+
+
 class TVRetailPriceBackfill:
     def __init__(self):
         self.conn = None
         self.cursor = None
+        self.batch_indexes = {}  # (table, key) -> TimeIndex, built once per run
         self.stats = {
             'Amazon': {'updated': 0, 'failed': 0},
             'Bestbuy': {'updated': 0, 'failed': 0},
@@ -15,9 +104,10 @@ class TVRetailPriceBackfill:
     def connect_db(self):
         """Connect to database"""
         try:
-            self.conn = psycopg2.connect(**DB_CONFIG)
-            self.conn.autocommit = False  # Manual commit for safety
+            self.conn = get_connection(autocommit=False)  # Manual commit for safety
             self.cursor = self.conn.cursor()
+            ensure_typed_columns(self.cursor)
+            self.conn.commit()
             print("[OK] Database connected")
             return True
         except Exception as e:
@@ -45,231 +135,163 @@ class TVRetailPriceBackfill:
             return self.cursor.fetchall()
         except Exception as e:
             print(f"[ERROR] Failed to get NULL price rows: {e}")
+            self.conn.rollback()
             return []
 
-    def process_amazon(self, priority_date_range=None):
-        """Process Amazon price backfill"""
-        print("\n" + "="*80)
-        print("Processing Amazon")
-        print("="*80)
-
-        # Get NULL price rows
-        if priority_date_range:
-            print(f"[Priority] Processing date range: {priority_date_range[0]} ~ {priority_date_range[1]}")
-            null_rows = self.get_null_price_rows('Amazon', priority_date_range)
-        else:
-            print("[INFO] Processing all NULL prices")
-            null_rows = self.get_null_price_rows('Amazon')
-
-        print(f"[INFO] Found {len(null_rows)} rows with NULL prices")
-
-        if not null_rows:
-            print("[INFO] No rows to process")
-            return
-
-        updated_count = 0
-
-        for idx, (row_id, product_url, crawl_strdatetime, retailer_sku_name) in enumerate(null_rows, 1):
-            try:
-                if idx % 10 == 0:
-                    print(f"[Progress] {idx}/{len(null_rows)} rows processed...")
-
-                # Step 1: Get batch_id from amazon_tv_detail_crawled
-                self.cursor.execute("""
-                    SELECT batch_id
-                    FROM amazon_tv_detail_crawled
-                    WHERE crawl_strdatetime = %s
-                    LIMIT 1
-                """, (crawl_strdatetime,))
-
-                detail_result = self.cursor.fetchone()
-                detail_batch_id = detail_result[0] if detail_result else None
-
-                # Step 2-5: Only process if detail_batch_id exists
-                final_price = None
-                original_price = None
-                main_batch_id = None
-                bsr_batch_id = None
-
-                if detail_batch_id:
-                    # Step 2: Find closest batch within 48 hours (before or after)
-                    # Main
-                    self.cursor.execute("""
-                        SELECT batch_id
-                        FROM amazon_tv_main_crawled
-                        WHERE ABS(EXTRACT(EPOCH FROM (
-                            TO_TIMESTAMP(%s, 'YYYYMMDD_HH24MISS') -
-                            TO_TIMESTAMP(batch_id, 'YYYYMMDD_HH24MISS')
-                        ))) <= 48 * 3600
-                        ORDER BY ABS(EXTRACT(EPOCH FROM (
-                            TO_TIMESTAMP(%s, 'YYYYMMDD_HH24MISS') -
-                            TO_TIMESTAMP(batch_id, 'YYYYMMDD_HH24MISS')
-                        )))
-                        LIMIT 1
-                    """, (detail_batch_id, detail_batch_id))
-                    main_batch = self.cursor.fetchone()
-                    main_batch_id = main_batch[0] if main_batch else None
-
-                    # BSR
-                    self.cursor.execute("""
-                        SELECT batch_id
-                        FROM amazon_tv_bsr
-                        WHERE ABS(EXTRACT(EPOCH FROM (
-                            TO_TIMESTAMP(%s, 'YYYYMMDD_HH24MISS') -
-                            TO_TIMESTAMP(batch_id, 'YYYYMMDD_HH24MISS')
-                        ))) <= 48 * 3600
-                        ORDER BY ABS(EXTRACT(EPOCH FROM (
-                            TO_TIMESTAMP(%s, 'YYYYMMDD_HH24MISS') -
-                            TO_TIMESTAMP(batch_id, 'YYYYMMDD_HH24MISS')
-                        )))
-                        LIMIT 1
-                    """, (detail_batch_id, detail_batch_id))
-                    bsr_batch = self.cursor.fetchone()
-                    bsr_batch_id = bsr_batch[0] if bsr_batch else None
-
-                # Step 3: Get prices from main (has both final and original)
-                # Priority: URL match > ASIN match (within same batch_id)
-                if main_batch_id:
-                    # Try URL match first
-                    self.cursor.execute("""
-                        SELECT final_sku_price, original_sku_price
-                        FROM amazon_tv_main_crawled
-                        WHERE batch_id = %s
-                          AND product_url = %s
-                          AND page_type = 'main'
-                        LIMIT 1
-                    """, (main_batch_id, product_url))
-                    main_result = self.cursor.fetchone()
-                    if main_result:
-                        final_price, original_price = main_result
-
-                    # If URL match failed, try ASIN match (same batch_id)
-                    elif retailer_sku_name:
-                        self.cursor.execute("""
-                            SELECT final_sku_price, original_sku_price
-                            FROM amazon_tv_main_crawled
-                            WHERE batch_id = %s
-                              AND retailer_sku_name = %s
-                              AND page_type = 'main'
-                            LIMIT 1
-                        """, (main_batch_id, retailer_sku_name))
-                        main_result = self.cursor.fetchone()
-                        if main_result:
-                            final_price, original_price = main_result
-
-                # Step 4: If still NULL, get final_price from BSR (no original_sku_price in BSR)
-                if not final_price and bsr_batch_id:
-                    # Try URL match first
-                    self.cursor.execute("""
-                        SELECT final_sku_price
-                        FROM amazon_tv_bsr
-                        WHERE batch_id = %s
-                          AND product_url = %s
-                        LIMIT 1
-                    """, (bsr_batch_id, product_url))
-                    bsr_result = self.cursor.fetchone()
-                    if bsr_result:
-                        final_price = bsr_result[0]
-
-                    # If URL match failed, try ASIN match (same batch_id)
-                    elif retailer_sku_name:
-                        self.cursor.execute("""
-                            SELECT final_sku_price
-                            FROM amazon_tv_bsr
-                            WHERE batch_id = %s
-                              AND retailer_sku_name = %s
-                            LIMIT 1
-                        """, (bsr_batch_id, retailer_sku_name))
-                        bsr_result = self.cursor.fetchone()
-                        if bsr_result:
-                            final_price = bsr_result[0]
-
-                # Step 5: If no batch_id match, try time-based + ASIN matching (24-48 hours)
-                if (not final_price or not original_price) and retailer_sku_name:
-                    self.cursor.execute("""
-                        SELECT final_sku_price, original_sku_price
-                        FROM amazon_tv_main_crawled
-                        WHERE retailer_sku_name = %s
-                          AND page_type = 'main'
-                          AND ABS(EXTRACT(EPOCH FROM (
-                              TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                              TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                          ))) BETWEEN 24 * 3600 AND 48 * 3600
-                        ORDER BY ABS(EXTRACT(EPOCH FROM (
-                              TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                              TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                          )))
-                        LIMIT 1
-                    """, (retailer_sku_name, crawl_strdatetime, crawl_strdatetime))
-                    time_main = self.cursor.fetchone()
-                    if time_main:
-                        if not final_price:
-                            final_price = time_main[0]
-                        if not original_price:
-                            original_price = time_main[1]
-
-                    # Try BSR for final_price only if still NULL
-                    if not final_price:
-                        self.cursor.execute("""
-                            SELECT final_sku_price
-                            FROM amazon_tv_bsr
-                            WHERE retailer_sku_name = %s
-                              AND ABS(EXTRACT(EPOCH FROM (
-                                  TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                                  TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                              ))) BETWEEN 24 * 3600 AND 48 * 3600
-                            ORDER BY ABS(EXTRACT(EPOCH FROM (
-                                  TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                                  TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                              )))
-                            LIMIT 1
-                        """, (retailer_sku_name, crawl_strdatetime, crawl_strdatetime))
-                        time_bsr = self.cursor.fetchone()
-                        if time_bsr:
-                            final_price = time_bsr[0]
-
-                # Step 7: Update tv_retail_com
-                if final_price or original_price:
-                    # Calculate savings: original_sku_price - final_sku_price
-                    # Update all price fields together to maintain consistency
-                    self.cursor.execute("""
-                        UPDATE tv_retail_com
-                        SET final_sku_price = COALESCE(final_sku_price, %s),
-                            original_sku_price = COALESCE(original_sku_price, %s),
-                            savings = CASE
-                                WHEN COALESCE(original_sku_price, %s) IS NOT NULL
-                                     AND COALESCE(final_sku_price, %s) IS NOT NULL
-                                THEN COALESCE(original_sku_price, %s) - COALESCE(final_sku_price, %s)
-                                ELSE savings
-                            END
-                        WHERE id = %s
-                    """, (final_price, original_price, original_price, final_price, original_price, final_price, row_id))
-
-                    if self.cursor.rowcount > 0:
-                        updated_count += 1
-
-            except Exception as e:
-                print(f"[ERROR] Row {idx} failed: {e}")
-                self.stats['Amazon']['failed'] += 1
-                continue
-
+    # ------------------------------------------------------------------
+    # Batch timestamp indexes
+    # ------------------------------------------------------------------
+
+    def get_batch_index(self, table):
+        """Sorted batch_id timestamp index of a source table (one DISTINCT query per run)"""
+        key = (table, 'batch_id')
+        if key not in self.batch_indexes:
+            self.cursor.execute(f"SELECT DISTINCT batch_id FROM {table} WHERE batch_id IS NOT NULL")
+            self.batch_indexes[key] = TimeIndex(
+                (parse_batch_id(batch_id), batch_id) for (batch_id,) in self.cursor.fetchall()
+            )
+            print(f"[INFO] Batch index {table}: {len(self.batch_indexes[key])} batches")
+        return self.batch_indexes[key]
+
+    def get_strdatetime_index(self, table):
+        """Sorted crawl_strdatetime -> batch_id index (for tables whose batch_id is not a timestamp)"""
+        key = (table, 'crawl_strdatetime')
+        if key not in self.batch_indexes:
+            self.cursor.execute(f"""
+                SELECT DISTINCT crawl_strdatetime, batch_id
+                FROM {table}
+                WHERE crawl_strdatetime IS NOT NULL AND batch_id IS NOT NULL
+            """)
+            self.batch_indexes[key] = TimeIndex(
+                (parse_strdatetime(crawl_strdatetime), batch_id)
+                for crawl_strdatetime, batch_id in self.cursor.fetchall()
+            )
+            print(f"[INFO] Time index {table}: {len(self.batch_indexes[key])} entries")
+        return self.batch_indexes[key]
+
+    def get_detail_batch_ids(self, table, crawl_strdatetimes):
+        """crawl_strdatetime -> batch_id of the detail crawl (one query for all rows)"""
+        if not crawl_strdatetimes:
+            return {}
+        self.cursor.execute(f"""
+            SELECT DISTINCT ON (crawl_strdatetime) crawl_strdatetime, batch_id
+            FROM {table}
+            WHERE crawl_strdatetime = ANY(%s)
+        """, (list(crawl_strdatetimes),))
+        return {crawl_strdatetime: batch_id for crawl_strdatetime, batch_id in self.cursor.fetchall()}
+
+    # ------------------------------------------------------------------
+    # Bulk price lookups
+    # ------------------------------------------------------------------
+
+    def load_batch_prices(self, table, batch_ids, key_column, with_original=True, extra_where=""):
+        """
+        (batch_id, key) -> (final_sku_price, original_sku_price) for the given batches
+        First row per key wins (same as LIMIT 1 in the per-row queries)
+        """
+        prices = {}
+        if not batch_ids:
+            return prices
+        original_column = "original_sku_price" if with_original else "NULL"
+        self.cursor.execute(f"""
+            SELECT batch_id, {key_column}, final_sku_price, {original_column}
+            FROM {table}
+            WHERE batch_id = ANY(%s)
+              AND {key_column} IS NOT NULL
+              {extra_where}
+        """, (list(batch_ids),))
+        for batch_id, key, final_price, original_price in self.cursor.fetchall():
+            prices.setdefault((batch_id, key), (final_price, original_price))
+        return prices
+
+    def load_time_prices(self, table, key_column, keys, with_original=True, extra_where=""):
+        """key -> TimeIndex of (crawl_strdatetime, (final_sku_price, original_sku_price))"""
+        by_key = defaultdict(list)
+        if not keys:
+            return {}
+        original_column = "original_sku_price" if with_original else "NULL"
+        self.cursor.execute(f"""
+            SELECT {key_column}, crawl_strdatetime, final_sku_price, {original_column}
+            FROM {table}
+            WHERE {key_column} = ANY(%s)
+              AND crawl_strdatetime IS NOT NULL
+              {extra_where}
+        """, (list(keys),))
+        for key, crawl_strdatetime, final_price, original_price in self.cursor.fetchall():
+            by_key[key].append((parse_strdatetime(crawl_strdatetime), (final_price, original_price)))
+        return {key: TimeIndex(pairs) for key, pairs in by_key.items()}
+
+    # ------------------------------------------------------------------
+    # Bulk update
+    # ------------------------------------------------------------------
+
+    def apply_updates(self, updates, with_savings=False):
+        """
+        Write (id, final_price, original_price) tuples with one UPDATE ... FROM
+
+        Values go through a temp table copied from tv_retail_com so the column types match
+        """
+        if not updates:
+            return 0
+
+        self.cursor.execute("DROP TABLE IF EXISTS tmp_price_backfill")
+        self.cursor.execute("""
+            CREATE TEMP TABLE tmp_price_backfill ON COMMIT DROP AS
+            SELECT id, final_sku_price, original_sku_price
+            FROM tv_retail_com
+            WITH NO DATA
+        """)
+        execute_values(self.cursor,
+                       "INSERT INTO tmp_price_backfill (id, final_sku_price, original_sku_price) VALUES %s",
+                       updates, page_size=1000)
+
+        self.cursor.execute("""
+            UPDATE tv_retail_com AS t
+            SET final_sku_price = COALESCE(t.final_sku_price, v.final_sku_price),
+                original_sku_price = COALESCE(t.original_sku_price, v.original_sku_price)
+            FROM tmp_price_backfill AS v
+            WHERE t.id = v.id
+        """)
+        updated_count = self.cursor.rowcount
+        normalize_tv_retail_com(self.cursor, "id IN (SELECT id FROM tmp_price_backfill)")
+        if with_savings:
+            self.apply_savings()
         self.conn.commit()
-        self.stats['Amazon']['updated'] = updated_count
-        print(f"[OK] Amazon: {updated_count} rows updated")
-
-    def process_bestbuy(self, priority_date_range=None):
-        """Process Best Buy price backfill"""
+        return updated_count
+
+    def apply_savings(self):
+        """
+        savings = original - final for the backfilled rows, from the parsed amounts
+        (the price columns are VARCHAR; same rule as the Amazon crawler: "$12.34" only when positive)
+        """
+        self.cursor.execute("""
+            UPDATE tv_retail_com AS t
+            SET savings_amount = s.amount,
+                savings = CASE WHEN s.amount IS NOT NULL THEN '$' || to_char(s.amount, 'FM999999990.00') END
+            FROM (
+                SELECT id, NULLIF(GREATEST(original_sku_price_amount - final_sku_price_amount, 0), 0) AS amount
+                FROM tv_retail_com
+                WHERE id IN (SELECT id FROM tmp_price_backfill)
+                  AND original_sku_price_amount IS NOT NULL
+                  AND final_sku_price_amount IS NOT NULL
+            ) AS s
+            WHERE t.id = s.id
+        """)
+        return self.cursor.rowcount
+
+    def run_account(self, account_name, label, priority_date_range, match_rows, with_savings=False):
+        """Common flow: load NULL rows -> match in memory -> bulk update"""
         print("\n" + "="*80)
-        print("Processing Best Buy")
+        print(f"Processing {label}")
         print("="*80)
 
         # Get NULL price rows
         if priority_date_range:
             print(f"[Priority] Processing date range: {priority_date_range[0]} ~ {priority_date_range[1]}")
-            null_rows = self.get_null_price_rows('Bestbuy', priority_date_range)
+            null_rows = self.get_null_price_rows(account_name, priority_date_range)
         else:
             print("[INFO] Processing all NULL prices")
-            null_rows = self.get_null_price_rows('Bestbuy')
+            null_rows = self.get_null_price_rows(account_name)
 
         print(f"[INFO] Found {len(null_rows)} rows with NULL prices")
 
@@ -277,314 +299,217 @@ class TVRetailPriceBackfill:
             print("[INFO] No rows to process")
             return
 
-        updated_count = 0
-
-        for idx, (row_id, product_url, crawl_strdatetime, retailer_sku_name) in enumerate(null_rows, 1):
-            try:
-                if idx % 10 == 0:
-                    print(f"[Progress] {idx}/{len(null_rows)} rows processed...")
-
-                # Step 1: Get batch_id from bby_tv_detail_crawled
-                self.cursor.execute("""
-                    SELECT batch_id
-                    FROM bby_tv_detail_crawled
-                    WHERE crawl_strdatetime = %s
-                    LIMIT 1
-                """, (crawl_strdatetime,))
+        try:
+            updates = match_rows(null_rows)
+            print(f"[INFO] Matched prices for {len(updates)}/{len(null_rows)} rows")
+            updated_count = self.apply_updates(updates, with_savings=with_savings)
+        except Exception as e:
+            print(f"[ERROR] {label} backfill failed: {e}")
+            self.conn.rollback()
+            self.stats[account_name]['failed'] += len(null_rows)
+            return
 
-                detail_result = self.cursor.fetchone()
-                if not detail_result:
+        self.stats[account_name]['updated'] += updated_count
+        print(f"[OK] {label}: {updated_count} rows updated")
+
+    # ------------------------------------------------------------------
+    # Per-retailer matching
+    # ------------------------------------------------------------------
+
+    def match_amazon(self, null_rows):
+        """Amazon: detail batch -> nearest main/BSR batch (48h), URL > ASIN, then 24-48h ASIN match"""
+        detail_batches = self.get_detail_batch_ids(
+            'amazon_tv_detail_crawled', {row[2] for row in null_rows if row[2]}
+        )
+        main_index = self.get_batch_index('amazon_tv_main_crawled')
+        bsr_index = self.get_batch_index('amazon_tv_bsr')
+
+        # Step 1-2: nearest main / BSR batch for every row
+        row_batches = {}
+        for row_id, product_url, crawl_strdatetime, retailer_sku_name in null_rows:
+            detail_batch_id = detail_batches.get(crawl_strdatetime)
+            if detail_batch_id:
+                detail_ts = parse_batch_id(detail_batch_id)
+                row_batches[row_id] = (main_index.nearest(detail_ts, MAX_BATCH_DISTANCE),
+                                       bsr_index.nearest(detail_ts, MAX_BATCH_DISTANCE))
+            else:
+                row_batches[row_id] = (None, None)
+
+        main_batch_ids = {main for main, _ in row_batches.values() if main}
+        bsr_batch_ids = {bsr for _, bsr in row_batches.values() if bsr}
+        main_by_url = self.load_batch_prices('amazon_tv_main_crawled', main_batch_ids, 'product_url',
+                                             extra_where="AND page_type = 'main'")
+        main_by_sku = self.load_batch_prices('amazon_tv_main_crawled', main_batch_ids, 'retailer_sku_name',
+                                             extra_where="AND page_type = 'main'")
+        bsr_by_url = self.load_batch_prices('amazon_tv_bsr', bsr_batch_ids, 'product_url', with_original=False)
+        bsr_by_sku = self.load_batch_prices('amazon_tv_bsr', bsr_batch_ids, 'retailer_sku_name', with_original=False)
+
+        sku_names = {row[3] for row in null_rows if row[3]}
+        main_by_time = self.load_time_prices('amazon_tv_main_crawled', 'retailer_sku_name', sku_names,
+                                             extra_where="AND page_type = 'main'")
+        bsr_by_time = self.load_time_prices('amazon_tv_bsr', 'retailer_sku_name', sku_names, with_original=False)
+
+        updates = []
+        for row_id, product_url, crawl_strdatetime, retailer_sku_name in null_rows:
+            main_batch_id, bsr_batch_id = row_batches[row_id]
+            final_price = None
+            original_price = None
+
+            # Step 3: main prices (URL match > ASIN match within the same batch)
+            if main_batch_id:
+                main_result = main_by_url.get((main_batch_id, product_url))
+                if main_result is None and retailer_sku_name:
+                    main_result = main_by_sku.get((main_batch_id, retailer_sku_name))
+                if main_result:
+                    final_price, original_price = main_result
+
+            # Step 4: BSR final price (no original_sku_price in BSR)
+            if is_missing(final_price) and bsr_batch_id:
+                bsr_result = bsr_by_url.get((bsr_batch_id, product_url))
+                if bsr_result is None and retailer_sku_name:
+                    bsr_result = bsr_by_sku.get((bsr_batch_id, retailer_sku_name))
+                if bsr_result:
+                    final_price = bsr_result[0]
+
+            # Step 5: time-based ASIN match (24-48 hours)
+            if (is_missing(final_price) or is_missing(original_price)) and retailer_sku_name:
+                row_ts = parse_strdatetime(crawl_strdatetime)
+                time_main = (main_by_time[retailer_sku_name].nearest_between(row_ts, TIME_MATCH_MIN, TIME_MATCH_MAX)
+                             if retailer_sku_name in main_by_time else None)
+                if time_main:
+                    if is_missing(final_price):
+                        final_price = time_main[0]
+                    if is_missing(original_price):
+                        original_price = time_main[1]
+
+                if is_missing(final_price) and retailer_sku_name in bsr_by_time:
+                    time_bsr = bsr_by_time[retailer_sku_name].nearest_between(row_ts, TIME_MATCH_MIN, TIME_MATCH_MAX)
+                    if time_bsr:
+                        final_price = time_bsr[0]
+
+            if final_price or original_price:
+                updates.append((row_id, final_price, original_price))
+
+        return updates
+
+    def match_bestbuy(self, null_rows):
+        """Best Buy: detail batch -> nearest main/BSR/promotion batch (48h), then 24-48h URL match"""
+        detail_batches = self.get_detail_batch_ids(
+            'bby_tv_detail_crawled', {row[2] for row in null_rows if row[2]}
+        )
+        sources = ['bestbuy_tv_main_crawl', 'bby_tv_bsr_crawl', 'bby_tv_promotion_crawl']  # priority order
+        indexes = [self.get_batch_index(table) for table in sources]
+
+        # Rows without a detail batch are skipped (same as before)
+        rows = []
+        for row_id, product_url, crawl_strdatetime, retailer_sku_name in null_rows:
+            detail_batch_id = detail_batches.get(crawl_strdatetime)
+            if not detail_batch_id:
+                continue
+            detail_ts = parse_batch_id(detail_batch_id)
+            rows.append((row_id, product_url, crawl_strdatetime,
+                         [index.nearest(detail_ts, MAX_BATCH_DISTANCE) for index in indexes]))
+
+        source_prices = []
+        for pos, table in enumerate(sources):
+            batch_ids = {batches[pos] for _, _, _, batches in rows if batches[pos]}
+            source_prices.append(self.load_batch_prices(table, batch_ids, 'product_url'))
+
+        main_by_time = self.load_time_prices('bestbuy_tv_main_crawl', 'product_url',
+                                             {row[1] for row in rows if row[1]})
+
+        updates = []
+        for row_id, product_url, crawl_strdatetime, batches in rows:
+            final_price = None
+            original_price = None
+
+            # Step 3: Main > BSR > Promotion
+            for pos, batch_id in enumerate(batches):
+                if not batch_id or not (is_missing(final_price) or is_missing(original_price)):
+                    continue
+                result = source_prices[pos].get((batch_id, product_url))
+                if result:
+                    if is_missing(final_price):
+                        final_price = result[0]
+                    if is_missing(original_price):
+                        original_price = result[1]
+
+            # Step 4: time-based URL match (24-48 hours)
+            if (is_missing(final_price) or is_missing(original_price)) and product_url in main_by_time:
+                time_result = main_by_time[product_url].nearest_between(
+                    parse_strdatetime(crawl_strdatetime), TIME_MATCH_MIN, TIME_MATCH_MAX)
+                if time_result:
+                    if is_missing(final_price):
+                        final_price = time_result[0]
+                    if is_missing(original_price):
+                        original_price = time_result[1]
+
+            if final_price or original_price:
+                updates.append((row_id, final_price, original_price))
+
+        return updates
+
+    def match_walmart(self, null_rows):
+        """Walmart: nearest main/BSR row by crawl_strdatetime (48h), then 24-48h URL match"""
+        # walmart_tv_detail_crawled does NOT have batch_id - match on crawl_strdatetime directly
+        sources = ['wmart_tv_main_crawl', 'wmart_tv_bsr_crawl']  # priority order
+        indexes = [self.get_strdatetime_index(table) for table in sources]
+
+        rows = []
+        for row_id, product_url, crawl_strdatetime, retailer_sku_name in null_rows:
+            row_ts = parse_strdatetime(crawl_strdatetime)
+            rows.append((row_id, product_url, row_ts,
+                         [index.nearest(row_ts, MAX_BATCH_DISTANCE) for index in indexes]))
+
+        source_prices = []
+        for pos, table in enumerate(sources):
+            batch_ids = {batches[pos] for _, _, _, batches in rows if batches[pos]}
+            source_prices.append(self.load_batch_prices(table, batch_ids, 'product_url'))
+
+        main_by_time = self.load_time_prices('wmart_tv_main_crawl', 'product_url',
+                                             {row[1] for row in rows if row[1]})
+
+        updates = []
+        for row_id, product_url, row_ts, batches in rows:
+            final_price = None
+            original_price = None
+
+            # Step 3: Main > BSR
+            for pos, batch_id in enumerate(batches):
+                if not batch_id or not (is_missing(final_price) or is_missing(original_price)):
                     continue
+                result = source_prices[pos].get((batch_id, product_url))
+                if result:
+                    if is_missing(final_price):
+                        final_price = result[0]
+                    if is_missing(original_price):
+                        original_price = result[1]
+
+            # Step 4: time-based URL match (24-48 hours)
+            if (is_missing(final_price) or is_missing(original_price)) and product_url in main_by_time:
+                time_result = main_by_time[product_url].nearest_between(row_ts, TIME_MATCH_MIN, TIME_MATCH_MAX)
+                if time_result:
+                    if is_missing(final_price):
+                        final_price = time_result[0]
+                    if is_missing(original_price):
+                        original_price = time_result[1]
+
+            if final_price or original_price:
+                updates.append((row_id, final_price, original_price))
+
+        return updates
 
-                detail_batch_id = detail_result[0]
-
-                # Step 2: Find closest batch within 48 hours (before or after)
-                # Main
-                self.cursor.execute("""
-                    SELECT batch_id
-                    FROM bestbuy_tv_main_crawl
-                    WHERE ABS(EXTRACT(EPOCH FROM (
-                        TO_TIMESTAMP(%s, 'YYYYMMDD_HH24MISS') -
-                        TO_TIMESTAMP(batch_id, 'YYYYMMDD_HH24MISS')
-                    ))) <= 48 * 3600
-                    ORDER BY ABS(EXTRACT(EPOCH FROM (
-                        TO_TIMESTAMP(%s, 'YYYYMMDD_HH24MISS') -
-                        TO_TIMESTAMP(batch_id, 'YYYYMMDD_HH24MISS')
-                    )))
-                    LIMIT 1
-                """, (detail_batch_id, detail_batch_id))
-                main_batch = self.cursor.fetchone()
-                main_batch_id = main_batch[0] if main_batch else None
-
-                # BSR
-                self.cursor.execute("""
-                    SELECT batch_id
-                    FROM bby_tv_bsr_crawl
-                    WHERE ABS(EXTRACT(EPOCH FROM (
-                        TO_TIMESTAMP(%s, 'YYYYMMDD_HH24MISS') -
-                        TO_TIMESTAMP(batch_id, 'YYYYMMDD_HH24MISS')
-                    ))) <= 48 * 3600
-                    ORDER BY ABS(EXTRACT(EPOCH FROM (
-                        TO_TIMESTAMP(%s, 'YYYYMMDD_HH24MISS') -
-                        TO_TIMESTAMP(batch_id, 'YYYYMMDD_HH24MISS')
-                    )))
-                    LIMIT 1
-                """, (detail_batch_id, detail_batch_id))
-                bsr_batch = self.cursor.fetchone()
-                bsr_batch_id = bsr_batch[0] if bsr_batch else None
-
-                # Promotion
-                self.cursor.execute("""
-                    SELECT batch_id
-                    FROM bby_tv_promotion_crawl
-                    WHERE ABS(EXTRACT(EPOCH FROM (
-                        TO_TIMESTAMP(%s, 'YYYYMMDD_HH24MISS') -
-                        TO_TIMESTAMP(batch_id, 'YYYYMMDD_HH24MISS')
-                    ))) <= 48 * 3600
-                    ORDER BY ABS(EXTRACT(EPOCH FROM (
-                        TO_TIMESTAMP(%s, 'YYYYMMDD_HH24MISS') -
-                        TO_TIMESTAMP(batch_id, 'YYYYMMDD_HH24MISS')
-                    )))
-                    LIMIT 1
-                """, (detail_batch_id, detail_batch_id))
-                promo_batch = self.cursor.fetchone()
-                promo_batch_id = promo_batch[0] if promo_batch else None
-
-                # Step 3: Get prices (priority: Main > BSR > Promotion)
-                final_price = None
-                original_price = None
-
-                # Try Main
-                if main_batch_id:
-                    self.cursor.execute("""
-                        SELECT final_sku_price, original_sku_price
-                        FROM bestbuy_tv_main_crawl
-                        WHERE batch_id = %s
-                          AND product_url = %s
-                        LIMIT 1
-                    """, (main_batch_id, product_url))
-                    main_result = self.cursor.fetchone()
-                    if main_result:
-                        final_price, original_price = main_result
-
-                # Try BSR if still NULL
-                if (not final_price or not original_price) and bsr_batch_id:
-                    self.cursor.execute("""
-                        SELECT final_sku_price, original_sku_price
-                        FROM bby_tv_bsr_crawl
-                        WHERE batch_id = %s
-                          AND product_url = %s
-                        LIMIT 1
-                    """, (bsr_batch_id, product_url))
-                    bsr_result = self.cursor.fetchone()
-                    if bsr_result:
-                        if not final_price:
-                            final_price = bsr_result[0]
-                        if not original_price:
-                            original_price = bsr_result[1]
-
-                # Try Promotion if still NULL
-                if (not final_price or not original_price) and promo_batch_id:
-                    self.cursor.execute("""
-                        SELECT final_sku_price, original_sku_price
-                        FROM bby_tv_promotion_crawl
-                        WHERE batch_id = %s
-                          AND product_url = %s
-                        LIMIT 1
-                    """, (promo_batch_id, product_url))
-                    promo_result = self.cursor.fetchone()
-                    if promo_result:
-                        if not final_price:
-                            final_price = promo_result[0]
-                        if not original_price:
-                            original_price = promo_result[1]
-
-                # Step 4: Time-based URL matching (24-48 hours) if no batch_id
-                if not final_price or not original_price:
-                    # Try Main
-                    self.cursor.execute("""
-                        SELECT final_sku_price, original_sku_price
-                        FROM bestbuy_tv_main_crawl
-                        WHERE product_url = %s
-                          AND ABS(EXTRACT(EPOCH FROM (
-                              TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                              TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                          ))) BETWEEN 24 * 3600 AND 48 * 3600
-                        ORDER BY ABS(EXTRACT(EPOCH FROM (
-                              TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                              TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                          )))
-                        LIMIT 1
-                    """, (product_url, crawl_strdatetime, crawl_strdatetime))
-                    time_result = self.cursor.fetchone()
-                    if time_result:
-                        if not final_price:
-                            final_price = time_result[0]
-                        if not original_price:
-                            original_price = time_result[1]
-
-                # Step 5: Update tv_retail_com
-                if final_price or original_price:
-                    self.cursor.execute("""
-                        UPDATE tv_retail_com
-                        SET final_sku_price = COALESCE(final_sku_price, %s),
-                            original_sku_price = COALESCE(original_sku_price, %s)
-                        WHERE id = %s
-                    """, (final_price, original_price, row_id))
-
-                    if self.cursor.rowcount > 0:
-                        updated_count += 1
-
-            except Exception as e:
-                print(f"[ERROR] Row {idx} failed: {e}")
-                self.stats['Bestbuy']['failed'] += 1
-                continue
+    def process_amazon(self, priority_date_range=None):
+        """Process Amazon price backfill"""
+        self.run_account('Amazon', 'Amazon', priority_date_range, self.match_amazon, with_savings=True)
 
-        self.conn.commit()
-        self.stats['Bestbuy']['updated'] = updated_count
-        print(f"[OK] Best Buy: {updated_count} rows updated")
+    def process_bestbuy(self, priority_date_range=None):
+        """Process Best Buy price backfill"""
+        self.run_account('Bestbuy', 'Best Buy', priority_date_range, self.match_bestbuy)
 
     def process_walmart(self, priority_date_range=None):
         """Process Walmart price backfill"""
-        print("\n" + "="*80)
-        print("Processing Walmart")
-        print("="*80)
-
-        # Get NULL price rows
-        if priority_date_range:
-            print(f"[Priority] Processing date range: {priority_date_range[0]} ~ {priority_date_range[1]}")
-            null_rows = self.get_null_price_rows('Walmart', priority_date_range)
-        else:
-            print("[INFO] Processing all NULL prices")
-            null_rows = self.get_null_price_rows('Walmart')
-
-        print(f"[INFO] Found {len(null_rows)} rows with NULL prices")
-
-        if not null_rows:
-            print("[INFO] No rows to process")
-            return
-
-        updated_count = 0
-
-        for idx, (row_id, product_url, crawl_strdatetime, retailer_sku_name) in enumerate(null_rows, 1):
-            try:
-                if idx % 10 == 0:
-                    print(f"[Progress] {idx}/{len(null_rows)} rows processed...")
-
-                # Step 1: walmart_tv_detail_crawled does NOT have batch_id
-                # Find closest batch within 48 hours (before or after) directly from main/bsr tables
-
-                # Find Main batch_id (closest within 48h)
-                self.cursor.execute("""
-                    SELECT batch_id
-                    FROM wmart_tv_main_crawl
-                    WHERE ABS(EXTRACT(EPOCH FROM (
-                        TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                        TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                    ))) <= 48 * 3600
-                    ORDER BY ABS(EXTRACT(EPOCH FROM (
-                        TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                        TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                    )))
-                    LIMIT 1
-                """, (crawl_strdatetime, crawl_strdatetime))
-                main_batch = self.cursor.fetchone()
-                main_batch_id = main_batch[0] if main_batch else None
-
-                # Find BSR batch_id (closest within 48h)
-                self.cursor.execute("""
-                    SELECT batch_id
-                    FROM wmart_tv_bsr_crawl
-                    WHERE ABS(EXTRACT(EPOCH FROM (
-                        TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                        TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                    ))) <= 48 * 3600
-                    ORDER BY ABS(EXTRACT(EPOCH FROM (
-                        TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                        TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                    )))
-                    LIMIT 1
-                """, (crawl_strdatetime, crawl_strdatetime))
-                bsr_batch = self.cursor.fetchone()
-                bsr_batch_id = bsr_batch[0] if bsr_batch else None
-
-                # Step 3: Get prices (priority: Main > BSR)
-                final_price = None
-                original_price = None
-
-                # Try Main
-                if main_batch_id:
-                    self.cursor.execute("""
-                        SELECT final_sku_price, original_sku_price
-                        FROM wmart_tv_main_crawl
-                        WHERE batch_id = %s
-                          AND product_url = %s
-                        LIMIT 1
-                    """, (main_batch_id, product_url))
-                    main_result = self.cursor.fetchone()
-                    if main_result:
-                        final_price, original_price = main_result
-
-                # Try BSR if still NULL
-                if (not final_price or not original_price) and bsr_batch_id:
-                    self.cursor.execute("""
-                        SELECT final_sku_price, original_sku_price
-                        FROM wmart_tv_bsr_crawl
-                        WHERE batch_id = %s
-                          AND product_url = %s
-                        LIMIT 1
-                    """, (bsr_batch_id, product_url))
-                    bsr_result = self.cursor.fetchone()
-                    if bsr_result:
-                        if not final_price:
-                            final_price = bsr_result[0]
-                        if not original_price:
-                            original_price = bsr_result[1]
-
-                # Step 4: Time-based URL matching (24-48 hours)
-                if not final_price or not original_price:
-                    # Try Main
-                    self.cursor.execute("""
-                        SELECT final_sku_price, original_sku_price
-                        FROM wmart_tv_main_crawl
-                        WHERE product_url = %s
-                          AND ABS(EXTRACT(EPOCH FROM (
-                              TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                              TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                          ))) BETWEEN 24 * 3600 AND 48 * 3600
-                        ORDER BY ABS(EXTRACT(EPOCH FROM (
-                              TO_TIMESTAMP(SUBSTRING(%s, 1, 14), 'YYYYMMDDHH24MISS') -
-                              TO_TIMESTAMP(SUBSTRING(crawl_strdatetime, 1, 14), 'YYYYMMDDHH24MISS')
-                          )))
-                        LIMIT 1
-                    """, (product_url, crawl_strdatetime, crawl_strdatetime))
-                    time_result = self.cursor.fetchone()
-                    if time_result:
-                        if not final_price:
-                            final_price = time_result[0]
-                        if not original_price:
-                            original_price = time_result[1]
-
-                # Step 5: Update tv_retail_com
-                if final_price or original_price:
-                    self.cursor.execute("""
-                        UPDATE tv_retail_com
-                        SET final_sku_price = COALESCE(final_sku_price, %s),
-                            original_sku_price = COALESCE(original_sku_price, %s)
-                        WHERE id = %s
-                    """, (final_price, original_price, row_id))
-
-                    if self.cursor.rowcount > 0:
-                        updated_count += 1
-
-            except Exception as e:
-                print(f"[ERROR] Row {idx} failed: {e}")
-                self.stats['Walmart']['failed'] += 1
-                continue
-
-        self.conn.commit()
-        self.stats['Walmart']['updated'] = updated_count
-        print(f"[OK] Walmart: {updated_count} rows updated")
+        self.run_account('Walmart', 'Walmart', priority_date_range, self.match_walmart)
 
     def run(self):
         """Main execution"""
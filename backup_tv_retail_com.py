@@ -1,41 +1,383 @@
-import psycopg2
-from config import DB_CONFIG
+"""
+tv_retail_com (+ retail_reviews) incremental backup / point-in-time restore
+
+매번 CREATE TABLE ... AS SELECT * 로 전체를 복사하는 대신,
+지난 backup 이후 추가된 row (id 기준)만 gzip 압축 COPY (CSV) 파일로 내보내고 manifest에 기록한다.
+
+retail_reviews: review_store.py가 tv_retail_com의 review 텍스트를 retail_reviews로 옮기고 원래 컬럼을 NULL로 만들므로,
+tv_retail_com만 backup하면 restore 후 hash 참조만 남는다. 그래서 BACKUP_TABLES 전체를 같은 snapshot에서
+backup하고 (segment마다 'table'), restore도 같은 시점의 테이블 set을 같이 만든다.
+
+저장 구조 (TV_RETAIL_BACKUP_DIR, 기본 ./backups/tv_retail_com):
+    manifest.json                               - segment 목록 (테이블, 종류, id 범위, 시간 범위, row 수, sha256, snapshot)
+    tv_retail_com_<timestamp>_full.csv.gz       - 전체 backup (restore 기준점)
+    tv_retail_com_<timestamp>_incr.csv.gz       - 이전 backup 이후 추가된 row
+    retail_reviews_<timestamp>_<kind>.csv.gz    - 같은 backup의 retail_reviews segment
+
+일관성:
+- 범위 (MAX(id) / COUNT) 조회와 COPY는 하나의 REPEATABLE READ snapshot 안에서 실행 -> manifest row 수 = 파일 row 수
+- id는 commit 순서대로 보이지 않는다 (긴 DetailIngestor COPY transaction이 backup 뒤에 commit 되면
+  이전 segment의 max_id보다 작은 id가 나중에 나타남). 그래서 segment마다 snapshot (txid_current_snapshot)을 기록하고,
+  다음 incremental은 id > max_id 인 row + 이전 snapshot에서 보이지 않던 (late commit) row를 같이 내보낸다.
+  late commit을 찾는 id 범위의 하한 (late_floor)은, 이번 snapshot에서 진행 중인 transaction이 모두 시작되기 전에
+  찍힌 segment의 max_id
+- restore는 같은 id가 여러 segment에 있으면 나중 segment 값을 사용 (late 범위에서 UPDATE 된 row도 다시 내보내짐)
+
+주의: incremental segment는 새 id (+ late 범위의 변경)만 담는다. 이미 backup된 row의 UPDATE (가격 backfill 등)까지
+반영하려면 가끔 --full 로 기준점을 새로 만든다.
+
+Usage:
+    python backup_tv_retail_com.py                          # incremental backup (처음이면 full)
+    python backup_tv_retail_com.py --full                   # full backup
+    python backup_tv_retail_com.py --list                   # segment 목록
+    python backup_tv_retail_com.py --restore 20251110_090000 [--target table_name]   # tv_retail_com 대상 이름
+    python backup_tv_retail_com.py --restore latest         # retail_reviews는 retail_reviews_restore_<timestamp>
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
 from datetime import datetime
 
-def backup_tv_retail_com():
-    """Backup tv_retail_com table"""
+# Shared pooled database layer
+from db_manager import get_connection
+
+BACKUP_DIR = os.environ.get(
+    'TV_RETAIL_BACKUP_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backups', 'tv_retail_com')
+)
+MANIFEST_FILE = os.path.join(BACKUP_DIR, 'manifest.json')
+
+TABLE = 'tv_retail_com'
+
+# backup 대상 테이블 -> 시간 범위 컬럼 (manifest 기록용)
+BACKUP_TABLES = {
+    'tv_retail_com': 'crawl_strdatetime',
+    'retail_reviews': 'first_seen_at',
+}
+
+XID_WRAP = 1 << 32
+XID_HALF = 1 << 31
+
+def load_manifest():
+    """manifest 읽기 (없으면 빈 manifest)"""
+    if not os.path.exists(MANIFEST_FILE):
+        return {'table': TABLE, 'segments': []}
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    """manifest 저장 (임시 파일에 쓴 뒤 교체)"""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    tmp_path = f"{MANIFEST_FILE}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)  # datetime 등은 문자열로
+    os.replace(tmp_path, MANIFEST_FILE)
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def parse_snapshot(snapshot):
+    """'xmin:xmax:xip,...' -> (xmin, xmax)"""
+    xmin, xmax, _ = snapshot.split(':', 2)
+    return int(xmin), int(xmax)
+
+def row_txid_sql(reference_xid):
+    """
+    row의 32bit xmin -> reference_xid 근처 epoch의 64bit txid (txid_visible_in_snapshot 용)
+    reference_xid에서 2^31 이상 떨어지면 앞 / 뒤 epoch로 보정
+    """
+    reference_xid = int(reference_xid)
+    base = f"(({reference_xid // XID_WRAP}::BIGINT << 32) | xmin::TEXT::BIGINT)"
+    return (f"({base} + CASE WHEN {base} - {reference_xid} > {XID_HALF} THEN -{XID_WRAP} "
+            f"WHEN {reference_xid} - {base} > {XID_HALF} THEN {XID_WRAP} ELSE 0 END)")
+
+def late_floor(segments, snapshot):
+    """
+    다음 incremental의 late commit 검사 하한 id
+    이번 snapshot에서 진행 중인 transaction (xid >= snapshot xmin)은 모두 xmax <= snapshot xmin 인
+    segment 뒤에 시작했으므로, 그 segment들의 max_id 이하 id는 가질 수 없다
+    """
+    xmin, _ = parse_snapshot(snapshot)
+    floors = [s['max_id'] for s in segments
+              if s.get('snapshot') and parse_snapshot(s['snapshot'])[1] <= xmin]
+    return max(floors, default=0)
+
+def table_segments(segments, table):
+    """테이블의 segment만 (table 기록 전 segment는 tv_retail_com)"""
+    return [s for s in segments if s.get('table', TABLE) == table]
+
+def late_condition(segments):
+    """
+    incremental 조건 (id > 이전 max_id + 이전 snapshot에서 보이지 않던 late commit / UPDATE row)
+
+    Returns:
+        (WHERE 조건, 이전 max_id)
+    """
+    previous = max(segments, key=lambda s: (s['created_at'], s['max_id']))
+    last_id = max(segment['max_id'] for segment in segments)
+    if not previous.get('snapshot'):
+        # snapshot 기록 전 segment - late commit 검사 불가
+        return f"id > {int(last_id)}", last_id
+    previous_floor = previous.get('late_floor', 0)
+    condition = (f"id > {int(last_id)} OR (id > {int(previous_floor)} AND id <= {int(last_id)} "
+                 f"AND NOT txid_visible_in_snapshot({row_txid_sql(parse_snapshot(previous['snapshot'])[1])}, "
+                 f"'{previous['snapshot']}'::txid_snapshot))")
+    return condition, last_id
+
+def backup_table(cursor, table, segments, full, snapshot, timestamp):
+    """
+    테이블 1개 segment 파일 생성 (backup_tv_retail_com의 snapshot transaction 안에서)
+
+    Returns:
+        manifest segment dict (새 row가 없으면 None)
+    """
+    kind = 'full' if full or not segments else 'incr'
+    if kind == 'full':
+        condition, last_id = "TRUE", 0
+    else:
+        condition, last_id = late_condition(segments)
+
+    time_column = BACKUP_TABLES[table]
+    cursor.execute(f"""
+        SELECT MIN(id), MAX(id), COUNT(*), MIN({time_column})::text, MAX({time_column})::text
+        FROM {table}
+        WHERE {condition}
+    """)
+    min_id, max_id, count, min_time, max_time = cursor.fetchone()
+
+    if not count:
+        print(f"[INFO] {table}: no new rows since last backup (id > {last_id:,})")
+        return None
+
+    cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+    columns = [desc[0] for desc in cursor.description]
+
+    file_name = f"{table}_{timestamp}_{kind}.csv.gz"
+    file_path = os.path.join(BACKUP_DIR, file_name)
+
+    late_count = 0
+    if min_id <= last_id:
+        cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE ({condition}) AND id <= {int(last_id)}")
+        late_count = cursor.fetchone()[0]
+    print(f"Creating {kind} backup: {file_name} (id {min_id:,} ~ {max_id:,}"
+          f"{f', {late_count:,} late-committed / updated rows' if late_count else ''})")
+
+    copy_query = f"""
+        COPY (
+            SELECT {', '.join(columns)}
+            FROM {table}
+            WHERE {condition}
+            ORDER BY id
+        ) TO STDOUT WITH (FORMAT csv, HEADER)
+    """
+    tmp_path = f"{file_path}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', newline='', compresslevel=6) as f:
+        cursor.copy_expert(copy_query, f)
+    os.replace(tmp_path, file_path)
+
+    print(f"[OK] {table}: {count:,} rows ({os.path.getsize(file_path):,} bytes compressed)")
+    return {
+        'table': table,
+        'file': file_name,
+        'kind': kind,
+        'created_at': timestamp,
+        'min_id': min_id,
+        'max_id': max(max_id, last_id),
+        'rows': count,
+        'late_rows': late_count,
+        f'min_{time_column}': min_time,
+        f'max_{time_column}': max_time,
+        'columns': columns,
+        'snapshot': snapshot,
+        'late_floor': late_floor(segments, snapshot),
+        'bytes': os.path.getsize(file_path),
+        'sha256': file_sha256(file_path),
+    }
+
+def backup_tv_retail_com(full=False):
+    """
+    Backup tv_retail_com / retail_reviews rows added since the last backup (or everything with full=True)
+
+    Returns:
+        새 segment 파일 경로 list (새 row가 없으면 빈 list), 실패하면 None
+    """
+    conn = None
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
+        manifest = load_manifest()
+        segments = manifest['segments']
+
+        conn = get_connection(autocommit=False)
         cursor = conn.cursor()
 
-        # Create backup table name with timestamp
+        # 범위 조회 / COPY를 모든 테이블에서 같은 snapshot으로 (backup 도중 commit 되는 row는 다음 backup으로)
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        cursor.execute("SELECT txid_current_snapshot()::text")
+        snapshot = cursor.fetchone()[0]
+
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_table = f'tv_retail_com_backup_{timestamp}'
+        os.makedirs(BACKUP_DIR, exist_ok=True)
 
-        print(f"Creating backup table: {backup_table}")
+        created = []
+        for table in BACKUP_TABLES:
+            cursor.execute("SELECT to_regclass(%s)", (table,))
+            if cursor.fetchone()[0] is None:
+                print(f"[INFO] {table}: table not found, skipped")
+                continue
+            segment = backup_table(cursor, table, table_segments(segments, table), full, snapshot, timestamp)
+            if segment:
+                created.append(segment)
+        conn.rollback()  # read only
+        cursor.close()
 
-        # Create backup table as a copy of tv_retail_com
-        cursor.execute(f"""
-            CREATE TABLE {backup_table} AS
-            SELECT * FROM tv_retail_com
-        """)
+        if not created:
+            return []
+        segments.extend(created)
+        save_manifest(manifest)
 
-        # Get row count
-        cursor.execute(f"SELECT COUNT(*) FROM {backup_table}")
-        count = cursor.fetchone()[0]
+        file_paths = [os.path.join(BACKUP_DIR, segment['file']) for segment in created]
+        print(f"[OK] Backup created: {', '.join(file_paths)}")
+        return file_paths
 
-        conn.commit()
+    except Exception as e:
+        print(f"[ERROR] Backup failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+    finally:
+        if conn:
+            conn.close()
+
+def select_segments(segments, point_in_time=None):
+    """
+    point_in_time (YYYYMMDD_HHMMSS) 시점의 table 상태를 만드는 segment 목록
+    마지막 full segment + 그 이후 incremental segment
+    """
+    candidates = [s for s in segments if point_in_time is None or s['created_at'] <= point_in_time]
+    candidates.sort(key=lambda s: s['created_at'])
+
+    base_index = None
+    for idx, segment in enumerate(candidates):
+        if segment['kind'] == 'full':
+            base_index = idx
+    if base_index is None:
+        return []
+    return candidates[base_index:]
 
-        print(f"[OK] Backup created: {backup_table}")
-        print(f"[OK] Total rows backed up: {count:,}")
+def list_backups():
+    """segment 목록 출력"""
+    segments = load_manifest()['segments']
+    if not segments:
+        print("[INFO] No backups found")
+        return
+    print(f"{'created_at':<17} {'table':<15} {'kind':<5} {'id range':<25} {'rows':>10} {'late':>8} {'bytes':>14}")
+    for s in sorted(segments, key=lambda s: (s['created_at'], s.get('table', TABLE))):
+        id_range = f"{s['min_id']:,} ~ {s['max_id']:,}"
+        print(f"{s['created_at']:<17} {s.get('table', TABLE):<15} {s['kind']:<5} {id_range:<25} {s['rows']:>10,} "
+              f"{s.get('late_rows', 0):>8,} {s['bytes']:>14,}")
 
+def restore_table(cursor, table, segments, target_table):
+    """segment들을 target_table로 복원 (같은 id는 나중 segment 값으로 교체)"""
+    cursor.execute(f"CREATE TABLE {target_table} (LIKE {table} INCLUDING DEFAULTS)")
+    # segment를 staging에 읽은 뒤 같은 id는 나중 segment 값으로 교체 (late commit / overlap dedupe)
+    cursor.execute(f"CREATE TEMP TABLE restore_staging (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+
+    for segment in segments:
+        file_path = os.path.join(BACKUP_DIR, segment['file'])
+        if file_sha256(file_path) != segment['sha256']:
+            raise ValueError(f"Checksum mismatch: {segment['file']}")
+
+        column_list = ', '.join(segment['columns'])
+        cursor.execute("TRUNCATE restore_staging")
+        with gzip.open(file_path, 'rt', encoding='utf-8', newline='') as f:
+            cursor.copy_expert(
+                f"COPY restore_staging ({column_list}) FROM STDIN WITH (FORMAT csv, HEADER)", f
+            )
+        replaced = 0
+        if segment['kind'] != 'full' and segment.get('late_rows'):
+            cursor.execute(f"DELETE FROM {target_table} t USING restore_staging s WHERE t.id = s.id")
+            replaced = cursor.rowcount
+        cursor.execute(f"INSERT INTO {target_table} ({column_list}) SELECT {column_list} FROM restore_staging")
+        print(f"  [OK] {segment['file']}: {segment['rows']:,} rows"
+              f"{f' ({replaced:,} replaced)' if replaced else ''}")
+
+    cursor.execute("DROP TABLE restore_staging")
+    cursor.execute(f"SELECT COUNT(*) FROM {target_table}")
+    return cursor.fetchone()[0]
+
+def restore_tv_retail_com(point_in_time=None, target_table=None):
+    """Restore tv_retail_com (+ retail_reviews) as of point_in_time into new tables"""
+    conn = None
+    try:
+        all_segments = load_manifest()['segments']
+        segments = select_segments(table_segments(all_segments, TABLE), point_in_time)
+        if not segments:
+            print(f"[ERROR] No full backup found at or before {point_in_time or 'latest'}")
+            return None
+
+        restore_point = segments[-1]['created_at']
+        targets = {TABLE: (segments, target_table or f"{TABLE}_restore_{restore_point}")}
+        for table in BACKUP_TABLES:
+            if table == TABLE:
+                continue
+            # tv_retail_com 복원 시점까지의 segment (같은 backup에서 만든 segment는 같은 timestamp)
+            table_restore = select_segments(table_segments(all_segments, table), restore_point)
+            if table_restore:
+                targets[table] = (table_restore, f"{table}_restore_{restore_point}")
+            else:
+                print(f"[WARNING] No {table} backup at or before {restore_point} - "
+                      f"rows whose review text was moved to {table} will only have hash references")
+
+        conn = get_connection(autocommit=False)
+        cursor = conn.cursor()
+        restored = []
+        for table, (table_restore, target) in targets.items():
+            print(f"Restoring {table} as of {restore_point} into {target} ({len(table_restore)} segments)")
+            total_rows = restore_table(cursor, table, table_restore, target)
+            restored.append((table, target, total_rows))
+        conn.commit()
         cursor.close()
-        conn.close()
+
+        for table, target, total_rows in restored:
+            print(f"[OK] Restore complete: {target} ({total_rows:,} rows)")
+        print("[INFO] Swap in manually if needed: " + ' '.join(
+            f"ALTER TABLE {table} RENAME TO ...; ALTER TABLE {target} RENAME TO {table};"
+            for table, target, _ in restored))
+        return targets[TABLE][1]
 
     except Exception as e:
-        print(f"[ERROR] Backup failed: {e}")
+        print(f"[ERROR] Restore failed: {e}")
+        if conn:
+            conn.rollback()
         import traceback
         traceback.print_exc()
+        return None
+
+    finally:
+        if conn:
+            conn.close()
+
+def get_arg_value(args, name):
+    """--name value 형식 인자 읽기"""
+    if name in args:
+        idx = args.index(name)
+        if idx + 1 < len(args) and not args[idx + 1].startswith('--'):
+            return args[idx + 1]
+    return None
 
 if __name__ == "__main__":
-    backup_tv_retail_com()
+    args = sys.argv[1:]
+    if '--list' in args:
+        list_backups()
+    elif '--restore' in args:
+        point = get_arg_value(args, '--restore')
+        restore_tv_retail_com(None if point in (None, 'latest') else point,
+                              get_arg_value(args, '--target'))
+    else:
+        backup_tv_retail_com(full='--full' in args)
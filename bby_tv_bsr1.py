@@ -24,7 +24,6 @@ import time
 import random
 import re
 import os
-import psycopg2
 from datetime import datetime
 import pytz
 from selenium import webdriver
@@ -37,8 +36,17 @@ from webdriver_manager.chrome import ChromeDriverManager
 from lxml import html
 from data_validator import DataValidator
 
-# Import database configuration
-from config import DB_CONFIG
+# Shared pooled database layer
+from db_manager import get_connection
+from page_fetcher import PageFetcher
+from pacing import get_pacer
+from crawl_schema import mark_batch_complete
+from snapshot_store import SnapshotStore, ReplayFetcher, get_reparse_batch_id, disable_delays
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
+
+# Base container: li with class "product-list-item product-list-item-gridView"
+CONTAINER_XPATH = '//li[contains(@class, "product-list-item") and contains(@class, "product-list-item-gridView")]'
 
 class BestBuyBSRCrawler:
     def __init__(self):
@@ -47,17 +55,21 @@ class BestBuyBSRCrawler:
         self.db_conn = None
         self.total_collected = 0
         self.error_messages = []
+        self.fetcher = None  # HTTP-first page fetcher (browser only as fallback)
+        self.pacer = get_pacer('bestbuy')  # Adaptive delay between pages
+        self.reparse_batch_id = get_reparse_batch_id()  # --reparse <batch_id>: rebuild rows from snapshots
 
         # Data validator 초기화
         session_start_time = os.environ.get('SESSION_START_TIME', datetime.now().strftime('%Y%m%d%H%M'))
         self.validator = DataValidator(session_start_time)
         self.korea_tz = pytz.timezone('Asia/Seoul')
-        self.batch_id = datetime.now(self.korea_tz).strftime('%Y%m%d_%H%M%S')
+        self.batch_id = self.reparse_batch_id or datetime.now(self.korea_tz).strftime('%Y%m%d_%H%M%S')
+        self.snapshots = SnapshotStore('bby_tv_bsr1', self.batch_id)  # Raw page source store for --reparse
 
     def connect_db(self):
         """Connect to PostgreSQL database"""
         try:
-            self.db_conn = psycopg2.connect(**DB_CONFIG)
+            self.db_conn = get_connection(autocommit=False)
             print("[OK] Database connected")
             return True
         except Exception as e:
@@ -68,7 +80,7 @@ class BestBuyBSRCrawler:
         """Setup Chrome WebDriver"""
         chrome_options = Options()
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36')
+        chrome_options.add_argument(f'--user-agent={USER_AGENT}')
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument('--no-sandbox')
         chrome_options.add_argument('--window-size=1920,1080')
@@ -142,64 +154,71 @@ class BestBuyBSRCrawler:
         except Exception as e:
             return None
 
+    def load_page_with_browser(self, url, page_number):
+        """Load page in Chrome with lazy-load scrolling (fallback when plain HTTP fetch is incomplete)"""
+        if self.driver is None:
+            self.setup_driver()
+
+        self.driver.get(url)
+
+        print("[INFO] Waiting for page to load...")
+        time.sleep(random.uniform(5, 8))
+
+        # Wait for product list to load
+        try:
+            self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "product-list-item")))
+            print("[OK] Product list loaded")
+        except Exception as e:
+            print(f"[WARNING] Product list not found: {e}")
+
+        # Aggressive scroll to trigger lazy loading of all products
+        print("[INFO] Performing aggressive scroll to load all products...")
+
+        # First pass - scroll down to bottom multiple times
+        for scroll_round in range(3):
+            print(f"[DEBUG] Scroll round {scroll_round + 1}/3")
+            scroll_height = self.driver.execute_script("return document.body.scrollHeight")
+            screen_height = self.driver.execute_script("return window.innerHeight")
+
+            current_position = 0
+            while current_position < scroll_height:
+                current_position += screen_height
+                self.driver.execute_script(f"window.scrollTo(0, {current_position});")
+                time.sleep(2)
+
+                # Check if new content loaded
+                new_scroll_height = self.driver.execute_script("return document.body.scrollHeight")
+                if new_scroll_height > scroll_height:
+                    scroll_height = new_scroll_height
+                    print(f"[DEBUG] Page height increased to {scroll_height}")
+
+            # Scroll to absolute bottom
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            time.sleep(3)
+            print(f"[DEBUG] Completed scroll round {scroll_round + 1}, final height: {scroll_height}")
+
+        # Scroll back to top slowly
+        print("[INFO] Scrolling back to top...")
+        self.driver.execute_script("window.scrollTo(0, 0);")
+        time.sleep(5)
+
+        # Wait for all content to settle
+        print("[INFO] Waiting for content to fully render...")
+        time.sleep(8)
+
+        return self.driver.page_source
+
     def scrape_page(self, url, page_number):
         """Scrape a single Best Buy page"""
         try:
             print(f"\n[PAGE {page_number}] Accessing: {url[:80]}...")
-            self.driver.get(url)
-
-            print("[INFO] Waiting for page to load...")
-            time.sleep(random.uniform(5, 8))
-
-            # Wait for product list to load
-            try:
-                self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "product-list-item")))
-                print("[OK] Product list loaded")
-            except Exception as e:
-                print(f"[WARNING] Product list not found: {e}")
-
-            # Aggressive scroll to trigger lazy loading of all products
-            print("[INFO] Performing aggressive scroll to load all products...")
-
-            # First pass - scroll down to bottom multiple times
-            for scroll_round in range(3):
-                print(f"[DEBUG] Scroll round {scroll_round + 1}/3")
-                scroll_height = self.driver.execute_script("return document.body.scrollHeight")
-                screen_height = self.driver.execute_script("return window.innerHeight")
-
-                current_position = 0
-                while current_position < scroll_height:
-                    current_position += screen_height
-                    self.driver.execute_script(f"window.scrollTo(0, {current_position});")
-                    time.sleep(2)
-
-                    # Check if new content loaded
-                    new_scroll_height = self.driver.execute_script("return document.body.scrollHeight")
-                    if new_scroll_height > scroll_height:
-                        scroll_height = new_scroll_height
-                        print(f"[DEBUG] Page height increased to {scroll_height}")
-
-                # Scroll to absolute bottom
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(3)
-                print(f"[DEBUG] Completed scroll round {scroll_round + 1}, final height: {scroll_height}")
-
-            # Scroll back to top slowly
-            print("[INFO] Scrolling back to top...")
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(5)
-
-            # Wait for all content to settle
-            print("[INFO] Waiting for content to fully render...")
-            time.sleep(8)
-
-            # Get page source and parse with lxml
-            page_source = self.driver.page_source
-            tree = html.fromstring(page_source)
+
+            # Plain HTTP first, Chrome only if the product list is missing or incomplete
+            page_source, tree, source = self.fetcher.fetch(url, page_number)
+            print(f"[INFO] Page fetched via {source}")
 
             # Find all product containers
-            # Base container: li with class "product-list-item product-list-item-gridView"
-            containers = tree.xpath('//li[contains(@class, "product-list-item") and contains(@class, "product-list-item-gridView")]')
+            containers = tree.xpath(CONTAINER_XPATH)
             print(f"[INFO] Found {len(containers)} product containers")
 
             collected_count = 0
@@ -366,6 +385,19 @@ class BestBuyBSRCrawler:
             self.error_messages.append(f"DB save error: {e}")
             return False
 
+    def clear_batch_rows(self):
+        """Delete existing rows of the batch being re-parsed"""
+        try:
+            cursor = self.db_conn.cursor()
+            cursor.execute("DELETE FROM bby_tv_bsr1 WHERE batch_id = %s", (self.batch_id,))
+            deleted = cursor.rowcount
+            self.db_conn.commit()
+            cursor.close()
+            print(f"[INFO] Cleared batch {self.batch_id}: {deleted} rows")
+        except Exception as e:
+            self.db_conn.rollback()
+            print(f"[WARNING] Failed to clear batch {self.batch_id}: {e}")
+
     def run(self):
         """Main execution"""
         try:
@@ -377,15 +409,35 @@ class BestBuyBSRCrawler:
             if not self.connect_db():
                 return
 
-            # Load page URLs
-            page_urls = self.load_page_urls()
+            if self.reparse_batch_id:
+                # Re-parse stored pages - no network access
+                if not self.snapshots.exists():
+                    print(f"[ERROR] No snapshots found for batch {self.batch_id}")
+                    return
+                page_urls = [tuple(item) for item in self.snapshots.load_manifest('page_urls', [])]
+                disable_delays(self.pacer)
+                self.clear_batch_rows()
+                self.fetcher = ReplayFetcher(self.snapshots)
+            else:
+                # Load page URLs
+                page_urls = self.load_page_urls()
+                self.snapshots.save_manifest('page_urls', page_urls)
+
+                # WebDriver is started lazily, only if a page needs the browser fallback
+                self.fetcher = PageFetcher(
+                    CONTAINER_XPATH,
+                    browser_fetch=self.load_page_with_browser,
+                    get_driver=lambda: self.driver,
+                    user_agent=USER_AGENT,
+                    min_containers=18,
+                    snapshot_store=self.snapshots,
+                    pacer=self.pacer
+                )
+
             if not page_urls:
                 print("[ERROR] No page URLs found")
                 return
 
-            # Setup WebDriver
-            self.setup_driver()
-
             # Scrape each page
             for page_number, url in page_urls:
                 if not self.scrape_page(url, page_number):
@@ -396,11 +448,16 @@ class BestBuyBSRCrawler:
                     else:
                         print(f"[WARNING] Failed to scrape page {page_number}, continuing...")
 
-                # Random delay between pages
-                time.sleep(random.uniform(5, 8))
+                # Adaptive delay between pages
+                self.pacer.wait()
 
             print("\n" + "="*80)
             print(f"Best Buy Crawling completed! Total collected: {self.total_collected} products")
+            if self.total_collected:
+                mark_batch_complete(self.db_conn, 'bby_tv_bsr1', self.batch_id)
+            print(f"[INFO] Pages fetched - HTTP: {self.fetcher.stats['http']}, Browser: {self.fetcher.stats['browser']}, "
+                  f"Snapshot: {self.fetcher.stats.get('snapshot', 0)}")
+            print(self.pacer.summary())
             print("="*80)
 
             if self.error_messages:
@@ -417,11 +474,11 @@ class BestBuyBSRCrawler:
                 print(f"Total Issues Detected: {summary['total']}")
                 for issue_type, count in sorted(summary['by_type'].items()):
                     print(f"  {issue_type}: {count}")
-                print(f"\nLog file: C:\\samsung_dx_retail_com\\problems\\{self.validator.session_start_time}.txt")
+                print(f"\nLog file: {self.validator.log_file}")
                 print("="*80)
-                self.validator.write_summary()
             else:
                 print("\n[OK] No data quality issues detected")
+            self.validator.write_summary()
 
         except Exception as e:
             print(f"[ERROR] Crawler failed: {e}")
@@ -36,42 +36,180 @@ v1 추가 수정사항 (2025-11-15):
    - 동일한 가격 컨테이너 사용 (/html/body/div[5]/div[4]/div[1])
    - 콤마 처리 포함 (예: "(1,234 reviews)" → "1234")
 """
-import time
-import random
 import re
 import os
-import psycopg2
 from datetime import datetime
 import pytz
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
 from lxml import html
 from data_validator import DataValidator
 
-# Import database configuration
-from config import DB_CONFIG
+# Shared pooled database layer
+from db_manager import get_connection
+from detail_worker_pool import get_worker_count, run_detail_workers
+from pacing import get_pacer
+from page_waits import PageWaits, enable_network_log
+from resource_policy import apply_resource_policy
+from browser_sessions import attach_session
+from dom_capture import capture
+from detail_queue import DetailQueue
+from crawl_schema import clear_batch, ensure_batch_column, get_latest_batches, mark_batch_complete
+from attribute_backfill import run_backfill
+from detail_ingest import DetailIngestor
+from review_harvest import SEEN_TABLE, SEEN_TABLE_SPEC, ReviewHarvester, bestbuy_reviews_url, ensure_seen_table
+from review_store import REVIEW_REF_COLUMNS, REVIEW_TABLE, REVIEW_TABLE_SPEC, ensure_review_store, review_refs
+from value_normalizer import TYPED_COLUMNS, ensure_typed_columns, parse_count, parse_star_counts, typed_values
+from snapshot_store import SnapshotStore, RecordingDriver, ReplayDriver, get_reparse_batch_id, disable_delays
+
+# Compare similar products section (page 전체 대신 이 element들만 browser에서 가져옴)
+COMPARE_TITLE_XPATH = '//div[@class="product-title font-weight-normal pb-100 body-copy-lg min-h-600"]'
+COMPARE_TABLE_XPATH = '/html/body/div[5]/div[6]/div/table'
+REVIEW_ITEM_XPATH = '//li[@class="review-item"]'
+
+# main → bsr → promotion 순서로 URL 병합 (첫 source의 data + 모든 source의 rank) 후 detail_crawl_queue에 추가
+QUEUE_FILL_SQL = """
+    WITH src AS (
+        SELECT product_url, 1 AS source_order, main_rank AS source_rank, 'main' AS page_type,
+               offer, pick_up_availability, shipping_availability, delivery_availability, sku_status,
+               main_rank, NULL::INTEGER AS bsr_rank, NULL::INTEGER AS promotion_rank, NULL::TEXT AS promotion_type
+        FROM bby_tv_main1
+        WHERE batch_id = %(main_batch)s AND product_url IS NOT NULL
+        UNION ALL
+        SELECT product_url, 2, bsr_rank, 'bsr',
+               offer, pick_up_availability, shipping_availability, delivery_availability, sku_status,
+               NULL, bsr_rank, NULL, NULL
+        FROM bby_tv_bsr1
+        WHERE batch_id = %(bsr_batch)s AND product_url IS NOT NULL
+        UNION ALL
+        SELECT product_url, 3, promotion_rank, 'promotion',
+               offer, NULL, NULL, NULL, NULL,
+               NULL, NULL, promotion_rank, promotion_type
+        FROM bby_tv_pmt1
+        WHERE batch_id = %(promo_batch)s AND product_url IS NOT NULL
+    ),
+    first_seen AS (
+        SELECT DISTINCT ON (product_url) *
+        FROM src
+        ORDER BY product_url, source_order, source_rank
+    ),
+    ranks AS (
+        SELECT product_url,
+               MIN(main_rank) AS main_rank,
+               MIN(bsr_rank) AS bsr_rank,
+               MIN(promotion_rank) AS promotion_rank,
+               (ARRAY_AGG(promotion_type ORDER BY promotion_rank) FILTER (WHERE promotion_type IS NOT NULL))[1]
+                   AS promotion_type
+        FROM src
+        GROUP BY product_url
+    )
+    INSERT INTO detail_crawl_queue
+        (retailer, queue_batch, product_url, page_type, seq, main_rank, bsr_rank, promotion_rank, source_data)
+    SELECT %(retailer)s, %(queue_batch)s, f.product_url, f.page_type,
+           ROW_NUMBER() OVER (ORDER BY f.source_order, f.source_rank, f.product_url),
+           r.main_rank, r.bsr_rank, r.promotion_rank,
+           jsonb_build_object(
+               'final_sku_price', NULL, 'savings', NULL, 'original_sku_price', NULL, 'star_rating', NULL,
+               'offer', f.offer,
+               'pick_up_availability', f.pick_up_availability,
+               'shipping_availability', f.shipping_availability,
+               'delivery_availability', f.delivery_availability,
+               'sku_status', f.sku_status,
+               'promotion_type', r.promotion_type)
+    FROM first_seen f
+    JOIN ranks r USING (product_url)
+    ON CONFLICT (retailer, queue_batch, product_url) DO NOTHING
+"""
+
+# ingestor가 COPY 하는 컬럼 (save_to_db의 row tuple 순서)
+BBY_TV_CRAWL_COLUMNS = [
+    'account_name', 'batch_id', 'page_type', '"order"', 'retailer_sku_name', 'item',
+    'Estimated_Annual_Electricity_Use', 'screen_size', 'count_of_reviews', 'Count_of_Star_Ratings', 'Top_Mentions',
+    'Detailed_Review_Content', 'Recommendation_Intent', 'product_url', 'crawl_datetime', 'calendar_week',
+    'final_sku_price', 'savings', 'original_sku_price', 'offer', 'pick_up_availability', 'shipping_availability',
+    'delivery_availability', 'sku_status', 'star_rating', 'promotion_type', 'promotion_rank',
+    'bsr_rank', 'main_rank',
+]
+
+TV_RETAIL_COLUMNS = [
+    'item', 'account_name', 'page_type', 'count_of_reviews', 'retailer_sku_name', 'product_url',
+    'star_rating', 'count_of_star_ratings', 'screen_size', 'sku_popularity',
+    'final_sku_price', 'original_sku_price', 'savings', 'discount_type', 'offer',
+    'pick_up_availability', 'shipping_availability', 'delivery_availability', 'shipping_info',
+    'available_quantity_for_purchase', 'inventory_status', 'sku_status', 'retailer_membership_discounts',
+    'recommendation_intent',
+    'main_rank', 'bsr_rank', 'rank_1', 'rank_2', 'promotion_rank',
+    'number_of_ppl_purchased_yesterday', 'number_of_ppl_added_to_carts', 'retailer_sku_name_similar',
+    'estimated_annual_electricity_use', 'promotion_type',
+    'calendar_week', 'crawl_datetime', 'batch_id',
+] + TYPED_COLUMNS + REVIEW_REF_COLUMNS  # 가격 / 별점 typed 값 + review 텍스트 대신 retail_reviews 참조
+
+# ingestor buffer에서 item lookup 할 때 쓰는 위치
+CRAWL_NAME_INDEX = BBY_TV_CRAWL_COLUMNS.index('retailer_sku_name')
+CRAWL_ITEM_INDEX = BBY_TV_CRAWL_COLUMNS.index('item')
+
+# 4items 비교 제품마다 실행되는 쿼리 -> execute_prepared로 connection 당 1번만 parse/plan
+ITEM_BY_NAME_SQL = """
+    SELECT item
+    FROM bby_tv_crawl
+    WHERE retailer_sku_name = %s
+    AND item IS NOT NULL
+    ORDER BY crawl_datetime DESC
+    LIMIT 1
+"""
+
+MST_INSERT_SQL = """
+    INSERT INTO bby_tv_mst
+    (account_name, item, product_url, pros, cons, product_name, update_date, calendar_week,
+     batch_id)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# --reparse 때 batch_id로 지우고 다시 쓰는 테이블 -> account_name 조건 (retailer 공용 테이블만)
+BATCH_KEYED_TABLES = {'bby_tv_crawl': None, 'tv_retail_com': 'Bestbuy', 'bby_tv_mst': None}
 
 class BestBuyDetailCrawler:
     def __init__(self):
         self.driver = None
         self.db_conn = None
         self.korea_tz = pytz.timezone('Asia/Seoul')
-        self.batch_id = datetime.now(self.korea_tz).strftime('%Y%m%d_%H%M%S')
+        self.reparse_batch_id = get_reparse_batch_id()  # --reparse <batch_id>: snapshot으로 다시 파싱
+        self.batch_id = self.reparse_batch_id or datetime.now(self.korea_tz).strftime('%Y%m%d_%H%M%S')
+        self.snapshots = SnapshotStore('bby_tv_dt1', self.batch_id)  # Raw page source 저장소
         self.order = 0
+        self.session_pages = 0  # 현재 browser session에서 처리한 page 수
+        self.profile_dir = None  # Chrome profile (worker-pool 모드에서 worker 별로 설정)
+        self.work_queue = None  # detail_crawl_queue (get_recent_urls에서 생성)
+        self.pacer = get_pacer('bestbuy')  # page 간 adaptive 딜레이 (worker 공유)
+        self.waits = PageWaits()  # page load / dialog 준비 조건 wait (worker 공유)
+        # detail record buffer -> bby_tv_crawl + tv_retail_com COPY (worker 공유)
+        self.ingestor = DetailIngestor('bestbuy', {REVIEW_TABLE: REVIEW_TABLE_SPEC,  # review 먼저 (한 번만 저장)
+                                                   'bby_tv_crawl': BBY_TV_CRAWL_COLUMNS,
+                                                   'tv_retail_com': TV_RETAIL_COLUMNS,
+                                                   SEEN_TABLE: SEEN_TABLE_SPEC})  # 새 review ID (detail row와 같이 기록)
 
         # Data validator sec기화
         session_start_time = os.environ.get('SESSION_START_TIME', datetime.now().strftime('%Y%m%d%H%M'))
         self.validator = DataValidator(session_start_time)
+        self.validation_records = []  # 상품 별 검증 대상 값 -> run 끝에 validate_batch 한 번 (worker 공유)
 
     def connect_db(self):
         """DB connection"""
         try:
-            self.db_conn = psycopg2.connect(**DB_CONFIG)
-            self.db_conn.autocommit = True
+            self.db_conn = get_connection(autocommit=True)
             print("[OK] Database connected")
+            # tv_retail_com typed 가격 컬럼 / retail_reviews 참조 컬럼 (이미 있으면 조회만)
+            with self.db_conn.transaction() as cursor:
+                ensure_typed_columns(cursor)
+                ensure_review_store(cursor)
+                ensure_seen_table(cursor)
+                # 재파싱 때 batch 단위로 지울 수 있도록 batch_id 기록
+                for table in BATCH_KEYED_TABLES:
+                    ensure_batch_column(cursor, table)
+            self.db_conn.prepare('bby_item_by_name', ITEM_BY_NAME_SQL)
+            self.db_conn.prepare('bby_mst_insert', MST_INSERT_SQL)
             return True
         except Exception as e:
             print(f"[ERROR] Database connection failed: {e}")
@@ -85,10 +223,17 @@ class BestBuyDetailCrawler:
             # Chrome options with page load strategy
             options = uc.ChromeOptions()
             options.page_load_strategy = 'eager'  # Wait for DOM load (CHANGED from 'none')
-
-            self.driver = uc.Chrome(options=options)
+            enable_network_log(options)  # network idle wait 용 CDP 이벤트
+
+            # 실행 중인 warm Chrome 세션에 attach, 없으면 새로 띄움
+            driver = attach_session('bby_detail', 'bestbuy', options, profile_dir=self.profile_dir, kind='uc')
+            if driver is None:
+                driver = uc.Chrome(options=options, user_data_dir=self.profile_dir)
+            # page_source를 읽을 때마다 snapshot 저장
+            self.driver = RecordingDriver(driver, self.snapshots)
             self.driver.set_page_load_timeout(120)  # Increased to 120 seconds
             self.driver.maximize_window()
+            apply_resource_policy(self.driver, 'bestbuy', 'detail')
 
             print("[OK] Driver setup complete (page_load_strategy=eager, timeout=120s)")
             return True
@@ -97,246 +242,33 @@ class BestBuyDetailCrawler:
             return False
 
     def get_recent_urls(self):
-        """최신 batch_id의 product URLs와 추가 data 가져오기"""
+        """최신 batch_id의 product URLs를 detail_crawl_queue에 채우고 남은 URL 목록 반환"""
         try:
-            cursor = self.db_conn.cursor()
-            urls = []
-
-            # bestbuy_tv_main_crawl에서 최신 batch_id 가져오기
-            cursor.execute("""
-                SELECT batch_id
-                FROM bby_tv_main1
-                WHERE batch_id IS NOT NULL
-                ORDER BY batch_id DESC
-                LIMIT 1
-            """)
-            main_batch_result = cursor.fetchone()
-            main_batch_id = main_batch_result[0] if main_batch_result else None
-
             # bby_tv_Trend_crawl 테이블은 사용하지 않음 (trend crawler 없음)
-            # cursor.execute("""
-            #     SELECT batch_id
-            #     FROM bby_tv_Trend_crawl
-            #     WHERE batch_id IS NOT NULL
-            #     ORDER BY batch_id DESC
-            #     LIMIT 1
-            # """)
-            # trend_batch_result = cursor.fetchone()
-            # trend_batch_id = trend_batch_result[0] if trend_batch_result else None
-            trend_batch_id = None  # Trend crawler not used
-
-            # bby_tv_promotion_crawl에서 최신 batch_id 가져오기
-            cursor.execute("""
-                SELECT batch_id
-                FROM bby_tv_pmt1
-                WHERE batch_id IS NOT NULL
-                ORDER BY batch_id DESC
-                LIMIT 1
-            """)
-            promo_batch_result = cursor.fetchone()
-            promo_batch_id = promo_batch_result[0] if promo_batch_result else None
-
-            # bby_tv_bsr_crawl에서 최신 batch_id 가져오기
-            cursor.execute("""
-                SELECT batch_id
-                FROM bby_tv_bsr1
-                WHERE batch_id IS NOT NULL
-                ORDER BY batch_id DESC
-                LIMIT 1
-            """)
-            bsr_batch_result = cursor.fetchone()
-            bsr_batch_id = bsr_batch_result[0] if bsr_batch_result else None
-
+            cursor = self.db_conn.cursor()
+            main_batch_id, bsr_batch_id, promo_batch_id = get_latest_batches(
+                cursor, ['bby_tv_main1', 'bby_tv_bsr1', 'bby_tv_pmt1'])
+            cursor.close()
             print(f"[INFO] Latest batch_id - Main: {main_batch_id}, BSR: {bsr_batch_id}, Promotion: {promo_batch_id}")
 
-            # collected 순서: main → bsr → promotion → trend (우선순위 순서)
-            # 각 table의 rank 순서대로 정렬
-            # 중복 URL은 rank 정보 병합 (crawling은 한 번만)
-
-            # Dictionary to store merged URL data: {url: {page_type, ranks, data...}}
-            url_data_map = {}
-
-            # 1. bestbuy_tv_main_crawl에서 해당 batch의 URLs와 data 가져오기
-            if main_batch_id:
-                cursor.execute("""
-                    SELECT DISTINCT product_url, offer,
-                           pick_up_availability, shipping_availability, delivery_availability,
-                           sku_status, main_rank
-                    FROM bby_tv_main1
-                    WHERE batch_id = %s
-                    AND product_url IS NOT NULL
-                    ORDER BY main_rank
-                """, (main_batch_id,))
-                main_urls = cursor.fetchall()
-                for row in main_urls:
-                    url = row[0]
-                    if url not in url_data_map:
-                        url_data_map[url] = {
-                            'page_type': 'main',
-                            'product_url': url,
-                            'final_sku_price': None,
-                            'savings': None,
-                            'original_sku_price': None,
-                            'offer': row[1],
-                            'pick_up_availability': row[2],
-                            'shipping_availability': row[3],
-                            'delivery_availability': row[4],
-                            'sku_status': row[5],
-                            'star_rating': None,
-                            'main_rank': row[6],
-                            'bsr_rank': None,
-                            'promotion_rank': None,
-                            'promotion_type': None
-                        }
-                print(f"[OK] Main URLs (batch {main_batch_id}): {len(main_urls)} items")
-
-            # 2. bby_tv_bsr_crawl에서 해당 batch의 URLs와 data 가져오기
-            if bsr_batch_id:
-                cursor.execute("""
-                    SELECT DISTINCT product_url, offer,
-                           pick_up_availability, shipping_availability, delivery_availability,
-                           sku_status, bsr_rank
-                    FROM bby_tv_bsr1
-                    WHERE batch_id = %s
-                    AND product_url IS NOT NULL
-                    ORDER BY bsr_rank
-                """, (bsr_batch_id,))
-                bsr_urls = cursor.fetchall()
-                for row in bsr_urls:
-                    url = row[0]
-                    if url in url_data_map:
-                        # URL already exists - just add bsr_rank
-                        url_data_map[url]['bsr_rank'] = row[6]
-                    else:
-                        # New URL from bsr
-                        url_data_map[url] = {
-                            'page_type': 'bsr',
-                            'product_url': url,
-                            'final_sku_price': None,
-                            'savings': None,
-                            'original_sku_price': None,
-                            'offer': row[1],
-                            'pick_up_availability': row[2],
-                            'shipping_availability': row[3],
-                            'delivery_availability': row[4],
-                            'sku_status': row[5],
-                            'star_rating': None,
-                            'main_rank': None,
-                            'bsr_rank': row[6],
-                            'promotion_rank': None,
-                            'promotion_type': None
-                        }
-                print(f"[OK] BSR URLs (batch {bsr_batch_id}): {len(bsr_urls)} items")
-
-            # 3. bby_tv_promotion_crawl에서 해당 batch의 URLs와 data 가져오기
-            if promo_batch_id:
-                cursor.execute("""
-                    SELECT DISTINCT product_url, offer, promotion_type, promotion_rank
-                    FROM bby_tv_pmt1
-                    WHERE batch_id = %s
-                    AND product_url IS NOT NULL
-                    ORDER BY promotion_rank
-                """, (promo_batch_id,))
-                promo_urls = cursor.fetchall()
-                for row in promo_urls:
-                    url = row[0]
-                    if url in url_data_map:
-                        # URL already exists - just add promotion_rank and promotion_type
-                        url_data_map[url]['promotion_rank'] = row[3]
-                        url_data_map[url]['promotion_type'] = row[2]
-                    else:
-                        # New URL from promotion
-                        url_data_map[url] = {
-                            'page_type': 'promotion',
-                            'product_url': url,
-                            'final_sku_price': None,
-                            'savings': None,
-                            'original_sku_price': None,
-                            'offer': row[1],
-                            'pick_up_availability': None,
-                            'shipping_availability': None,
-                            'delivery_availability': None,
-                            'sku_status': None,
-                            'star_rating': None,
-                            'main_rank': None,
-                            'bsr_rank': None,
-                            'promotion_rank': row[3],
-                            'promotion_type': row[2]
-                        }
-                print(f"[OK] Promotion URLs (batch {promo_batch_id}): {len(promo_urls)} items")
-
-            # 4. bby_tv_Trend_crawl에서 해당 batch의 URLs와 data 가져오기 (DISABLED - no trend crawler)
-            # if trend_batch_id:
-            #     cursor.execute("""
-            #         SELECT DISTINCT product_url, rank
-            #         FROM bby_tv_Trend_crawl
-            #         WHERE batch_id = %s
-            #         AND product_url IS NOT NULL
-            #         ORDER BY rank
-            #     """, (trend_batch_id,))
-            #     trend_urls = cursor.fetchall()
-            #     for row in trend_urls:
-            #         url = row[0]
-            #         if url in url_data_map:
-            #             # URL already exists - just add trend_rank
-            #             url_data_map[url]['trend_rank'] = row[1]
-            #         else:
-            #             # New URL from trend
-            #             url_data_map[url] = {
-            #                 'page_type': 'Trend',
-            #                 'product_url': url,
-            #                 'final_sku_price': None,
-            #                 'savings': None,
-            #                 'original_sku_price': None,
-            #                 'offer': None,
-            #                 'pick_up_availability': None,
-            #                 'shipping_availability': None,
-            #                 'delivery_availability': None,
-            #                 'sku_status': None,
-            #                 'star_rating': None,
-            #                 'main_rank': None,
-            #                 'bsr_rank': None,
-            #                 'trend_rank': row[1],
-            #                 'promotion_rank': None,
-            #                 'promotion_type': None
-            #             }
-            #     print(f"[OK] Trend URLs (batch {trend_batch_id}): {len(trend_urls)} items")
+            queue_batch = DetailQueue.batch_key(main=main_batch_id, bsr=bsr_batch_id, promotion=promo_batch_id)
+            if not queue_batch:
+                return []
 
-            cursor.close()
+            # collected 순서: main → bsr → promotion (우선순위 순서), 각 table의 rank 순서
+            # 중복 URL은 rank 정보 병합 (crawling은 한 번만) - 모두 QUEUE_FILL_SQL에서 처리
+            self.work_queue = DetailQueue('bestbuy', queue_batch)
+            inserted = self.work_queue.fill(QUEUE_FILL_SQL, {
+                'main_batch': main_batch_id, 'bsr_batch': bsr_batch_id, 'promo_batch': promo_batch_id,
+            })
+            urls = self.work_queue.items()
 
-            # Convert dictionary to list (maintains insertion order: main, bsr, promotion, trend)
-            unique_urls = list(url_data_map.values())
-
-            # Count duplicates
-            total_loaded = 0
-            if main_batch_id:
-                cursor = self.db_conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM bby_tv_main1 WHERE batch_id = %s", (main_batch_id,))
-                total_loaded += cursor.fetchone()[0]
-                cursor.close()
-            if bsr_batch_id:
-                cursor = self.db_conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM bby_tv_bsr1 WHERE batch_id = %s", (bsr_batch_id,))
-                total_loaded += cursor.fetchone()[0]
-                cursor.close()
-            if promo_batch_id:
-                cursor = self.db_conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM bby_tv_pmt1 WHERE batch_id = %s", (promo_batch_id,))
-                total_loaded += cursor.fetchone()[0]
-                cursor.close()
-            # Trend crawler not used
-            # if trend_batch_id:
-            #     cursor = self.db_conn.cursor()
-            #     cursor.execute("SELECT COUNT(*) FROM bby_tv_Trend_crawl WHERE batch_id = %s", (trend_batch_id,))
-            #     total_loaded += cursor.fetchone()[0]
-            #     cursor.close()
-
-            duplicates_count = total_loaded - len(unique_urls)
-            if duplicates_count > 0:
-                print(f"[INFO] Found {duplicates_count} duplicate URLs - rank information merged")
-
-            print(f"[OK] Loaded {len(unique_urls)} unique URLs (before dedup: {total_loaded} items)")
-            return unique_urls
+            if inserted:
+                print(f"[OK] Queued {inserted} unique URLs (queue batch {queue_batch})")
+            else:
+                print(f"[INFO] Resuming queue batch {queue_batch}: {len(urls)} URLs left")
+            print(self.work_queue.summary())
+            return urls
 
         except Exception as e:
             print(f"[ERROR] Failed to load URLs: {e}")
@@ -375,11 +307,9 @@ class BestBuyDetailCrawler:
                 try:
                     spec_button = self.driver.find_element(By.XPATH, xpath)
                     self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", spec_button)
-                    time.sleep(2)
                     spec_button.click()
                     print("  [OK] Specification click successful")
-                    time.sleep(7)  # dialog 로딩 wait 증가
-                    return True
+                    return True  # dialog 로딩은 click_specifications_with_retry에서 wait
                 except:
                     continue
 
@@ -407,21 +337,16 @@ class BestBuyDetailCrawler:
         while retry_count <= max_retries:
             # Specifications button click
             if self.click_specifications():
-                try:
-                    wait_time = base_timeout * (2 ** retry_count)  # 15s -> 30s
-                    wait = WebDriverWait(self.driver, wait_time)
-                    wait.until(EC.presence_of_element_located(
-                        (By.XPATH, '//div[contains(text(), "Model Number")]')
-                    ))
-                    print(f"  [OK] dialog load complete (wait: {wait_time}sec)")
+                wait_time = base_timeout * (2 ** retry_count)  # 15s -> 30s
+                if self.waits.for_count(self.driver, By.XPATH, '//div[contains(text(), "Model Number")]',
+                                        timeout=wait_time, name='specs_dialog'):
+                    print(f"  [OK] dialog load complete (timeout: {wait_time}sec)")
                     return True, None
-
-                except TimeoutException:
+                else:
                     if retry_count < max_retries:
                         print(f"  [WARNING] dialog timeout, retry {retry_count + 1}/{max_retries}...")
                         retry_count += 1
                         self.close_specifications_dialog()
-                        time.sleep(2)
                         continue
                     else:
                         print(f"  [ERROR] dialog timeout (retry failed)")
@@ -765,7 +690,7 @@ class BestBuyDetailCrawler:
                     close_button = self.driver.find_element(By.XPATH, xpath)
                     close_button.click()
                     print("  [OK] dialog close successful")
-                    time.sleep(2)
+                    self.waits.for_absent(self.driver, By.XPATH, xpath, timeout=5, name='dialog_close')
                     return True
                 except:
                     continue
@@ -820,7 +745,9 @@ class BestBuyDetailCrawler:
     def extract_star_ratings_from_reviews_page(self):
         """Count_of_Star_Ratings extraction (See All Customer Reviews page에서)"""
         try:
-            time.sleep(3)  # page 로딩 wait
+            # 별점 분포 fieldset이 render될 때까지
+            self.waits.for_count(self.driver, By.XPATH, '//*[@id="reviews-accordion"]//fieldset',
+                                 timeout=5, name='star_ratings')
             ratings = {}
             # XPath 패턴 (5점부터 1점까지)
             xpaths = [
@@ -944,21 +871,22 @@ class BestBuyDetailCrawler:
                         button = self.driver.find_element(By.XPATH, xpath)
                         print("  [OK] See All Customer Reviews button found")
                         self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", button)
-                        time.sleep(2)
+                        self.waits.for_dom_quiet(self.driver, quiet=0.3, timeout=2, name='scroll_into_view')
 
                         # JavaScript로 click attempt
                         try:
                             self.driver.execute_script("arguments[0].click();", button)
                             print("  [OK] See All Customer Reviews click successful")
-                            time.sleep(5)  # review page 로딩 wait
-                            return True
                         except Exception as click_err:
                             print(f"  [WARNING] click failed (JS): {click_err}, trying regular click")
                             # trying regular click
                             button.click()
                             print("  [OK] See All Customer Reviews click successful (regular)")
-                            time.sleep(5)
-                            return True
+
+                        # review page로 전환 (button이 DOM에서 사라짐) 후 review item이 나올 때까지
+                        self.waits.for_stale(self.driver, button, timeout=10, name='reviews_navigation')
+                        self.waits.for_count(self.driver, By.XPATH, REVIEW_ITEM_XPATH, timeout=15, name='review_items')
+                        return True
 
                     except Exception as e:
                         # button을 찾지 못한 경우만 continue
@@ -969,7 +897,7 @@ class BestBuyDetailCrawler:
                 # button을 못 찾으면 계속 스크롤
                 current_position += step
                 self.driver.execute_script(f"window.scrollTo(0, {current_position});")
-                time.sleep(1)  # 스크롤 후 wait 시간
+                self.waits.for_dom_quiet(self.driver, quiet=0.3, timeout=1.5, name='scroll_step')  # lazy-load 된 section render 대기
 
             print("  [WARNING] See All Customer Reviews button not found.")
             return False
@@ -978,33 +906,47 @@ class BestBuyDetailCrawler:
             print(f"  [ERROR] See All Customer Reviews click failed: {e}")
             return False
 
-    def extract_reviews(self):
-        """review 20items collected (page네이션 포함)"""
+    def open_reviews_page(self, product_url):
+        """review page를 최신순 URL로 바로 열기 (URL 형식이 다르면 False -> See All Customer Reviews click)"""
+        reviews_url = bestbuy_reviews_url(product_url)
+        if not reviews_url:
+            return False
+        print("  [INFO] Opening reviews page (most recent first)...")
+        self.driver.get(reviews_url)
+        self.waits.for_count(self.driver, By.XPATH, REVIEW_ITEM_XPATH, timeout=15, name='review_items')
+        return True
+
+    def extract_reviews(self, product_url):
+        """
+        새 review collected (최신순 page네이션, 이전 실행에서 본 review가 나오면 중단, 최대 20items)
+
+        Returns:
+            (review 텍스트 또는 None, SEEN_TABLE row - detail record와 같이 ingestor에 넘김)
+        """
         try:
-            time.sleep(3)  # page 로딩 wait
-            reviews = []
-            collected = 0
+            self.waits.for_count(self.driver, By.XPATH, REVIEW_ITEM_XPATH, timeout=5, name='review_items')
+            harvester = ReviewHarvester('bestbuy', product_url, self.batch_id)
             page = 1
 
-            while collected < 20:
+            while True:
                 # page 소스 가져오기
                 page_source = self.driver.page_source
                 tree = html.fromstring(page_source)
 
-                # review extraction
-                review_elements = tree.xpath('//li[@class="review-item"]//div[@class="ugc-review-body"]//p[@class="pre-white-space"]')
-
-                for elem in review_elements:
-                    if collected >= 20:
-                        break
-                    review_text = elem.text_content().strip()
+                # review extraction (card에 고정 ID가 없어서 본문 hash로 구분)
+                cards = []
+                for item in tree.xpath(REVIEW_ITEM_XPATH):
+                    bodies = item.xpath('.//div[@class="ugc-review-body"]//p[@class="pre-white-space"]')
+                    review_text = bodies[0].text_content().strip() if bodies else ''
                     if review_text:
-                        reviews.append(review_text)
-                        collected += 1
-                        print(f"    [review {collected}/20] {review_text[:50]}...")
-
-                # 20items collected complete하면 closed
-                if collected >= 20:
+                        cards.append((None, review_text))
+
+                # known review를 만났거나 20items collected complete하면 closed
+                collected = len(harvester.reviews)
+                more = harvester.add_page(cards)
+                for idx, review_text in enumerate(harvester.texts()[collected:], collected + 1):
+                    print(f"    [review {idx}/{harvester.max_reviews}] {review_text[:50]}...")
+                if not more:
                     break
 
                 # next page button 찾기
@@ -1012,20 +954,29 @@ class BestBuyDetailCrawler:
                     next_button = self.driver.find_element(By.XPATH, '//li[contains(@class, "page next")]//a')
                     print(f"  [INFO] Navigating to next page... (Page {page + 1})")
                     self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_button)
-                    time.sleep(2)
+                    self.waits.for_dom_quiet(self.driver, quiet=0.3, timeout=2, name='scroll_into_view')
+                    first_review = self.driver.find_elements(By.XPATH, REVIEW_ITEM_XPATH)[:1]
                     next_button.click()
-                    time.sleep(4)
+                    # 이전 page의 review item이 교체된 뒤 새 review item이 나올 때까지
+                    if first_review:
+                        self.waits.for_stale(self.driver, first_review[0], timeout=10, name='review_page_change')
+                    self.waits.for_count(self.driver, By.XPATH, REVIEW_ITEM_XPATH, timeout=10, name='review_items')
                     page += 1
                 except:
                     print("  [INFO] next page button not found. collected closed.")
                     break
 
-            # review를 구분자로 connection
-            return " | ".join(reviews) if reviews else None
+            print(f"  {harvester.summary()}")
+
+            # 새 review를 구분자로 connection
+            reviews = harvester.texts()
+            if not reviews:
+                return None, []
+            return " | ".join(reviews), harvester.seen_rows()
 
         except Exception as e:
             print(f"  [ERROR] review collected failed: {e}")
-            return None
+            return None, []
 
     def extract_recommendation_intent_from_reviews_page(self):
         """Recommendation_Intent extraction (See All Customer Reviews page에서)"""
@@ -1071,14 +1022,14 @@ class BestBuyDetailCrawler:
 
                 # page 상단으로 이동 후 30%까지 스크롤
                 self.driver.execute_script("window.scrollTo(0, 0);")
-                time.sleep(1)
+                self.waits.for_dom_quiet(self.driver, quiet=0.3, timeout=2, name='scroll_top')
 
                 total_height = self.driver.execute_script("return document.body.scrollHeight")
                 scroll_to = int(total_height * 0.3)
                 self.driver.execute_script(f"window.scrollTo(0, {scroll_to});")
 
-                # first page 여부 확인
-                is_first_page = (self.order == 1)
+                # first page 여부 확인 (browser session 기준)
+                is_first_page = (self.session_pages == 1)
 
                 # timeout 설정: first page는 30sec, 나머지는 15sec
                 timeout = 30 if is_first_page else 15
@@ -1089,42 +1040,40 @@ class BestBuyDetailCrawler:
                 # WebDriverWait로 product-title element가 load될 때까지 명시적 wait
                 try:
                     wait = WebDriverWait(self.driver, timeout)
-                    wait.until(EC.presence_of_element_located(
-                        (By.XPATH, '//div[@class="product-title font-weight-normal pb-100 body-copy-lg min-h-600"]')
-                    ))
+                    wait.until(EC.presence_of_element_located((By.XPATH, COMPARE_TITLE_XPATH)))
                     print(f"  [OK] Compare similar products element load complete")
 
-                    # element가 load된 후 안정화를 위한 추가 wait
-                    additional_wait = 5 if is_first_page else 3
-                    time.sleep(additional_wait)
+                    # 4items 제품명과 pros/cons table이 모두 render될 때까지 (first page는 더 길게)
+                    render_timeout = 5 if is_first_page else 3
+                    self.waits.for_count(self.driver, By.XPATH, COMPARE_TITLE_XPATH, 4,
+                                         timeout=render_timeout, name='compare_products')
+                    self.waits.for_count(self.driver, By.XPATH, COMPARE_TABLE_XPATH,
+                                         timeout=render_timeout, name='compare_table')
 
                 except Exception as wait_error:
                     print(f"  [WARNING] element wait time exceeded: {wait_error}")
                     if retry < max_retries - 1:
                         # next retry를 위해 page refresh
                         print("  [INFO] page refresh and retry...")
+                        self.pacer.wait('retry')
                         self.driver.refresh()
-                        time.sleep(10)
                         continue
                     else:
                         # 마지막 attempt였다면 None 반환
                         return None
 
-                # page 소스 가져오기
-                page_source = self.driver.page_source
-                tree = html.fromstring(page_source)
+                # page 소스 전체 대신 product-title div들과 pros/cons table만 가져오기
+                product_divs, compare_tables = capture(self.driver, [COMPARE_TITLE_XPATH, COMPARE_TABLE_XPATH])
+                compare_table = compare_tables[0] if compare_tables else None
 
                 # 4items 제품 data save
                 products = []
 
-                # product-title div들 찾기
-                product_divs = tree.xpath('//div[@class="product-title font-weight-normal pb-100 body-copy-lg min-h-600"]')
-
                 if len(product_divs) < 4:
                     print(f"  [WARNING] insufficient products. (found items count: {len(product_divs)})")
                     if retry < max_retries - 1:
                         # retry
-                        time.sleep(5)
+                        self.pacer.wait('retry')
                         continue
                     else:
                         return None
@@ -1166,15 +1115,15 @@ class BestBuyDetailCrawler:
 
                 # Pros extraction (tr[2]/td[1~4])
                 for i in range(1, 5):
-                    pros_xpath = f'/html/body/div[5]/div[6]/div/table/tbody/tr[2]/td[{i}]/span/span'
-                    pros_elem = tree.xpath(pros_xpath)
+                    pros_xpath = f'./tbody/tr[2]/td[{i}]/span/span'
+                    pros_elem = compare_table.xpath(pros_xpath) if compare_table is not None else []
                     if pros_elem and i-1 < len(products):
                         products[i-1]['pros'] = pros_elem[0].text_content().strip()
 
                 # Cons extraction (tr[4]/td[1~4])
                 for i in range(1, 5):
-                    cons_xpath = f'/html/body/div[5]/div[6]/div/table/tbody/tr[4]/td[{i}]/span/span'
-                    cons_elem = tree.xpath(cons_xpath)
+                    cons_xpath = f'./tbody/tr[4]/td[{i}]/span/span'
+                    cons_elem = compare_table.xpath(cons_xpath) if compare_table is not None else []
                     if cons_elem and i-1 < len(products):
                         text = cons_elem[0].text_content().strip()
                         # '—' 같은 값은 None으로 처리
@@ -1187,7 +1136,7 @@ class BestBuyDetailCrawler:
                 print(f"  [ERROR] Compare similar products extraction failed (attempt {retry + 1}/{max_retries}): {e}")
                 if retry < max_retries - 1:
                     print("  [INFO] Retrying...")
-                    time.sleep(5)
+                    self.waits.for_dom_quiet(self.driver, quiet=1, timeout=5, name='compare_retry')
                     continue
                 else:
                     import traceback
@@ -1197,22 +1146,18 @@ class BestBuyDetailCrawler:
         return None
 
     def get_item_by_product_name(self, product_name):
-        """bby_tv_crawl에서 product_name으로 item 찾기"""
+        """product_name으로 item 찾기 (이번 실행의 아직 flush 안 된 row 먼저, 없으면 bby_tv_crawl)"""
         try:
             if not product_name:
                 return None
 
-            cursor = self.db_conn.cursor()
+            # 이번 batch row는 DETAIL_INGEST_FLUSH_ROWS 만큼 ingestor buffer에 있다가 COPY 됨
+            for row in reversed(self.ingestor.pending_rows('bby_tv_crawl')):
+                if row[CRAWL_NAME_INDEX] == product_name and row[CRAWL_ITEM_INDEX] is not None:
+                    return row[CRAWL_ITEM_INDEX]
 
             # 가장 최근 data에서 retailer_sku_name과 product_name이 일치하는 것 찾기
-            cursor.execute("""
-                SELECT item
-                FROM bby_tv_crawl
-                WHERE retailer_sku_name = %s
-                AND item IS NOT NULL
-                ORDER BY crawl_datetime DESC
-                LIMIT 1
-            """, (product_name,))
+            cursor = self.db_conn.execute_prepared('bby_item_by_name', (product_name,))
 
             result = cursor.fetchone()
             cursor.close()
@@ -1241,7 +1186,8 @@ class BestBuyDetailCrawler:
                     cons TEXT,
                     product_name TEXT,
                     update_date VARCHAR(50),
-                    calendar_week VARCHAR(10)
+                    calendar_week VARCHAR(10),
+                    batch_id TEXT
                 )
             """)
 
@@ -1261,14 +1207,8 @@ class BestBuyDetailCrawler:
                     # 2-4번째 제품은 DB에서 찾기
                     mst_item = self.get_item_by_product_name(product['product_name'])
 
-                # data 삽입
-                insert_query = """
-                    INSERT INTO bby_tv_mst
-                    (account_name, item, product_url, pros, cons, product_name, update_date, calendar_week)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """
-
-                cursor.execute(insert_query, (
+                # data 삽입 (prepared statement)
+                self.db_conn.execute_prepared('bby_mst_insert', (
                     'Bestbuy',
                     mst_item,
                     product['product_url'],
@@ -1276,8 +1216,9 @@ class BestBuyDetailCrawler:
                     product['cons'],
                     product['product_name'],
                     update_date,
-                    calendar_week
-                ))
+                    calendar_week,
+                    self.batch_id
+                ), cursor=cursor)
 
                 print(f"    [MST {idx+1}/4] {product['product_name'][:50]}... (item: {mst_item})")
 
@@ -1294,7 +1235,9 @@ class BestBuyDetailCrawler:
     def scrape_detail_page(self, url_data):
         """detail page crawling (items선된 로딩 + dialog 처리)"""
         try:
-            self.order += 1
+            # worker-pool 모드에서는 URL 목록 순서로 미리 부여된 order 사용
+            self.order = url_data.get('order', self.order + 1)
+            self.session_pages += 1
             page_type = url_data['page_type']
             product_url = url_data['product_url']
 
@@ -1304,16 +1247,13 @@ class BestBuyDetailCrawler:
 
             # page 접속
             print(f"  [INFO] Loading page...")
-            self.driver.get(product_url)
+            self.pacer.timed_get(self.driver, product_url)
 
             # ADDED: 핵심 element load wait (최대 20sec)
-            try:
-                wait = WebDriverWait(self.driver, 20)
-                wait.until(EC.presence_of_element_located(
-                    (By.XPATH, '//h1[contains(@class, "h4") or contains(@class, "heading")]')  # 제품명
-                ))
+            if self.waits.for_count(self.driver, By.XPATH, '//h1[contains(@class, "h4") or contains(@class, "heading")]',
+                                    timeout=20, name='product_title'):  # 제품명
                 print(f"  [OK] page load complete")
-            except TimeoutException:
+            else:
                 print(f"  [ERROR] page loading timeout")
                 return False
 
@@ -1356,7 +1296,8 @@ class BestBuyDetailCrawler:
             success, error = self.click_specifications_with_retry()
 
             if success:
-                time.sleep(3)
+                # dialog 내용 render가 끝날 때까지 (고정 3sec 대신)
+                self.waits.for_dom_quiet(self.driver, quiet=0.5, timeout=4)
                 # dialog 소스 가져오기
                 dialog_source = self.driver.page_source
                 dialog_tree = html.fromstring(dialog_source)
@@ -1383,9 +1324,10 @@ class BestBuyDetailCrawler:
             star_ratings = None
             top_mentions = None
             detailed_reviews = None
+            review_seen_rows = []
             recommendation_intent = None
 
-            if self.click_see_all_reviews():
+            if self.open_reviews_page(product_url) or self.click_see_all_reviews():
                 # 9-1. Star ratings collected (review page에서 - 별점별 detail items count)
                 star_ratings = self.extract_star_ratings_from_reviews_page()
                 print(f"  [✓] Star_Ratings: {star_ratings}")
@@ -1399,20 +1341,16 @@ class BestBuyDetailCrawler:
                 print(f"  [✓] Recommendation_Intent: {recommendation_intent}")
 
                 # 9-4. Detailed reviews collected
-                detailed_reviews = self.extract_reviews()
+                detailed_reviews, review_seen_rows = self.extract_reviews(product_url)
                 print(f"  [✓] Detailed_Reviews: {len(detailed_reviews) if detailed_reviews else 0} chars")
 
-            # 9-5. data 검증 (문제 감지 및 로깅)
-            print(f"\n  [VALIDATION] Checking data quality...")
-            self.validator.validate_item(item, product_url, 'bby_tv_dt1')
-            self.validator.validate_screen_size(screen_size, product_url, 'bby_tv_dt1')
-            self.validator.validate_price(final_sku_price, 'final_sku_price', product_url, 'bby_tv_dt1')
-            if savings:  # savings는 없을 수도 있음
-                self.validator.validate_price(savings, 'savings', product_url, 'bby_tv_dt1')
-            if original_sku_price:  # original도 없을 수도 있음
-                self.validator.validate_price(original_sku_price, 'original_sku_price', product_url, 'bby_tv_dt1')
-            self.validator.validate_count(count_of_reviews, 'count_of_reviews', product_url, 'bby_tv_dt1')
-            self.validator.validate_star_rating(star_rating, product_url, 'bby_tv_dt1')
+            # 9-5. data 검증 대상 수집 (검증은 run 끝에 batch 전체를 validate_batch로 한 번에)
+            self.validation_records.append({
+                'product_url': product_url, 'item': item, 'screen_size': screen_size,
+                'final_sku_price': final_sku_price, 'savings': savings,
+                'original_sku_price': original_sku_price, 'count_of_reviews': count_of_reviews,
+                'star_rating': star_rating,
+            })
 
             # 10. Detail DB save
             self.save_to_db(
@@ -1442,7 +1380,8 @@ class BestBuyDetailCrawler:
                 promotion_type=url_data['promotion_type'],
                 promotion_rank=url_data['promotion_rank'],
                 bsr_rank=url_data['bsr_rank'],
-                main_rank=url_data['main_rank']
+                main_rank=url_data['main_rank'],
+                review_seen_rows=review_seen_rows
             )
 
             return True
@@ -1459,15 +1398,13 @@ class BestBuyDetailCrawler:
                    final_sku_price, savings, original_sku_price, offer,
                    pick_up_availability, shipping_availability, delivery_availability,
                    sku_status, star_rating_source, promotion_type, promotion_rank,
-                   bsr_rank, main_rank):
-        """DB에 save"""
+                   bsr_rank, main_rank, review_seen_rows=None):
+        """bby_tv_crawl + tv_retail_com record를 ingestor에 buffer (COPY로 모아서 적재)"""
         try:
-            print(f"  [DB] Saving to database...")
+            print(f"  [DB] Buffering record...")
             print(f"       Product: {retailer_sku_name[:60] if retailer_sku_name else 'N/A'}...")
             print(f"       Item (SKU): {item if item else 'N/A'}")
 
-            cursor = self.db_conn.cursor()
-
             # Calculate calendar week
             calendar_week = f"w{datetime.now().isocalendar().week}"
 
@@ -1475,19 +1412,7 @@ class BestBuyDetailCrawler:
             now = datetime.now()
             crawl_datetime = now.strftime('%Y-%m-%d %H:%M:%S')
 
-            # data 삽입
-            insert_query = """
-                INSERT INTO bby_tv_crawl
-                (account_name, batch_id, page_type, "order", retailer_sku_name, item,
-                 Estimated_Annual_Electricity_Use, screen_size, count_of_reviews, Count_of_Star_Ratings, Top_Mentions,
-                 Detailed_Review_Content, Recommendation_Intent, product_url, crawl_datetime, calendar_week,
-                 final_sku_price, savings, original_sku_price, offer, pick_up_availability, shipping_availability,
-                 delivery_availability, sku_status, star_rating, promotion_type, promotion_rank,
-                 bsr_rank, main_rank)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-
-            cursor.execute(insert_query, (
+            crawl_row = (
                 'Bestbuy',
                 self.batch_id,
                 page_type,
@@ -1517,43 +1442,14 @@ class BestBuyDetailCrawler:
                 promotion_rank,
                 bsr_rank,
                 main_rank
-            ))
+            )
 
             # Also insert into unified tv_retail_com table
-            # Convert count_of_reviews to integer (remove commas if present)
-            count_of_reviews_int = None
-            if count_of_reviews:
-                try:
-                    count_of_reviews_int = int(str(count_of_reviews).replace(',', ''))
-                except:
-                    count_of_reviews_int = None
-
-            # Parse star_ratings to get total count
-            # Example: "5stars:231 4stars:19 3stars:2 2stars:1 1star:8" -> 261
-            count_of_star_ratings_int = None
-            if star_ratings:
-                try:
-                    import re
-                    numbers = re.findall(r':(\d+)', star_ratings)
-                    if numbers:
-                        count_of_star_ratings_int = sum(int(n) for n in numbers)
-                except:
-                    count_of_star_ratings_int = None
+            # "1,123" -> 1123, "5stars:231 4stars:19 3stars:2 2stars:1 1star:8" -> 261
+            count_of_reviews_int = parse_count(count_of_reviews)
+            count_of_star_ratings_int = parse_star_counts(star_ratings)
 
-            cursor.execute("""
-                INSERT INTO tv_retail_com
-                (item, account_name, page_type, count_of_reviews, retailer_sku_name, product_url,
-                 star_rating, count_of_star_ratings, screen_size, sku_popularity,
-                 final_sku_price, original_sku_price, savings, discount_type, offer,
-                 pick_up_availability, shipping_availability, delivery_availability, shipping_info,
-                 available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts,
-                 detailed_review_content, summarized_review_content, top_mentions, recommendation_intent,
-                 main_rank, bsr_rank, rank_1, rank_2, promotion_rank,
-                 number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar,
-                 estimated_annual_electricity_use, promotion_type,
-                 calendar_week, crawl_datetime)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
+            retail_row = (
                 item,
                 'Bestbuy',  # account_name
                 page_type,
@@ -1577,9 +1473,6 @@ class BestBuyDetailCrawler:
                 None,  # inventory_status (BestBuy doesn't have this)
                 sku_status,
                 None,  # retailer_membership_discounts (BestBuy doesn't have this)
-                detailed_reviews,
-                None,  # summarized_review_content (BestBuy doesn't have this)
-                top_mentions,
                 recommendation_intent,
                 main_rank,
                 bsr_rank,
@@ -1592,75 +1485,33 @@ class BestBuyDetailCrawler:
                 electricity_use,
                 promotion_type,
                 calendar_week,
-                crawl_datetime
-            ))
-
-            cursor.close()
-            print(f"  [DB] ✓ Successfully saved to bby_tv_crawl + tv_retail_com")
+                crawl_datetime,
+                self.batch_id
+            ) + typed_values(final_sku_price, original_sku_price, savings, star_rating_source, 'USD')
+
+            # detailed review / top mentions 텍스트는 retail_reviews에 한 번만, tv_retail_com에는 hash 참조
+            review_ref_values, review_rows = review_refs('Bestbuy', product_url, detailed_reviews, None,
+                                                         top_mentions, self.batch_id)
+            retail_row += review_ref_values
+
+            # retail_reviews + bby_tv_crawl + tv_retail_com + review ID는 같은 transaction으로 적재됨 (journal에 먼저 기록)
+            self.ingestor.add({REVIEW_TABLE: review_rows, 'bby_tv_crawl': crawl_row, 'tv_retail_com': retail_row,
+                               SEEN_TABLE: review_seen_rows})
+            print(f"  [DB] ✓ Buffered for bby_tv_crawl + tv_retail_com ({self.ingestor.pending} pending)")
             return True
 
         except Exception as e:
-            # 모든 에러를 명확하게 출력 (중복 키 포함)
-            if 'duplicate key' in str(e):
-                print(f"  [WARNING] Duplicate key - product already exists in DB")
-                print(f"            URL: {product_url[:80] if product_url else 'N/A'}...")
-            else:
-                print(f"  [ERROR] DB save failed: {e}")
-                import traceback
-                traceback.print_exc()
+            print(f"  [ERROR] DB save failed: {e}")
+            import traceback
+            traceback.print_exc()
             return False
 
     def fill_missing_items(self):
-        """empty item을 이전 세션 data로 fill"""
+        """empty item을 이전 세션 data로 fill (같은 product_name의 최신 item, UPDATE 한 번)"""
         try:
             print("\n[INFO] empty item filling...")
-            cursor = self.db_conn.cursor()
-
-            # 현재 세션에서 item이 NULL인 레코드 찾기
-            cursor.execute("""
-                SELECT id, product_name
-                FROM bby_tv_mst
-                WHERE item IS NULL
-                AND product_name IS NOT NULL
-            """)
-
-            empty_items = cursor.fetchall()
-
-            if not empty_items:
-                print("[OK] empty item none")
-                cursor.close()
-                return
-
-            print(f"[INFO] empty item {len(empty_items)}items found")
-
-            updated_count = 0
-            for record_id, product_name in empty_items:
-                # 이전 세션에서 같은 product_name을 가진 레코드의 item 찾기
-                cursor.execute("""
-                    SELECT item
-                    FROM bby_tv_mst
-                    WHERE product_name = %s
-                    AND item IS NOT NULL
-                    ORDER BY id DESC
-                    LIMIT 1
-                """, (product_name,))
-
-                result = cursor.fetchone()
-                if result:
-                    item_value = result[0]
-                    # UPDATE
-                    cursor.execute("""
-                        UPDATE bby_tv_mst
-                        SET item = %s
-                        WHERE id = %s
-                    """, (item_value, record_id))
-                    updated_count += 1
-                    print(f"  [✓] Updated: {product_name[:50]}... → item: {item_value}")
-
-            self.db_conn.commit()
-            cursor.close()
-
-            print(f"[OK] {updated_count}/{len(empty_items)}items item filled complete")
+            with self.db_conn.transaction() as cursor:
+                run_backfill(cursor, 'bby_tv_mst.item')
             return True
 
         except Exception as e:
@@ -1669,6 +1520,30 @@ class BestBuyDetailCrawler:
             traceback.print_exc()
             return False
 
+    def clear_batch_rows(self):
+        """
+        재파싱할 batch의 기존 row 삭제 (bby_tv_crawl / tv_retail_com / bby_tv_mst)
+
+        Returns:
+            False if the batch was crawled before the tables had batch_id (재파싱하면 row 중복 -> 거부)
+        """
+        keyed_tables = self.snapshots.load_manifest('batch_keyed_tables', [])
+        missing = [table for table in BATCH_KEYED_TABLES if table not in keyed_tables]
+        if missing:
+            print(f"[ERROR] Batch {self.batch_id} was crawled before {', '.join(missing)} had batch_id - "
+                  f"re-parsing would duplicate its rows, refusing")
+            return False
+        try:
+            with self.db_conn.transaction() as cursor:
+                deleted = {table: clear_batch(cursor, table, self.batch_id, account_name)
+                           for table, account_name in BATCH_KEYED_TABLES.items()}
+            print(f"[INFO] Cleared batch {self.batch_id}: "
+                  + ', '.join(f"{table} {count} rows" for table, count in deleted.items()))
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to clear batch {self.batch_id}: {e}")
+            return False
+
     def run(self):
         """메인 execution"""
         try:
@@ -1680,32 +1555,81 @@ class BestBuyDetailCrawler:
             if not self.connect_db():
                 return
 
-            # URLs 가져오기
-            urls = self.get_recent_urls()
+            # URLs 가져오기 (재파싱 때는 live 실행 때 저장한 목록)
+            if self.reparse_batch_id:
+                if not self.snapshots.exists():
+                    print(f"[ERROR] No snapshots found for batch {self.batch_id}")
+                    return
+                urls = self.snapshots.load_manifest('urls', [])
+            else:
+                urls = self.get_recent_urls()
+                self.snapshots.save_manifest('urls', urls)
+                self.snapshots.save_manifest('batch_keyed_tables', list(BATCH_KEYED_TABLES))
             if not urls:
                 print("[ERROR] No URLs found")
                 return
 
-            # 드라이버 설정
-            if not self.setup_driver():
-                return
-
-            # 각 URL crawling
-            success_count = 0
-            for url_data in urls:
-                if self.scrape_detail_page(url_data):
-                    success_count += 1
+            num_workers = get_worker_count()
+            if self.reparse_batch_id:
+                # 재파싱 모드: browser 대신 snapshot, 딜레이 없음
+                # (batch의 bby_tv_crawl / tv_retail_com / bby_tv_mst row를 지우고 다시 저장)
+                print(f"[INFO] Re-parse mode: replaying snapshots of batch {self.batch_id}")
+                if not self.clear_batch_rows():
+                    return
+                disable_delays(self.pacer, self.waits)
+                self.driver = ReplayDriver(self.snapshots)
+                success_count = 0
+                for url_data in urls:
+                    if self.scrape_detail_page(url_data):
+                        success_count += 1
+            elif num_workers > 1:
+                # worker-pool 모드: worker들이 detail_crawl_queue에서 lease (order = queue seq)
+                success_count = run_detail_workers(
+                    self, self.work_queue, num_workers, delay_range=(3, 5),
+                    writer_methods=('save_to_db', 'save_to_mst_table'),
+                    profile_name='bby_detail'
+                )
+            else:
+                # 드라이버 설정
+                if not self.setup_driver():
+                    return
+
+                # queue에서 URL을 하나씩 lease해서 crawling (중단되면 다음 실행에서 이어서)
+                success_count = 0
+                while True:
+                    url_data = self.work_queue.claim()
+                    if url_data is None:
+                        break
+                    ok = self.scrape_detail_page(url_data)
+                    self.work_queue.finish(url_data, ok)
+                    if ok:
+                        success_count += 1
 
-                # page 간 딜레이
-                time.sleep(random.uniform(3, 5))
+                    # page 간 딜레이 (adaptive)
+                    self.pacer.wait()
 
             print("\n" + "="*80)
             print(f"crawling complete! successful: {success_count}/{len(urls)}items")
+            self.ingestor.flush()
+            if success_count:
+                mark_batch_complete(self.db_conn, 'bby_tv_crawl', self.batch_id)
+            print(self.pacer.summary())
+            print(self.waits.summary())
+            if self.work_queue is not None:
+                print(self.work_queue.summary())
+            print(self.ingestor.summary())
             print("="*80)
 
             # empty item fill
             self.fill_missing_items()
 
+            # data 검증 (이번 batch 전체, 컬럼 단위)
+            if self.validation_records:
+                report = self.validator.validate_batch(self.validation_records, 'bby_tv_dt1', self.batch_id)
+                print(f"\n[VALIDATION] {len(self.validation_records)} products")
+                for line in self.validator.format_batch_report(report):
+                    print(line)
+
             # data 검증 요약 출력
             summary = self.validator.get_summary()
             if summary['total'] > 0:
@@ -1715,11 +1639,11 @@ class BestBuyDetailCrawler:
                 print(f"Total Issues Detected: {summary['total']}")
                 for issue_type, count in sorted(summary['by_type'].items()):
                     print(f"  {issue_type}: {count}")
-                print(f"\nLog file: C:\\samsung_dx_retail_com\\problems\\{self.validator.session_start_time}.txt")
+                print(f"\nLog file: {self.validator.log_file}")
                 print("="*80)
-                self.validator.write_summary()
             else:
                 print("\n[OK] No data quality issues detected")
+            self.validator.write_summary()
 
         except Exception as e:
             print(f"[ERROR] crawler execution error: {e}")
@@ -1727,6 +1651,8 @@ class BestBuyDetailCrawler:
             traceback.print_exc()
 
         finally:
+            # 남은 record 적재 (DB에 연결할 수 없으면 spill 파일로 남김)
+            self.ingestor.close()
             if self.driver:
                 self.driver.quit()
                 print("\n[INFO] Driver closed")
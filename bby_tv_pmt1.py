@@ -6,7 +6,7 @@ https://www.bestbuy.com/site/all-tv-home-theater-on-sale/tvs-on-sale/pcmcat17206
 1. 다중 섹션 처리: 3개 프로모션 섹션에서 총 18개 SKU 수집 (각 섹션당 6개)
 2. 완전 동적 탐지: 키워드 독립적, 섹션 순서 변경 대응
 3. HTML 태그 처리: <br> → 공백, <sup> → 소수점 변환
-4. preceding 축 기반 매핑: 섹션과 carousel을 DOM 순서로 정확히 매핑
+4. preceding 축 기준 매핑: 섹션과 carousel을 DOM 순서 한 번 순회로 매핑 (map_section_carousels)
 
 수집 데이터:
 - page_type, retailer_sku_name, promotion_rank (섹션 내 1-6)
@@ -21,11 +21,9 @@ https://www.bestbuy.com/site/all-tv-home-theater-on-sale/tvs-on-sale/pcmcat17206
 
 버전: v2.0 (Dynamic Multi-Section)
 """
-import time
 import random
 import re
 import os
-import psycopg2
 from datetime import datetime
 import pytz
 import undetected_chromedriver as uc
@@ -35,15 +33,67 @@ from selenium.webdriver.support import expected_conditions as EC
 from lxml import html, etree
 from data_validator import DataValidator
 
-# Import database configuration
-from config import DB_CONFIG
+# Shared pooled database layer
+from db_manager import get_connection
+from crawl_schema import mark_batch_complete
+from pacing import get_pacer
+from snapshot_store import SnapshotStore, RecordingDriver, ReplayDriver, get_reparse_batch_id, disable_delays
+from dom_capture import capture_tree
+
+# 섹션 / carousel만 문서 순서대로 가져옴 (preceding::section 매핑이 그대로 동작)
+PROMOTION_CAPTURE_XPATH = '//section | //ul[@class="c-carousel-list"]'
+SECTION_ITEM_LIMIT = 6  # 섹션 당 수집할 최대 SKU 수
+CAROUSEL_ITEM_XPATH = './/li[@class="item c-carousel-item "]'
+
+
+def map_section_carousels(tree):
+    """
+    carousel -> 가장 가까운 preceding section 매핑을 문서 한 번 순회로 처리
+
+    carousel.xpath('preceding::section')[-1] 과 같은 기준:
+    carousel 시작 전에 이미 닫힌 section (조상 section 제외) 중 시작 위치가 가장 늦은 것
+
+    Returns:
+        {section element: [carousel ul, ...] (문서 순서)} - carousel이 매핑된 section만
+    """
+    carousels_by_section = {}
+    section_starts = {}
+    nearest_section, nearest_start = None, -1
+    position = 0
+
+    for event, elem in etree.iterwalk(tree, events=('start', 'end')):
+        if elem.tag == 'section':
+            if event == 'start':
+                section_starts[elem] = position
+            elif section_starts[elem] > nearest_start:
+                nearest_section, nearest_start = elem, section_starts[elem]
+        elif (event == 'start' and nearest_section is not None and elem.tag == 'ul'
+              and elem.get('class') == 'c-carousel-list'):
+            carousels_by_section.setdefault(nearest_section, []).append(elem)
+        position += 1
+
+    return carousels_by_section
+
+
+def section_items(carousels, limit=SECTION_ITEM_LIMIT):
+    """섹션의 carousel들에서 li 아이템 수집 (최대 limit개)"""
+    product_items = []
+    for carousel in carousels:
+        product_items.extend(carousel.xpath(CAROUSEL_ITEM_XPATH))
+        if len(product_items) >= limit:
+            break
+    return product_items[:limit]
+
 
 class BestBuyPromotionCrawler:
     def __init__(self):
         self.driver = None
         self.db_conn = None
         self.korea_tz = pytz.timezone('Asia/Seoul')
-        self.batch_id = datetime.now(self.korea_tz).strftime('%Y%m%d_%H%M%S')
+        self.pacer = get_pacer('bestbuy')  # 고정 딜레이 (재파싱 때는 건너뜀)
+        self.reparse_batch_id = get_reparse_batch_id()  # --reparse <batch_id>: snapshot으로 다시 파싱
+        self.batch_id = self.reparse_batch_id or datetime.now(self.korea_tz).strftime('%Y%m%d_%H%M%S')
+        self.snapshots = SnapshotStore('bby_tv_pmt1', self.batch_id)  # Raw page source 저장소
         self.url = "https://www.bestbuy.com/site/all-tv-home-theater-on-sale/tvs-on-sale/pcmcat1720647543741.c?id=pcmcat1720647543741"
 
         # Data validator 초기화
@@ -53,8 +103,7 @@ class BestBuyPromotionCrawler:
     def connect_db(self):
         """DB 연결"""
         try:
-            self.db_conn = psycopg2.connect(**DB_CONFIG)
-            self.db_conn.autocommit = True
+            self.db_conn = get_connection(autocommit=True)
             print("[OK] Database connected")
             return True
         except Exception as e:
@@ -65,7 +114,8 @@ class BestBuyPromotionCrawler:
         """Chrome driver setup"""
         try:
             print("[INFO] Setting up Chrome driver...")
-            self.driver = uc.Chrome()
+            # page_source를 읽을 때마다 snapshot 저장
+            self.driver = RecordingDriver(uc.Chrome(), self.snapshots)
             self.driver.maximize_window()
             print("[OK] Driver setup complete")
             return True
@@ -78,7 +128,7 @@ class BestBuyPromotionCrawler:
         try:
             print(f"[INFO] Accessing Best Buy TV Promotion page...")
             self.driver.get(self.url)
-            time.sleep(random.uniform(3, 5))
+            self.pacer.pause(random.uniform(3, 5))
 
             # Wait for page load
             wait = WebDriverWait(self.driver, 20)
@@ -173,10 +223,13 @@ class BestBuyPromotionCrawler:
             print(f"[ERROR] Promotion Type extraction failed: {e}")
             return None
 
-    def extract_promotion_sections(self, tree):
+    def extract_promotion_sections(self, tree, carousels_by_section):
         """
         페이지에서 모든 프로모션 섹션 찾기 (동적 탐지 - 키워드 독립적)
 
+        Args:
+            carousels_by_section: map_section_carousels(tree) 결과
+
         Returns:
             List of tuples: [(section_element, section_type, promotion_type), ...]
         """
@@ -188,8 +241,6 @@ class BestBuyPromotionCrawler:
             print(f"[INFO] Found {len(all_sections)} sections total")
 
             # 각 섹션이 프로모션 섹션인지 확인 (carousel 매핑 여부로 판단)
-            all_carousels = tree.xpath('//ul[@class="c-carousel-list"]')
-
             for section in all_sections:
                 try:
                     # facet 섹션 제외 (필터 섹션)
@@ -198,14 +249,7 @@ class BestBuyPromotionCrawler:
                         continue
 
                     # 이 섹션에 매핑된 carousel이 있는지 확인
-                    has_carousel = False
-                    for carousel in all_carousels:
-                        preceding_sections = carousel.xpath('preceding::section')
-                        if preceding_sections and preceding_sections[-1] == section:
-                            has_carousel = True
-                            break
-
-                    if not has_carousel:
+                    if section not in carousels_by_section:
                         continue
 
                     # promotion_type 동적 추출
@@ -277,12 +321,14 @@ class BestBuyPromotionCrawler:
         try:
             print("\n[INFO] Starting product extraction...")
 
-            # 페이지 소스 가져오기
-            page_source = self.driver.page_source
-            tree = html.fromstring(page_source)
+            # 페이지 소스 전체 대신 섹션 / carousel element만 가져오기
+            tree = capture_tree(self.driver, [PROMOTION_CAPTURE_XPATH])
+
+            # section -> carousel 매핑 (문서 한 번 순회, 섹션 탐지 / 아이템 수집 공용)
+            carousels_by_section = map_section_carousels(tree)
 
             # Find all promotion sections
-            sections = self.extract_promotion_sections(tree)
+            sections = self.extract_promotion_sections(tree, carousels_by_section)
 
             if not sections:
                 print("[WARNING] No promotion sections found")
@@ -295,33 +341,11 @@ class BestBuyPromotionCrawler:
                 try:
                     print(f"\n[INFO] Processing Section {section_idx}: {promotion_type[:60]}...")
 
-                    # 이 섹션에 속하는 모든 carousel 찾기 (preceding 축 기반)
-                    # 섹션 이후의 모든 c-carousel-list를 찾아서
-                    # 각 carousel의 preceding::section[-1]이 현재 섹션인지 확인
-
-                    all_carousels = tree.xpath('//ul[@class="c-carousel-list"]')
-                    section_carousels = []
-
-                    for carousel in all_carousels:
-                        # 이 carousel 앞의 가장 가까운 section 찾기
-                        preceding_sections = carousel.xpath('preceding::section')
-                        if preceding_sections:
-                            nearest_section = preceding_sections[-1]  # 가장 가까운 section
-                            # 현재 섹션과 동일한지 확인 (메모리 주소 비교)
-                            if nearest_section == section_elem:
-                                section_carousels.append(carousel)
-
+                    section_carousels = carousels_by_section[section_elem]
                     print(f"[OK] Section {section_idx} mapped carousels: {len(section_carousels)}")
 
                     # 모든 carousel에서 li 아이템 수집 (최대 6개)
-                    product_items = []
-                    for carousel in section_carousels:
-                        items = carousel.xpath('.//li[@class="item c-carousel-item "]')
-                        product_items.extend(items)
-                        if len(product_items) >= 6:
-                            break
-
-                    product_items = product_items[:6]  # Limit to max 6
+                    product_items = section_items(section_carousels)
                     print(f"[OK] Section {section_idx} collected {len(product_items)} products")
 
                     # 각 제품 처리 (promotion_rank는 섹션 내에서 1-6)
@@ -469,6 +493,16 @@ class BestBuyPromotionCrawler:
             traceback.print_exc()
             return False
 
+    def clear_batch_rows(self):
+        """재파싱할 batch의 기존 row 삭제"""
+        try:
+            with self.db_conn.transaction() as cursor:
+                cursor.execute("DELETE FROM bby_tv_pmt1 WHERE batch_id = %s", (self.batch_id,))
+                deleted = cursor.rowcount
+            print(f"[INFO] Cleared batch {self.batch_id}: {deleted} rows")
+        except Exception as e:
+            print(f"[WARNING] Failed to clear batch {self.batch_id}: {e}")
+
     def run(self):
         """메인 실행"""
         try:
@@ -480,8 +514,16 @@ class BestBuyPromotionCrawler:
             if not self.connect_db():
                 return
 
-            # 드라이버 설정
-            if not self.setup_driver():
+            # 드라이버 설정 (재파싱 때는 저장된 snapshot 사용)
+            if self.reparse_batch_id:
+                if not self.snapshots.exists():
+                    print(f"[ERROR] No snapshots found for batch {self.batch_id}")
+                    return
+                print(f"[INFO] Re-parse mode: replaying snapshots of batch {self.batch_id}")
+                disable_delays(self.pacer)
+                self.clear_batch_rows()
+                self.driver = ReplayDriver(self.snapshots)
+            elif not self.setup_driver():
                 return
 
             # 페이지 접속
@@ -494,6 +536,7 @@ class BestBuyPromotionCrawler:
             # DB 저장
             if products:
                 self.save_to_db(products)
+                mark_batch_complete(self.db_conn, 'bby_tv_pmt1', self.batch_id)
 
                 # Summary
                 print("\n" + "="*80)
@@ -512,11 +555,11 @@ class BestBuyPromotionCrawler:
                 print(f"Total Issues Detected: {summary['total']}")
                 for issue_type, count in sorted(summary['by_type'].items()):
                     print(f"  {issue_type}: {count}")
-                print(f"\nLog file: C:\\samsung_dx_retail_com\\problems\\{self.validator.session_start_time}.txt")
+                print(f"\nLog file: {self.validator.log_file}")
                 print("="*80)
-                self.validator.write_summary()
             else:
                 print("\n[OK] No data quality issues detected")
+            self.validator.write_summary()
 
         except Exception as e:
             print(f"[ERROR] Crawler execution error: {e}")
@@ -0,0 +1,510 @@
+"""
+Warm Browser Session Broker
+크롤러 실행마다 Chrome을 새로 띄우는 대신, 실행 사이에도 살아 있는 Chrome (remote debugging port)에
+붙어서 쓰고 돌려준다.
+
+- 세션 = Chrome process 1개 + 전용 profile + 상태 파일 (cache/browser_sessions/<name>.json)
+- acquire: 살아 있는 세션이 있으면 health check 후 attach (cold start / warm-up navigation / cookie 로딩 생략)
+           없거나 응답이 없으면 새로 띄우고 warm-up (retailer 홈 접속 + cookie 파일 로딩)
+- release: driver.quit() 때 자동으로 반납. chromedriver만 종료되고 Chrome은 다음 실행을 위해 유지
+- recycle: 세션이 BROWSER_SESSION_MAX_PAGES 페이지를 처리했거나 BROWSER_SESSION_MAX_HOURS가 지나면
+           반납 시 Chrome을 종료 -> 다음 acquire에서 새로 시작
+- lease: 세션 별 lock 파일 (다른 크롤러가 쓰고 있으면 None 반환 -> 크롤러는 기존처럼 cold start)
+- chromedriver 경로는 cache (ChromeDriverManager().install() / uc patch를 매 실행마다 하지 않음)
+  BROWSER_DRIVER_CACHE_DAYS 지나거나 Chrome 버전이 바뀌어 attach가 실패하면 다시 받음
+
+Chrome 실행 인자는 크롤러의 options.arguments를 그대로 사용하고, attach 할 때는
+page_load_strategy / goog:loggingPrefs만 옮긴다 (debuggerAddress 세션은 excludeSwitches / prefs 불가,
+broker가 직접 띄운 Chrome에는 --enable-automation이 없음).
+
+설정 (환경 변수 또는 config.py):
+    BROWSER_SESSIONS=off              기존처럼 매번 새 Chrome (기본 on)
+    BROWSER_SESSION_MAX_PAGES=500     세션 당 처리 페이지 수
+    BROWSER_SESSION_MAX_HOURS=12      세션 최대 수명
+    CHROME_BINARY=...                 Chrome 실행 파일 (없으면 기본 설치 위치에서 찾음)
+
+사용법:
+    from browser_sessions import attach_session
+
+    driver = attach_session('walmart_detail', 'walmart', options, profile_dir=self.profile_dir, kind='uc')
+    if driver is None:
+        driver = uc.Chrome(options=options, user_data_dir=self.profile_dir)   # cold start
+    self.driver = RecordingDriver(driver, self.snapshots)
+
+Usage (CLI):
+    python browser_sessions.py --status                  # 세션 목록 / 처리 페이지 수 / 상태
+    python browser_sessions.py --start amazon_main amazon   # 미리 띄워서 warm-up
+    python browser_sessions.py --stop [name]             # 세션 종료 (name 없으면 전체)
+    python browser_sessions.py --refresh-driver          # chromedriver 다시 받기
+"""
+
+import json
+import os
+import pickle
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+try:
+    import config
+except ImportError:
+    config = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SESSION_ROOT = os.path.join(BASE_DIR, 'cache', 'browser_sessions')
+PROFILE_ROOT = os.path.join(SESSION_ROOT, 'profiles')
+DRIVER_CACHE_FILE = os.path.join(SESSION_ROOT, 'drivers.json')
+
+# retailer 별 warm-up (새 세션을 띄웠을 때 1번)
+WARMUP = {
+    'amazon': {'url': 'https://www.amazon.com', 'cookie_file': os.path.join(BASE_DIR, 'amazon_cookies.pkl')},
+    'walmart': {'url': 'https://www.walmart.com'},
+    'bestbuy': {'url': 'https://www.bestbuy.com'},
+}
+
+CHROME_CANDIDATES = [
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+    os.path.expandvars(r"%LOCALAPPDATA%\Google\Chrome\Application\chrome.exe"),
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+]
+
+STARTUP_TIMEOUT = 20
+
+
+def _setting(name, default):
+    value = os.environ.get(name)
+    if value is None and config is not None:
+        value = getattr(config, name, None)
+    return default if value is None else value
+
+
+def is_enabled():
+    """BROWSER_SESSIONS=off 이면 broker를 쓰지 않음"""
+    return str(_setting('BROWSER_SESSIONS', 'on')).lower() not in ('off', '0', 'false', 'no')
+
+
+def max_pages():
+    return int(_setting('BROWSER_SESSION_MAX_PAGES', 500))
+
+
+def max_hours():
+    return float(_setting('BROWSER_SESSION_MAX_HOURS', 12))
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def pid_alive(pid):
+    """process가 살아 있는지 (Windows는 os.kill(pid, 0)이 process를 종료시키므로 OpenProcess 사용)"""
+    if not pid:
+        return False
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def kill_process(pid):
+    """Chrome process (와 child process) 종료"""
+    if not pid_alive(pid):
+        return
+    try:
+        if os.name == 'nt':
+            subprocess.run(['taskkill', '/PID', str(pid), '/T', '/F'],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(pid, signal.SIGTERM)
+    except Exception as e:
+        print(f"[WARNING] Could not stop Chrome process {pid}: {e}")
+
+
+def chrome_binary(options=None):
+    """Chrome 실행 파일 경로"""
+    path = (getattr(options, 'binary_location', None) or _setting('CHROME_BINARY', None))
+    if path:
+        return path
+    for candidate in CHROME_CANDIDATES:
+        if os.path.exists(candidate):
+            return candidate
+    for name in ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome'):
+        found = shutil.which(name)
+        if found:
+            return found
+    raise FileNotFoundError("Chrome binary not found (set CHROME_BINARY)")
+
+
+def driver_path(kind='selenium', force=False):
+    """
+    chromedriver 경로 (cache). kind='uc'는 undetected_chromedriver로 patch된 binary
+
+    ChromeDriverManager().install() / uc Patcher는 network로 최신 버전을 확인하므로
+    cache가 BROWSER_DRIVER_CACHE_DAYS (기본 7일)보다 오래됐거나 force일 때만 호출한다.
+    """
+    cache = _read_json(DRIVER_CACHE_FILE) or {}
+    entry = cache.get(kind)
+    max_age = float(_setting('BROWSER_DRIVER_CACHE_DAYS', 7)) * 86400
+    if (not force and entry and os.path.exists(entry['path'])
+            and time.time() - entry.get('resolved_at', 0) < max_age):
+        return entry['path']
+
+    if kind == 'uc':
+        from undetected_chromedriver import Patcher
+        patcher = Patcher()
+        patcher.auto()
+        # Patcher는 종료 시 patch한 binary를 지우므로 cache 위치로 복사해서 사용
+        filename = 'chromedriver_uc.exe' if os.name == 'nt' else 'chromedriver_uc'
+        path = os.path.join(SESSION_ROOT, 'drivers', filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copy2(patcher.executable_path, path)
+    else:
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+
+    cache[kind] = {'path': path, 'resolved_at': time.time()}
+    _write_json(DRIVER_CACHE_FILE, cache)
+    print(f"[OK] ChromeDriver resolved ({kind}): {path}")
+    return path
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _endpoint_alive(port, timeout=2):
+    """Chrome remote debugging endpoint 응답 확인"""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=timeout) as resp:
+            return resp.status == 200
+    except Exception:
+        return False
+
+
+class SessionDriver:
+    """
+    broker 세션에 attach한 driver proxy
+    get() 횟수를 세고, quit()하면 Chrome은 두고 세션만 반납
+    나머지 속성/메서드는 원래 driver로 그대로 전달
+    """
+
+    def __init__(self, driver, session, cookies_loaded):
+        object.__setattr__(self, '_driver', driver)
+        object.__setattr__(self, '_session', session)
+        object.__setattr__(self, '_pages', 0)
+        object.__setattr__(self, 'cookies_loaded', cookies_loaded)
+
+    def get(self, url):
+        object.__setattr__(self, '_pages', self._pages + 1)
+        return self._driver.get(url)
+
+    def quit(self):
+        try:
+            # debuggerAddress 세션의 quit은 chromedriver만 종료 (Chrome은 유지)
+            self._driver.quit()
+        finally:
+            self._session.release(self._pages)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._driver, name, value)
+
+
+class BrowserSession:
+    """이름 하나에 해당하는 Chrome process + profile + lease"""
+
+    def __init__(self, name, retailer=None, profile_dir=None):
+        self.name = name
+        self.retailer = retailer
+        self.profile_dir = os.path.abspath(profile_dir) if profile_dir else os.path.join(PROFILE_ROOT, name)
+        self.state_file = os.path.join(SESSION_ROOT, f"{name}.json")
+        self.lock_file = os.path.join(SESSION_ROOT, f"{name}.lock")
+
+    # ---- lease ----
+    def lock(self):
+        """세션 lease 획득 (lock을 가진 process가 죽었으면 넘겨받음)"""
+        os.makedirs(SESSION_ROOT, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                with os.fdopen(fd, 'w') as f:
+                    f.write(str(os.getpid()))
+                return True
+            except FileExistsError:
+                try:
+                    with open(self.lock_file, 'r') as f:
+                        owner = int(f.read().strip() or 0)
+                except (OSError, ValueError):
+                    owner = 0
+                if owner == os.getpid() or pid_alive(owner):
+                    return False
+                print(f"[INFO] Session {self.name}: taking over stale lease from pid {owner}")
+                try:
+                    os.remove(self.lock_file)
+                except OSError:
+                    pass
+        return False
+
+    def unlock(self):
+        try:
+            os.remove(self.lock_file)
+        except OSError:
+            pass
+
+    # ---- state ----
+    def state(self):
+        return _read_json(self.state_file)
+
+    def is_alive(self, state=None):
+        """Chrome process와 remote debugging endpoint가 모두 응답하는지"""
+        state = state or self.state()
+        return bool(state) and pid_alive(state.get('pid')) and _endpoint_alive(state.get('port'))
+
+    def expired(self, state):
+        age_hours = (time.time() - state.get('started_at', 0)) / 3600
+        return state.get('pages', 0) >= max_pages() or age_hours >= max_hours()
+
+    def launch(self, options=None):
+        """Chrome을 remote debugging port로 띄움 (크롤러가 끝나도 유지되도록 분리된 process)"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        port = _free_port()
+        args = [a for a in (getattr(options, 'arguments', None) or [])
+                if not a.startswith(('--user-data-dir', '--remote-debugging-port'))]
+        cmd = [chrome_binary(options), f'--remote-debugging-port={port}', f'--user-data-dir={self.profile_dir}',
+               '--no-first-run', '--no-default-browser-check'] + args
+
+        kwargs = {'stdout': subprocess.DEVNULL, 'stderr': subprocess.DEVNULL}
+        if os.name == 'nt':
+            kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs['start_new_session'] = True
+        process = subprocess.Popen(cmd, **kwargs)
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while not _endpoint_alive(port):
+            if time.monotonic() >= deadline or process.poll() is not None:
+                kill_process(process.pid)
+                raise RuntimeError(f"Chrome did not open remote debugging port {port}")
+            time.sleep(0.3)
+
+        state = {'name': self.name, 'retailer': self.retailer, 'pid': process.pid, 'port': port,
+                 'profile_dir': self.profile_dir, 'pages': 0, 'warmed': False,
+                 'started_at': time.time(), 'started': datetime.now().isoformat(timespec='seconds')}
+        _write_json(self.state_file, state)
+        print(f"[OK] Session {self.name}: Chrome started (pid {process.pid}, port {port})")
+        return state
+
+    def stop(self, state=None):
+        state = state or self.state()
+        if state:
+            kill_process(state.get('pid'))
+        try:
+            os.remove(self.state_file)
+        except OSError:
+            pass
+
+    # ---- driver ----
+    def _attach(self, state, options=None, kind='selenium'):
+        """실행 중인 Chrome에 chromedriver attach"""
+        attach_options = Options()
+        attach_options.debugger_address = f"127.0.0.1:{state['port']}"
+        if options is not None:
+            attach_options.page_load_strategy = options.page_load_strategy
+            logging_prefs = options.to_capabilities().get('goog:loggingPrefs')
+            if logging_prefs:
+                attach_options.set_capability('goog:loggingPrefs', logging_prefs)
+
+        try:
+            driver = webdriver.Chrome(service=Service(driver_path(kind)), options=attach_options)
+        except SessionNotCreatedException:
+            # Chrome이 업데이트돼서 cache된 chromedriver 버전이 맞지 않는 경우
+            driver = webdriver.Chrome(service=Service(driver_path(kind, force=True)), options=attach_options)
+
+        # 이전 실행에서 열린 tab 정리 (첫 tab만 유지)
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.execute_script('return 1')  # health check
+        return driver
+
+    def warm_up(self, driver):
+        """retailer 홈 접속 + cookie 파일 로딩 (새 세션에서 1번)"""
+        warmup = WARMUP.get(self.retailer)
+        if not warmup:
+            return False
+        driver.get(warmup['url'])
+        cookie_file = warmup.get('cookie_file')
+        if not cookie_file or not os.path.exists(cookie_file):
+            return False
+
+        with open(cookie_file, 'rb') as f:
+            cookies = pickle.load(f)
+        for cookie in cookies:
+            try:
+                driver.add_cookie(cookie)
+            except WebDriverException:
+                pass
+        driver.refresh()
+        print(f"[OK] Session {self.name}: {len(cookies)} cookies loaded from {os.path.basename(cookie_file)}")
+        return True
+
+    def acquire(self, options=None, kind='selenium'):
+        """
+        세션 lease 후 attach한 SessionDriver 반환
+
+        Returns:
+            SessionDriver, 또는 다른 process가 쓰는 중이면 None
+        """
+        if not self.lock():
+            print(f"[INFO] Session {self.name} is in use by another crawler")
+            return None
+
+        try:
+            state = self.state()
+            if state and self.is_alive(state) and not self.expired(state):
+                try:
+                    driver = self._attach(state, options, kind)
+                    print(f"[OK] Session {self.name}: attached to warm Chrome "
+                          f"(pid {state['pid']}, {state.get('pages', 0)} pages served)")
+                    return SessionDriver(driver, self, state.get('cookies_loaded', False))
+                except WebDriverException as e:
+                    print(f"[WARNING] Session {self.name}: health check failed ({e.__class__.__name__}) - restarting")
+
+            if state:
+                self.stop(state)
+            state = self.launch(options)
+            driver = self._attach(state, options, kind)
+            cookies_loaded = self.warm_up(driver)
+            state.update({'warmed': True, 'cookies_loaded': cookies_loaded})
+            _write_json(self.state_file, state)
+            return SessionDriver(driver, self, cookies_loaded)
+        except Exception:
+            self.unlock()
+            raise
+
+    def release(self, pages):
+        """세션 반납 (처리 페이지 수 기록, 한도를 넘었으면 Chrome 종료)"""
+        try:
+            state = self.state()
+            if state:
+                state['pages'] = state.get('pages', 0) + pages
+                state['last_used'] = datetime.now().isoformat(timespec='seconds')
+                if self.expired(state):
+                    print(f"[INFO] Session {self.name}: recycling after {state['pages']} pages")
+                    self.stop(state)
+                else:
+                    _write_json(self.state_file, state)
+        finally:
+            self.unlock()
+
+
+def attach_session(name, retailer, options=None, profile_dir=None, kind='selenium'):
+    """
+    warm 세션에 attach한 driver (broker를 쓸 수 없으면 None -> 크롤러가 직접 cold start)
+
+    Args:
+        name: 세션 이름 (worker-pool이면 profile_dir 이름이 대신 사용됨)
+        retailer: warm-up 대상 ('amazon' / 'walmart' / 'bestbuy')
+        options: 크롤러의 Chrome options (arguments -> Chrome 실행 인자)
+        profile_dir: Chrome profile (worker 별 profile)
+        kind: 'selenium' 또는 'uc' (undetected_chromedriver patch binary)
+    """
+    if not is_enabled():
+        return None
+    if profile_dir:
+        name = os.path.basename(os.path.normpath(profile_dir))
+    try:
+        return BrowserSession(name, retailer, profile_dir).acquire(options, kind)
+    except Exception as e:
+        print(f"[WARNING] Browser session broker unavailable ({e}) - starting a new Chrome")
+        return None
+
+
+def list_sessions():
+    if not os.path.isdir(SESSION_ROOT):
+        return []
+    return sorted(f[:-5] for f in os.listdir(SESSION_ROOT) if f.endswith('.json') and f != 'drivers.json')
+
+
+def print_status():
+    names = list_sessions()
+    if not names:
+        print("[INFO] No browser sessions")
+        return
+    print(f"{'session':<25} {'retailer':<10} {'pid':>7} {'port':>6} {'pages':>6}  {'started':<20} status")
+    for name in names:
+        session = BrowserSession(name)
+        state = session.state() or {}
+        status = 'alive' if session.is_alive(state) else 'dead'
+        if os.path.exists(session.lock_file):
+            status += ', leased'
+        print(f"{name:<25} {str(state.get('retailer')):<10} {state.get('pid', 0):>7} {state.get('port', 0):>6} "
+              f"{state.get('pages', 0):>6}  {state.get('started', ''):<20} {status}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if '--start' in args:
+        idx = args.index('--start')
+        session_args = args[idx + 1:idx + 3]
+        if len(session_args) < 2:
+            print("Usage: python browser_sessions.py --start <name> <retailer>")
+            sys.exit(1)
+        driver = attach_session(session_args[0], session_args[1])
+        if driver is not None:
+            driver.quit()
+    elif '--stop' in args:
+        idx = args.index('--stop')
+        targets = args[idx + 1:idx + 2] or list_sessions()
+        for name in targets:
+            BrowserSession(name).stop()
+            print(f"[OK] Session {name} stopped")
+    elif '--refresh-driver' in args:
+        driver_path('selenium', force=True)
+        try:
+            driver_path('uc', force=True)
+        except ImportError:
+            print("[INFO] undetected_chromedriver not installed - skipped uc driver")
+    else:
+        print_status()
@@ -11,3 +11,37 @@ DB_CONFIG = {
     'user': 'your_username',
     'password': 'your_password'
 }
+
+# Connection pool size used by db_manager.py (optional)
+DB_POOL_MIN_CONN = 1
+DB_POOL_MAX_CONN = 8
+
+# Adaptive page delay overrides used by pacing.py (optional)
+# PACING_POLICIES = {
+#     'walmart': {'min_delay': 4.0, 'base_delay': 8.0},
+#     'default': {'max_delay': 120.0},
+# }
+
+# Seconds before selector_registry.py re-checks xpath_selectors for changes (optional)
+# SELECTOR_REFRESH_SECONDS = 300
+
+# Resource blocking per retailer / 'retailer:page_type' (optional, see resource_policy.py)
+# Categories: images, media, fonts, trackers. Set RESOURCE_BLOCKING=off to disable.
+# RESOURCE_POLICIES = {
+#     'bestbuy:detail': {'block': ['media', 'fonts', 'trackers']},
+# }
+
+# Warm browser sessions reused across crawler runs (optional, see browser_sessions.py)
+# BROWSER_SESSIONS = 'on'            # 'off' starts a new Chrome every run
+# BROWSER_SESSION_MAX_PAGES = 500    # recycle Chrome after this many pages
+# BROWSER_SESSION_MAX_HOURS = 12
+# CHROME_BINARY = r"C:\Program Files\Google\Chrome\Application\chrome.exe"
+
+# Detail record ingestion (optional, see detail_ingest.py)
+# DETAIL_INGEST_FLUSH_ROWS = 25      # COPY buffered detail records every N records
+# DETAIL_INGEST_SPILL_DIR = r"C:\samsung_dx_retail_com\cache\ingest_spill"
+
+# Data validation (optional, see data_validator.py)
+# VALIDATION_PROBLEMS_DIR = r"C:\samsung_dx_retail_com\problems"   # default ./problems
+# VALIDATION_FLUSH_ISSUES = 1000         # write buffered issues every N issues
+# VALIDATION_NULL_RATE_THRESHOLD = 0.2   # validate_batch flags columns with a higher null rate
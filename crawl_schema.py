@@ -0,0 +1,270 @@
+"""
+Crawl Table Schema Management
+crawl 테이블 index + latest_batches 테이블 관리
+
+대부분의 reader (detail 크롤러의 URL 로딩, backfill, check_* 스크립트)는
+"SELECT batch_id ... ORDER BY batch_id DESC LIMIT 1" 로 시작하는데, index가 없어서 이력이 쌓일수록 full scan이 된다.
+
+1. index (컬럼이 있는 테이블에만, CREATE INDEX CONCURRENTLY - 크롤러 쓰기를 막지 않음)
+   - (batch_id)                       최신 batch 조회 / batch 별 조회
+   - (product_url, batch_id)          URL 별 이전 batch 조회 (backfill 등)
+   - (account_name, crawl_strdatetime) tv_retail_com 등 retailer 별 최신 수집 조회
+2. latest_batches 테이블: 테이블 별 마지막으로 "끝까지 완료된" batch_id
+   - 크롤러가 끝날 때 mark_batch_complete()로 갱신 (이전보다 최신 batch일 때만)
+   - reader는 get_latest_batches()로 한 번에 조회 - 기록과 MAX(batch_id) 중 더 최신 값
+     (mark_batch_complete를 부르지 않는 crawler가 더 새 batch를 쓴 경우 오래된 기록에 묶이지 않도록)
+3. batch key: --reparse가 다시 쓰는 테이블 (tv_retail_com, bby_tv_mst, Walmart_tv_detail_crawled 등)에
+   ensure_batch_column()으로 batch_id를 추가하고, 재파싱 전에 clear_batch()로 해당 batch row를 삭제
+
+사용법:
+    from crawl_schema import get_latest_batches, mark_batch_complete
+
+    main_batch_id, bsr_batch_id = get_latest_batches(cursor, ['wmart_tv_main_crawl', 'wmart_tv_bsr_crawl'])
+    mark_batch_complete(self.db_conn, 'wmart_tv_main_crawl', self.batch_id)   # 크롤러 종료 시
+
+Usage (CLI):
+    python crawl_schema.py             # index 생성 / 보수 + latest_batches 생성 및 초기값 채우기
+    python crawl_schema.py --status    # 테이블 별 index / latest batch 확인
+"""
+
+import sys
+
+import psycopg2
+
+# Import database configuration
+from config import DB_CONFIG
+
+# batch 단위로 쌓이는 crawl 테이블
+CRAWL_TABLES = [
+    'bby_tv_main1', 'bby_tv_bsr1', 'bby_tv_pmt1', 'bby_tv_crawl',
+    'wmart_tv_main_crawl', 'wmart_tv_bsr_crawl', 'walmart_tv_detail_crawled',
+    'amazon_tv_main_crawled', 'amazon_tv_bsr', 'amazon_tv_detail_crawled',
+    'tv_retail_com', 'bby_tv_mst',
+]
+
+# 테이블에 해당 컬럼이 모두 있을 때만 생성
+INDEX_COLUMNS = [
+    ('batch_id',),
+    ('product_url', 'batch_id'),
+    ('account_name', 'crawl_strdatetime'),
+]
+
+CREATE_LATEST_BATCHES_SQL = """
+    CREATE TABLE IF NOT EXISTS latest_batches (
+        table_name VARCHAR(100) PRIMARY KEY,
+        batch_id TEXT NOT NULL,
+        row_count INTEGER,
+        finished_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+"""
+
+# 이전 기록보다 최신 batch일 때만 갱신 (재파싱 등으로 이전 batch를 다시 쓰는 경우 유지)
+RECORD_LATEST_BATCH_SQL = """
+    INSERT INTO latest_batches (table_name, batch_id, row_count, finished_at)
+    VALUES (%s, %s, %s, NOW())
+    ON CONFLICT (table_name) DO UPDATE
+    SET batch_id = EXCLUDED.batch_id, row_count = EXCLUDED.row_count, finished_at = EXCLUDED.finished_at
+    WHERE latest_batches.batch_id <= EXCLUDED.batch_id
+"""
+
+_latest_batches_ready = False
+
+
+def index_name(table, columns):
+    return f"idx_{table}_{'_'.join(columns)}"[:63]
+
+
+def table_columns(cursor, table):
+    """테이블의 컬럼 이름 set (테이블이 없으면 빈 set)"""
+    cursor.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_name = %s
+    """, (table.lower(),))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def ensure_latest_batches_table(cursor):
+    """latest_batches 테이블 생성 (process 당 1번)"""
+    global _latest_batches_ready
+    if not _latest_batches_ready:
+        cursor.execute(CREATE_LATEST_BATCHES_SQL)
+        _latest_batches_ready = True
+
+
+def get_latest_batches(cursor, tables):
+    """
+    테이블 별 최신 batch_id 목록 (tables 순서, 쿼리 1번)
+
+    latest_batches 기록과 MAX(batch_id) (batch_id index 사용) 중 더 최신 값
+    (GREATEST는 NULL을 무시하므로 기록이 없으면 MAX(batch_id)), 없는 테이블은 None
+    """
+    ensure_latest_batches_table(cursor)
+    cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_name = ANY(%s)",
+                   ([table.lower() for table in tables],))
+    existing = {row[0] for row in cursor.fetchall()}
+
+    columns = ', '.join(
+        f"GREATEST((SELECT batch_id FROM latest_batches WHERE table_name = %s), "
+        f"(SELECT MAX(batch_id)::TEXT FROM {table}))" if table.lower() in existing else "NULL::TEXT"
+        for table in tables
+    )
+    cursor.execute(f"SELECT {columns}", [table.lower() for table in tables if table.lower() in existing])
+    return list(cursor.fetchone())
+
+
+def record_latest_batch(cursor, table, batch_id):
+    """크롤러 종료 시 완료된 batch 기록 (row 수 포함)"""
+    if batch_id is None:
+        return
+    try:
+        ensure_latest_batches_table(cursor)
+        cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE batch_id = %s", (batch_id,))
+        row_count = cursor.fetchone()[0]
+        cursor.execute(RECORD_LATEST_BATCH_SQL, (table.lower(), str(batch_id), row_count))
+        print(f"[OK] latest_batches: {table} -> {batch_id} ({row_count} rows)")
+    except Exception as e:
+        print(f"[WARNING] Could not record latest batch for {table}: {e}")
+
+
+def mark_batch_complete(db_conn, table, batch_id):
+    """크롤러 종료 시 호출 - db_manager connection으로 record_latest_batch 후 commit"""
+    try:
+        with db_conn.transaction() as cursor:
+            record_latest_batch(cursor, table, batch_id)
+    except Exception as e:
+        print(f"[WARNING] Could not record latest batch for {table}: {e}")
+
+
+def ensure_batch_column(cursor, table):
+    """
+    batch_id 컬럼이 없으면 추가 (재파싱 때 batch 단위로 지우기 위한 key, 있으면 catalog 조회만)
+    테이블이 아직 없으면 아무것도 하지 않음 (CREATE TABLE 쪽에 batch_id 포함)
+    """
+    columns = table_columns(cursor, table)
+    if not columns or 'batch_id' in columns:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS batch_id TEXT")
+    print(f"[OK] {table}: batch_id column added")
+    return True
+
+
+def clear_batch(cursor, table, batch_id, account_name=None):
+    """
+    재파싱 전 batch의 기존 row 삭제
+
+    Args:
+        account_name: tv_retail_com 처럼 retailer 공용 테이블이면 해당 retailer row만
+
+    Returns:
+        삭제된 row 수
+    """
+    if account_name is None:
+        cursor.execute(f"DELETE FROM {table} WHERE batch_id = %s", (str(batch_id),))
+    else:
+        cursor.execute(f"DELETE FROM {table} WHERE batch_id = %s AND account_name = %s",
+                       (str(batch_id), account_name))
+    return cursor.rowcount
+
+
+def ensure_indexes(cursor, tables=CRAWL_TABLES):
+    """crawl 테이블 index 생성 (이미 있으면 건너뜀, 실패로 남은 invalid index는 다시 생성)"""
+    created = 0
+    for table in tables:
+        columns = table_columns(cursor, table)
+        if not columns:
+            print(f"  [INFO] {table}: table not found, skipped")
+            continue
+
+        for index_columns in INDEX_COLUMNS:
+            if not set(index_columns) <= columns:
+                continue
+            name = index_name(table, index_columns)
+
+            cursor.execute("""
+                SELECT i.indisvalid
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE c.relname = %s
+            """, (name,))
+            existing = cursor.fetchone()
+            if existing and existing[0]:
+                continue
+            if existing:
+                print(f"  [WARNING] {name} is invalid (interrupted build) - recreating")
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+            cursor.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(index_columns)})")
+            print(f"  [OK] {name} created")
+            created += 1
+    return created
+
+
+def seed_latest_batches(cursor, tables=CRAWL_TABLES):
+    """기록이 없는 테이블은 현재 MAX(batch_id)로 초기값 채우기"""
+    ensure_latest_batches_table(cursor)
+    for table in tables:
+        if 'batch_id' not in table_columns(cursor, table):
+            continue
+        cursor.execute("SELECT 1 FROM latest_batches WHERE table_name = %s", (table.lower(),))
+        if cursor.fetchone():
+            continue
+        cursor.execute(f"SELECT MAX(batch_id) FROM {table}")
+        batch_id = cursor.fetchone()[0]
+        if batch_id is not None:
+            record_latest_batch(cursor, table, batch_id)
+
+
+def print_status(cursor):
+    ensure_latest_batches_table(cursor)
+    cursor.execute("SELECT table_name, batch_id, row_count, finished_at FROM latest_batches")
+    latest = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    for table in CRAWL_TABLES:
+        columns = table_columns(cursor, table)
+        if not columns:
+            continue
+        cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s ORDER BY indexname", (table.lower(),))
+        indexes = [row[0] for row in cursor.fetchall()]
+        batch_id, row_count, finished_at = latest.get(table.lower(), (None, None, None))
+        print(f"\n{table}")
+        print(f"  latest batch: {batch_id} ({row_count} rows, {finished_at})")
+        print(f"  indexes: {', '.join(indexes) or '-'}")
+
+
+def main():
+    try:
+        # CREATE INDEX CONCURRENTLY는 transaction 밖에서만 실행 가능
+        conn = psycopg2.connect(**DB_CONFIG)
+        conn.autocommit = True
+        cursor = conn.cursor()
+
+        if '--status' in sys.argv[1:]:
+            print_status(cursor)
+        else:
+            print("=" * 80)
+            print("Crawl Table Indexes / latest_batches")
+            print("=" * 80)
+
+            print("\n[1/2] Creating indexes...")
+            created = ensure_indexes(cursor)
+            print(f"  [OK] {created} indexes created")
+
+            print("\n[2/2] Creating latest_batches...")
+            seed_latest_batches(cursor)
+
+            print("\n" + "=" * 80)
+            print("SUCCESS: crawl table schema is up to date")
+            print("=" * 80)
+
+        cursor.close()
+        conn.close()
+
+    except Exception as e:
+        print(f"\n[ERROR] {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ Create tv_retail_com unified table
 """
 import psycopg2
 from config import DB_CONFIG
+from review_store import CREATE_TABLE_SQL as CREATE_REVIEW_TABLE_SQL, CREATE_VIEW_SQL as CREATE_REVIEW_VIEW_SQL
 
 def create_tv_retail_com_table():
     """Create unified TV retail data table"""
@@ -72,10 +73,27 @@ def create_tv_retail_com_table():
 
                 -- 8. Metadata (last column)
                 calendar_week VARCHAR(20),
-                crawl_strdatetime TIMESTAMP
+                crawl_strdatetime TIMESTAMP,
+
+                -- 9. Typed values parsed once at ingestion (value_normalizer.py), raw strings stay above
+                final_sku_price_amount NUMERIC(12,2),
+                original_sku_price_amount NUMERIC(12,2),
+                savings_amount NUMERIC(12,2),
+                price_currency CHAR(3),
+                star_rating_value NUMERIC(3,2),
+
+                -- 10. Review references (review_store.py) - each review text is stored once in retail_reviews
+                review_product_key VARCHAR(200),
+                detailed_review_hashes TEXT[],
+                summarized_review_hash CHAR(40),
+                top_mentions_hash CHAR(40)
             )
         """)
 
+        # Review texts + tv_retail_com_reviews view
+        cursor.execute(CREATE_REVIEW_TABLE_SQL)
+        cursor.execute(CREATE_REVIEW_VIEW_SQL)
+
         print("[OK] Table tv_retail_com created successfully")
 
         # Create indexes
@@ -96,6 +114,10 @@ def create_tv_retail_com_table():
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_tv_retail_com_calendar_week ON tv_retail_com(calendar_week)
         """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_tv_retail_com_final_price_amount
+            ON tv_retail_com(account_name, final_sku_price_amount)
+        """)
 
         print("[OK] Indexes created successfully")
 
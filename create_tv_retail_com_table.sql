@@ -35,7 +35,7 @@ CREATE TABLE tv_retail_com (
     sku_status VARCHAR(100),
     retailer_membership_discounts VARCHAR(100),
 
-    -- 5. Reviews/Content
+    -- 5. Reviews/Content (texts live in retail_reviews; these stay NULL for new rows, see section 10)
     detailed_review_content TEXT,
     summarized_review_content TEXT,       -- Amazon only
     top_mentions TEXT,                     -- BestBuy only
@@ -58,7 +58,33 @@ CREATE TABLE tv_retail_com (
 
     -- 8. Metadata (last column)
     calendar_week VARCHAR(20),
-    crawl_strdatetime TIMESTAMP
+    crawl_strdatetime TIMESTAMP,
+
+    -- 9. Typed values parsed once at ingestion (value_normalizer.py), raw strings stay above
+    final_sku_price_amount NUMERIC(12,2),
+    original_sku_price_amount NUMERIC(12,2),
+    savings_amount NUMERIC(12,2),
+    price_currency CHAR(3),
+    star_rating_value NUMERIC(3,2),
+
+    -- 10. Review references (review_store.py) - each review text is stored once in retail_reviews
+    review_product_key VARCHAR(200),
+    detailed_review_hashes TEXT[],
+    summarized_review_hash CHAR(40),
+    top_mentions_hash CHAR(40)
+);
+
+-- Review texts, one row per (retailer, product, review hash)
+CREATE TABLE retail_reviews (
+    id BIGSERIAL PRIMARY KEY,
+    retailer VARCHAR(20) NOT NULL,         -- tv_retail_com.account_name
+    product_key VARCHAR(200) NOT NULL,     -- ASIN / item id / SKU
+    review_hash CHAR(40) NOT NULL,
+    review_kind VARCHAR(20) NOT NULL,      -- review / summary / top_mentions
+    review_text TEXT NOT NULL,
+    first_batch_id TEXT,
+    first_seen_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    UNIQUE (retailer, product_key, review_hash)
 );
 
 -- Create indexes for common queries
@@ -67,5 +93,8 @@ CREATE INDEX idx_tv_retail_com_account ON tv_retail_com(account_name);
 CREATE INDEX idx_tv_retail_com_page_type ON tv_retail_com(page_type);
 CREATE INDEX idx_tv_retail_com_crawl_time ON tv_retail_com(crawl_strdatetime);
 CREATE INDEX idx_tv_retail_com_calendar_week ON tv_retail_com(calendar_week);
+CREATE INDEX idx_tv_retail_com_final_price_amount ON tv_retail_com(account_name, final_sku_price_amount);
 
 COMMENT ON TABLE tv_retail_com IS 'Unified table for TV retail data from Walmart, Amazon, and BestBuy';
+
+-- tv_retail_com_reviews view (texts joined back under the original column names): python review_store.py
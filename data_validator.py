@@ -6,72 +6,202 @@ Data Validation Module for BestBuy TV Crawlers
 1. NULL 값 검증 (필수 컬럼)
 2. 형식 검증 (price는 $, item은 패턴 확인)
 3. 이상치 검증 (price $0 또는 비정상 범위)
+4. batch 검증 (validate_batch): 끝난 batch의 컬럼 전체를 한 번에 - 컬럼 별 null 비율 / 통계 이상치 포함
+
+기록 방식:
+- 이슈는 메모리에 모아 두고 (크롤링 loop에서는 파일 / 콘솔 / DB I/O 없음)
+  VALIDATION_FLUSH_ISSUES 개가 쌓이거나 write_summary() / flush() / process 종료 시 한 번에 기록
+- <VALIDATION_PROBLEMS_DIR>/<session_start_time>.jsonl  (한 줄에 이슈 1개, kind = issue / field_stats / summary)
+- validation_issues / validation_field_stats 테이블 (DB에 쓸 수 없으면 JSONL만 남김)
+
+설정 (환경 변수 또는 config.py):
+    VALIDATION_PROBLEMS_DIR          JSONL 위치 (기본 ./problems)
+    VALIDATION_FLUSH_ISSUES=1000     이만큼 쌓이면 중간 flush
+    VALIDATION_NULL_RATE_THRESHOLD=0.2   validate_batch에서 컬럼 null 비율이 이보다 크면 HIGH_NULL_RATE
+    VALIDATION_VERBOSE=1             이슈마다 콘솔 WARNING 출력 (기본 off)
+
+사용법:
+    self.validator = DataValidator(session_start_time)
+    self.validator.validate_item(item, product_url, 'bby_tv_main1')              # 값 1개 (buffer만)
+    report = self.validator.validate_batch(records, 'bby_tv_dt1', batch_id)     # 끝난 batch 전체 (dict 목록 / DataFrame)
+    self.validator.write_summary()                                              # 종료 시 flush
 """
 
+import atexit
+import json
 import os
 import re
+import threading
 from datetime import datetime
 
+import pandas as pd
+
+from value_normalizer import parse_price
+
+try:
+    import config
+except ImportError:
+    config = None
+
+
+def _setting(name, default):
+    return os.environ.get(name, getattr(config, name, default) if config else default)
+
+
+def _as_float(value):
+    return float(value) if value is not None else None
+
+
+PROBLEMS_DIR = _setting('VALIDATION_PROBLEMS_DIR',
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'problems'))
+FLUSH_ISSUES = max(1, int(_setting('VALIDATION_FLUSH_ISSUES', 1000)))
+NULL_RATE_THRESHOLD = float(_setting('VALIDATION_NULL_RATE_THRESHOLD', 0.2))
+VERBOSE = str(_setting('VALIDATION_VERBOSE', '')).lower() in ('1', 'true', 'yes')
+
+# validate_batch 기본 컬럼 -> 검증 종류 (required면 NULL도 이슈)
+BATCH_FIELDS = {
+    'item': ('item', True),
+    'screen_size': ('screen_size', True),
+    'final_sku_price': ('price', True),
+    'savings': ('price', False),
+    'original_sku_price': ('price', False),
+    'count_of_reviews': ('count', False),
+    'star_rating': ('rating', False),
+}
+
+# 통계 이상치 (Tukey fence, Q1 - k*IQR ~ Q3 + k*IQR) - 이 수 이상 값이 있을 때만
+OUTLIER_KINDS = {'price'}
+OUTLIER_IQR_FACTOR = 3.0
+OUTLIER_MIN_VALUES = 8
+
+NULL_STRINGS = ('', 'none')
+
+CREATE_TABLES_SQL = """
+    CREATE TABLE IF NOT EXISTS validation_issues (
+        id BIGSERIAL PRIMARY KEY,
+        session_start VARCHAR(20),
+        crawler_name VARCHAR(50),
+        batch_id TEXT,
+        field_name VARCHAR(100),
+        issue_type VARCHAR(30),
+        value TEXT,
+        expected TEXT,
+        product_url TEXT,
+        logged_at TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS idx_validation_issues_crawler
+        ON validation_issues (crawler_name, logged_at);
+    CREATE TABLE IF NOT EXISTS validation_field_stats (
+        id BIGSERIAL PRIMARY KEY,
+        session_start VARCHAR(20),
+        crawler_name VARCHAR(50),
+        batch_id TEXT,
+        field_name VARCHAR(100),
+        row_count INTEGER,
+        null_count INTEGER,
+        null_rate NUMERIC(6,4),
+        min_value NUMERIC,
+        median_value NUMERIC,
+        max_value NUMERIC,
+        outlier_count INTEGER,
+        created_at TIMESTAMP
+    );
+"""
+
+ISSUE_COLUMNS = ['session_start', 'crawler_name', 'batch_id', 'field_name', 'issue_type',
+                 'value', 'expected', 'product_url', 'logged_at']
+STATS_COLUMNS = ['session_start', 'crawler_name', 'batch_id', 'field_name', 'row_count', 'null_count',
+                 'null_rate', 'min_value', 'median_value', 'max_value', 'outlier_count', 'created_at']
+
 
 class DataValidator:
-    """데이터 검증 및 문제 로깅 클래스"""
+    """데이터 검증 및 문제 로깅 클래스 (worker thread에서 같이 호출해도 안전)"""
 
-    def __init__(self, session_start_time):
+    def __init__(self, session_start_time, problems_dir=PROBLEMS_DIR, flush_issues=FLUSH_ISSUES):
         """
         Args:
             session_start_time: YYYYMMDDHHMM 형식 (예: 202511151200)
         """
         self.session_start_time = session_start_time
-        self.problems_dir = r"C:\samsung_dx_retail_com\problems"
-        self.log_file = None
+        self.problems_dir = problems_dir
+        self.log_file = os.path.join(self.problems_dir, f"{self.session_start_time}.jsonl")
+        self.flush_issues = flush_issues
         self.issue_count = 0
         self.issues_by_type = {}  # 타입별 이슈 카운트
+        self.issues = []          # 아직 기록하지 않은 이슈
+        self.field_stats = []     # 아직 기록하지 않은 validate_batch 컬럼 통계
+        self.db_enabled = True
+        self.lock = threading.RLock()
+        atexit.register(self.flush)
 
-    def _ensure_log_file(self):
-        """로그 디렉토리 및 파일 생성"""
-        if self.log_file is None:
-            os.makedirs(self.problems_dir, exist_ok=True)
-            self.log_file = os.path.join(self.problems_dir, f"{self.session_start_time}.txt")
-
-            # 파일 헤더 작성
-            with open(self.log_file, 'w', encoding='utf-8') as f:
-                f.write("="*80 + "\n")
-                f.write(f"DATA VALIDATION LOG\n")
-                f.write(f"Session Start: {self.session_start_time}\n")
-                f.write("="*80 + "\n\n")
-
-    def log_issue(self, crawler_name, product_url, field_name, value, issue_type, expected=None):
+    def log_issue(self, crawler_name, product_url, field_name, value, issue_type, expected=None, batch_id=None):
         """
-        문제를 파일 및 콘솔에 로깅
+        문제를 buffer에 추가 (파일 / DB는 flush 때 한 번에)
 
         Args:
             crawler_name: 크롤러 이름 (예: bby_tv_main1)
             product_url: 제품 URL
             field_name: 문제가 있는 컬럼명
             value: 문제가 있는 값
-            issue_type: NULL_VALUE, FORMAT_ISSUE, OUTLIER
+            issue_type: NULL_VALUE, FORMAT_ISSUE, OUTLIER, STAT_OUTLIER, HIGH_NULL_RATE
             expected: 기대되는 형식 (선택)
         """
-        self._ensure_log_file()
-
-        # 파일에 로깅
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            timestamp = datetime.now().strftime('%H:%M:%S')
-            f.write(f"[{timestamp}] {issue_type}\n")
-            f.write(f"  Crawler: {crawler_name}\n")
-            f.write(f"  Field: {field_name}\n")
-            f.write(f"  Value: {repr(value)}\n")
-            if expected:
-                f.write(f"  Expected: {expected}\n")
-            f.write(f"  URL: {product_url}\n")
-            f.write("\n")
-
-        # 카운트 증가
-        self.issue_count += 1
-        self.issues_by_type[issue_type] = self.issues_by_type.get(issue_type, 0) + 1
-
-        # 콘솔에도 WARNING 출력
-        print(f"  [WARNING] {issue_type}: {field_name} = {repr(value)}")
+        issue = {
+            'session_start': self.session_start_time,
+            'crawler_name': crawler_name,
+            'batch_id': batch_id,
+            'field_name': field_name,
+            'issue_type': issue_type,
+            'value': repr(value),
+            'expected': expected,
+            'product_url': product_url,
+            'logged_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        with self.lock:
+            self.issues.append(issue)
+            self.issue_count += 1
+            self.issues_by_type[issue_type] = self.issues_by_type.get(issue_type, 0) + 1
+            if len(self.issues) >= self.flush_issues:
+                self.flush()
+
+        if VERBOSE:
+            print(f"  [WARNING] {issue_type}: {field_name} = {repr(value)}")
+
+    def flush(self):
+        """buffer된 이슈 / 컬럼 통계를 JSONL + DB에 기록"""
+        with self.lock:
+            issues, self.issues = self.issues, []
+            field_stats, self.field_stats = self.field_stats, []
+            if not issues and not field_stats:
+                return 0
+
+            os.makedirs(self.problems_dir, exist_ok=True)
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                for kind, entries in (('issue', issues), ('field_stats', field_stats)):
+                    for entry in entries:
+                        f.write(json.dumps(dict(entry, kind=kind), ensure_ascii=False, default=str) + '\n')
+
+            if self.db_enabled:
+                self._write_db(issues, field_stats)
+            return len(issues)
+
+    def _write_db(self, issues, field_stats):
+        try:
+            from psycopg2.extras import execute_values
+            from db_manager import transaction
+
+            with transaction() as cursor:
+                cursor.execute(CREATE_TABLES_SQL)
+                for table, columns, entries in (('validation_issues', ISSUE_COLUMNS, issues),
+                                                ('validation_field_stats', STATS_COLUMNS, field_stats)):
+                    if entries:
+                        execute_values(cursor, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s",
+                                       [tuple(entry.get(column) for column in columns) for entry in entries],
+                                       page_size=1000)
+        except Exception as e:
+            # DB 없이 도는 환경 - 이후에는 JSONL만
+            self.db_enabled = False
+            print(f"[WARNING] Validation issues written to {self.log_file} only (DB: {e})")
 
     def validate_item(self, item, product_url, crawler_name):
         """
@@ -129,26 +259,24 @@ class DataValidator:
                           'Should start with $ (e.g., "$599.99")')
             return False
 
-        # 숫자 추출 및 범위 확인
-        try:
-            price_num = float(price_str.replace('$', '').replace(',', ''))
-
-            # 이상치 검증
-            if price_num <= 0:
-                self.log_issue(crawler_name, product_url, field_name, price, 'OUTLIER',
-                              'Price should be greater than $0')
-                return False
-
-            if price_num > 50000:  # TV 가격이 $50,000 넘으면 이상
-                self.log_issue(crawler_name, product_url, field_name, price, 'OUTLIER',
-                              'Price seems unusually high (> $50,000)')
-                return False
-
-        except ValueError:
+        # 숫자 추출 및 범위 확인 (tv_retail_com typed 컬럼과 같은 parser)
+        price_num, _ = parse_price(price_str)
+        if price_num is None:
             self.log_issue(crawler_name, product_url, field_name, price, 'FORMAT_ISSUE',
                           'Cannot parse price value')
             return False
 
+        # 이상치 검증
+        if price_num <= 0:
+            self.log_issue(crawler_name, product_url, field_name, price, 'OUTLIER',
+                          'Price should be greater than $0')
+            return False
+
+        if price_num > 50000:  # TV 가격이 $50,000 넘으면 이상
+            self.log_issue(crawler_name, product_url, field_name, price, 'OUTLIER',
+                          'Price seems unusually high (> $50,000)')
+            return False
+
         return True
 
     def validate_screen_size(self, screen_size, product_url, crawler_name):
@@ -240,6 +368,137 @@ class DataValidator:
 
         return True
 
+    def _check_column(self, kind, text, null):
+        """
+        컬럼 1개 검증 (validate_* 와 같은 규칙을 컬럼 단위로)
+
+        Returns:
+            (숫자 Series (NaN = null / 파싱 실패), {issue_type: (mask, expected)})
+        """
+        present = ~null
+        lower = text.str.lower()
+        if kind == 'item':
+            alpha = lower.str.replace('inches', '', regex=False).str.replace('inch', '', regex=False) \
+                .str.count(r'[a-z]')
+            bad = present & lower.str.contains('inch', regex=False) & (alpha < 2)
+            return pd.Series(float('nan'), index=text.index), {
+                'FORMAT_ISSUE': (bad, 'Should include model name or "TV" (e.g., "55 inch Smart TV")')}
+
+        if kind == 'screen_size':
+            values = pd.to_numeric(lower.str.extract(r'(\d+)', expand=False), errors='coerce')
+            no_inch = present & ~lower.str.contains('inch', regex=False)
+            no_number = present & ~no_inch & values.isna()
+            out_of_range = present & ~no_inch & ((values < 20) | (values > 100))
+            return values, {
+                'FORMAT_ISSUE': (no_inch | no_number, 'Should include "inch" and a size (e.g., "55 inch")'),
+                'OUTLIER': (out_of_range, 'Screen size seems unusual (expected 20-100 inch)')}
+
+        if kind == 'price':
+            values = pd.to_numeric(text.where(present).map(
+                lambda value: _as_float(parse_price(value)[0]) if isinstance(value, str) else None),
+                errors='coerce')
+            bad = present & (~text.str.startswith('$') | values.isna())
+            out_of_range = present & ~bad & ((values <= 0) | (values > 50000))
+            return values, {
+                'FORMAT_ISSUE': (bad, 'Should be a $ price (e.g., "$599.99")'),
+                'OUTLIER': (out_of_range, 'Price should be between $0 and $50,000')}
+
+        if kind == 'count':
+            values = pd.to_numeric(text.str.replace(',', '', regex=False), errors='coerce')
+            return values, {
+                'FORMAT_ISSUE': (present & values.isna(), 'Should be numeric'),
+                'OUTLIER': (present & (values < 0), 'Count should not be negative')}
+
+        # rating
+        values = pd.to_numeric(text, errors='coerce')
+        return values, {
+            'FORMAT_ISSUE': (present & values.isna(), 'Should be numeric (0-5)'),
+            'OUTLIER': (present & ((values < 0) | (values > 5)), 'Rating should be between 0 and 5')}
+
+    def validate_batch(self, records, crawler_name, batch_id=None, fields=None):
+        """
+        끝난 batch 전체 검증 (컬럼 단위)
+
+        Args:
+            records: dict 목록 또는 DataFrame (product_url 컬럼이 있으면 이슈에 같이 기록)
+            fields: {컬럼: (검증 종류, required)} - 기본 BATCH_FIELDS (records에 없는 컬럼은 건너뜀)
+
+        Returns:
+            {컬럼: {'rows', 'nulls', 'null_rate', 'min', 'median', 'max', 'issues': {issue_type: count}}}
+        """
+        df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+        report = {}
+        if df.empty:
+            return report
+        urls = df['product_url'] if 'product_url' in df else pd.Series(None, index=df.index, dtype=object)
+        created_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+        for field, (kind, required) in (fields or BATCH_FIELDS).items():
+            if field not in df:
+                continue
+            text = df[field].astype('string').str.strip()
+            null = (text.isna() | text.str.lower().isin(NULL_STRINGS)).fillna(True).astype(bool)
+            text = text.fillna('')
+            values, checks = self._check_column(kind, text, null)
+            if required:
+                checks['NULL_VALUE'] = (null, f'Should have {field} value')
+
+            valid = values[~null & values.notna()]
+            if kind in OUTLIER_KINDS and len(valid) >= OUTLIER_MIN_VALUES:
+                q1, q3 = valid.quantile(0.25), valid.quantile(0.75)
+                low, high = q1 - OUTLIER_IQR_FACTOR * (q3 - q1), q3 + OUTLIER_IQR_FACTOR * (q3 - q1)
+                checks['STAT_OUTLIER'] = ((values < low) | (values > high),
+                                          f'Outside batch range {low:,.2f} ~ {high:,.2f}')
+
+            issue_counts = {}
+            for issue_type, (mask, expected) in checks.items():
+                mask = mask.fillna(False).astype(bool)
+                for index in df.index[mask]:
+                    value = df.at[index, field]
+                    self.log_issue(crawler_name, urls[index], field, None if pd.isna(value) else value,
+                                   issue_type, expected, batch_id)
+                if mask.any():
+                    issue_counts[issue_type] = int(mask.sum())
+
+            null_rate = float(null.mean())
+            if null_rate > NULL_RATE_THRESHOLD:
+                self.log_issue(crawler_name, None, field, f"{null_rate:.1%}", 'HIGH_NULL_RATE',
+                               f'Null rate should be <= {NULL_RATE_THRESHOLD:.0%}', batch_id)
+                issue_counts['HIGH_NULL_RATE'] = 1
+
+            stats = {
+                'rows': len(df),
+                'nulls': int(null.sum()),
+                'null_rate': round(null_rate, 4),
+                'min': float(valid.min()) if len(valid) else None,
+                'median': float(valid.median()) if len(valid) else None,
+                'max': float(valid.max()) if len(valid) else None,
+                'issues': issue_counts,
+            }
+            report[field] = stats
+            with self.lock:
+                self.field_stats.append({
+                    'session_start': self.session_start_time, 'crawler_name': crawler_name,
+                    'batch_id': batch_id, 'field_name': field, 'row_count': stats['rows'],
+                    'null_count': stats['nulls'], 'null_rate': stats['null_rate'], 'min_value': stats['min'],
+                    'median_value': stats['median'], 'max_value': stats['max'],
+                    'outlier_count': issue_counts.get('OUTLIER', 0) + issue_counts.get('STAT_OUTLIER', 0),
+                    'created_at': created_at,
+                })
+        return report
+
+    @staticmethod
+    def format_batch_report(report):
+        """validate_batch 결과 -> 콘솔 출력용 줄 목록"""
+        lines = []
+        for field, stats in report.items():
+            value_range = (f"{stats['min']:,.2f} / {stats['median']:,.2f} / {stats['max']:,.2f}"
+                           if stats['min'] is not None else '-')
+            issues = ', '.join(f"{issue_type}: {count}" for issue_type, count in sorted(stats['issues'].items()))
+            lines.append(f"  {field:<20} null {stats['null_rate']:6.1%}  min/median/max {value_range}"
+                         f"{'  ' + issues if issues else ''}")
+        return lines
+
     def get_issue_count(self):
         """총 이슈 개수 반환"""
         return self.issue_count
@@ -252,13 +511,11 @@ class DataValidator:
         }
 
     def write_summary(self):
-        """로그 파일에 요약 정보 작성"""
-        if self.log_file and self.issue_count > 0:
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write("\n" + "="*80 + "\n")
-                f.write("SUMMARY\n")
-                f.write("="*80 + "\n")
-                f.write(f"Total Issues: {self.issue_count}\n")
-                for issue_type, count in sorted(self.issues_by_type.items()):
-                    f.write(f"  {issue_type}: {count}\n")
-                f.write("="*80 + "\n")
+        """남은 이슈 flush 후 로그 파일에 요약 정보 작성"""
+        with self.lock:
+            self.flush()
+            if self.issue_count > 0:
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'kind': 'summary', 'session_start': self.session_start_time,
+                                        'total': self.issue_count, 'by_type': self.issues_by_type},
+                                       ensure_ascii=False) + '\n')
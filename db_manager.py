@@ -0,0 +1,284 @@
+"""
+Shared Database Module for all TV crawlers
+config.DB_CONFIG 기반 connection pool / prepared statement / 자동 재연결 / transaction helper
+
+사용법:
+    from db_manager import get_connection, transaction
+
+    self.db_conn = get_connection()              # autocommit=True (기본)
+    cursor = self.db_conn.cursor()               # 끊어진 connection이면 자동 재연결
+
+    with self.db_conn.transaction() as cursor:   # commit / rollback / autocommit 복원 자동 처리
+        cursor.execute(...)
+
+    with transaction() as cursor:                # pool에서 connection을 빌려 한 transaction만 수행
+        cursor.execute(...)
+
+    self.db_conn.close()                         # 실제 close가 아니라 pool에 반납
+
+기능:
+1. Connection pool (ThreadedConnectionPool) - 스크립트 당 한 번만 TLS handshake, 여러 worker thread에서 공유
+2. Prepared statement 재사용 - execute_prepared()로 같은 쿼리를 서버에서 한 번만 parse/plan
+3. 자동 재연결 - connection이 끊어지면 다음 cursor()/execute() 호출 시 새 connection으로 교체
+4. Transaction context manager
+"""
+
+import re
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool
+
+# Import database configuration
+import config
+from config import DB_CONFIG
+
+# Pool 크기 (config.py에서 덮어쓸 수 있음)
+POOL_MIN_CONN = getattr(config, 'DB_POOL_MIN_CONN', 1)
+POOL_MAX_CONN = getattr(config, 'DB_POOL_MAX_CONN', 8)
+
+# 원격 DB에서 idle connection이 조용히 끊기지 않도록 TCP keepalive 기본값
+KEEPALIVE_OPTIONS = {
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 5,
+}
+
+# 끊어진 connection으로 판단하는 예외
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """프로세스 전역 connection pool 반환 (최초 호출 시 생성)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                connect_kwargs = dict(KEEPALIVE_OPTIONS)
+                connect_kwargs.update(DB_CONFIG)
+                _pool = pool.ThreadedConnectionPool(POOL_MIN_CONN, POOL_MAX_CONN, **connect_kwargs)
+    return _pool
+
+
+def close_pool():
+    """pool의 모든 connection 종료 (스크립트 종료 시)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def _to_server_placeholders(query):
+    """psycopg2 스타일 %s 를 PREPARE 용 $1, $2, ... 로 변환"""
+    counter = [0]
+
+    def replace(match):
+        counter[0] += 1
+        return f"${counter[0]}"
+
+    return re.sub(r'(?<!%)%s', replace, query).replace('%%', '%'), counter[0]
+
+
+class DBConnection:
+    """
+    Pool에서 빌린 psycopg2 connection wrapper
+
+    기존 크롤러 코드(self.db_conn.cursor(), .commit(), .rollback(), .autocommit = ...)를
+    그대로 사용할 수 있도록 psycopg2 connection과 같은 인터페이스를 제공한다.
+    """
+
+    def __init__(self, autocommit=True):
+        self._autocommit = autocommit
+        self._conn = None
+        self._prepared = {}  # name -> query (connection 교체 시 다시 PREPARE)
+        self._connect()
+
+    def _connect(self):
+        """pool에서 connection을 가져와 초기화"""
+        self._conn = get_pool().getconn()
+        self._conn.autocommit = self._autocommit
+        self._prepared_on_conn = set()
+
+    def _discard(self):
+        """끊어진 connection을 pool에서 제거"""
+        if self._conn is not None:
+            try:
+                get_pool().putconn(self._conn, close=True)
+            except Exception:
+                pass
+            self._conn = None
+
+    def reconnect(self):
+        """현재 connection을 버리고 새 connection으로 교체"""
+        self._discard()
+        self._connect()
+        print("[INFO] Database reconnected")
+
+    def _ensure_connection(self):
+        """connection이 닫혔거나 끊어졌으면 재연결"""
+        if self._conn is None or self._conn.closed:
+            self.reconnect()
+        return self._conn
+
+    @property
+    def connection(self):
+        """원본 psycopg2 connection (execute_values 등 직접 필요할 때)"""
+        return self._ensure_connection()
+
+    @property
+    def autocommit(self):
+        return self._autocommit
+
+    @autocommit.setter
+    def autocommit(self, value):
+        self._autocommit = value
+        self._ensure_connection().autocommit = value
+
+    @property
+    def closed(self):
+        return self._conn is None or self._conn.closed
+
+    def cursor(self, *args, **kwargs):
+        return self._ensure_connection().cursor(*args, **kwargs)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        if self._conn is not None and not self._conn.closed:
+            self._conn.rollback()
+
+    def execute(self, query, params=None, fetch=None, retries=1):
+        """
+        단일 쿼리 실행 (autocommit 모드 전용)
+        connection이 끊어지면 재연결 후 retries 횟수만큼 재시도
+
+        Args:
+            fetch: None / 'one' / 'all'
+        """
+        for attempt in range(retries + 1):
+            cursor = None
+            try:
+                cursor = self.cursor()
+                cursor.execute(query, params)
+                if fetch == 'one':
+                    return cursor.fetchone()
+                if fetch == 'all':
+                    return cursor.fetchall()
+                return cursor.rowcount
+            except CONNECTION_ERRORS:
+                if attempt >= retries or not self._autocommit:
+                    raise
+                print("[WARNING] Database connection lost, retrying...")
+                self.reconnect()
+            finally:
+                if cursor is not None:
+                    try:
+                        cursor.close()
+                    except Exception:
+                        pass
+
+    def prepare(self, name, query):
+        """
+        server-side prepared statement 등록
+        query는 psycopg2와 같은 %s placeholder 사용
+        """
+        self._prepared[name] = query
+
+    def execute_prepared(self, name, params, cursor=None, query=None):
+        """
+        prepared statement 실행 (connection 별로 최초 1회만 PREPARE)
+
+        Args:
+            name: prepare()에 등록한 이름
+            params: 파라미터 tuple
+            cursor: transaction() 안에서 사용할 cursor (없으면 새 cursor)
+            query: prepare()를 생략하고 바로 등록할 쿼리
+        """
+        if query is not None:
+            self._prepared[name] = query
+
+        own_cursor = cursor is None
+        if own_cursor:
+            cursor = self.cursor()
+
+        try:
+            if name not in self._prepared_on_conn:
+                server_query, _ = _to_server_placeholders(self._prepared[name])
+                cursor.execute(f"PREPARE {name} AS {server_query}")
+                self._prepared_on_conn.add(name)
+
+            placeholders = ', '.join(['%s'] * len(params))
+            cursor.execute(f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}", params)
+            return cursor
+        finally:
+            if own_cursor and cursor.description is None:
+                cursor.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        transaction context manager
+        블록 안에서 예외가 없으면 commit, 있으면 rollback 후 예외를 다시 발생시킨다.
+        블록이 끝나면 원래 autocommit 상태로 복원된다.
+        """
+        conn = self._ensure_connection()
+        previous_autocommit = self._autocommit
+        conn.autocommit = False
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except Exception as e:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            if isinstance(e, CONNECTION_ERRORS):
+                # 다음 호출에서 새 connection을 쓰도록 교체
+                self._discard()
+            raise
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            if self._conn is not None and not self._conn.closed:
+                self._conn.autocommit = previous_autocommit
+
+    def close(self):
+        """connection을 pool에 반납"""
+        if self._conn is not None:
+            try:
+                if not self._conn.closed:
+                    # 반납 전에 세션 상태 정리 (prepared statement 포함)
+                    self._conn.autocommit = True
+                    if self._prepared_on_conn:
+                        with self._conn.cursor() as cursor:
+                            cursor.execute("DEALLOCATE ALL")
+                get_pool().putconn(self._conn)
+            except Exception:
+                self._discard()
+            self._conn = None
+
+
+def get_connection(autocommit=True):
+    """pool에서 connection을 빌려 DBConnection으로 반환"""
+    return DBConnection(autocommit=autocommit)
+
+
+@contextmanager
+def transaction():
+    """pool connection 하나로 transaction 1회 수행 후 반납"""
+    conn = get_connection(autocommit=False)
+    try:
+        with conn.transaction() as cursor:
+            yield cursor
+    finally:
+        conn.close()
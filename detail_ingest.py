@@ -0,0 +1,397 @@
+"""
+Detail Record Ingestion
+detail 크롤러가 파싱한 record를 메모리에 모았다가 COPY FROM STDIN으로 한 번에 적재
+(product 하나마다 INSERT + commit 하던 것을 N개 record 당 transaction 1번으로)
+
+- record = {테이블: 값 tuple} (크롤러가 넘긴 컬럼 순서 그대로, Python 값 - str / int / None)
+  한 record의 테이블 row들은 같은 transaction으로 적재됨 (예: bby_tv_crawl + tv_retail_com)
+- flush: DETAIL_INGEST_FLUSH_ROWS 개 record마다 + 크롤러 종료 시 (flush() / close())
+- journal: add() 할 때마다 local spill 파일 (cache/ingest_spill/<name>.<pid>.<시각>.jsonl)에 먼저 기록
+  -> COPY 성공하면 삭제
+  -> DB에 연결할 수 없으면 record를 버리지 않고 다음 flush에서 다시 시도,
+     끝까지 안 되면 spill 파일이 남아서 다음 실행 (또는 --replay)에서 적재
+  -> process가 죽어도 이미 add()된 record는 spill 파일에 남아 있음 (queue에서 done 처리된 URL 포함)
+- COPY가 data 오류로 실패하면 record 단위 INSERT로 재시도 (SAVEPOINT), 문제 record만
+  <name>.rejected.jsonl 로 빼고 나머지는 적재
+- merge 테이블 ({'columns': [...], 'merge': True}): record 값이 row 목록이고, unique key가 이미 있는 row는 건너뜀
+  (임시 테이블로 COPY -> INSERT ... ON CONFLICT DO NOTHING, review처럼 한 번만 저장하는 data)
+
+설정 (환경 변수 또는 config.py):
+    DETAIL_INGEST_FLUSH_ROWS=25      몇 record마다 flush 할지
+    DETAIL_INGEST_SPILL_DIR          spill 파일 위치 (기본 ./cache/ingest_spill)
+
+사용법:
+    from detail_ingest import DetailIngestor
+
+    self.ingestor = DetailIngestor('bestbuy', {'bby_tv_crawl': BBY_TV_CRAWL_COLUMNS,
+                                               'tv_retail_com': TV_RETAIL_COLUMNS})
+    self.ingestor.add({'bby_tv_crawl': crawl_row, 'tv_retail_com': retail_row})   # save_to_db
+    self.ingestor.flush()    # batch 끝 (mark_batch_complete 전)
+    self.ingestor.close()    # finally - 남은 record flush, 실패하면 spill 파일로 남김
+
+Usage (CLI):
+    python detail_ingest.py            # 남아 있는 spill 파일 목록
+    python detail_ingest.py --replay   # 종료된 process의 spill 파일을 모두 적재
+"""
+
+import glob
+import io
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+from psycopg2 import pool
+
+from browser_sessions import pid_alive
+from db_manager import CONNECTION_ERRORS, transaction
+
+try:
+    import config
+except ImportError:
+    config = None
+
+
+def _setting(name, default):
+    return os.environ.get(name, getattr(config, name, default) if config else default)
+
+
+FLUSH_ROWS = max(1, int(_setting('DETAIL_INGEST_FLUSH_ROWS', 25)))
+SPILL_DIR = _setting('DETAIL_INGEST_SPILL_DIR',
+                     os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'ingest_spill'))
+
+# DB에 연결할 수 없는 경우 (pool 생성 / connection 고갈 포함) - record를 남겨두고 나중에 다시 시도
+UNREACHABLE_ERRORS = CONNECTION_ERRORS + (pool.PoolError,)
+
+
+def copy_value(value):
+    """Python value -> COPY text format field"""
+    if value is None:
+        return '\\N'
+    text = str(value)
+    return (text.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def copy_rows(cursor, table, columns, rows):
+    """rows를 COPY FROM STDIN으로 table에 적재"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+
+def table_spec(spec):
+    """columns 값 (컬럼 목록 또는 {'columns': [...], 'merge': True}) -> (컬럼 목록, merge 여부)"""
+    if isinstance(spec, dict):
+        return list(spec['columns']), bool(spec.get('merge'))
+    return list(spec), False
+
+
+def table_rows(record, table, merge):
+    """record의 테이블 row 목록 (merge 테이블은 값 자체가 row 목록)"""
+    values = record.get(table)
+    if values is None:
+        return []
+    return list(values) if merge else [values]
+
+
+def merge_rows(cursor, table, columns, rows):
+    """rows를 임시 테이블로 COPY 한 뒤 INSERT ... ON CONFLICT DO NOTHING (이미 있는 row는 그대로)"""
+    stage = f"{table.lower()}_ingest_stage"
+    column_list = ', '.join(columns)
+    cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DROP AS "
+                   f"SELECT {column_list} FROM {table} WITH NO DATA")
+    copy_rows(cursor, stage, columns, rows)
+    cursor.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {stage} ON CONFLICT DO NOTHING")
+    cursor.execute(f"TRUNCATE {stage}")
+
+
+def write_records(cursor, columns, records):
+    """record 목록을 테이블 별 COPY 1번씩으로 적재 (columns 순서 - merge 테이블을 먼저 두면 참조 data가 먼저 들어감)"""
+    for table, spec in columns.items():
+        table_columns, merge = table_spec(spec)
+        rows = [row for record in records for row in table_rows(record, table, merge)]
+        if not rows:
+            continue
+        if merge:
+            merge_rows(cursor, table, table_columns, rows)
+        else:
+            copy_rows(cursor, table, table_columns, rows)
+
+
+def insert_records_individually(cursor, columns, records):
+    """
+    COPY 실패 시: record 단위 INSERT (SAVEPOINT로 문제 record만 건너뜀)
+
+    Returns:
+        (inserted, rejected record 목록)
+    """
+    inserted = 0
+    rejected = []
+    for record in records:
+        cursor.execute("SAVEPOINT ingest_record")
+        try:
+            for table, spec in columns.items():
+                table_columns, merge = table_spec(spec)
+                for row in table_rows(record, table, merge):
+                    cursor.execute(f"""
+                        INSERT INTO {table} ({', '.join(table_columns)})
+                        VALUES ({', '.join(['%s'] * len(table_columns))})
+                        {'ON CONFLICT DO NOTHING' if merge else ''}
+                    """, row)
+            cursor.execute("RELEASE SAVEPOINT ingest_record")
+            inserted += 1
+        except UNREACHABLE_ERRORS:
+            raise
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT ingest_record")
+            rejected.append(record)
+            if len(rejected) <= 5:  # Show first 5 errors
+                print(f"  [ERROR] Record skipped: {e}")
+    return inserted, rejected
+
+
+def load_records(columns, records, label):
+    """
+    records 적재 (COPY -> 실패하면 record 단위 INSERT)
+    DB에 연결할 수 없으면 UNREACHABLE_ERRORS가 그대로 올라감
+
+    Returns:
+        (inserted, rejected record 목록)
+    """
+    try:
+        with transaction() as cursor:
+            write_records(cursor, columns, records)
+        return len(records), []
+    except UNREACHABLE_ERRORS:
+        raise
+    except Exception as e:
+        print(f"  [WARNING] COPY failed for {label} ({len(records)} records): {e}")
+        print("  [INFO] Retrying record by record...")
+
+    with transaction() as cursor:
+        return insert_records_individually(cursor, columns, records)
+
+
+def spill_path(name):
+    return os.path.join(SPILL_DIR, f"{name}.{os.getpid()}.{datetime.now():%Y%m%d%H%M%S%f}.jsonl")
+
+
+def spill_pid(path):
+    """<name>.<pid>.<시각>.jsonl -> pid"""
+    try:
+        return int(os.path.basename(path).split('.')[-3])
+    except (IndexError, ValueError):
+        return None
+
+
+def list_spills(name='*'):
+    """적재되지 않은 spill 파일 (rejected 제외)"""
+    return sorted(path for path in glob.glob(os.path.join(SPILL_DIR, f"{name}.*.jsonl"))
+                  if not path.endswith('.rejected.jsonl'))
+
+
+def read_spill(path):
+    """spill 파일 -> (columns, records). 마지막 줄이 쓰다 만 줄이면 무시"""
+    columns = None
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if 'columns' in entry:
+                columns = entry['columns']
+            elif 'record' in entry:
+                records.append(entry['record'])
+    return columns, records
+
+
+def write_rejected(name, records):
+    """적재할 수 없는 record는 <name>.rejected.jsonl 에 모아둠 (확인 / 수동 처리용)"""
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    with open(os.path.join(SPILL_DIR, f"{name}.rejected.jsonl"), 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps({'record': record}, ensure_ascii=False, default=str) + '\n')
+
+
+def replay_spill(path):
+    """
+    spill 파일 하나 적재 후 삭제
+
+    Returns:
+        적재된 record 수 (DB에 연결할 수 없으면 UNREACHABLE_ERRORS)
+    """
+    columns, records = read_spill(path)
+    if columns and records:
+        name = os.path.basename(path).split('.')[0]
+        inserted, rejected = load_records(columns, records, os.path.basename(path))
+        if rejected:
+            write_rejected(name, rejected)
+    else:
+        inserted = 0
+    os.remove(path)
+    return inserted
+
+
+def replay_orphan_spills(name='*'):
+    """종료된 process가 남긴 spill 파일 적재 (실행 중인 process의 journal은 건드리지 않음)"""
+    replayed = 0
+    for path in list_spills(name):
+        pid = spill_pid(path)
+        if pid == os.getpid() or pid_alive(pid):
+            continue
+        inserted = replay_spill(path)
+        print(f"[OK] Replayed spill file {os.path.basename(path)}: {inserted} records")
+        replayed += inserted
+    return replayed
+
+
+class DetailIngestor:
+    """detail record buffer + journal + COPY flush (worker-pool writer thread에서 호출해도 안전)"""
+
+    def __init__(self, name, columns, flush_rows=FLUSH_ROWS):
+        """
+        Args:
+            name: spill 파일 이름 prefix (retailer)
+            columns: {테이블: 컬럼 목록 또는 merge spec} - add()하는 값 tuple의 순서
+            flush_rows: 이 수만큼 record가 쌓이면 flush
+        """
+        self.name = name
+        self.columns = {table: dict(spec) if isinstance(spec, dict) else list(spec)
+                        for table, spec in columns.items()}
+        self.flush_rows = flush_rows
+        self.next_flush = flush_rows  # DB에 연결할 수 없으면 flush_rows 만큼 더 쌓인 뒤 다시 시도
+        self.records = []
+        self.journal_path = None
+        self.journal = None
+        self.written = 0
+        self.rejected = 0
+        self.lock = threading.RLock()
+        self.orphans_checked = False
+
+    @property
+    def pending(self):
+        return len(self.records)
+
+    def pending_rows(self, table):
+        """아직 flush되지 않은 table 값 tuple 목록 (add 순서) - DB에 없는 이번 실행 row를 먼저 찾을 때"""
+        with self.lock:
+            return [record[table] for record in self.records if table in record]
+
+    def _open_journal(self):
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        self.journal_path = spill_path(self.name)
+        self.journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._write_journal({'columns': self.columns})
+
+    def _write_journal(self, entry):
+        self.journal.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    def _close_journal(self, remove):
+        if self.journal is not None:
+            self.journal.close()
+            if remove:
+                os.remove(self.journal_path)
+        self.journal = None
+        self.journal_path = None
+
+    def add(self, record):
+        """
+        record 1개 buffer (journal에 먼저 기록). flush_rows가 차면 flush
+
+        Args:
+            record: {테이블: 값 tuple (merge 테이블은 tuple 목록)} (columns에 없는 테이블은 무시)
+        """
+        record = {table: list(values) for table, values in record.items()
+                  if table in self.columns and values is not None}
+        with self.lock:
+            if self.journal is None:
+                self._open_journal()
+            self._write_journal({'record': record})
+            self.records.append(record)
+            if len(self.records) >= self.next_flush:
+                self.flush()
+        return True
+
+    def flush(self):
+        """
+        buffer된 record를 COPY로 적재
+
+        Returns:
+            적재된 record 수 (DB에 연결할 수 없으면 0 - record는 buffer / spill 파일에 유지)
+        """
+        with self.lock:
+            try:
+                if not self.orphans_checked:
+                    # 이전 실행이 남긴 spill 파일 먼저
+                    replay_orphan_spills(self.name)
+                    self.orphans_checked = True
+
+                if not self.records:
+                    return 0
+
+                inserted, rejected = load_records(self.columns, self.records, self.name)
+            except UNREACHABLE_ERRORS as e:
+                print(f"[WARNING] Database unreachable - keeping {len(self.records)} records "
+                      f"in {self.journal_path or SPILL_DIR}: {str(e).strip()[:200]}")
+                self.next_flush = len(self.records) + self.flush_rows
+                return 0
+
+            if rejected:
+                write_rejected(self.name, rejected)
+                self.rejected += len(rejected)
+            self._close_journal(remove=True)
+            self.records = []
+            self.next_flush = self.flush_rows
+            self.written += inserted
+            print(f"[DB] Flushed {inserted} records to {', '.join(self.columns)}"
+                  + (f" ({len(rejected)} rejected)" if rejected else ""))
+            return inserted
+
+    def close(self):
+        """남은 record flush. 실패하면 spill 파일을 남기고 다음 실행에서 적재"""
+        with self.lock:
+            self.flush()
+            if self.records:
+                print(f"[WARNING] {len(self.records)} records not written - saved in {self.journal_path}")
+                print("          They are loaded by the next run or 'python detail_ingest.py --replay'")
+                self._close_journal(remove=False)
+                self.records = []
+            else:
+                self._close_journal(remove=True)
+
+    def summary(self):
+        parts = f"{self.written} written"
+        if self.rejected:
+            parts += f", {self.rejected} rejected"
+        if self.records:
+            parts += f", {len(self.records)} pending"
+        return f"[INGEST] {self.name} - {parts}"
+
+
+def print_spills():
+    paths = list_spills()
+    if not paths:
+        print("[OK] No spill files")
+        return
+    for path in paths:
+        pid = spill_pid(path)
+        _, records = read_spill(path)
+        state = 'running' if pid_alive(pid) else 'orphan'
+        print(f"{os.path.basename(path):<70} {len(records):>6} records  ({state})")
+
+
+if __name__ == "__main__":
+    if '--replay' in sys.argv[1:]:
+        total = replay_orphan_spills()
+        print(f"[OK] {total} records loaded from spill files")
+    else:
+        print_spills()
@@ -0,0 +1,265 @@
+"""
+Detail Crawl Work Queue
+main / BSR / promotion 테이블의 최신 batch URL을 detail_crawl_queue 테이블에 (queue batch, url) 당 1 row로 넣고,
+detail 크롤러 (worker-pool worker 포함)가 SELECT ... FOR UPDATE SKIP LOCKED로 하나씩 가져가서 처리
+
+- fill: 크롤러가 넘긴 INSERT ... SELECT 쿼리 1번으로 채움 (source 병합 / 중복 제거 / 순서 부여는 SQL에서)
+- queue batch: source 테이블의 최신 batch_id 조합 ('main:..|bsr:..|promotion:..')
+  source batch가 그대로면 같은 queue batch -> 중간에 죽은 실행을 다시 돌리면 남은 URL부터 이어서 처리
+- claim: pending이거나 lease가 만료된 (crash 등) row 중 seq 순서로 하나 lease
+- finish: 성공 -> done, 실패 -> 다시 pending (DETAIL_QUEUE_MAX_ATTEMPTS 회 실패하면 failed)
+  lease가 만료된 row가 이미 DETAIL_QUEUE_MAX_ATTEMPTS 회 시도됐으면 claim 때 failed로 정리
+- 여러 worker / 여러 process가 같은 queue batch를 나눠서 처리 가능 (SKIP LOCKED)
+
+queue row -> url_data: source_data (JSONB, 크롤러 별 url_data 모양) + queue_id / seq / page_type / product_url / rank
+
+설정 (환경 변수):
+    DETAIL_QUEUE_LEASE_SECONDS=600   lease 만료 시간 (이 시간 안에 finish 안 되면 다른 worker가 다시 가져감)
+    DETAIL_QUEUE_MAX_ATTEMPTS=3
+
+사용법:
+    from detail_queue import DetailQueue
+
+    main_batch_id, bsr_batch_id = get_latest_batches(cursor, ['bby_tv_main1', 'bby_tv_bsr1'])
+    self.work_queue = DetailQueue('bestbuy', DetailQueue.batch_key(main=main_batch_id, bsr=bsr_batch_id))
+    self.work_queue.fill(QUEUE_FILL_SQL, {'main_batch': main_batch_id, 'bsr_batch': bsr_batch_id})
+
+    while True:
+        url_data = self.work_queue.claim()
+        if url_data is None:
+            break
+        self.work_queue.finish(url_data, self.scrape_detail_page(url_data))
+
+Usage (CLI):
+    python detail_queue.py                     # retailer / queue batch 별 status 집계
+    python detail_queue.py --requeue bestbuy   # 해당 retailer의 leased / failed row를 pending으로 되돌림
+"""
+
+import os
+import socket
+import sys
+
+from db_manager import get_connection, transaction
+
+LEASE_SECONDS = int(os.environ.get('DETAIL_QUEUE_LEASE_SECONDS', 600))
+MAX_ATTEMPTS = int(os.environ.get('DETAIL_QUEUE_MAX_ATTEMPTS', 3))
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS detail_crawl_queue (
+        id BIGSERIAL PRIMARY KEY,
+        retailer VARCHAR(20) NOT NULL,
+        queue_batch TEXT NOT NULL,
+        product_url TEXT NOT NULL,
+        page_type VARCHAR(20),
+        seq INTEGER NOT NULL,
+        main_rank INTEGER,
+        bsr_rank INTEGER,
+        promotion_rank INTEGER,
+        source_data JSONB,
+        status VARCHAR(10) NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        lease_owner VARCHAR(100),
+        leased_at TIMESTAMP,
+        finished_at TIMESTAMP,
+        last_error TEXT,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        UNIQUE (retailer, queue_batch, product_url)
+    );
+    CREATE INDEX IF NOT EXISTS idx_detail_crawl_queue_claim
+        ON detail_crawl_queue (retailer, queue_batch, status, attempts, seq);
+"""
+
+CLAIM_SQL = """
+    UPDATE detail_crawl_queue
+    SET status = 'leased', lease_owner = %(owner)s, leased_at = NOW(), attempts = attempts + 1
+    WHERE id = (
+        SELECT id
+        FROM detail_crawl_queue
+        WHERE retailer = %(retailer)s
+          AND queue_batch = %(queue_batch)s
+          AND (status = 'pending'
+               OR (status = 'leased' AND leased_at < NOW() - %(lease_seconds)s * INTERVAL '1 second'))
+          AND attempts < %(max_attempts)s
+        ORDER BY attempts, seq
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, seq, product_url, page_type, main_rank, bsr_rank, promotion_rank, source_data
+"""
+
+# lease가 만료됐는데 더 이상 재시도할 수 없는 row (마지막 시도 중 crash) -> failed (claim 전에 같은 transaction에서)
+EXPIRE_SQL = """
+    UPDATE detail_crawl_queue
+    SET status = 'failed', lease_owner = NULL, finished_at = NOW(),
+        last_error = COALESCE(last_error, 'lease expired after final attempt')
+    WHERE id IN (
+        SELECT id
+        FROM detail_crawl_queue
+        WHERE retailer = %(retailer)s
+          AND queue_batch = %(queue_batch)s
+          AND status = 'leased'
+          AND leased_at < NOW() - %(lease_seconds)s * INTERVAL '1 second'
+          AND attempts >= %(max_attempts)s
+        FOR UPDATE SKIP LOCKED
+    )
+"""
+
+FINISH_SQL = """
+    UPDATE detail_crawl_queue
+    SET status = CASE WHEN %(ok)s THEN 'done'
+                      WHEN attempts >= %(max_attempts)s THEN 'failed'
+                      ELSE 'pending' END,
+        lease_owner = NULL,
+        finished_at = NOW(),
+        last_error = %(error)s
+    WHERE id = %(id)s
+"""
+
+ITEMS_SQL = """
+    SELECT id, seq, product_url, page_type, main_rank, bsr_rank, promotion_rank, source_data
+    FROM detail_crawl_queue
+    WHERE retailer = %s AND queue_batch = %s AND status <> 'done'
+    ORDER BY seq
+"""
+
+COUNTS_SQL = """
+    SELECT status, COUNT(*)
+    FROM detail_crawl_queue
+    WHERE retailer = %s AND queue_batch = %s
+    GROUP BY status
+"""
+
+
+def default_owner(worker_id=None):
+    """lease owner 이름 (host:pid[:W<n>])"""
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    return f"{owner}:W{worker_id}" if worker_id else owner
+
+
+def row_to_url_data(row):
+    """queue row -> 크롤러의 url_data dict"""
+    queue_id, seq, product_url, page_type, main_rank, bsr_rank, promotion_rank, source_data = row
+    url_data = dict(source_data or {})
+    url_data.update({
+        'queue_id': queue_id,
+        'product_url': product_url,
+        'page_type': page_type,
+        'main_rank': main_rank,
+        'bsr_rank': bsr_rank,
+        'promotion_rank': promotion_rank,
+    })
+    url_data.setdefault('order', seq)
+    return url_data
+
+
+class DetailQueue:
+    """detail_crawl_queue의 queue batch 하나"""
+
+    def __init__(self, retailer, queue_batch, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.retailer = retailer
+        self.queue_batch = queue_batch
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    @staticmethod
+    def batch_key(**source_batches):
+        """source 별 최신 batch_id -> queue batch 이름 (없는 source는 제외)"""
+        return '|'.join(f"{source}:{batch_id}" for source, batch_id in source_batches.items() if batch_id)
+
+    def fill(self, fill_sql, params=None):
+        """
+        INSERT ... SELECT 쿼리로 queue 채우기 (이미 있는 URL은 ON CONFLICT DO NOTHING)
+
+        fill_sql은 %(retailer)s / %(queue_batch)s 와 params의 source batch_id를 사용한다.
+
+        Returns:
+            새로 추가된 row 수 (이어서 처리하는 경우 0)
+        """
+        query_params = {'retailer': self.retailer, 'queue_batch': self.queue_batch}
+        query_params.update(params or {})
+        with transaction() as cursor:
+            cursor.execute(CREATE_TABLE_SQL)
+            cursor.execute(fill_sql, query_params)
+            inserted = cursor.rowcount
+        return inserted
+
+    def claim(self, owner=None):
+        """다음 URL lease (없으면 None)"""
+        params = {
+            'owner': owner or default_owner(), 'retailer': self.retailer, 'queue_batch': self.queue_batch,
+            'lease_seconds': self.lease_seconds, 'max_attempts': self.max_attempts,
+        }
+        with transaction() as cursor:
+            cursor.execute(EXPIRE_SQL, params)
+            if cursor.rowcount:
+                print(f"[WARNING] detail queue: {cursor.rowcount} expired leases out of attempts -> failed")
+            cursor.execute(CLAIM_SQL, params)
+            row = cursor.fetchone()
+        return row_to_url_data(row) if row else None
+
+    def finish(self, url_data, ok, error=None):
+        """처리 결과 기록 (성공 -> done, 실패 -> pending 또는 failed)"""
+        queue_id = url_data.get('queue_id') if url_data else None
+        if queue_id is None:
+            return
+        with transaction() as cursor:
+            cursor.execute(FINISH_SQL, {'ok': bool(ok), 'max_attempts': self.max_attempts,
+                                        'error': str(error)[:500] if error else None, 'id': queue_id})
+
+    def items(self):
+        """아직 done이 아닌 URL 목록 (seq 순서, snapshot manifest 용)"""
+        conn = get_connection(autocommit=True)
+        try:
+            return [row_to_url_data(row)
+                    for row in conn.execute(ITEMS_SQL, (self.retailer, self.queue_batch), fetch='all')]
+        finally:
+            conn.close()
+
+    def counts(self):
+        """{status: count}"""
+        conn = get_connection(autocommit=True)
+        try:
+            return dict(conn.execute(COUNTS_SQL, (self.retailer, self.queue_batch), fetch='all'))
+        finally:
+            conn.close()
+
+    def summary(self):
+        counts = self.counts()
+        parts = ', '.join(f"{status}: {counts[status]}" for status in ('done', 'pending', 'leased', 'failed')
+                          if counts.get(status))
+        return f"[QUEUE] {self.retailer} {self.queue_batch} - {parts or 'empty'}"
+
+
+def print_status():
+    conn = get_connection(autocommit=True)
+    try:
+        rows = conn.execute("""
+            SELECT retailer, queue_batch, status, COUNT(*), MAX(created_at)
+            FROM detail_crawl_queue
+            GROUP BY retailer, queue_batch, status
+            ORDER BY MAX(created_at) DESC, retailer, status
+            LIMIT 60
+        """, fetch='all')
+    finally:
+        conn.close()
+    for retailer, queue_batch, status, count, created_at in rows:
+        print(f"{retailer:<10} {queue_batch:<60} {status:<8} {count:>6}  {created_at:%Y-%m-%d %H:%M}")
+
+
+def requeue(retailer):
+    """leased / failed row를 pending으로 (attempts 초기화)"""
+    with transaction() as cursor:
+        cursor.execute("""
+            UPDATE detail_crawl_queue
+            SET status = 'pending', attempts = 0, lease_owner = NULL
+            WHERE retailer = %s AND status IN ('leased', 'failed')
+        """, (retailer,))
+        print(f"[OK] Requeued {cursor.rowcount} {retailer} URLs")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if '--requeue' in args and args.index('--requeue') + 1 < len(args):
+        requeue(args[args.index('--requeue') + 1])
+    else:
+        print_status()
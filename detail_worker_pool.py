@@ -0,0 +1,203 @@
+"""
+Detail Page Worker Pool
+N개의 독립 browser session이 하나의 URL 목록을 나눠서 병렬 crawling
+
+구조:
+- worker: 메인 크롤러의 얕은 복사본 (xpaths, batch_id, validator 등 공유)
+          각자 driver / Chrome profile을 따로 가짐 (page 간 딜레이는 아래처럼 retailer 단위)
+- writer: 단일 thread. worker의 save 메서드(save_to_db 등)는 모두 writer thread에서
+          메인 크롤러 인스턴스로 실행되므로 DB connection은 하나만 사용된다.
+- order / page_type: URL 목록에 미리 들어있는 값을 그대로 사용 (처리 순서와 무관)
+- page 간 딜레이: 크롤러에 self.pacer (pacing.Pacer)가 있으면 모든 worker가 같은 retailer pacer를
+          공유해서 사용하고 (같은 IP에서 나가는 요청이므로 adaptive 딜레이 / block backoff도 retailer 단위),
+          없으면 worker 별로 delay_range 안의 random 딜레이
+- URL 목록 대신 detail_queue.DetailQueue를 넘기면 worker가 DB queue에서 직접 lease
+          (SKIP LOCKED - 다른 process의 worker와도 나눠서 처리, 처리 결과는 queue에 기록)
+
+사용법:
+    from detail_worker_pool import get_worker_count, run_detail_workers
+
+    num_workers = get_worker_count()       # 환경 변수 DETAIL_WORKERS (기본 1)
+    if num_workers > 1:
+        success_count = run_detail_workers(self, urls, num_workers, delay_range=(3, 5))
+        success_count = run_detail_workers(self, self.work_queue, num_workers)   # DB work queue
+
+크롤러 쪽 요구사항:
+- setup_driver()에서 self.profile_dir가 있으면 해당 Chrome profile 사용
+- scrape_detail_page(url_data)가 성공 여부(True/False)를 반환
+"""
+
+import copy
+import os
+import queue
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# worker 별 Chrome profile 저장 위치
+PROFILE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chrome_profiles')
+
+# worker 들이 동시에 Chrome을 띄우지 않도록 시작 간격 (sec)
+STARTUP_STAGGER = 5
+
+
+def get_worker_count(default=1):
+    """환경 변수 DETAIL_WORKERS에서 worker 수 읽기"""
+    try:
+        return max(1, int(os.environ.get('DETAIL_WORKERS', default)))
+    except ValueError:
+        return default
+
+
+class _ListSource:
+    """메모리 URL 목록 (DetailQueue와 같은 claim / finish 인터페이스)"""
+
+    def __init__(self, url_list):
+        self.queue = queue.Queue()
+        for url_data in url_list:
+            self.queue.put(url_data)
+
+    def claim(self, owner=None):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def finish(self, url_data, ok, error=None):
+        self.queue.task_done()
+
+    def remaining(self):
+        return self.queue.qsize()
+
+
+def _make_worker(crawler, worker_id, writer, writer_methods, profile_name):
+    """메인 크롤러를 복사해 worker 생성 (driver / DB는 공유하지 않음)"""
+    worker = copy.copy(crawler)
+    worker.driver = None
+    worker.wait = None
+    worker.db_conn = None
+    worker.worker_id = worker_id
+    worker.profile_dir = os.path.join(PROFILE_ROOT, f"{profile_name}_{worker_id}")
+    if hasattr(crawler, 'total_collected'):
+        worker.total_collected = 0
+
+    # save 계열 메서드는 writer thread에서 메인 크롤러로 실행하고 결과를 기다린다
+    for method_name in writer_methods:
+        method = getattr(crawler, method_name)
+
+        def routed(*args, _method=method, **kwargs):
+            return writer.submit(_method, *args, **kwargs).result()
+
+        setattr(worker, method_name, routed)
+
+    return worker
+
+
+def _worker_loop(worker, source, delay_range, results, lock):
+    """URL queue가 빌 때까지 detail page 처리"""
+    worker_id = worker.worker_id
+    owner = f"{socket.gethostname()}:{os.getpid()}:W{worker_id}"
+    time.sleep((worker_id - 1) * STARTUP_STAGGER)
+
+    try:
+        os.makedirs(worker.profile_dir, exist_ok=True)
+        if worker.setup_driver() is False:
+            print(f"[ERROR] [W{worker_id}] Driver setup failed - worker stopped")
+            return
+    except Exception as e:
+        print(f"[ERROR] [W{worker_id}] Driver setup failed - worker stopped: {e}")
+        return
+
+    processed = 0
+    success = 0
+    try:
+        while True:
+            url_data = source.claim(owner)
+            if url_data is None:
+                break
+
+            processed += 1
+            ok, error = False, None
+            try:
+                ok = bool(worker.scrape_detail_page(url_data))
+                if ok:
+                    success += 1
+            except Exception as e:
+                error = e
+                print(f"[ERROR] [W{worker_id}] Unexpected error: {e}")
+            finally:
+                try:
+                    source.finish(url_data, ok, error)
+                except Exception as e:
+                    print(f"[WARNING] [W{worker_id}] Could not record result: {e}")
+
+            # page 간 딜레이 (pacer가 있으면 worker 공유 adaptive 딜레이, 없으면 worker 별 random)
+            pacer = getattr(worker, 'pacer', None)
+            if pacer is not None:
+                pacer.wait()
+            else:
+                time.sleep(random.uniform(*delay_range))
+
+    finally:
+        if worker.driver:
+            try:
+                worker.driver.quit()
+            except Exception:
+                pass
+        with lock:
+            results[worker_id] = (processed, success, getattr(worker, 'total_collected', 0))
+        print(f"[INFO] [W{worker_id}] finished - processed: {processed}, successful: {success}")
+
+
+def run_detail_workers(crawler, url_list, num_workers, delay_range=(2, 4),
+                       writer_methods=('save_to_db',), profile_name='detail'):
+    """
+    URL 목록을 num_workers 개의 browser session으로 병렬 처리
+
+    Args:
+        crawler: 메인 크롤러 (DB connection / xpaths 준비 완료 상태)
+        url_list: load된 URL 목록 (order / page_type 포함) 또는 detail_queue.DetailQueue
+        num_workers: browser session 수
+        delay_range: worker 별 page 간 딜레이 (sec) - 크롤러에 pacer가 없을 때만 사용
+        writer_methods: writer thread로 보낼 메서드 이름
+        profile_name: Chrome profile 디렉토리 이름 prefix
+
+    Returns:
+        successful count
+    """
+    if hasattr(url_list, 'claim'):
+        source = url_list
+        total = sum(url_list.counts().get(status, 0) for status in ('pending', 'leased'))
+    else:
+        source = _ListSource(url_list)
+        total = len(url_list)
+
+    num_workers = max(1, min(num_workers, total))
+    print(f"[INFO] Starting {num_workers} browser workers for {total} URLs")
+
+    results = {}
+    lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='writer') as writer:
+        threads = []
+        for worker_id in range(1, num_workers + 1):
+            worker = _make_worker(crawler, worker_id, writer, writer_methods, profile_name)
+            thread = threading.Thread(target=_worker_loop, name=f"worker-{worker_id}",
+                                      args=(worker, source, delay_range, results, lock))
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+    remaining = source.remaining() if isinstance(source, _ListSource) else source.counts().get('pending', 0)
+    if remaining:
+        print(f"[WARNING] {remaining} URLs were not processed (all workers stopped)")
+
+    success_count = sum(success for _, success, _ in results.values())
+    if hasattr(crawler, 'total_collected'):
+        crawler.total_collected += sum(collected for _, _, collected in results.values())
+
+    return success_count
@@ -0,0 +1,106 @@
+"""
+Partial DOM Capture
+driver.page_source (수 MB) 전체를 WebDriver로 받아 다시 파싱하는 대신,
+browser 안에서 XPath로 필요한 container만 찾아 outerHTML만 가져온다 (script 실행 1회).
+
+- 여러 XPath를 한 번에 요청 -> XPath 별 fragment 목록
+- 같은 XPath 결과 안에서 이미 담은 element의 하위 element는 건너뜀 (중첩 중복 방지)
+  결과는 문서 순서를 유지하므로 preceding:: / following:: 같은 순서 기반 XPath도 그대로 동작
+- 가져온 fragment들은 capture document 하나로 묶어서
+  RecordingDriver면 snapshot으로 저장, ReplayDriver (--reparse)면 저장된 document를 그대로 읽음
+  (예전 snapshot처럼 전체 page source가 저장돼 있으면 같은 XPath를 전체 document에 적용)
+
+사용법:
+    from dom_capture import capture, capture_tree
+
+    titles, tables = capture(self.driver, [TITLE_XPATH, TABLE_XPATH])   # XPath 별 element 목록
+    tree = capture_tree(self.driver, ['//section | //ul[@class="c-carousel-list"]'])
+    document = capture_html(self.driver, [base_xpath], record=False)     # HTML 문자열 (PageFetcher 용)
+"""
+
+from lxml import html
+
+from page_waits import is_replay
+from snapshot_store import RecordingDriver
+
+CAPTURE_SCRIPT = """
+var xpaths = arguments[0], results = [];
+for (var i = 0; i < xpaths.length; i++) {
+    var found = document.evaluate(xpaths[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    var fragments = [], last = null;
+    for (var j = 0; j < found.snapshotLength; j++) {
+        var node = found.snapshotItem(j);
+        if (node.nodeType !== 1) continue;
+        if (last !== null && last.contains(node)) continue;
+        last = node;
+        fragments.push(node.outerHTML);
+    }
+    results.push(fragments);
+}
+return results;
+"""
+
+CAPTURE_GROUP_XPATH = '/html/body/div[@data-capture]'
+
+
+def build_document(results):
+    """XPath 별 fragment 목록 -> capture document (<div data-capture="i"> 로 구분)"""
+    parts = ['<html><body>']
+    for idx, fragments in enumerate(results):
+        parts.append(f'<div data-capture="{idx}">')
+        parts.extend(fragments or [])
+        parts.append('</div>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def capture_html(driver, xpaths, record=True):
+    """
+    XPath 별 outerHTML을 가져와 capture document 문자열로 반환
+
+    Args:
+        driver: Selenium driver (RecordingDriver / ReplayDriver 포함)
+        xpaths: 가져올 container XPath 목록
+        record: RecordingDriver면 snapshot으로 저장 (PageFetcher처럼 호출하는 쪽에서 저장하면 False)
+    """
+    if is_replay(driver):
+        return driver.page_source
+
+    results = driver.execute_script(CAPTURE_SCRIPT, list(xpaths)) or []
+    document = build_document(results)
+    if record and isinstance(driver, RecordingDriver):
+        driver.record(document, capture=list(xpaths))
+    return document
+
+
+def parse_document(document, xpaths):
+    """capture document -> XPath 별 element 목록 (전체 page source면 XPath를 직접 적용)"""
+    root = html.fromstring(document)
+    groups = root.xpath(CAPTURE_GROUP_XPATH)
+    if not groups:
+        return root, [root.xpath(xpath) for xpath in xpaths]
+
+    by_index = {group.get('data-capture'): group for group in groups}
+    elements = []
+    for idx in range(len(xpaths)):
+        group = by_index.get(str(idx))
+        elements.append([child for child in group if isinstance(child.tag, str)] if group is not None else [])
+    return root, elements
+
+
+def capture(driver, xpaths, record=True):
+    """XPath 별 element 목록 (lxml)"""
+    _, elements = parse_document(capture_html(driver, xpaths, record), xpaths)
+    return elements
+
+
+def capture_tree(driver, xpaths, record=True):
+    """capture document의 lxml root (문서 순서 기반 XPath를 그대로 쓰는 경우)"""
+    root, _ = parse_document(capture_html(driver, xpaths, record), xpaths)
+    return root
+
+
+def captured_count(document):
+    """capture document에 담긴 fragment 수 (전체 page source면 0)"""
+    root = html.fromstring(document)
+    return sum(len([c for c in group if isinstance(c.tag, str)]) for group in root.xpath(CAPTURE_GROUP_XPATH))
@@ -27,6 +27,7 @@ logger = logging.getLogger(__name__)
 
 # Import database configuration
 from config import DB_CONFIG
+from price_parsing import parse_price, parse_prices
 
 # 파일서버 설정
 FILE_SERVER_CONFIG = {
@@ -646,77 +647,11 @@ class AmazonScraper:
         return None
     
     def parse_price_by_country(self, price_text, country_code):
-        """국가별 가격 파싱 - 강화된 검증 추가"""
-        try:
-            price_text = price_text.strip()
-            logger.debug(f"파싱할 가격 텍스트: '{price_text}'")
-            
-            # 가격이 아닌 텍스트 필터링 (165 문제 방지)
-            invalid_patterns = [
-                r'^[a-zA-Z\s]+$',  # 알파벳만 있는 경우
-                r'^\d+\s*[a-zA-Z]',  # 숫자 + 문자 조합
-                r'^[^€$£¥₹]\d+$',   # 통화 기호 없는 순수 숫자
-            ]
-            
-            for pattern in invalid_patterns:
-                if re.search(pattern, price_text):
-                    logger.debug(f"무효한 가격 패턴 감지: {pattern}")
-                    return None
-            
-            if country_code in ['fr', 'it', 'es', 'de']:
-                cleaned = re.sub(r'[€\s]', '', price_text)
-                logger.debug(f"통화 제거 후: '{cleaned}'")
-                
-                if country_code == 'es':
-                    if ',' in cleaned and '.' not in cleaned:
-                        cleaned = cleaned.replace(',', '.')
-                        logger.debug(f"스페인 쉼표→점 변환: '{cleaned}'")
-                    elif ',' in cleaned and '.' in cleaned:
-                        parts = cleaned.rsplit(',', 1)
-                        if len(parts) == 2 and len(parts[1]) <= 2:
-                            integer_part = parts[0].replace('.', '')
-                            decimal_part = parts[1]
-                            cleaned = f"{integer_part}.{decimal_part}"
-                            logger.debug(f"스페인 복합형식 변환: '{cleaned}'")
-                else:
-                    if ',' in cleaned:
-                        parts = cleaned.split(',')
-                        if len(parts) == 2 and len(parts[1]) <= 2 and parts[1].isdigit():
-                            integer_part = parts[0].replace('.', '')
-                            decimal_part = parts[1]
-                            cleaned = f"{integer_part}.{decimal_part}"
-                
-                if re.match(r'^\d+(\.\d{1,2})?$', cleaned):
-                    # 최소 가격 검증 (10유로 이상, 10000유로 미만)
-                    try:
-                        price_value = float(cleaned)
-                        if 10 <= price_value <= 10000:  
-                            return cleaned
-                        else:
-                            logger.debug(f"가격 범위 벗어남: {price_value}")
-                            return None
-                    except:
-                        return None
-                    
-            elif country_code == 'jp':
-                cleaned = re.sub(r'[¥￥\s]', '', price_text)
-                if re.match(r'^\d{1,3}(,\d{3})*$', cleaned) or re.match(r'^\d+$', cleaned):
-                    return cleaned
-                    
-            elif country_code == 'in':
-                cleaned = re.sub(r'[₹\s]', '', price_text)
-                if re.match(r'^\d{1,3}(,\d{2,3})*(\.\d{1,2})?$', cleaned) or re.match(r'^\d+(\.\d{1,2})?$', cleaned):
-                    return cleaned
-                    
-            else:
-                cleaned = re.sub(r'[$£\s]', '', price_text)
-                if re.match(r'^\d{1,3}(,\d{3})*(\.\d{1,2})?$', cleaned) or re.match(r'^\d+(\.\d{1,2})?$', cleaned):
-                    return cleaned
-                    
-        except Exception as e:
-            logger.debug(f"가격 파싱 오류: {price_text} - {e}")
-            
-        return None
+        """국가별 가격 파싱 - price_parsing 공용 규칙 (검증 / 범위 포함)"""
+        price = parse_price(price_text, country_code)
+        if price is None:
+            logger.debug(f"무효한 가격 텍스트: '{price_text}'")
+        return price
     
     def extract_price(self, country_code):
         """가격 추출 - 165 문제 해결 버전"""
@@ -1385,7 +1320,8 @@ class AmazonScraper:
             price_df = df[df['retailprice'].notna()].copy()
             
             try:
-                price_df['price_numeric'] = price_df['retailprice'].astype(str).str.replace(',', '').astype(float)
+                # 저장된 retailprice는 점 소수점 canonical 형식 - 통계는 범위 제한 없이 (범위 밖 값은 아래에서 비정상으로 검출)
+                price_df['price_numeric'] = parse_prices(price_df['retailprice'], 'usa', price_range=(0, float('inf')))[0]
                 
                 logger.info("가격 통계:")
                 logger.info(f"   평균가: {price_df['price_numeric'].mean():.2f}")
@@ -57,6 +57,7 @@ logger = logging.getLogger(__name__)
 
 # Import database configuration
 from config import DB_CONFIG
+from price_parsing import parse_price, parse_prices
 
 # 파일서버 설정
 FILE_SERVER_CONFIG = {
@@ -460,91 +461,11 @@ class AmazonScraper:
         return None
     
     def parse_price_by_country(self, price_text, country_code):
-        """국가별 가격 파싱"""
-        try:
-            price_text = price_text.strip()
-            logger.debug(f"파싱할 가격 텍스트: '{price_text}'")
-            
-            invalid_patterns = [
-                r'^[a-zA-Z\s]+$',
-                r'^\d+\s*[a-zA-Z]',
-                r'was\s*[€$£¥₹]',
-                r'list\s*price',
-                r'buy\s*used'
-            ]
-            
-            for pattern in invalid_patterns:
-                if re.search(pattern, price_text, re.IGNORECASE):
-                    logger.debug(f"무효한 가격 패턴 감지: {pattern}")
-                    return None
-            
-            if country_code in ['gb', 'usa']:
-                cleaned = re.sub(r'[£$\s]', '', price_text)
-                if re.match(r'^\d{1,4}(?:,\d{3})*(?:\.\d{1,2})?$', cleaned):
-                    try:
-                        price_value = float(cleaned.replace(',', ''))
-                        if 5 <= price_value <= 50000:
-                            return cleaned.replace(',', '')
-                    except:
-                        pass
-            
-            elif country_code in ['de', 'es', 'fr', 'it']:
-                cleaned = re.sub(r'[€\s]', '', price_text)
-                logger.debug(f"통화 제거 후: '{cleaned}'")
-                
-                if country_code == 'de':
-                    if re.match(r'^\d{4}$', cleaned) and len(cleaned) == 4:
-                        try:
-                            cents = int(cleaned)
-                            euros = cents / 100
-                            if 10 <= euros <= 10000:
-                                formatted_price = f"{euros:.2f}"
-                                logger.debug(f"독일 센트→유로 변환: {cleaned} → {formatted_price}")
-                                return formatted_price
-                        except:
-                            pass
-                    
-                    if ',' in cleaned and '.' not in cleaned:
-                        cleaned = cleaned.replace(',', '.')
-                    elif ',' in cleaned and '.' in cleaned:
-                        parts = cleaned.rsplit(',', 1)
-                        if len(parts) == 2 and len(parts[1]) <= 2:
-                            integer_part = parts[0].replace('.', '')
-                            decimal_part = parts[1]
-                            cleaned = f"{integer_part}.{decimal_part}"
-                
-                elif country_code == 'es':
-                    if ',' in cleaned and '.' not in cleaned:
-                        cleaned = cleaned.replace(',', '.')
-                    elif ',' in cleaned and '.' in cleaned:
-                        parts = cleaned.rsplit(',', 1)
-                        if len(parts) == 2 and len(parts[1]) <= 2:
-                            integer_part = parts[0].replace('.', '')
-                            decimal_part = parts[1]
-                            cleaned = f"{integer_part}.{decimal_part}"
-                
-                if re.match(r'^\d+(?:\.\d{1,2})?$', cleaned):
-                    try:
-                        price_value = float(cleaned)
-                        if 10 <= price_value <= 10000:
-                            return cleaned
-                    except:
-                        pass
-            
-            elif country_code == 'jp':
-                cleaned = re.sub(r'[¥￥\s]', '', price_text)
-                if re.match(r'^\d+(?:,\d{3})*$', cleaned):
-                    return cleaned
-            
-            elif country_code == 'in':
-                cleaned = re.sub(r'[₹\s]', '', price_text)
-                if re.match(r'^\d+(?:,\d{2,3})*(?:\.\d{1,2})?$', cleaned):
-                    return cleaned
-            
-        except Exception as e:
-            logger.debug(f"가격 파싱 오류: {e}")
-        
-        return None
+        """국가별 가격 파싱 - price_parsing 공용 규칙"""
+        price = parse_price(price_text, country_code)
+        if price is None:
+            logger.debug(f"무효한 가격 텍스트: '{price_text}'")
+        return price
     
     def extract_price(self, country_code):
         """가격 추출"""
@@ -1050,7 +971,7 @@ class AmazonScraper:
         if with_price > 0:
             try:
                 price_df = df[df['retailprice'].notna()].copy()
-                price_df['price_numeric'] = price_df['retailprice'].astype(str).str.replace(',', '').astype(float)
+                price_df['price_numeric'] = parse_prices(price_df['retailprice'], 'usa')[0]  # 저장된 retailprice는 점 소수점 canonical 형식
                 
                 logger.info("가격 통계:")
                 logger.info(f"  평균: {price_df['price_numeric'].mean():.2f}")
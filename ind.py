@@ -18,7 +18,6 @@ from sqlalchemy import create_engine
 import paramiko
 import time
 import random
-import re
 from datetime import datetime
 import pytz
 import logging
@@ -32,6 +31,7 @@ logger = logging.getLogger(__name__)
 
 # Import database configuration
 from config import DB_CONFIG
+from price_parsing import parse_price
 
 # 파일서버 설정
 FILE_SERVER_CONFIG = {
@@ -540,36 +540,15 @@ class AmazonIndiaScraper:
         return None
     
     def parse_rupee_price(self, price_text):
-        """루피 가격 파싱 - 통화기호 완전 제거, 정수/소수점 자동 처리"""
-        try:
-            # 기본 정리
-            price_text = price_text.strip()
-            logger.debug(f"원본 가격 텍스트: '{price_text}'")
-            
-            # 루피 기호와 공백 제거
-            price_text = re.sub(r'[₹\s]', '', price_text)
-            
-            # 콤마 제거
-            price_text = price_text.replace(',', '')
-            
-            # 숫자만 추출
-            match = re.search(r'(\d+\.?\d*)', price_text)
-            if match:
-                price = float(match.group(1))
-                
-                # 소수점 이하가 0이면 정수로 변환
-                if price == int(price):
-                    price = int(price)
-                    logger.debug(f"파싱된 가격 (정수): {price}")
-                else:
-                    logger.debug(f"파싱된 가격 (소수): {price}")
-                
-                return price
-                
-        except Exception as e:
-            logger.debug(f"루피 가격 파싱 오류: {price_text} - {e}")
-            
-        return None
+        """루피 가격 파싱 - price_parsing 공용 규칙, 정수/소수점 자동 처리"""
+        cleaned = parse_price(price_text, 'in')
+        if cleaned is None:
+            logger.debug(f"무효한 가격 텍스트: '{price_text}'")
+            return None
+
+        price = float(cleaned)
+        # 소수점 이하가 0이면 정수로 변환
+        return int(price) if price == int(price) else price
     
     def extract_ships_from_india(self):
         """인도 전용 ships_from 추출"""
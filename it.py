@@ -27,6 +27,7 @@ logger = logging.getLogger(__name__)
 
 # Import database configuration
 from config import DB_CONFIG
+from price_parsing import parse_price, parse_prices
 
 # 파일서버 설정
 FILE_SERVER_CONFIG = {
@@ -533,41 +534,11 @@ class AmazonItalyScraper:
             return False
     
     def parse_italian_price(self, price_text):
-        """이탈리아 가격 파싱 (€ 통화, 쉼표 소수점)"""
-        try:
-            price_text = price_text.strip()
-            logger.debug(f"이탈리아 가격 파싱: '{price_text}'")
-            
-            # 유로 기호와 공백 제거
-            cleaned = re.sub(r'[€\s]', '', price_text)
-            logger.debug(f"통화 제거 후: '{cleaned}'")
-            
-            # 이탈리아 형식: 61,84 또는 1.234,56
-            if ',' in cleaned:
-                # 쉼표가 있으면 마지막 쉼표를 소수점으로 처리
-                parts = cleaned.rsplit(',', 1)
-                if len(parts) == 2 and len(parts[1]) <= 2 and parts[1].isdigit():
-                    # 정수 부분에서 점 제거 (천단위 구분자)
-                    integer_part = parts[0].replace('.', '')
-                    decimal_part = parts[1]
-                    final_price = f"{integer_part}.{decimal_part}"
-                    logger.debug(f"이탈리아 쉼표→점 변환: '{final_price}'")
-                    
-                    # 최종 검증
-                    if re.match(r'^\d+\.\d{1,2}$', final_price):
-                        return final_price
-                else:
-                    # 쉼표가 있지만 소수점이 아닌 경우
-                    cleaned = cleaned.replace(',', '')
-            
-            # 정수 가격 또는 점으로 구분된 가격
-            if re.match(r'^\d+(\.\d{1,2})?$', cleaned):
-                return cleaned
-                
-        except Exception as e:
-            logger.debug(f"이탈리아 가격 파싱 오류: {price_text} - {e}")
-            
-        return None
+        """이탈리아 가격 파싱 (€ 통화, 쉼표 소수점) - price_parsing 공용 규칙"""
+        price = parse_price(price_text, 'it')
+        if price is None:
+            logger.debug(f"무효한 가격 텍스트: '{price_text}'")
+        return price
     
     def extract_italian_price(self):
         """이탈리아 가격 추출"""
@@ -1331,7 +1302,7 @@ class AmazonItalyScraper:
             
             try:
                 # 이탈리아 가격 숫자 변환
-                price_df['price_numeric'] = price_df['retailprice'].astype(str).str.replace(',', '').astype(float)
+                price_df['price_numeric'] = parse_prices(price_df['retailprice'], 'usa')[0]  # 저장된 retailprice는 점 소수점 canonical 형식
                 
                 logger.info("이탈리아 가격 통계 (€):")
                 logger.info(f"   평균가: €{price_df['price_numeric'].mean():.2f}")
@@ -1,27 +1,55 @@
 """
 Migrate existing data from walmart_tv_detail_crawled, amazon_tv_detail_crawled,
 and bby_tv_detail_crawled to unified tv_retail_com table
+
+Streaming migration:
+- source는 named (server-side) cursor로 MIGRATION_CHUNK_SIZE 건씩 읽음 (전체를 메모리에 올리지 않음)
+- count 필드는 chunk 단위로 한 번에 parse, 가격 / 별점은 typed 컬럼 값도 같이 계산 (value_normalizer)
+- review 텍스트는 retail_reviews에 한 번만 저장하고 tv_retail_com에는 hash 참조만 (review_store)
+- chunk는 COPY로 적재하고, 같은 transaction에서 high-water mark (마지막 source id)를 저장
+- 중간에 끊기면 다시 실행했을 때 high-water mark 다음 id부터 이어서 진행
+- COPY가 실패한 chunk만 row 단위 INSERT로 재시도해서 문제 row를 건너뜀
+
+Usage:
+    python migrate_to_tv_retail_com.py           # 이어서 진행 (처음이면 처음부터)
+    python migrate_to_tv_retail_com.py --reset   # high-water mark 초기화 후 처음부터
 """
-import psycopg2
-import re
-from config import DB_CONFIG
+import io
+import sys
 from datetime import datetime
 
+# Shared pooled database layer
+from db_manager import get_connection
+from value_normalizer import TYPED_COLUMNS, ensure_typed_columns, parse_count, parse_star_counts, typed_values
+from review_store import REVIEW_REF_COLUMNS, ensure_review_store, review_refs, write_review_rows
+
+# source에서 한 번에 읽고 COPY 하는 row 수
+MIGRATION_CHUNK_SIZE = 5000
+
+# high-water mark 저장 테이블
+STATE_TABLE = 'tv_retail_com_migration_state'
+
+# tv_retail_com 적재 컬럼 (build_*_row가 같은 순서로 값을 만든다)
+TV_RETAIL_COLUMNS = [
+    'item', 'account_name', 'page_type', 'count_of_reviews', 'retailer_sku_name', 'product_url',
+    'star_rating', 'count_of_star_ratings', 'screen_size', 'sku_popularity',
+    'final_sku_price', 'original_sku_price', 'savings', 'discount_type', 'offer',
+    'pick_up_availability', 'shipping_availability', 'delivery_availability', 'shipping_info',
+    'available_quantity_for_purchase', 'inventory_status', 'sku_status', 'retailer_membership_discounts',
+    'recommendation_intent',
+    'main_rank', 'bsr_rank', 'rank_1', 'rank_2', 'promotion_rank', 'trend_rank',
+    'number_of_ppl_purchased_yesterday', 'number_of_ppl_added_to_carts', 'retailer_sku_name_similar',
+    'estimated_annual_electricity_use', 'promotion_type',
+    'calendar_week', 'crawl_strdatetime',
+] + TYPED_COLUMNS + REVIEW_REF_COLUMNS  # 가격 / 별점 typed 값 (value_normalizer) + retail_reviews 참조 (review_store)
+
 def parse_star_ratings(star_ratings_str):
     """Parse star ratings string to get total count
     Examples:
     - "5star:142, 4star:14, 3star:7, 2star:2, 1star:4" -> 169
     - "5stars:231 4stars:19 3stars:2 2stars:1 1star:8" -> 261
     """
-    if not star_ratings_str:
-        return None
-    try:
-        numbers = re.findall(r':(\d+)', str(star_ratings_str))
-        if numbers:
-            return sum(int(n) for n in numbers)
-    except:
-        pass
-    return None
+    return parse_star_counts(star_ratings_str)
 
 def parse_count_of_reviews(count_str):
     """Parse count_of_reviews to integer
@@ -30,271 +58,322 @@ def parse_count_of_reviews(count_str):
     - "20" -> 20
     - 100 -> 100
     """
-    if not count_str:
-        return None
-    try:
-        if isinstance(count_str, int):
-            return count_str
-        return int(str(count_str).replace(',', ''))
-    except:
-        return None
-
-def migrate_walmart_data(conn):
-    """Migrate Walmart data to tv_retail_com"""
+    return parse_count(count_str)
+
+def parse_star_ratings_batch(values):
+    """parse_star_ratings for a whole chunk column"""
+    return [parse_star_ratings(value) for value in values]
+
+def parse_count_of_reviews_batch(values):
+    """parse_count_of_reviews for a whole chunk column"""
+    return [parse_count_of_reviews(value) for value in values]
+
+def copy_value(value):
+    """Python value -> COPY text format field"""
+    if value is None:
+        return '\\N'
+    text = str(value)
+    return (text.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+
+def ensure_state_table(conn):
+    """high-water mark 테이블 생성"""
     cursor = conn.cursor()
-
-    print("\n" + "="*80)
-    print("MIGRATING WALMART DATA")
-    print("="*80)
-
-    # Get total count
-    cursor.execute("SELECT COUNT(*) FROM walmart_tv_detail_crawled")
-    total = cursor.fetchone()[0]
-    print(f"[INFO] Total Walmart records: {total:,}")
-
-    # Fetch all data
-    cursor.execute("""
-        SELECT
-            page_type, product_url, retailer_sku_name, item, star_rating,
-            number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts,
-            sku_popularity, savings, discount_type, shipping_info,
-            count_of_star_ratings, retailer_sku_name_similar, detailed_review_content,
-            calendar_week, crawl_strdatetime,
-            final_sku_price, original_sku_price, pick_up_availability,
-            shipping_availability, delivery_availability, sku_status,
-            retailer_membership_discounts, available_quantity_for_purchase,
-            inventory_status, main_rank, bsr_rank, screen_size, count_of_reviews
-        FROM walmart_tv_detail_crawled
-        ORDER BY id
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            source_table VARCHAR(100) PRIMARY KEY,
+            last_id BIGINT NOT NULL DEFAULT 0,
+            rows_migrated BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
     """)
+    conn.commit()
+    cursor.close()
 
-    rows = cursor.fetchall()
+def get_high_water_mark(conn, source_table):
+    """(last_id, rows_migrated) - 처음이면 (0, 0)"""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT last_id, rows_migrated FROM {STATE_TABLE} WHERE source_table = %s",
+                   (source_table,))
+    result = cursor.fetchone()
+    cursor.close()
+    return (result[0], result[1]) if result else (0, 0)
+
+def save_high_water_mark(cursor, source_table, last_id, rows_migrated):
+    """chunk 적재와 같은 transaction 안에서 high-water mark 저장"""
+    cursor.execute(f"""
+        INSERT INTO {STATE_TABLE} (source_table, last_id, rows_migrated, updated_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (source_table) DO UPDATE
+        SET last_id = EXCLUDED.last_id,
+            rows_migrated = EXCLUDED.rows_migrated,
+            updated_at = NOW()
+    """, (source_table, last_id, rows_migrated))
+
+def reset_high_water_marks(conn):
+    """--reset: 모든 source의 high-water mark 삭제"""
+    cursor = conn.cursor()
+    cursor.execute(f"DELETE FROM {STATE_TABLE}")
+    conn.commit()
+    cursor.close()
+    print("[INFO] Migration high-water marks reset")
+
+def copy_chunk(cursor, rows):
+    """chunk를 COPY로 tv_retail_com에 적재"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY tv_retail_com ({', '.join(TV_RETAIL_COLUMNS)}) FROM STDIN", buffer)
+
+def insert_rows_individually(cursor, rows, errors):
+    """COPY 실패 chunk: row 단위 INSERT (SAVEPOINT로 문제 row만 건너뜀)
+
+    Returns:
+        (inserted, errors)
+    """
+    insert_query = f"""
+        INSERT INTO tv_retail_com ({', '.join(TV_RETAIL_COLUMNS)})
+        VALUES ({', '.join(['%s'] * len(TV_RETAIL_COLUMNS))})
+    """
     inserted = 0
-    errors = 0
-
-    for idx, row in enumerate(rows, 1):
+    for row in rows:
+        cursor.execute("SAVEPOINT migrate_row")
         try:
-            (page_type, product_url, retailer_sku_name, item, star_rating,
-             number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts,
-             sku_popularity, savings, discount_type, shipping_info,
-             count_of_star_ratings, retailer_sku_name_similar, detailed_review_content,
-             calendar_week, crawl_strdatetime,
-             final_sku_price, original_sku_price, pick_up_availability,
-             shipping_availability, delivery_availability, sku_status,
-             retailer_membership_discounts, available_quantity_for_purchase,
-             inventory_status, main_rank, bsr_rank, screen_size, count_of_reviews) = row
-
-            # Parse count fields
-            count_of_reviews_int = parse_count_of_reviews(count_of_reviews)
-            count_of_star_ratings_int = parse_star_ratings(count_of_star_ratings)
-
-            cursor.execute("""
-                INSERT INTO tv_retail_com
-                (item, account_name, page_type, count_of_reviews, retailer_sku_name, product_url,
-                 star_rating, count_of_star_ratings, screen_size, sku_popularity,
-                 final_sku_price, original_sku_price, savings, discount_type, offer,
-                 pick_up_availability, shipping_availability, delivery_availability, shipping_info,
-                 available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts,
-                 detailed_review_content, summarized_review_content, top_mentions, recommendation_intent,
-                 main_rank, bsr_rank, rank_1, rank_2, promotion_rank, trend_rank,
-                 number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar,
-                 estimated_annual_electricity_use, promotion_type,
-                 calendar_week, crawl_strdatetime)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                item, 'Walmart', page_type, count_of_reviews_int, retailer_sku_name, product_url,
-                star_rating, count_of_star_ratings_int, screen_size, sku_popularity,
-                final_sku_price, original_sku_price, savings, discount_type, None,  # offer
-                pick_up_availability, shipping_availability, delivery_availability, shipping_info,
-                available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts,
-                detailed_review_content, None, None, None,  # summarized_review_content, top_mentions, recommendation_intent
-                main_rank, bsr_rank, None, None, None, None,  # rank_1, rank_2, promotion_rank, trend_rank
-                number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar,
-                None, None,  # estimated_annual_electricity_use, promotion_type
-                calendar_week, crawl_strdatetime
-            ))
+            cursor.execute(insert_query, row)
+            cursor.execute("RELEASE SAVEPOINT migrate_row")
             inserted += 1
-
-            if idx % 100 == 0:
-                conn.commit()
-                print(f"  [PROGRESS] {idx:,}/{total:,} ({idx/total*100:.1f}%)")
-
         except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT migrate_row")
             errors += 1
             if errors <= 5:  # Show first 5 errors
-                print(f"  [ERROR] Row {idx}: {e}")
-
-    conn.commit()
-    cursor.close()
-
-    print(f"[OK] Walmart migration complete: {inserted:,} inserted, {errors:,} errors")
+                print(f"  [ERROR] Row skipped: {e}")
     return inserted, errors
 
-def migrate_amazon_data(conn):
-    """Migrate Amazon data to tv_retail_com"""
-    cursor = conn.cursor()
+def stream_migrate(conn, label, source_table, select_columns, build_rows):
+    """
+    source_table -> tv_retail_com streaming migration
 
+    Args:
+        conn: 쓰기용 connection (chunk 마다 commit)
+        label: 로그용 이름
+        source_table: source 테이블
+        select_columns: source에서 읽을 컬럼 (id 제외)
+        build_rows: chunk (id 제외 source row list) -> (tv_retail_com row list, retail_reviews row list)
+
+    Returns:
+        (inserted, errors)
+    """
     print("\n" + "="*80)
-    print("MIGRATING AMAZON DATA")
+    print(f"MIGRATING {label.upper()} DATA")
     print("="*80)
 
-    # Get total count
-    cursor.execute("SELECT COUNT(*) FROM amazon_tv_detail_crawled")
-    total = cursor.fetchone()[0]
-    print(f"[INFO] Total Amazon records: {total:,}")
-
-    # Fetch all data
-    cursor.execute("""
-        SELECT
-            page_type, product_url, retailer_sku_name, star_rating, sku_popularity,
-            retailer_membership_discounts, item, rank_1, rank_2, count_of_star_ratings,
-            summarized_review_content, detailed_review_content, calendar_week,
-            crawl_strdatetime, screen_size, count_of_reviews, main_rank, bsr_rank
-        FROM amazon_tv_detail_crawled
-        ORDER BY id
-    """)
-
-    rows = cursor.fetchall()
-    inserted = 0
-    errors = 0
+    last_id, rows_migrated = get_high_water_mark(conn, source_table)
 
-    for idx, row in enumerate(rows, 1):
-        try:
-            (page_type, product_url, retailer_sku_name, star_rating, sku_popularity,
-             retailer_membership_discounts, item, rank_1, rank_2, count_of_star_ratings,
-             summarized_review_content, detailed_review_content, calendar_week,
-             crawl_strdatetime, screen_size, count_of_reviews, main_rank, bsr_rank) = row
-
-            # Parse count fields
-            count_of_reviews_int = parse_count_of_reviews(count_of_reviews)
-            count_of_star_ratings_int = parse_star_ratings(count_of_star_ratings)
-
-            cursor.execute("""
-                INSERT INTO tv_retail_com
-                (item, account_name, page_type, count_of_reviews, retailer_sku_name, product_url,
-                 star_rating, count_of_star_ratings, screen_size, sku_popularity,
-                 final_sku_price, original_sku_price, savings, discount_type, offer,
-                 pick_up_availability, shipping_availability, delivery_availability, shipping_info,
-                 available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts,
-                 detailed_review_content, summarized_review_content, top_mentions, recommendation_intent,
-                 main_rank, bsr_rank, rank_1, rank_2, promotion_rank, trend_rank,
-                 number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar,
-                 estimated_annual_electricity_use, promotion_type,
-                 calendar_week, crawl_strdatetime)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                item, 'Amazon', page_type, count_of_reviews_int, retailer_sku_name, product_url,
-                star_rating, count_of_star_ratings_int, screen_size, sku_popularity,
-                None, None, None, None, None,  # final_sku_price, original_sku_price, savings, discount_type, offer
-                None, None, None, None,  # pick_up_availability, shipping_availability, delivery_availability, shipping_info
-                None, None, None, retailer_membership_discounts,  # available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts
-                detailed_review_content, summarized_review_content, None, None,  # detailed_review_content, summarized_review_content, top_mentions, recommendation_intent
-                main_rank, bsr_rank, rank_1, rank_2, None, None,  # main_rank, bsr_rank, rank_1, rank_2, promotion_rank, trend_rank
-                None, None, None,  # number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar
-                None, None,  # estimated_annual_electricity_use, promotion_type
-                calendar_week, crawl_strdatetime
-            ))
-            inserted += 1
-
-            if idx % 100 == 0:
-                conn.commit()
-                print(f"  [PROGRESS] {idx:,}/{total:,} ({idx/total*100:.1f}%)")
-
-        except Exception as e:
-            errors += 1
-            if errors <= 5:
-                print(f"  [ERROR] Row {idx}: {e}")
-
-    conn.commit()
-    cursor.close()
-
-    print(f"[OK] Amazon migration complete: {inserted:,} inserted, {errors:,} errors")
-    return inserted, errors
-
-def migrate_bestbuy_data(conn):
-    """Migrate BestBuy data to tv_retail_com"""
+    # Get remaining count
     cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {source_table} WHERE id > %s", (last_id,))
+    total = cursor.fetchone()[0]
+    cursor.close()
+    if last_id:
+        print(f"[INFO] Resuming after id {last_id:,} ({rows_migrated:,} rows already migrated)")
+    print(f"[INFO] Remaining {label} records: {total:,}")
 
-    print("\n" + "="*80)
-    print("MIGRATING BESTBUY DATA")
-    print("="*80)
+    if total == 0:
+        print(f"[OK] {label} migration complete: nothing to do")
+        return 0, 0
 
-    # Get total count
-    cursor.execute("SELECT COUNT(*) FROM bby_tv_detail_crawled")
-    total = cursor.fetchone()[0]
-    print(f"[INFO] Total BestBuy records: {total:,}")
-
-    # Fetch all data
-    cursor.execute("""
-        SELECT
-            page_type, retailer_sku_name, item, estimated_annual_electricity_use,
-            screen_size, count_of_star_ratings, top_mentions, detailed_review_content,
-            recommendation_intent, product_url, calendar_week, crawl_strdatetime,
-            count_of_reviews, final_sku_price, savings, original_sku_price, offer,
-            pick_up_availability, shipping_availability, delivery_availability, sku_status,
-            star_rating, promotion_type, promotion_rank, bsr_rank, main_rank, trend_rank
-        FROM bby_tv_detail_crawled
-        ORDER BY id
-    """)
+    # 읽기 전용 connection + named cursor (쓰기 connection의 commit과 독립)
+    read_conn = get_connection(autocommit=False)
+    source_cursor = read_conn.cursor(name=f"migrate_{source_table}")
+    source_cursor.itersize = MIGRATION_CHUNK_SIZE
 
-    rows = cursor.fetchall()
     inserted = 0
     errors = 0
-
-    for idx, row in enumerate(rows, 1):
+    processed = 0
+    try:
+        source_cursor.execute(f"""
+            SELECT id, {', '.join(select_columns)}
+            FROM {source_table}
+            WHERE id > %s
+            ORDER BY id
+        """, (last_id,))
+
+        while True:
+            chunk = source_cursor.fetchmany(MIGRATION_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            chunk_last_id = chunk[-1][0]
+            rows, review_rows = build_rows([row[1:] for row in chunk])
+
+            cursor = conn.cursor()
+            try:
+                write_review_rows(cursor, review_rows)
+                copy_chunk(cursor, rows)
+                chunk_inserted = len(rows)
+            except Exception as e:
+                print(f"  [WARNING] COPY failed for chunk ending at id {chunk_last_id:,}: {e}")
+                print("  [INFO] Retrying chunk row by row...")
+                conn.rollback()
+                write_review_rows(cursor, review_rows)
+                chunk_inserted, errors = insert_rows_individually(cursor, rows, errors)
+
+            rows_migrated += chunk_inserted
+            save_high_water_mark(cursor, source_table, chunk_last_id, rows_migrated)
+            conn.commit()
+            cursor.close()
+
+            inserted += chunk_inserted
+            processed += len(chunk)
+            print(f"  [PROGRESS] {processed:,}/{total:,} ({processed/total*100:.1f}%) - last id {chunk_last_id:,}")
+
+    finally:
         try:
-            (page_type, retailer_sku_name, item, estimated_annual_electricity_use,
-             screen_size, count_of_star_ratings, top_mentions, detailed_review_content,
-             recommendation_intent, product_url, calendar_week, crawl_strdatetime,
-             count_of_reviews, final_sku_price, savings, original_sku_price, offer,
-             pick_up_availability, shipping_availability, delivery_availability, sku_status,
-             star_rating, promotion_type, promotion_rank, bsr_rank, main_rank, trend_rank) = row
-
-            # Parse count fields
-            count_of_reviews_int = parse_count_of_reviews(count_of_reviews)
-            count_of_star_ratings_int = parse_star_ratings(count_of_star_ratings)
-
-            cursor.execute("""
-                INSERT INTO tv_retail_com
-                (item, account_name, page_type, count_of_reviews, retailer_sku_name, product_url,
-                 star_rating, count_of_star_ratings, screen_size, sku_popularity,
-                 final_sku_price, original_sku_price, savings, discount_type, offer,
-                 pick_up_availability, shipping_availability, delivery_availability, shipping_info,
-                 available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts,
-                 detailed_review_content, summarized_review_content, top_mentions, recommendation_intent,
-                 main_rank, bsr_rank, rank_1, rank_2, promotion_rank, trend_rank,
-                 number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar,
-                 estimated_annual_electricity_use, promotion_type,
-                 calendar_week, crawl_strdatetime)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                item, 'Bestbuy', page_type, count_of_reviews_int, retailer_sku_name, product_url,
-                star_rating, count_of_star_ratings_int, screen_size, None,  # sku_popularity
-                final_sku_price, original_sku_price, savings, None, offer,  # discount_type
-                pick_up_availability, shipping_availability, delivery_availability, None,  # shipping_info
-                None, None, sku_status, None,  # available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts
-                detailed_review_content, None, top_mentions, recommendation_intent,  # detailed_review_content, summarized_review_content, top_mentions, recommendation_intent
-                main_rank, bsr_rank, None, None, promotion_rank, trend_rank,  # main_rank, bsr_rank, rank_1, rank_2, promotion_rank, trend_rank
-                None, None, None,  # number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar
-                estimated_annual_electricity_use, promotion_type,
-                calendar_week, crawl_strdatetime
-            ))
-            inserted += 1
+            source_cursor.close()
+        except Exception:
+            pass
+        read_conn.rollback()
+        read_conn.close()
 
-            if idx % 100 == 0:
-                conn.commit()
-                print(f"  [PROGRESS] {idx:,}/{total:,} ({idx/total*100:.1f}%)")
+    print(f"[OK] {label} migration complete: {inserted:,} inserted, {errors:,} errors")
+    return inserted, errors
 
-        except Exception as e:
-            errors += 1
-            if errors <= 5:
-                print(f"  [ERROR] Row {idx}: {e}")
+def add_review_refs(review_rows, account_name, product_url, detailed, summarized, top_mentions):
+    """review 텍스트 -> retail_reviews row는 review_rows에 추가, tv_retail_com 참조 값 tuple 반환"""
+    refs, rows = review_refs(account_name, product_url, detailed, summarized, top_mentions)
+    review_rows.extend(rows)
+    return refs
+
+def build_walmart_rows(chunk):
+    """Walmart source rows -> tv_retail_com rows"""
+    count_of_reviews_list = parse_count_of_reviews_batch(row[28] for row in chunk)
+    count_of_star_ratings_list = parse_star_ratings_batch(row[11] for row in chunk)
+
+    rows = []
+    review_rows = []
+    for row, count_of_reviews_int, count_of_star_ratings_int in zip(
+            chunk, count_of_reviews_list, count_of_star_ratings_list):
+        (page_type, product_url, retailer_sku_name, item, star_rating,
+         number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts,
+         sku_popularity, savings, discount_type, shipping_info,
+         count_of_star_ratings, retailer_sku_name_similar, detailed_review_content,
+         calendar_week, crawl_strdatetime,
+         final_sku_price, original_sku_price, pick_up_availability,
+         shipping_availability, delivery_availability, sku_status,
+         retailer_membership_discounts, available_quantity_for_purchase,
+         inventory_status, main_rank, bsr_rank, screen_size, count_of_reviews) = row
+
+        rows.append((
+            item, 'Walmart', page_type, count_of_reviews_int, retailer_sku_name, product_url,
+            star_rating, count_of_star_ratings_int, screen_size, sku_popularity,
+            final_sku_price, original_sku_price, savings, discount_type, None,  # offer
+            pick_up_availability, shipping_availability, delivery_availability, shipping_info,
+            available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts,
+            None,  # recommendation_intent
+            main_rank, bsr_rank, None, None, None, None,  # rank_1, rank_2, promotion_rank, trend_rank
+            number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar,
+            None, None,  # estimated_annual_electricity_use, promotion_type
+            calendar_week, crawl_strdatetime
+        ) + typed_values(final_sku_price, original_sku_price, savings, star_rating)
+            + add_review_refs(review_rows, 'Walmart', product_url, detailed_review_content, None, None))
+    return rows, review_rows
+
+def build_amazon_rows(chunk):
+    """Amazon source rows -> tv_retail_com rows"""
+    count_of_reviews_list = parse_count_of_reviews_batch(row[15] for row in chunk)
+    count_of_star_ratings_list = parse_star_ratings_batch(row[9] for row in chunk)
+
+    rows = []
+    review_rows = []
+    for row, count_of_reviews_int, count_of_star_ratings_int in zip(
+            chunk, count_of_reviews_list, count_of_star_ratings_list):
+        (page_type, product_url, retailer_sku_name, star_rating, sku_popularity,
+         retailer_membership_discounts, item, rank_1, rank_2, count_of_star_ratings,
+         summarized_review_content, detailed_review_content, calendar_week,
+         crawl_strdatetime, screen_size, count_of_reviews, main_rank, bsr_rank) = row
+
+        rows.append((
+            item, 'Amazon', page_type, count_of_reviews_int, retailer_sku_name, product_url,
+            star_rating, count_of_star_ratings_int, screen_size, sku_popularity,
+            None, None, None, None, None,  # final_sku_price, original_sku_price, savings, discount_type, offer
+            None, None, None, None,  # pick_up_availability, shipping_availability, delivery_availability, shipping_info
+            None, None, None, retailer_membership_discounts,  # available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts
+            None,  # recommendation_intent
+            main_rank, bsr_rank, rank_1, rank_2, None, None,  # main_rank, bsr_rank, rank_1, rank_2, promotion_rank, trend_rank
+            None, None, None,  # number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar
+            None, None,  # estimated_annual_electricity_use, promotion_type
+            calendar_week, crawl_strdatetime
+        ) + typed_values(None, None, None, star_rating)
+            + add_review_refs(review_rows, 'Amazon', product_url, detailed_review_content,
+                              summarized_review_content, None))
+    return rows, review_rows
+
+def build_bestbuy_rows(chunk):
+    """BestBuy source rows -> tv_retail_com rows"""
+    count_of_reviews_list = parse_count_of_reviews_batch(row[12] for row in chunk)
+    count_of_star_ratings_list = parse_star_ratings_batch(row[5] for row in chunk)
+
+    rows = []
+    review_rows = []
+    for row, count_of_reviews_int, count_of_star_ratings_int in zip(
+            chunk, count_of_reviews_list, count_of_star_ratings_list):
+        (page_type, retailer_sku_name, item, estimated_annual_electricity_use,
+         screen_size, count_of_star_ratings, top_mentions, detailed_review_content,
+         recommendation_intent, product_url, calendar_week, crawl_strdatetime,
+         count_of_reviews, final_sku_price, savings, original_sku_price, offer,
+         pick_up_availability, shipping_availability, delivery_availability, sku_status,
+         star_rating, promotion_type, promotion_rank, bsr_rank, main_rank, trend_rank) = row
+
+        rows.append((
+            item, 'Bestbuy', page_type, count_of_reviews_int, retailer_sku_name, product_url,
+            star_rating, count_of_star_ratings_int, screen_size, None,  # sku_popularity
+            final_sku_price, original_sku_price, savings, None, offer,  # discount_type
+            pick_up_availability, shipping_availability, delivery_availability, None,  # shipping_info
+            None, None, sku_status, None,  # available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts
+            recommendation_intent,
+            main_rank, bsr_rank, None, None, promotion_rank, trend_rank,  # main_rank, bsr_rank, rank_1, rank_2, promotion_rank, trend_rank
+            None, None, None,  # number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar
+            estimated_annual_electricity_use, promotion_type,
+            calendar_week, crawl_strdatetime
+        ) + typed_values(final_sku_price, original_sku_price, savings, star_rating)
+            + add_review_refs(review_rows, 'Bestbuy', product_url, detailed_review_content, None, top_mentions))
+    return rows, review_rows
 
-    conn.commit()
-    cursor.close()
+def migrate_walmart_data(conn):
+    """Migrate Walmart data to tv_retail_com"""
+    return stream_migrate(conn, 'Walmart', 'walmart_tv_detail_crawled', [
+        'page_type', 'product_url', 'retailer_sku_name', 'item', 'star_rating',
+        'number_of_ppl_purchased_yesterday', 'number_of_ppl_added_to_carts',
+        'sku_popularity', 'savings', 'discount_type', 'shipping_info',
+        'count_of_star_ratings', 'retailer_sku_name_similar', 'detailed_review_content',
+        'calendar_week', 'crawl_strdatetime',
+        'final_sku_price', 'original_sku_price', 'pick_up_availability',
+        'shipping_availability', 'delivery_availability', 'sku_status',
+        'retailer_membership_discounts', 'available_quantity_for_purchase',
+        'inventory_status', 'main_rank', 'bsr_rank', 'screen_size', 'count_of_reviews',
+    ], build_walmart_rows)
 
-    print(f"[OK] BestBuy migration complete: {inserted:,} inserted, {errors:,} errors")
-    return inserted, errors
+def migrate_amazon_data(conn):
+    """Migrate Amazon data to tv_retail_com"""
+    return stream_migrate(conn, 'Amazon', 'amazon_tv_detail_crawled', [
+        'page_type', 'product_url', 'retailer_sku_name', 'star_rating', 'sku_popularity',
+        'retailer_membership_discounts', 'item', 'rank_1', 'rank_2', 'count_of_star_ratings',
+        'summarized_review_content', 'detailed_review_content', 'calendar_week',
+        'crawl_strdatetime', 'screen_size', 'count_of_reviews', 'main_rank', 'bsr_rank',
+    ], build_amazon_rows)
+
+def migrate_bestbuy_data(conn):
+    """Migrate BestBuy data to tv_retail_com"""
+    return stream_migrate(conn, 'BestBuy', 'bby_tv_detail_crawled', [
+        'page_type', 'retailer_sku_name', 'item', 'estimated_annual_electricity_use',
+        'screen_size', 'count_of_star_ratings', 'top_mentions', 'detailed_review_content',
+        'recommendation_intent', 'product_url', 'calendar_week', 'crawl_strdatetime',
+        'count_of_reviews', 'final_sku_price', 'savings', 'original_sku_price', 'offer',
+        'pick_up_availability', 'shipping_availability', 'delivery_availability', 'sku_status',
+        'star_rating', 'promotion_type', 'promotion_rank', 'bsr_rank', 'main_rank', 'trend_rank',
+    ], build_bestbuy_rows)
 
 def main():
     """Main migration function"""
@@ -305,21 +384,34 @@ def main():
 
     try:
         # Connect to database
-        conn = psycopg2.connect(**DB_CONFIG)
+        conn = get_connection(autocommit=False)
         print("[OK] Database connected")
 
+        ensure_state_table(conn)
+        cursor = conn.cursor()
+        ensure_typed_columns(cursor)
+        ensure_review_store(cursor)
+        conn.commit()
+        cursor.close()
+        if '--reset' in sys.argv[1:]:
+            reset_high_water_marks(conn)
+
         # Check current tv_retail_com count
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM tv_retail_com")
         current_count = cursor.fetchone()[0]
+        cursor.execute(f"SELECT COUNT(*) FROM {STATE_TABLE}")
+        resuming = cursor.fetchone()[0] > 0
         cursor.close()
         print(f"[INFO] Current tv_retail_com records: {current_count:,}")
 
-        if current_count > 0:
+        if current_count > 0 and not resuming:
             response = input(f"\n⚠️  tv_retail_com already has {current_count:,} records. Continue? (yes/no): ")
             if response.lower() != 'yes':
                 print("[INFO] Migration cancelled by user")
                 return
+        elif resuming:
+            print("[INFO] Previous migration state found - continuing from saved high-water marks")
 
         # Migrate data from each source
         total_inserted = 0
@@ -362,6 +454,7 @@ def main():
 
     except Exception as e:
         print(f"\n[ERROR] Migration failed: {e}")
+        print("[INFO] Completed chunks are saved - run again to resume")
         import traceback
         traceback.print_exc()
 
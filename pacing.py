@@ -0,0 +1,219 @@
+"""
+Adaptive Pacing Scheduler
+고정 time.sleep(random.uniform(a, b)) 대신 retailer 별로 page 간 딜레이를 조절
+
+동작:
+- 사이트가 정상 응답하면 딜레이를 조금씩 줄임 (min_delay까지)
+- 응답이 느려지면 (latency > slow_latency) 딜레이를 늘림
+- 차단 신호 (captcha / robot check / throttling / 403·429·503)가 보이면 지수적으로 backoff (max_delay까지)
+- 같은 retailer의 pacer는 프로세스 안에서 하나만 사용 (worker-pool worker들도 공유)
+
+설정 (config.py, 선택):
+    PACING_POLICIES = {
+        'bestbuy': {'min_delay': 2.0, 'base_delay': 4.0},
+        'default': {'max_delay': 120.0},
+    }
+환경 변수:
+    PACING_MODE=adaptive  (기본)
+    PACING_MODE=fixed     항상 base_delay 근처 (기존 고정 딜레이와 비슷한 동작)
+
+사용법:
+    from pacing import get_pacer
+
+    self.pacer = get_pacer('bestbuy')
+    self.pacer = get_pacer('amazon_bsr')            # page type 별 policy (RETAILER_POLICIES['amazon_bsr'])
+    self.pacer.timed_get(self.driver, url)          # driver.get + latency / title 차단 신호 기록
+    self.pacer.observe(latency, page_source=html)   # 직접 기록 (HTTP fetch 등)
+    self.pacer.report_block('captcha')              # 크롤러가 직접 차단을 감지했을 때
+    self.pacer.wait()                               # page 간 딜레이
+    self.pacer.wait('retry')                        # refresh / retry 전 딜레이
+    self.pacer.pause(2)                             # 고정 딜레이 (scroll / click 후 등)
+    self.pacer.no_delay = True                      # 재파싱 (--reparse): wait / pause 모두 바로 return
+"""
+
+import os
+import random
+import threading
+import time
+
+try:
+    import config
+except ImportError:
+    config = None
+
+DEFAULT_POLICY = {
+    'min_delay': 1.0,        # 정상 응답이 계속될 때 최소 딜레이 (sec)
+    'base_delay': 3.0,       # 시작 딜레이
+    'max_delay': 180.0,      # backoff 최대 딜레이
+    'speedup': 0.85,         # 정상 응답 1회마다 딜레이 배율
+    'backoff': 2.0,          # 차단 1회마다 딜레이 배율
+    'slow_latency': 15.0,    # 이 이상 걸린 응답은 느린 응답으로 보고 딜레이를 늘림
+    'slowdown': 1.25,        # 느린 응답 1회마다 딜레이 배율
+    'retry_factor': 2.0,     # wait('retry')는 현재 딜레이 x retry_factor
+    'jitter': 0.25,          # +-25% 랜덤
+}
+
+RETAILER_POLICIES = {
+    'amazon': {'min_delay': 1.5, 'base_delay': 3.0, 'max_delay': 120.0},
+    'bestbuy': {'min_delay': 1.5, 'base_delay': 4.0, 'max_delay': 180.0},
+    'walmart': {'min_delay': 3.0, 'base_delay': 6.0, 'max_delay': 300.0},
+    # page type 별 policy ('<retailer>_<page type>'): retailer policy 위에 덮어씀, 차단 신호는 retailer 것 사용
+    'amazon_bsr': {'min_delay': 10.0, 'base_delay': 12.5, 'max_delay': 180.0, 'jitter': 0.2},  # BSR은 throttling이 빠름
+}
+
+# page source / title에서 찾는 차단 신호 (소문자)
+BLOCK_MARKERS = {
+    'default': ['captcha', 'robot check', 'access denied', 'are you a robot'],
+    'amazon': ['request was throttled', 'please wait a moment and refresh',
+               'enter the characters you see below', "sorry! something went wrong"],
+    'bestbuy': ['access denied', 'please verify you are a human'],
+    'walmart': ['robot or human?', 'press & hold', 'press and hold', 'human verification'],
+}
+
+BLOCK_STATUS_CODES = (403, 429, 503)
+
+# 차단 신호 검사 범위 (page 앞부분만)
+MARKER_SCAN_CHARS = 5000
+
+_pacers = {}
+_pacers_lock = threading.Lock()
+
+
+def base_retailer(retailer):
+    """'amazon_bsr' -> 'amazon' (page type 별 policy의 retailer)"""
+    return retailer.split('_', 1)[0]
+
+
+def get_policy(retailer):
+    """
+    DEFAULT_POLICY <- RETAILER_POLICIES <- config.PACING_POLICIES 순서로 덮어쓴 policy
+    page type 별 policy ('amazon_bsr')는 각 단계에서 retailer ('amazon') 값 위에 덮어씀
+    """
+    keys = [base_retailer(retailer)]
+    if retailer != keys[0]:
+        keys.append(retailer)
+    policy = dict(DEFAULT_POLICY)
+    for key in keys:
+        policy.update(RETAILER_POLICIES.get(key, {}))
+    overrides = getattr(config, 'PACING_POLICIES', {}) if config else {}
+    policy.update(overrides.get('default', {}))
+    for key in keys:
+        policy.update(overrides.get(key, {}))
+    return policy
+
+
+def get_pacer(retailer):
+    """retailer (또는 'amazon_bsr' 같은 page type) 별 공유 Pacer"""
+    retailer = retailer.lower()
+    with _pacers_lock:
+        if retailer not in _pacers:
+            _pacers[retailer] = Pacer(retailer)
+        return _pacers[retailer]
+
+
+class Pacer:
+    """retailer 하나의 딜레이 상태"""
+
+    def __init__(self, retailer, policy=None):
+        self.retailer = retailer
+        self.policy = policy or get_policy(retailer)
+        self.adaptive = os.environ.get('PACING_MODE', 'adaptive').lower() != 'fixed'
+        self.delay = self.policy['base_delay']
+        self.consecutive_blocks = 0
+        self.markers = BLOCK_MARKERS['default'] + BLOCK_MARKERS.get(base_retailer(retailer), [])
+        self.stats = {'pages': 0, 'blocks': 0, 'slow': 0, 'slept': 0.0}
+        self.no_delay = False  # True면 wait() / pause()가 sleep 하지 않음 (snapshot 재파싱)
+        self._lock = threading.Lock()
+
+    def is_blocked(self, page_source=None, title=None, status_code=None):
+        """응답에서 차단 신호 검사"""
+        if status_code in BLOCK_STATUS_CODES:
+            return True
+        text = ' '.join(part[:MARKER_SCAN_CHARS] for part in (title, page_source) if part).lower()
+        return any(marker in text for marker in self.markers)
+
+    def observe(self, latency=None, page_source=None, title=None, status_code=None):
+        """
+        응답 1회 기록 후 딜레이 조정
+
+        Returns:
+            True if blocking was detected
+        """
+        blocked = self.is_blocked(page_source, title, status_code)
+        if blocked:
+            self.report_block(f"status {status_code}" if status_code in BLOCK_STATUS_CODES else 'marker')
+            return True
+
+        with self._lock:
+            self.stats['pages'] += 1
+            self.consecutive_blocks = 0
+            if not self.adaptive:
+                return False
+            if latency is not None and latency > self.policy['slow_latency']:
+                self.stats['slow'] += 1
+                self.delay = min(self.policy['max_delay'], self.delay * self.policy['slowdown'])
+            else:
+                self.delay = max(self.policy['min_delay'], self.delay * self.policy['speedup'])
+        return False
+
+    def report_block(self, reason=''):
+        """차단 감지 - 지수 backoff"""
+        with self._lock:
+            self.stats['pages'] += 1
+            self.stats['blocks'] += 1
+            self.consecutive_blocks += 1
+            if self.adaptive:
+                self.delay = min(self.policy['max_delay'],
+                                 max(self.delay, self.policy['base_delay']) * self.policy['backoff'])
+            delay = self.delay
+        print(f"[PACING] {self.retailer}: blocking detected ({reason}) - next delay {delay:.1f}s")
+
+    def timed_get(self, driver, url):
+        """
+        driver.get(url) + latency / title 기반 차단 신호 기록
+        (page_source는 읽지 않음 - snapshot 기록 순서에 영향 없도록)
+
+        Returns:
+            True if blocking was detected
+        """
+        started = time.monotonic()
+        driver.get(url)
+        latency = time.monotonic() - started
+        try:
+            title = driver.title
+        except Exception:
+            title = None
+        return self.observe(latency, title=title)
+
+    def next_delay(self, kind='page'):
+        """다음 wait() 딜레이 (jitter 포함)"""
+        with self._lock:
+            delay = self.delay
+        if kind == 'retry':
+            delay = min(self.policy['max_delay'], delay * self.policy['retry_factor'])
+        jitter = self.policy['jitter']
+        return delay * random.uniform(1 - jitter, 1 + jitter)
+
+    def wait(self, kind='page'):
+        """page 간 (또는 retry 전) 딜레이"""
+        if self.no_delay:
+            return 0.0
+        delay = self.next_delay(kind)
+        with self._lock:
+            self.stats['slept'] += delay
+        time.sleep(delay)
+        return delay
+
+    def pause(self, seconds):
+        """고정 딜레이 (page 안에서 scroll / click 후 등) - no_delay면 바로 return"""
+        if self.no_delay:
+            return 0.0
+        with self._lock:
+            self.stats['slept'] += seconds
+        time.sleep(seconds)
+        return seconds
+
+    def summary(self):
+        """실행 요약 문자열"""
+        return (f"[PACING] {self.retailer}: {self.stats['pages']} pages, {self.stats['blocks']} blocks, "
+                f"{self.stats['slow']} slow, {self.stats['slept']:.0f}s slept, current delay {self.delay:.1f}s")
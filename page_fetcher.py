@@ -0,0 +1,203 @@
+"""
+HTTP-first Page Fetcher for main / BSR listing pages
+plain HTTP로 먼저 가져오고, base_container 검증에 실패하면 browser로 fallback
+
+동작:
+1. requests.Session으로 GET (크롤러와 같은 User-Agent / 쿠키 사용)
+2. 응답 HTML에서 container_xpath 결과가 min_containers 이상인지 확인
+3. 실패하면 browser_fetch(url) 콜백으로 Selenium page_source 사용
+   - browser 사용 후에는 driver 쿠키를 HTTP session에 복사해서 다음 page에 재사용
+4. HTTP가 max_http_failures 번 연속 실패하면 이번 실행에서는 browser만 사용
+
+환경 변수:
+    FETCH_MODE=auto     HTTP 우선 + browser fallback (기본)
+    FETCH_MODE=browser  항상 browser 사용 (기존 동작)
+
+사용법:
+    self.fetcher = PageFetcher(self.xpaths['base_container']['xpath'],
+                               browser_fetch=self.load_page_with_browser,
+                               get_driver=lambda: self.driver,
+                               user_agent=USER_AGENT, min_containers=10)
+    page_source, tree, source = self.fetcher.fetch(url, page_number)
+
+pacer (pacing.Pacer)를 넘기면 HTTP / browser 응답의 latency와 차단 신호를 기록한다.
+(fetch 1번에 1번 - HTTP 실패 후 browser fallback이면 browser 결과, HTTP가 차단이었으면 그 차단 신호)
+"""
+
+import os
+import time
+
+import requests
+from lxml import html
+
+DEFAULT_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36')
+
+DEFAULT_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+
+def get_fetch_mode():
+    """환경 변수 FETCH_MODE 읽기 (auto / browser)"""
+    mode = os.environ.get('FETCH_MODE', 'auto').lower()
+    return mode if mode in ('auto', 'browser') else 'auto'
+
+
+class PageFetcher:
+    """HTTP 우선, browser fallback page fetcher"""
+
+    def __init__(self, container_xpath, browser_fetch, get_driver=None, user_agent=None, headers=None,
+                 cookies=None, min_containers=1, timeout=20, max_http_failures=2, snapshot_store=None,
+                 pacer=None):
+        """
+        Args:
+            container_xpath: 정상 page 판별용 base_container XPath
+            browser_fetch: (url, *browser_args) -> page_source (Selenium fallback 콜백)
+            get_driver: 현재 driver 반환 콜백 (browser 사용 후 쿠키 복사용)
+            user_agent: 크롤러 driver와 같은 User-Agent
+            headers: 추가 HTTP header
+            cookies: Selenium 쿠키 list (get_cookies() / pickle 형식) 또는 dict
+            min_containers: 정상 page로 인정할 최소 container 수
+            timeout: HTTP timeout (sec)
+            max_http_failures: 연속 실패 시 HTTP 시도 중단 기준
+            snapshot_store: 가져온 page를 저장할 SnapshotStore (선택)
+            pacer: 응답 latency / 차단 신호를 기록할 Pacer (선택)
+        """
+        self.container_xpath = container_xpath
+        self.browser_fetch = browser_fetch
+        self.get_driver = get_driver
+        self.min_containers = min_containers
+        self.timeout = timeout
+        self.max_http_failures = max_http_failures
+        self.snapshot_store = snapshot_store
+        self.pacer = pacer
+        self.http_enabled = get_fetch_mode() == 'auto'
+        self.consecutive_http_failures = 0
+        self.stats = {'http': 0, 'browser': 0}
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.headers['User-Agent'] = user_agent or DEFAULT_USER_AGENT
+        if headers:
+            self.session.headers.update(headers)
+        if cookies:
+            self.load_cookies(cookies)
+
+    def load_cookies(self, cookies):
+        """Selenium 쿠키 list 또는 dict를 HTTP session에 추가"""
+        if isinstance(cookies, dict):
+            for name, value in cookies.items():
+                self.session.cookies.set(name, value)
+            return
+
+        for cookie in cookies:
+            try:
+                self.session.cookies.set(
+                    cookie['name'], cookie['value'],
+                    domain=cookie.get('domain'), path=cookie.get('path', '/')
+                )
+            except Exception:
+                pass
+
+    def sync_cookies_from_driver(self, driver):
+        """browser에서 받은 쿠키를 HTTP session에 복사"""
+        if driver is None:
+            return
+        try:
+            self.load_cookies(driver.get_cookies())
+        except Exception:
+            pass
+
+    def count_containers(self, tree):
+        """검증용 container 수"""
+        try:
+            return len(tree.xpath(self.container_xpath))
+        except Exception:
+            return 0
+
+    def fetch_http(self, url):
+        """
+        HTTP로 page 가져오기
+
+        Returns:
+            (page_source, tree, response) - 검증 실패 시 page_source / tree는 None
+            response: pacer 기록용 (latency, page_source, status_code), 요청 자체가 실패하면 None
+        """
+        response_info = None
+        try:
+            started = time.monotonic()
+            response = self.session.get(url, timeout=self.timeout)
+            response_info = (time.monotonic() - started, response.text, response.status_code)
+            if response.status_code != 200:
+                print(f"[INFO] HTTP fetch returned {response.status_code} - falling back to browser")
+                return None, None, response_info
+
+            page_source = response.text
+            tree = html.fromstring(page_source)
+            container_count = self.count_containers(tree)
+            if container_count < self.min_containers:
+                print(f"[INFO] HTTP page has {container_count} containers "
+                      f"(need {self.min_containers}) - falling back to browser")
+                return None, None, response_info
+
+            print(f"[OK] HTTP fetch succeeded ({container_count} containers, {len(page_source)} bytes)")
+            return page_source, tree, response_info
+
+        except Exception as e:
+            print(f"[INFO] HTTP fetch failed ({e}) - falling back to browser")
+            return None, None, response_info
+
+    def observe(self, latency, page_source, status_code=None):
+        """pacer에 응답 기록 (fetch 1번에 1번만 호출)"""
+        if self.pacer is not None:
+            self.pacer.observe(latency, page_source=page_source, status_code=status_code)
+
+    def save_snapshot(self, url, page_source, source, browser_args):
+        """파싱에 사용한 page source를 snapshot으로 저장"""
+        if self.snapshot_store is not None:
+            self.snapshot_store.save(url, page_source, source=source, args=list(browser_args))
+
+    def fetch(self, url, *browser_args):
+        """
+        HTTP 우선 fetch, 실패 시 browser fallback
+
+        Args:
+            url: page URL
+            browser_args: browser_fetch에 그대로 넘길 추가 인자 (예: page_number)
+
+        Returns:
+            (page_source, tree, source) - source는 'http' 또는 'browser'
+        """
+        http_response = None
+        if self.http_enabled:
+            page_source, tree, http_response = self.fetch_http(url)
+            if page_source is not None:
+                self.observe(*http_response)
+                self.consecutive_http_failures = 0
+                self.stats['http'] += 1
+                self.save_snapshot(url, page_source, 'http', browser_args)
+                return page_source, tree, 'http'
+
+            self.consecutive_http_failures += 1
+            if self.consecutive_http_failures >= self.max_http_failures:
+                print(f"[INFO] HTTP failed {self.consecutive_http_failures} times in a row - using browser only")
+                self.http_enabled = False
+
+        started = time.monotonic()
+        page_source = self.browser_fetch(url, *browser_args)
+        if (http_response is not None and self.pacer is not None
+                and self.pacer.is_blocked(http_response[1], status_code=http_response[2])):
+            # HTTP 응답이 차단이었으면 그 신호를 기록 (browser fallback은 같은 fetch라 따로 세지 않음)
+            self.observe(*http_response)
+        else:
+            self.observe(time.monotonic() - started, page_source)
+        tree = html.fromstring(page_source)
+        self.stats['browser'] += 1
+        self.save_snapshot(url, page_source, 'browser', browser_args)
+        if self.get_driver is not None:
+            self.sync_cookies_from_driver(self.get_driver())
+        return page_source, tree, 'browser'
@@ -0,0 +1,202 @@
+"""
+Event-driven Page Waits
+page load / click 후 고정 time.sleep() 대신 준비 조건이 만족될 때까지만 기다림
+
+조건:
+- for_count:        element가 min_count 개 이상 나타날 때까지 (container 수 등)
+- for_dom_quiet:    DOM mutation이 quiet 초 동안 없을 때까지 (MutationObserver)
+- for_network_idle: in-flight request가 max_inflight 이하로 idle 초 동안 유지될 때까지
+                    (CDP Network 이벤트 - performance log 필요, 없으면 Resource Timing으로 대체)
+- for_absent:       element가 모두 사라질 때까지 (dialog close 등)
+- for_stale:        click 전 element가 DOM에서 사라질 때까지 (page 전환 확인)
+
+모든 wait는 timeout이 있고, 조건 이름 별 소요 시간 / timeout 횟수를 기록한다.
+timeout이 나도 예외를 던지지 않고 False를 반환 (호출하는 쪽에서 그대로 파싱 진행 여부 결정).
+
+재파싱 (--reparse, ReplayDriver) 때는 기다리지 않고 현재 snapshot 기준으로 바로 반환한다.
+no_delay = True 이면 (snapshot_store.disable_delays) 조건을 한 번만 확인하고 poll 하지 않는다.
+
+사용법:
+    from page_waits import PageWaits, enable_network_log
+
+    enable_network_log(chrome_options)          # setup_driver에서 (network idle 용)
+    self.waits = PageWaits()                    # worker-pool worker들도 공유 (driver는 매번 넘김)
+    self.waits.for_count(self.driver, By.CSS_SELECTOR, "[data-component-type='s-search-result']", 10)
+    self.waits.for_dom_quiet(self.driver, quiet=0.5, timeout=5)
+    self.waits.for_network_idle(self.driver, timeout=6)
+    print(self.waits.summary())
+"""
+
+import json
+import threading
+import time
+
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+
+DEFAULT_TIMEOUT = 15
+POLL_INTERVAL = 0.2
+
+# MutationObserver 설치 (page 전환으로 window가 바뀌면 다시 설치) 후 마지막 mutation 이후 경과 ms 반환
+DOM_QUIET_SCRIPT = """
+if (!window.__pageWaitMutation) {
+    window.__pageWaitMutation = {last: Date.now()};
+    new MutationObserver(function () { window.__pageWaitMutation.last = Date.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return Date.now() - window.__pageWaitMutation.last;
+"""
+
+RESOURCE_COUNT_SCRIPT = "return performance.getEntriesByType('resource').length;"
+
+NETWORK_START_EVENTS = ('Network.requestWillBeSent',)
+NETWORK_END_EVENTS = ('Network.loadingFinished', 'Network.loadingFailed')
+
+
+def enable_network_log(options):
+    """Chrome options에 performance log (CDP Network 이벤트) 활성화"""
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def is_replay(driver):
+    """재파싱용 ReplayDriver 여부"""
+    return getattr(driver, 'replay', False) is True
+
+
+class PageWaits:
+    """준비 조건 wait + 조건 별 소요 시간 기록"""
+
+    def __init__(self, default_timeout=DEFAULT_TIMEOUT, poll_interval=POLL_INTERVAL):
+        self.default_timeout = default_timeout
+        self.poll_interval = poll_interval
+        self.stats = {}
+        self.no_delay = False  # True면 poll 없이 조건 1회 확인 (snapshot 재파싱)
+        self._lock = threading.Lock()
+
+    def _record(self, name, elapsed, ok):
+        with self._lock:
+            stat = self.stats.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            stat['count'] += 1
+            stat['total'] += elapsed
+            stat['max'] = max(stat['max'], elapsed)
+            if not ok:
+                stat['timeouts'] += 1
+
+    def until(self, name, condition, timeout=None):
+        """
+        condition()이 True가 될 때까지 poll
+
+        Returns:
+            True if the condition was met before timeout
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        ok = False
+        while True:
+            try:
+                ok = bool(condition())
+            except WebDriverException:
+                # stale element / page 전환 중 script 실패 등은 아직 준비 안 된 것으로 처리
+                ok = False
+            if ok or self.no_delay or time.monotonic() >= deadline:
+                break
+            time.sleep(self.poll_interval)
+        self._record(name, time.monotonic() - started, ok)
+        return ok
+
+    def for_count(self, driver, by, value, min_count=1, timeout=None, name=None):
+        """element가 min_count 개 이상 나타날 때까지"""
+        name = name or f"count:{value[:40]}"
+        if is_replay(driver):
+            return len(driver.find_elements(by, value)) >= min_count
+        return self.until(name, lambda: len(driver.find_elements(by, value)) >= min_count, timeout)
+
+    def for_absent(self, driver, by, value, timeout=None, name=None):
+        """element가 모두 사라질 때까지 (dialog close 등)"""
+        name = name or f"absent:{value[:40]}"
+        if is_replay(driver):
+            return True
+        return self.until(name, lambda: not driver.find_elements(by, value), timeout)
+
+    def for_dom_quiet(self, driver, quiet=0.5, timeout=None, name='dom_quiet'):
+        """DOM mutation이 quiet 초 동안 없을 때까지"""
+        if is_replay(driver):
+            return True
+        quiet_ms = quiet * 1000
+        return self.until(name, lambda: (driver.execute_script(DOM_QUIET_SCRIPT) or 0) >= quiet_ms, timeout)
+
+    def for_network_idle(self, driver, idle=0.5, max_inflight=0, timeout=None, name='network_idle'):
+        """
+        in-flight request가 max_inflight 이하로 idle 초 동안 유지될 때까지
+
+        CDP Network 이벤트 (performance log)로 request 시작 / 종료를 추적한다.
+        performance log가 꺼져 있으면 Resource Timing entry 수가 idle 초 동안 그대로인지로 판단.
+        """
+        if is_replay(driver):
+            return True
+
+        inflight = set()
+        state = {'idle_since': None, 'resources': None, 'use_log': True}
+
+        def drain_network_events():
+            for entry in driver.get_log('performance'):
+                try:
+                    message = json.loads(entry['message'])['message']
+                except (KeyError, ValueError):
+                    continue
+                method = message.get('method')
+                request_id = message.get('params', {}).get('requestId')
+                if method in NETWORK_START_EVENTS:
+                    inflight.add(request_id)
+                elif method in NETWORK_END_EVENTS:
+                    inflight.discard(request_id)
+
+        def is_idle():
+            if state['use_log']:
+                try:
+                    drain_network_events()
+                    busy = len(inflight) > max_inflight
+                except Exception:
+                    state['use_log'] = False
+            if not state['use_log']:
+                resources = driver.execute_script(RESOURCE_COUNT_SCRIPT)
+                busy = resources != state['resources']
+                state['resources'] = resources
+
+            now = time.monotonic()
+            if busy:
+                state['idle_since'] = None
+                return False
+            if state['idle_since'] is None:
+                state['idle_since'] = now
+            return now - state['idle_since'] >= idle
+
+        return self.until(name, is_idle, timeout)
+
+    def for_stale(self, driver, element, timeout=None, name='stale'):
+        """click 전에 잡아둔 element가 DOM에서 사라질 때까지 (page 전환 확인)"""
+        if is_replay(driver):
+            return True
+
+        def is_stale():
+            try:
+                element.is_enabled()
+                return False
+            except StaleElementReferenceException:
+                return True
+
+        return self.until(name, is_stale, timeout)
+
+    def summary(self):
+        """조건 별 wait 요약 문자열"""
+        if not self.stats:
+            return "[WAITS] no waits recorded"
+        parts = []
+        for name, stat in sorted(self.stats.items()):
+            average = stat['total'] / stat['count']
+            part = f"{name}: {stat['count']}x avg {average:.1f}s max {stat['max']:.1f}s"
+            if stat['timeouts']:
+                part += f", {stat['timeouts']} timeouts"
+            parts.append(part)
+        return "[WAITS] " + " | ".join(parts)
@@ -0,0 +1,203 @@
+"""
+Price Parsing (vectorised)
+해외 Amazon scraper (es / fr / it / de / ind 등) 공용 가격 파서
+
+가격 문자열 column 전체 (list / pandas Series / NumPy array)를 국가 코드와 함께 받아서
+pandas str 연산 한 번으로 (float array, valid mask)를 돌려준다.
+scraper마다 따로 있던 parse_price_by_country / parse_german_price / parse_italian_price / parse_rupee_price의
+locale 규칙을 여기 한 곳으로 모음 -> 크롤링 중 1건 파싱과 과거 CSV 재처리가 같은 결과
+
+locale 규칙:
+- 소수점 쉼표 (de / es / fr / it / nl / pl): "1.299,00 €" "1 299,99 €" "61,84 €" "1299.99" -> 1299.0 / 1299.99 / 61.84
+  de만: 소수 부분이 빠진 4자리 숫자 "1299" 는 cent로 간주 (a-price-whole + fraction이 붙어서 읽힌 경우) -> 12.99
+- 소수점 점 (gb / usa / in / jp): "£1,299.00" "₹1,23,456.00" "¥128,000" -> 1299.0 / 123456.0 / 128000.0
+- 무효: 글자만 있는 값, 숫자 뒤에 글자 ("2 TB"), "was €..." / "list price" / "buy used"
+  es만: 통화 기호 없는 순수 숫자 "165" (165 문제)
+- 범위: PRICE_RANGES (기본 10 ~ 10000, 밖이면 invalid)
+
+회귀 corpus: price_parsing_corpus.json ([country, 가격 문자열, 기대값 또는 null])
+locale 규칙을 바꿀 때는 python price_parsing.py --check 가 통과해야 한다.
+
+사용법:
+    from price_parsing import parse_prices, parse_price
+
+    prices, valid = parse_prices(df['retailprice'], 'de')   # float64 array (invalid는 NaN), bool mask
+    price = parse_price('1.299,00 €', 'de')                  # '1299.00' (scraper 1건 용, invalid면 None)
+
+Usage (CLI):
+    python price_parsing.py --check                              # 회귀 corpus 검사
+    python price_parsing.py results.csv --country es             # CSV 재처리 (retailprice -> price_numeric / price_valid)
+    python price_parsing.py results.csv --country es --column price --output fixed.csv
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_parsing_corpus.json')
+
+DECIMAL_COMMA_COUNTRIES = {'de', 'es', 'fr', 'it', 'nl', 'pl'}
+DECIMAL_POINT_COUNTRIES = {'gb', 'uk', 'usa', 'us', 'in', 'jp'}
+
+# 국가 별 유효 가격 범위 (현지 통화)
+DEFAULT_RANGE = (10, 10000)
+PRICE_RANGES = {
+    'in': (100, 1000000),
+    'jp': (100, 2000000),
+}
+
+# 통화 기호 / 공백 (nbsp, narrow nbsp 포함)
+STRIP_PATTERN = r'[€$£¥￥₹\s  ]|EUR|Rs\.?'
+
+INVALID_PATTERN = r'^[^\d]*$|^\d+\s*[a-zA-Z]|was\s*[€$£¥₹]|list\s*price|buy\s*used'
+
+# 통화 기호 없는 순수 숫자 ("165")를 무효로 보는 국가 (es: 별점 / 리뷰 수 등이 가격으로 읽히던 "165 문제" 방지)
+BARE_NUMBER_INVALID_COUNTRIES = {'es'}
+BARE_NUMBER_PATTERN = r'\d+'
+
+# (정수부, 소수부) - 천 단위 구분자는 정수부에 남아 있고 나중에 제거
+DECIMAL_COMMA_PATTERN = r'^(?P<whole>\d{1,3}(?:\.\d{3})+|\d+)(?:,(?P<fraction>\d{1,2}))?$'
+DECIMAL_COMMA_POINT_PATTERN = r'^(?P<whole>\d+)\.(?P<fraction>\d{1,2})$'
+DECIMAL_POINT_PATTERN = r'^(?P<whole>\d{1,3}(?:,\d{2,3})+|\d+)(?:\.(?P<fraction>\d{1,2}))?$'
+
+
+def _as_series(values):
+    """list / Series / ndarray -> 문자열 Series (index 0..n-1, None은 NA)"""
+    if isinstance(values, pd.Series):
+        series = values.reset_index(drop=True)
+    else:
+        series = pd.Series(list(values) if not isinstance(values, np.ndarray) else values, dtype=object)
+    return series.astype(object).where(series.notna(), None).astype('string')
+
+
+def _extract(cleaned, pattern):
+    """pattern의 whole / fraction group (match 안 되면 NA)"""
+    return cleaned.str.extract(pattern)
+
+
+def parse_price_column(values, country_code, price_range=None):
+    """
+    가격 column 파싱
+
+    Returns:
+        (prices, valid, canonical)
+        prices: float64 ndarray (invalid는 NaN)
+        valid: bool ndarray
+        canonical: object ndarray - scraper가 저장하던 문자열 형식 ('1299.99', '599', invalid는 None)
+    """
+    country = (country_code or '').lower()
+    low, high = price_range or PRICE_RANGES.get(country, DEFAULT_RANGE)
+
+    text = _as_series(values).str.strip()
+    invalid = text.str.contains(INVALID_PATTERN, case=False, regex=True).fillna(True).astype(bool)
+    if country in BARE_NUMBER_INVALID_COUNTRIES:
+        invalid |= text.str.fullmatch(BARE_NUMBER_PATTERN).fillna(False).astype(bool)
+    cleaned = text.str.replace(STRIP_PATTERN, '', regex=True)
+
+    if country in DECIMAL_COMMA_COUNTRIES:
+        parts = _extract(cleaned, DECIMAL_COMMA_PATTERN)
+        point_parts = _extract(cleaned, DECIMAL_COMMA_POINT_PATTERN)
+        # "1299.99" (a-offscreen 값 등 점 소수점)은 그대로
+        use_point = parts['whole'].isna() & point_parts['whole'].notna()
+        whole = parts['whole'].where(~use_point, point_parts['whole']).str.replace('.', '', regex=False)
+        fraction = parts['fraction'].where(~use_point, point_parts['fraction'])
+    else:
+        parts = _extract(cleaned, DECIMAL_POINT_PATTERN)
+        whole = parts['whole'].str.replace(',', '', regex=False)
+        fraction = parts['fraction']
+        if country == 'jp':
+            fraction = fraction.where(fraction.isna(), None)
+
+    canonical = whole.where(fraction.isna(), whole + '.' + fraction.fillna(''))
+    prices = pd.to_numeric(canonical, errors='coerce').astype('float64')
+
+    if country == 'de':
+        # "1299" (소수 부분 없이 붙어서 읽힌 4자리) -> 12.99
+        cents = cleaned.str.fullmatch(r'\d{4}').fillna(False).astype(bool)
+        cent_prices = pd.to_numeric(cleaned.where(cents), errors='coerce') / 100
+        prices = prices.where(~cents, cent_prices)
+        canonical = canonical.where(~cents, cent_prices.map(lambda v: f"{v:.2f}" if pd.notna(v) else None))
+
+    valid = (~invalid & prices.notna() & prices.between(low, high)).to_numpy(dtype=bool)
+    prices = prices.where(valid).to_numpy(dtype='float64')
+    canonical = canonical.astype(object).where(valid, None).to_numpy(dtype=object)
+    return prices, valid, canonical
+
+
+def parse_prices(values, country_code, price_range=None):
+    """가격 column -> (float64 ndarray, valid mask)"""
+    prices, valid, _ = parse_price_column(values, country_code, price_range)
+    return prices, valid
+
+
+def parse_price(price_text, country_code, price_range=None):
+    """가격 문자열 1개 -> scraper 저장 형식 문자열 ('1299.99'), invalid면 None"""
+    if price_text is None:
+        return None
+    _, _, canonical = parse_price_column([price_text], country_code, price_range)
+    return canonical[0]
+
+
+def load_corpus(path=CORPUS_FILE):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def check_corpus(path=CORPUS_FILE):
+    """
+    회귀 corpus 검사 (국가 별로 한 번씩 vectorised 파싱)
+
+    Returns:
+        실패 목록 [(country, text, expected, actual)]
+    """
+    failures = []
+    corpus = load_corpus(path)
+    by_country = {}
+    for country, text, expected in corpus:
+        by_country.setdefault(country, []).append((text, expected))
+
+    for country, cases in by_country.items():
+        prices, valid, _ = parse_price_column([text for text, _ in cases], country)
+        for (text, expected), price, ok in zip(cases, prices, valid):
+            actual = float(price) if ok else None
+            if (expected is None) != (actual is None) or (
+                    expected is not None and abs(expected - actual) > 0.005):
+                failures.append((country, text, expected, actual))
+    print(f"[INFO] {len(corpus)} price strings, {len(by_country)} countries")
+    return failures
+
+
+def reprocess_csv(path, country_code, column='retailprice', output=None):
+    """과거 결과 CSV 재처리: price_numeric / price_valid 컬럼 추가"""
+    df = pd.read_csv(path, dtype={column: str}, encoding='utf-8-sig')
+    prices, valid = parse_prices(df[column], country_code)
+    df['price_numeric'] = prices
+    df['price_valid'] = valid
+    output = output or path
+    df.to_csv(output, index=False, encoding='utf-8-sig')
+    print(f"[OK] {output}: {int(valid.sum())}/{len(df)} valid prices")
+    return df
+
+
+def get_arg_value(args, name, default=None):
+    if name in args and args.index(name) + 1 < len(args):
+        return args[args.index(name) + 1]
+    return default
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if '--check' in args:
+        failures = check_corpus()
+        for country, text, expected, actual in failures:
+            print(f"  [FAIL] {country} {text!r}: expected {expected}, got {actual}")
+        print("[OK] Price corpus passed" if not failures else f"[ERROR] {len(failures)} corpus failures")
+        sys.exit(1 if failures else 0)
+    elif args and not args[0].startswith('--'):
+        reprocess_csv(args[0], get_arg_value(args, '--country', 'usa'),
+                      get_arg_value(args, '--column', 'retailprice'), get_arg_value(args, '--output'))
+    else:
+        print(__doc__)
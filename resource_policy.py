@@ -0,0 +1,130 @@
+"""
+Browser Resource Policy
+크롤러 browser에서 이미지 / 동영상 / 폰트 / 3rd-party analytics 요청을 CDP Network.setBlockedURLs로 차단
+
+- 추출에 필요한 것은 HTML / script / XHR 뿐이므로 나머지는 받지 않음 (metered egress, render 시간 절약)
+- retailer / page_type 별로 차단할 분류(category)와 allow-list를 지정
+- allow-list: setBlockedURLs는 "차단 패턴"만 받고 예외를 표현할 수 없으므로, allow 패턴과 겹치는 차단 패턴
+  (tracker host 등)을 빼는 것만 가능하다. 확장자 기반 분류(images / fonts 등)를 특정 host만 허용할 수는 없으므로,
+  그 리소스가 필요한 page에서는 분류 자체를 block에서 뺀다
+  (예: 'amazon:login'은 captcha 이미지, walmart는 PerimeterX challenge 이미지 / 폰트 때문에 images / fonts를 차단하지 않음)
+  어떤 차단 패턴과도 겹치지 않는 allow 패턴은 효과가 없으므로 경고를 출력
+- 설정은 tab(target) 단위로 유지되므로 driver 생성 직후 한 번 적용하면 이후 navigation에도 유지
+
+설정 (config.py, 선택):
+    RESOURCE_POLICIES = {
+        'walmart:detail': {'block': ['media', 'trackers'], 'allow': ['*branch.io*']},
+        'amazon': {'block': ['images', 'media', 'fonts', 'trackers']},
+    }
+환경 변수:
+    RESOURCE_BLOCKING=off   차단하지 않음 (디버깅 / 화면 확인용)
+
+사용법:
+    from resource_policy import apply_resource_policy
+
+    apply_resource_policy(self.driver, 'bestbuy', 'detail')
+"""
+
+import os
+
+try:
+    import config
+except ImportError:
+    config = None
+
+# 분류 별 차단 URL 패턴 (setBlockedURLs 와일드카드 '*')
+BLOCK_CATEGORIES = {
+    'images': ['*.jpg*', '*.jpeg*', '*.png*', '*.gif*', '*.webp*', '*.avif*', '*.bmp*', '*.ico*', '*.svg*'],
+    'media': ['*.mp4*', '*.webm*', '*.m3u8*', '*.mpd*', '*.mp3*', '*.m4a*', '*.ogg*'],
+    'fonts': ['*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*'],
+    'trackers': [
+        '*google-analytics.com*', '*googletagmanager.com*', '*googleadservices.com*',
+        '*doubleclick.net*', '*googlesyndication.com*', '*connect.facebook.net*',
+        '*facebook.com/tr*', '*hotjar.com*', '*scorecardresearch.com*', '*quantserve.com*',
+        '*criteo.com*', '*criteo.net*', '*adsrvr.org*', '*bat.bing.com*', '*analytics.tiktok.com*',
+        '*ct.pinterest.com*', '*snap.licdn.com*', '*amazon-adsystem.com*', '*demdex.net*',
+        '*omtrdc.net*', '*everesttech.net*', '*clarity.ms*', '*branch.io*',
+    ],
+}
+
+DEFAULT_POLICY = {'block': ['images', 'media', 'fonts', 'trackers'], 'allow': []}
+
+# key: 'retailer' 또는 'retailer:page_type' (page_type 설정이 우선)
+POLICIES = {
+    'amazon': DEFAULT_POLICY,
+    # 로그인 때는 captcha 이미지를 사람이 봐야 함
+    'amazon:login': {'block': ['media', 'fonts', 'trackers'], 'allow': []},
+    'bestbuy': DEFAULT_POLICY,
+    # PerimeterX "press & hold" challenge가 px-cdn.net 등의 이미지 / 폰트를 사용 -> host만 허용할 수 없으므로 차단하지 않음
+    'walmart': {'block': ['media', 'trackers'], 'allow': []},
+}
+
+
+def is_enabled():
+    """환경 변수 RESOURCE_BLOCKING=off 이면 차단하지 않음"""
+    return os.environ.get('RESOURCE_BLOCKING', 'on').lower() not in ('off', '0', 'false', 'no')
+
+
+def get_policy(retailer, page_type=None):
+    """POLICIES <- config.RESOURCE_POLICIES 순서로 덮어쓴 policy ('retailer:page_type' 우선)"""
+    overrides = getattr(config, 'RESOURCE_POLICIES', {}) if config else {}
+    keys = [retailer] + ([f"{retailer}:{page_type}"] if page_type else [])
+    policy = dict(DEFAULT_POLICY)
+    for key in keys:
+        policy.update(POLICIES.get(key, {}))
+        policy.update(overrides.get(key, {}))
+    return policy
+
+
+def _pattern_core(pattern):
+    """'*px-cdn.net*' -> 'px-cdn.net' (allow / block 패턴 비교용)"""
+    return pattern.strip('*').lower()
+
+
+def build_blocked_urls(policy):
+    """policy -> setBlockedURLs에 넘길 URL 패턴 목록"""
+    allow = [_pattern_core(p) for p in policy.get('allow', []) if p]
+    used = set()
+    blocked = []
+    for category in policy.get('block', []):
+        for pattern in BLOCK_CATEGORIES.get(category, [category]):
+            core = _pattern_core(pattern)
+            # allow-list와 겹치는 패턴은 차단하지 않음
+            overlapping = [a for a in allow if core in a or a in core]
+            if overlapping:
+                used.update(overlapping)
+                continue
+            if pattern not in blocked:
+                blocked.append(pattern)
+    for a in allow:
+        if a not in used:
+            print(f"[WARNING] Resource policy allow pattern '*{a}*' matches no block pattern - has no effect "
+                  f"(setBlockedURLs cannot exempt a host from a blocked category)")
+    return blocked
+
+
+def apply_resource_policy(driver, retailer, page_type=None):
+    """
+    driver에 retailer / page_type policy 적용
+
+    Returns:
+        차단 패턴 목록 (적용하지 않았으면 빈 list)
+    """
+    if not is_enabled():
+        return []
+
+    policy = get_policy(retailer, page_type)
+    blocked = build_blocked_urls(policy)
+    if not blocked:
+        return []
+
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked})
+        categories = ', '.join(policy.get('block', []))
+        print(f"[OK] Resource policy {retailer}{':' + page_type if page_type else ''}: "
+              f"blocking {categories} ({len(blocked)} patterns)")
+    except Exception as e:
+        print(f"[WARNING] Could not apply resource policy: {e}")
+        return []
+    return blocked
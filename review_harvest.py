@@ -0,0 +1,247 @@
+"""
+Incremental Review Harvester
+detail 크롤러가 review page를 최신순으로 읽으면서, 이전 실행에서 이미 본 review ID가 나오면 바로 paging을 멈추고
+새 review만 저장하도록 상품 별 review ID를 기록
+
+- review_harvest_seen 테이블: (retailer, product_key, review_id) 당 1 row + 처음 본 batch_id
+- review ID: Amazon은 card의 고정 ID (customer_review-R1BFCX39NH21NH -> R1BFCX39NH21NH),
+  ID가 없는 retailer (Walmart / BestBuy card 등)는 review 본문 hash ('h:' + sha1 16자리)
+- review page는 최신순 (REVIEW_SORT_PARAMS)으로 열어야 "처음 나온 known review = 그 뒤는 전부 known"이 성립
+- 상품을 처음 보면 (known ID 없음) 기존처럼 최대 REVIEW_HARVEST_MAX 개 수집
+- --reparse: 같은 batch_id보다 먼저 기록된 ID만 known으로 보므로 live 실행과 같은 지점에서 멈춤 (snapshot 순서 유지)
+- ID 기록은 detail record와 같은 DetailIngestor record로 (SEEN_TABLE merge 테이블)
+  -> flush가 성공해야 detail row와 같은 transaction으로 기록되므로, 적재되지 않은 review를 다음 실행이
+     known으로 보고 건너뛰는 일이 없음
+
+설정 (환경 변수):
+    REVIEW_HARVEST_MAX=20       한 번에 수집할 최대 review 수
+    REVIEW_HARVEST_FULL=1       known ID를 무시하고 매번 최대 개수까지 다시 읽기 (기존 동작)
+
+사용법:
+    from review_harvest import SEEN_TABLE, SEEN_TABLE_SPEC, ReviewHarvester, ensure_seen_table, review_list_url
+
+    self.ingestor = DetailIngestor('amazon', {'Amazon_tv_detail_crawled': DETAIL_COLUMNS, SEEN_TABLE: SEEN_TABLE_SPEC})
+    ensure_seen_table(cursor)                                          # connect_db
+
+    harvester = ReviewHarvester('amazon', product_url, self.batch_id)
+    self.driver.get(review_list_url('amazon', review_url))            # 최신순
+    while harvester.add_page(cards):                                   # cards: [(review_id, text), ...] (page 순서)
+        ... next page ...
+    content = ', '.join(f"{idx}-{text}" for idx, text in enumerate(harvester.texts(), 1))
+    self.ingestor.add({'Amazon_tv_detail_crawled': row, SEEN_TABLE: harvester.seen_rows()})   # save_to_db
+
+Usage (CLI):
+    python review_harvest.py                  # retailer 별 기록된 상품 / review ID 수
+    python review_harvest.py --reset amazon   # 해당 retailer 기록 삭제 (다음 실행은 전체 수집)
+"""
+
+import hashlib
+import os
+import re
+import sys
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from db_manager import get_connection, transaction
+
+MAX_REVIEWS = int(os.environ.get('REVIEW_HARVEST_MAX', 20))
+FULL_HARVEST = os.environ.get('REVIEW_HARVEST_FULL', '').lower() in ('1', 'true', 'yes')
+
+SEEN_TABLE = 'review_harvest_seen'
+SEEN_COLUMNS = ['retailer', 'product_key', 'review_id', 'first_batch_id']
+SEEN_TABLE_SPEC = {'columns': SEEN_COLUMNS, 'merge': True}  # DetailIngestor merge 테이블 (이미 있는 ID는 건너뜀)
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS review_harvest_seen (
+        retailer VARCHAR(20) NOT NULL,
+        product_key VARCHAR(200) NOT NULL,
+        review_id VARCHAR(100) NOT NULL,
+        first_batch_id TEXT NOT NULL,
+        first_seen_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (retailer, product_key, review_id)
+    )
+"""
+
+# review page 최신순 정렬 query parameter
+REVIEW_SORT_PARAMS = {
+    'amazon': {'sortBy': 'recent'},
+    'walmart': {'sort': 'submission-desc'},
+    'bestbuy': {'variant': 'A', 'sort': 'MOST_RECENT'},
+}
+
+# product URL -> 상품 key (같은 상품의 URL query / slug가 바뀌어도 같은 key)
+PRODUCT_KEY_PATTERNS = [
+    re.compile(r'/(?:dp|gp/product|product-reviews)/([A-Z0-9]{10})'),  # Amazon ASIN
+    re.compile(r'/ip/(?:[^/?]+/)?(\d+)'),                              # Walmart item id
+    re.compile(r'/(\d{6,8})\.p'),                                       # BestBuy SKU
+    re.compile(r'[?&]skuId=(\d+)'),
+]
+
+AMAZON_REVIEW_ID_PATTERN = re.compile(r'customer_review-(R[A-Z0-9]+)')
+
+_table_ready = False
+
+
+def product_key(product_url):
+    """product URL -> 상품 key (ASIN / item id / SKU, 없으면 query 뺀 URL)"""
+    for pattern in PRODUCT_KEY_PATTERNS:
+        match = pattern.search(product_url or '')
+        if match:
+            return match.group(1)
+    parts = urlsplit(product_url or '')
+    return f"{parts.netloc}{parts.path}"[:200]
+
+
+def text_review_id(text):
+    """고정 ID가 없는 review card -> 본문 hash ID"""
+    normalized = ' '.join((text or '').split()).lower()
+    return 'h:' + hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def amazon_review_id(card_id):
+    """'customer_review-R1BFCX39NH21NH' / 'R1BFCX39NH21NH-review-card' -> 'R1BFCX39NH21NH'"""
+    match = AMAZON_REVIEW_ID_PATTERN.search(card_id or '')
+    if match:
+        return match.group(1)
+    match = re.match(r'(R[A-Z0-9]+)-review-card', card_id or '')
+    return match.group(1) if match else None
+
+
+def with_query(url, **params):
+    """URL에 query parameter 추가 / 교체"""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update(params)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+def review_list_url(retailer, url):
+    """review page URL -> 최신순 정렬 URL"""
+    return with_query(url, **REVIEW_SORT_PARAMS.get(retailer, {}))
+
+
+def walmart_reviews_url(product_url):
+    """Walmart product URL -> 최신순 review page URL (item id가 없으면 None)"""
+    match = PRODUCT_KEY_PATTERNS[1].search(product_url or '')
+    if not match:
+        return None
+    return review_list_url('walmart', f"https://www.walmart.com/reviews/product/{match.group(1)}")
+
+
+def bestbuy_reviews_url(product_url):
+    """BestBuy product URL (/site/<slug>/<sku>.p) -> 최신순 review page URL (형식이 다르면 None)"""
+    match = re.search(r'bestbuy\.com/site/([^/?]+)/(\d+)\.p', product_url or '')
+    if not match:
+        return None
+    return review_list_url('bestbuy', f"https://www.bestbuy.com/site/reviews/{match.group(1)}/{match.group(2)}")
+
+
+def ensure_seen_table(cursor):
+    """review_harvest_seen 테이블 생성 (process 당 1번)"""
+    global _table_ready
+    if not _table_ready:
+        cursor.execute(CREATE_TABLE_SQL)
+        _table_ready = True
+
+
+class ReviewHarvester:
+    """상품 1개의 review 수집 상태 (known ID 로딩 -> page 별 추가 -> 새 ID row)"""
+
+    def __init__(self, retailer, product_url, batch_id, max_reviews=MAX_REVIEWS, full=FULL_HARVEST):
+        self.retailer = retailer
+        self.product_key = product_key(product_url)
+        self.batch_id = str(batch_id)
+        self.max_reviews = max_reviews
+        self.known = set() if full else self.load_known()
+        self.reviews = []  # [(review_id, text)] 새 review, page 순서
+        self.seen = set()
+        self.stop_id = None  # paging을 멈추게 한 known review ID
+        self.pages = 0
+
+    def load_known(self):
+        """이 batch 이전에 기록된 review ID (DB 오류면 빈 set -> 전체 수집)"""
+        try:
+            with transaction() as cursor:
+                ensure_seen_table(cursor)
+                cursor.execute("""
+                    SELECT review_id
+                    FROM review_harvest_seen
+                    WHERE retailer = %s AND product_key = %s AND first_batch_id < %s
+                """, (self.retailer, self.product_key, self.batch_id))
+                return {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            print(f"  [WARNING] Could not load known review IDs: {e}")
+            return set()
+
+    @property
+    def done(self):
+        return self.stop_id is not None or len(self.reviews) >= self.max_reviews
+
+    def add_page(self, cards):
+        """
+        review page 1개의 card 추가 (page에 보이는 순서 = 최신순)
+
+        Args:
+            cards: [(review_id, text)] - review_id가 None이면 본문 hash 사용
+
+        Returns:
+            다음 page를 더 읽어야 하면 True (known review를 만났거나 최대 개수면 False)
+        """
+        self.pages += 1
+        for review_id, text in cards:
+            if self.done:
+                break
+            review_id = review_id or text_review_id(text)
+            if review_id in self.known:
+                self.stop_id = review_id
+                break
+            if review_id in self.seen:
+                continue
+            self.seen.add(review_id)
+            self.reviews.append((review_id, text))
+        return not self.done
+
+    def texts(self):
+        return [text for _, text in self.reviews]
+
+    def seen_rows(self):
+        """새 review ID의 SEEN_TABLE row (SEEN_COLUMNS 순서) - detail record와 같은 ingestor record로 넘김"""
+        return [(self.retailer, self.product_key, review_id, self.batch_id) for review_id, _ in self.reviews]
+
+    def summary(self):
+        if self.stop_id:
+            reason = f"stopped at known review {self.stop_id}"
+        elif len(self.reviews) >= self.max_reviews:
+            reason = f"max {self.max_reviews}"
+        else:
+            reason = "no more pages"
+        return (f"[REVIEWS] {self.product_key}: {len(self.reviews)} new "
+                f"({len(self.known)} known, {self.pages} page(s), {reason})")
+
+
+def print_status():
+    conn = get_connection(autocommit=True)
+    try:
+        rows = conn.execute("""
+            SELECT retailer, COUNT(DISTINCT product_key), COUNT(*), MAX(first_batch_id)
+            FROM review_harvest_seen
+            GROUP BY retailer
+            ORDER BY retailer
+        """, fetch='all')
+    finally:
+        conn.close()
+    for retailer, products, reviews, last_batch in rows:
+        print(f"{retailer:<10} {products:>6} products  {reviews:>8} review IDs  last batch {last_batch}")
+
+
+def reset(retailer):
+    with transaction() as cursor:
+        cursor.execute("DELETE FROM review_harvest_seen WHERE retailer = %s", (retailer,))
+        print(f"[OK] Removed {cursor.rowcount} {retailer} review IDs")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if '--reset' in args and args.index('--reset') + 1 < len(args):
+        reset(args[args.index('--reset') + 1])
+    else:
+        print_status()
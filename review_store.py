@@ -0,0 +1,310 @@
+"""
+Review Store
+tv_retail_com의 긴 review 텍스트 (detailed_review_content / summarized_review_content / top_mentions)를
+retail_reviews 테이블로 분리해서 review 하나를 한 번만 저장하고, tv_retail_com row는 hash로 참조
+
+    retail_reviews (retailer, product_key, review_hash) UNIQUE
+        retailer        tv_retail_com.account_name ('Bestbuy' / 'Walmart' / 'Amazon')
+        product_key     ASIN / item id / SKU (review_harvest.product_key)
+        review_hash     sha1(review_kind + 정규화 텍스트)
+        review_kind     'review' / 'summary' / 'top_mentions'
+
+    tv_retail_com 참조 컬럼 (REVIEW_REF_COLUMNS)
+        review_product_key      VARCHAR(200)
+        detailed_review_hashes  TEXT[]       (review 순서 유지)
+        summarized_review_hash  CHAR(40)
+        top_mentions_hash       CHAR(40)
+
+-> 가격 / 순위만 읽는 query가 매주 반복되는 review TEXT (TOAST)를 scan하지 않음
+-> 텍스트가 필요하면 tv_retail_com_reviews view (원래 컬럼 이름으로 텍스트를 다시 붙여줌, detailed review는 ' | '로 연결)
+
+- 새 row: 크롤러가 review_refs()로 참조 값 + retail_reviews row를 만들고,
+  DetailIngestor의 merge 테이블 (REVIEW_TABLE_SPEC)로 같은 transaction에 적재 (이미 있는 review는 건너뜀)
+- 기존 row: python review_store.py 가 id 순서 chunk로 텍스트를 옮기고 원래 컬럼은 NULL
+  (공간 회수는 그 뒤 VACUUM FULL tv_retail_com 또는 pg_repack)
+  NULL로 만들기 전에 backup_tv_retail_com (tv_retail_com + retail_reviews segment)을 먼저 실행하고, 실패하면 중단
+  -> restore 때 hash 참조와 텍스트가 같이 돌아옴
+
+사용법:
+    from review_store import REVIEW_REF_COLUMNS, REVIEW_TABLE, REVIEW_TABLE_SPEC, review_refs
+
+    refs, review_rows = review_refs('Bestbuy', product_url, detailed_reviews, None, top_mentions, self.batch_id)
+    retail_row = base_row + refs                                    # TV_RETAIL_COLUMNS + REVIEW_REF_COLUMNS
+    self.ingestor.add({REVIEW_TABLE: review_rows, 'tv_retail_com': retail_row})
+
+Usage (CLI):
+    python review_store.py            # 테이블 / 컬럼 / view 생성 + backup + 기존 tv_retail_com 텍스트 이동
+    python review_store.py --status   # review 수 / 아직 옮기지 않은 row 수
+"""
+
+import hashlib
+import sys
+
+from review_harvest import product_key
+
+# 한 번에 옮기는 tv_retail_com row 수
+EXTERNALIZE_CHUNK_SIZE = 2000
+
+REVIEW_TABLE = 'retail_reviews'
+REVIEW_COLUMNS = ['retailer', 'product_key', 'review_hash', 'review_kind', 'review_text', 'first_batch_id']
+# DetailIngestor merge 테이블 (record 값 = row 목록, 이미 있는 review는 건너뜀)
+REVIEW_TABLE_SPEC = {'columns': REVIEW_COLUMNS, 'merge': True}
+
+REVIEW_REF_COLUMNS = ['review_product_key', 'detailed_review_hashes', 'summarized_review_hash', 'top_mentions_hash']
+
+REVIEW_REF_TYPES = {
+    'review_product_key': 'VARCHAR(200)',
+    'detailed_review_hashes': 'TEXT[]',
+    'summarized_review_hash': 'CHAR(40)',
+    'top_mentions_hash': 'CHAR(40)',
+}
+
+# tv_retail_com에서 옮기는 텍스트 컬럼
+TEXT_COLUMNS = ['detailed_review_content', 'summarized_review_content', 'top_mentions']
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS retail_reviews (
+        id BIGSERIAL PRIMARY KEY,
+        retailer VARCHAR(20) NOT NULL,
+        product_key VARCHAR(200) NOT NULL,
+        review_hash CHAR(40) NOT NULL,
+        review_kind VARCHAR(20) NOT NULL,
+        review_text TEXT NOT NULL,
+        first_batch_id TEXT,
+        first_seen_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        UNIQUE (retailer, product_key, review_hash)
+    )
+"""
+
+# 원래 컬럼 이름으로 텍스트를 다시 붙여주는 view (아직 옮기지 않은 row는 원래 값)
+CREATE_VIEW_SQL = """
+    CREATE OR REPLACE VIEW tv_retail_com_reviews AS
+    SELECT t.id, t.account_name, t.item, t.product_url, t.calendar_week,
+           COALESCE(t.detailed_review_content, (
+               SELECT string_agg(r.review_text, ' | ' ORDER BY u.ord)
+               FROM unnest(t.detailed_review_hashes) WITH ORDINALITY AS u (review_hash, ord)
+               JOIN retail_reviews r
+                 ON r.retailer = t.account_name AND r.product_key = t.review_product_key
+                AND r.review_hash = u.review_hash
+           )) AS detailed_review_content,
+           COALESCE(t.summarized_review_content, s.review_text) AS summarized_review_content,
+           COALESCE(t.top_mentions, m.review_text) AS top_mentions
+    FROM tv_retail_com t
+    LEFT JOIN retail_reviews s
+      ON s.retailer = t.account_name AND s.product_key = t.review_product_key
+     AND s.review_hash = t.summarized_review_hash
+    LEFT JOIN retail_reviews m
+      ON m.retailer = t.account_name AND m.product_key = t.review_product_key
+     AND m.review_hash = t.top_mentions_hash
+"""
+
+
+def review_hash(kind, text):
+    normalized = ' '.join(text.split())
+    return hashlib.sha1(f"{kind}\n{normalized}".encode('utf-8')).hexdigest()
+
+
+def split_numbered(content, prefix=''):
+    """"1-text, 2-text" / "review1-text, review2-text" -> 텍스트 목록 (번호 순서대로 찾아서 본문 안의 ", 5-star" 등은 유지)"""
+    head = f"{prefix}1-"
+    if not content.startswith(head):
+        return None
+    parts = []
+    position = len(head)
+    number = 2
+    while True:
+        marker = f", {prefix}{number}-"
+        next_position = content.find(marker, position)
+        if next_position < 0:
+            parts.append(content[position:])
+            return parts
+        parts.append(content[position:next_position])
+        position = next_position + len(marker)
+        number += 1
+
+
+def split_detailed_reviews(content):
+    """
+    detailed_review_content 문자열 -> review 텍스트 목록
+    크롤러 별 형식: Amazon "1-text, 2-text", Walmart "review1-text, review2-text", BestBuy "text | text"
+    """
+    if not content or not str(content).strip():
+        return []
+    content = str(content).strip()
+    parts = split_numbered(content) or split_numbered(content, 'review') or content.split(' | ')
+    return [part.strip() for part in parts if part and part.strip()]
+
+
+def hash_array(hashes):
+    """hash 목록 -> PostgreSQL array literal (COPY / INSERT 공용, hex 문자열이라 quote 불필요)"""
+    return '{' + ','.join(hashes) + '}' if hashes else None
+
+
+def review_refs(account_name, product_url, detailed, summarized, top_mentions, batch_id=None):
+    """
+    review 텍스트 -> (REVIEW_REF_COLUMNS 순서의 tuple, retail_reviews row 목록)
+    """
+    key = product_key(product_url)
+    rows = []
+
+    def add(kind, text):
+        text = str(text).strip() if text else ''
+        if not text:
+            return None
+        digest = review_hash(kind, text)
+        rows.append((account_name, key, digest, kind, text, batch_id))
+        return digest
+
+    detailed_hashes = []
+    for text in split_detailed_reviews(detailed):
+        digest = add('review', text)
+        if digest not in detailed_hashes:
+            detailed_hashes.append(digest)
+    summary_hash = add('summary', summarized)
+    top_mentions_hash = add('top_mentions', top_mentions)
+
+    refs = (key if rows else None, hash_array(detailed_hashes), summary_hash, top_mentions_hash)
+    return refs, rows
+
+
+def write_review_rows(cursor, rows):
+    """retail_reviews row 적재 (이미 있는 review는 건너뜀) - 한 row씩 INSERT 하는 script 용"""
+    from psycopg2.extras import execute_values
+
+    if rows:
+        execute_values(cursor, f"""
+            INSERT INTO {REVIEW_TABLE} ({', '.join(REVIEW_COLUMNS)})
+            VALUES %s
+            ON CONFLICT DO NOTHING
+        """, rows, page_size=1000)
+    return len(rows)
+
+
+def ensure_review_store(cursor):
+    """retail_reviews 테이블 + tv_retail_com 참조 컬럼 + view 생성 (이미 있으면 lock 없이 바로 return)"""
+    cursor.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_name = 'tv_retail_com' AND column_name = ANY(%s)
+    """, (REVIEW_REF_COLUMNS,))
+    existing = {row[0] for row in cursor.fetchall()}
+    missing = [column for column in REVIEW_REF_COLUMNS if column not in existing]
+    if missing:
+        cursor.execute(CREATE_TABLE_SQL)
+        cursor.execute("ALTER TABLE tv_retail_com " + ', '.join(
+            f"ADD COLUMN IF NOT EXISTS {column} {REVIEW_REF_TYPES[column]}" for column in missing))
+        cursor.execute(CREATE_VIEW_SQL)
+        print(f"[OK] retail_reviews / tv_retail_com review reference columns added: {', '.join(missing)}")
+    return missing
+
+
+def externalize_rows(cursor, rows):
+    """
+    (id, account_name, product_url, detailed, summarized, top_mentions) rows의 텍스트를 retail_reviews로 옮기고
+    참조 컬럼을 채운 뒤 원래 컬럼은 NULL
+    """
+    from psycopg2.extras import execute_values
+
+    review_rows = []
+    updates = []
+    for row_id, account_name, product_url, detailed, summarized, top_mentions in rows:
+        refs, row_reviews = review_refs(account_name, product_url, detailed, summarized, top_mentions)
+        review_rows.extend(row_reviews)
+        updates.append((row_id,) + refs)
+
+    write_review_rows(cursor, review_rows)
+    execute_values(cursor, """
+        UPDATE tv_retail_com AS t
+        SET review_product_key = v.product_key,
+            detailed_review_hashes = v.detailed_hashes::TEXT[],
+            summarized_review_hash = v.summary_hash,
+            top_mentions_hash = v.top_mentions_hash,
+            detailed_review_content = NULL,
+            summarized_review_content = NULL,
+            top_mentions = NULL
+        FROM (VALUES %s) AS v (id, product_key, detailed_hashes, summary_hash, top_mentions_hash)
+        WHERE t.id = v.id
+    """, updates, page_size=1000)
+    return len(review_rows)
+
+
+def externalize_all(conn):
+    """텍스트가 남아 있는 tv_retail_com row를 id 순서 chunk로 옮김 (chunk마다 commit, 중단 후 다시 실행 가능)"""
+    last_id = 0
+    total_rows = 0
+    total_reviews = 0
+    while True:
+        with conn.transaction() as cursor:
+            cursor.execute(f"""
+                SELECT id, account_name, product_url, {', '.join(TEXT_COLUMNS)}
+                FROM tv_retail_com
+                WHERE id > %s
+                  AND (detailed_review_content IS NOT NULL OR summarized_review_content IS NOT NULL
+                       OR top_mentions IS NOT NULL)
+                ORDER BY id
+                LIMIT %s
+            """, (last_id, EXTERNALIZE_CHUNK_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            total_reviews += externalize_rows(cursor, rows)
+            total_rows += len(rows)
+            last_id = rows[-1][0]
+        print(f"  [PROGRESS] {total_rows:,} rows moved, {total_reviews:,} review texts (last id {last_id:,})")
+    return total_rows
+
+
+def print_status(conn):
+    rows = conn.execute("""
+        SELECT retailer, review_kind, COUNT(*), COUNT(DISTINCT product_key)
+        FROM retail_reviews
+        GROUP BY retailer, review_kind
+        ORDER BY retailer, review_kind
+    """, fetch='all')
+    for retailer, kind, count, products in rows:
+        print(f"{retailer:<10} {kind:<14} {count:>8} texts  {products:>6} products")
+    remaining = conn.execute("""
+        SELECT COUNT(*)
+        FROM tv_retail_com
+        WHERE detailed_review_content IS NOT NULL OR summarized_review_content IS NOT NULL
+           OR top_mentions IS NOT NULL
+    """, fetch='one')[0]
+    print(f"tv_retail_com rows with inline review text: {remaining:,}")
+
+
+def main():
+    from db_manager import get_connection
+
+    conn = get_connection(autocommit=True)
+    try:
+        with conn.transaction() as cursor:
+            ensure_review_store(cursor)
+        if '--status' in sys.argv[1:]:
+            print_status(conn)
+            return
+
+        print("=" * 80)
+        print("tv_retail_com review text -> retail_reviews")
+        print("=" * 80)
+        with conn.transaction() as cursor:
+            cursor.execute(CREATE_VIEW_SQL)
+
+        # 텍스트를 NULL로 만들기 전에 tv_retail_com + retail_reviews backup
+        from backup_tv_retail_com import backup_tv_retail_com
+        if backup_tv_retail_com() is None:
+            print("[ERROR] Backup failed - review text was not moved (tv_retail_com unchanged)")
+            return
+        total = externalize_all(conn)
+        print(f"[OK] {total:,} tv_retail_com rows now reference retail_reviews")
+        if total:
+            print("[INFO] Run VACUUM FULL tv_retail_com (or pg_repack) in a maintenance window to reclaim TOAST space")
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
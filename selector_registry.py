@@ -0,0 +1,221 @@
+"""
+Selector Registry
+xpath_selectors를 로컬 cache 파일에 version(checksum)과 함께 저장하고 모든 크롤러가 같은 API로 사용
+
+동작:
+- cache가 SELECTOR_REFRESH_SECONDS 보다 최근에 확인됐으면 DB에 묻지 않고 cache 사용
+- 오래됐으면 checksum 쿼리 1번으로 table 변경 여부만 확인, 바뀐 경우에만 전체 row를 다시 읽음
+- DB에 연결할 수 없으면 (stale) cache로 계속 진행
+- 모든 크롤러가 같은 cache 파일을 보므로, 한 번 refresh되면 이후 시작하는 크롤러는 모두 같은 version 사용
+  xpath_selectors를 고친 뒤 바로 반영하려면: python selector_registry.py --refresh
+
+cache 파일: SELECTOR_CACHE_FILE (기본 ./cache/xpath_selectors.json)
+refresh 주기: SELECTOR_REFRESH_SECONDS 환경 변수 또는 config.SELECTOR_REFRESH_SECONDS (기본 300)
+
+사용법:
+    from selector_registry import get_selectors, get_xpaths, get_field_map
+
+    self.xpaths = get_selectors('Amazon', 'main_page')      # {field: {'xpath': ..., 'css': ...}}
+    self.xpaths = get_xpaths('Walmart', 'detail_page')      # {field: xpath}
+    self.fields = get_field_map('Walmart', 'main', CONTAINER_FIELDS, name='WalmartContainer')
+
+Usage (CLI):
+    python selector_registry.py --refresh     # DB에서 다시 읽어 cache 갱신
+    python selector_registry.py --show        # cache version / mall, page_type 별 selector 수
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from xpath_engine import FieldMap
+
+try:
+    import config
+except ImportError:
+    config = None
+
+CACHE_FILE = os.environ.get(
+    'SELECTOR_CACHE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'xpath_selectors.json')
+)
+REFRESH_SECONDS = int(os.environ.get(
+    'SELECTOR_REFRESH_SECONDS',
+    getattr(config, 'SELECTOR_REFRESH_SECONDS', 300) if config else 300
+))
+
+# active selector 전체의 checksum (작은 table이라 서버에서 바로 계산)
+VERSION_QUERY = """
+    SELECT md5(COALESCE(string_agg(
+               concat_ws(E'\\x1f', mall_name, page_type, data_field,
+                         COALESCE(xpath, ''), COALESCE(css_selector, '')),
+               E'\\x1e' ORDER BY mall_name, page_type, data_field), '')),
+           COUNT(*)
+    FROM xpath_selectors
+    WHERE is_active = TRUE
+"""
+
+ROWS_QUERY = """
+    SELECT mall_name, page_type, data_field, xpath, css_selector
+    FROM xpath_selectors
+    WHERE is_active = TRUE
+    ORDER BY mall_name, page_type, data_field
+"""
+
+
+class SelectorRegistry:
+    """xpath_selectors 로컬 cache + version 관리"""
+
+    def __init__(self, cache_file=CACHE_FILE, refresh_seconds=REFRESH_SECONDS):
+        self.cache_file = cache_file
+        self.refresh_seconds = refresh_seconds
+        self.cache = None
+        self.field_maps = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.cache['version'] if self.cache else None
+
+    def load_cache(self):
+        """cache 파일 읽기 (없거나 깨졌으면 None)"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_cache(self, cache):
+        """cache 저장 (임시 파일에 쓴 뒤 교체 - 다른 크롤러가 반쯤 쓴 파일을 읽지 않도록)"""
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        tmp_path = f"{self.cache_file}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.cache_file)
+
+    def refresh(self, force=False):
+        """
+        DB checksum 확인 후 바뀌었으면 전체 selector 다시 읽기
+
+        Returns:
+            True if the selectors changed
+        """
+        from db_manager import get_connection
+
+        cache = self.cache or self.load_cache()
+        conn = get_connection(autocommit=True)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(VERSION_QUERY)
+            version, count = cursor.fetchone()
+
+            changed = force or cache is None or cache.get('version') != version
+            if changed:
+                cursor.execute(ROWS_QUERY)
+                rows = [
+                    {'mall_name': r[0], 'page_type': r[1], 'data_field': r[2], 'xpath': r[3], 'css': r[4]}
+                    for r in cursor.fetchall()
+                ]
+                cache = {'version': version, 'count': count, 'rows': rows,
+                         'fetched_at': datetime.now().isoformat(timespec='seconds')}
+                print(f"[OK] Selector registry refreshed: {count} selectors (version {version[:8]})")
+            cursor.close()
+        finally:
+            conn.close()
+
+        cache['checked_at'] = time.time()
+        self.save_cache(cache)
+        self.cache = cache
+        if changed:
+            self.field_maps = {}
+        return changed
+
+    def ensure_loaded(self):
+        """cache가 충분히 최근이면 그대로, 아니면 DB version 확인"""
+        with self._lock:
+            if self.cache is None:
+                self.cache = self.load_cache()
+
+            age = time.time() - self.cache.get('checked_at', 0) if self.cache else None
+            if age is not None and age < self.refresh_seconds:
+                return
+
+            try:
+                self.refresh()
+            except Exception as e:
+                if self.cache is None:
+                    raise
+                print(f"[WARNING] Selector registry refresh failed ({e}) - using cached version "
+                      f"{self.version[:8]} from {self.cache.get('fetched_at')}")
+
+    def rows(self, mall_name, page_type):
+        self.ensure_loaded()
+        return [row for row in self.cache['rows']
+                if row['mall_name'] == mall_name and row['page_type'] == page_type]
+
+    def get_selectors(self, mall_name, page_type):
+        """{data_field: {'xpath': ..., 'css': ...}} (호출마다 새 dict)"""
+        return {row['data_field']: {'xpath': row['xpath'], 'css': row['css']}
+                for row in self.rows(mall_name, page_type)}
+
+    def get_xpaths(self, mall_name, page_type):
+        """{data_field: xpath}"""
+        return {row['data_field']: row['xpath'] for row in self.rows(mall_name, page_type)}
+
+    def get_field_map(self, mall_name, page_type, fields=None, name='Record'):
+        """compile된 FieldMap (같은 version 안에서는 재사용)"""
+        xpaths = self.get_xpaths(mall_name, page_type)
+        key = (mall_name, page_type, tuple(fields) if fields else None, name)
+        with self._lock:
+            if key not in self.field_maps:
+                self.field_maps[key] = FieldMap(xpaths, fields=fields, name=name)
+            return self.field_maps[key]
+
+    def summary(self):
+        """cache version / mall, page_type 별 selector 수"""
+        self.ensure_loaded()
+        counts = {}
+        for row in self.cache['rows']:
+            key = (row['mall_name'], row['page_type'])
+            counts[key] = counts.get(key, 0) + 1
+        lines = [f"Selector registry {self.cache_file}",
+                 f"  version {self.version} ({self.cache.get('count')} selectors, fetched {self.cache.get('fetched_at')})"]
+        for (mall_name, page_type), count in sorted(counts.items()):
+            lines.append(f"  {mall_name:<10} {page_type:<15} {count:>4}")
+        return "\n".join(lines)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """프로세스 전역 registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SelectorRegistry()
+    return _registry
+
+
+def get_selectors(mall_name, page_type):
+    return get_registry().get_selectors(mall_name, page_type)
+
+
+def get_xpaths(mall_name, page_type):
+    return get_registry().get_xpaths(mall_name, page_type)
+
+
+def get_field_map(mall_name, page_type, fields=None, name='Record'):
+    return get_registry().get_field_map(mall_name, page_type, fields, name)
+
+
+if __name__ == "__main__":
+    registry = get_registry()
+    if '--refresh' in sys.argv[1:]:
+        registry.refresh(force=True)
+    print(registry.summary())
@@ -0,0 +1,370 @@
+"""
+Raw HTML Snapshot Store
+모든 크롤러가 가져온 page source를 압축해서 저장하고, 네트워크 없이 다시 파싱(--reparse)할 수 있게 함
+
+저장 구조 (SNAPSHOT_DIR, 기본 ./snapshots):
+    objects/ab/abcdef....html.gz         - 내용(sha256) 기준 저장, 같은 HTML은 한 번만 저장
+    <crawler_name>/<batch_id>.jsonl       - batch 별 index (seq, url, sha256, size, saved_at, meta)
+    <crawler_name>/<batch_id>.<name>.json - URL 목록 등 재파싱에 필요한 manifest
+
+재파싱 방법:
+    python amazon_tv_main_crawl.py --reparse 20251115_093000
+
+    - 같은 batch_id로 DB row를 다시 만든다 (해당 batch의 기존 row는 크롤러가 먼저 삭제)
+    - 목록 page 크롤러: ReplayFetcher가 URL 별 snapshot을 돌려줌
+    - detail / promotion 크롤러: ReplayDriver가 live 실행 때 읽었던 page_source를 같은 순서로 돌려줌
+      (click / scroll은 no-op, find_element는 현재 snapshot에서 lxml로 찾음)
+
+사용법 (live):
+    self.snapshots = SnapshotStore('amazon_tv_main', self.batch_id)
+    self.snapshots.save(url, page_source, page_number=page_number)
+    self.driver = RecordingDriver(driver, self.snapshots)   # driver.page_source 읽을 때마다 저장
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from lxml import html
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+
+SNAPSHOT_ROOT = os.environ.get(
+    'SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+)
+
+
+# 재파싱 때 document.body.scrollHeight 대신 돌려주는 값
+REPLAY_SCROLL_HEIGHT = 10000
+
+
+def get_reparse_batch_id(argv=None):
+    """명령행에서 --reparse <batch_id> 읽기 (없으면 None)"""
+    argv = sys.argv[1:] if argv is None else argv
+    for idx, arg in enumerate(argv):
+        if arg == '--reparse' and idx + 1 < len(argv):
+            return argv[idx + 1]
+        if arg.startswith('--reparse='):
+            return arg.split('=', 1)[1]
+    return None
+
+
+def disable_delays(*targets):
+    """
+    재파싱 때 딜레이 끄기 - Pacer / PageWaits의 no_delay flag만 설정
+    (process 전체의 time.sleep은 그대로 - 다른 thread의 poll loop가 busy-spin 되지 않도록)
+
+    사용법:
+        disable_delays(self.pacer, self.waits)
+    """
+    for target in targets:
+        target.no_delay = True
+
+
+class SnapshotStore:
+    """batch_id + URL 기준 압축 page source 저장소"""
+
+    def __init__(self, crawler_name, batch_id, root=SNAPSHOT_ROOT):
+        self.crawler_name = crawler_name
+        self.batch_id = str(batch_id)
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.batch_dir = os.path.join(root, crawler_name)
+        self.index_file = os.path.join(self.batch_dir, f"{self.batch_id}.jsonl")
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._index = None
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.html.gz")
+
+    def save(self, url, page_source, **meta):
+        """
+        page source 저장 (실패해도 크롤링은 계속)
+
+        Returns:
+            sha256 digest 또는 None
+        """
+        if not page_source:
+            return None
+        try:
+            raw = page_source.encode('utf-8')
+            digest = hashlib.sha256(raw).hexdigest()
+            object_path = self._object_path(digest)
+
+            if not os.path.exists(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                tmp_path = f"{object_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp_path, 'wb', compresslevel=6) as f:
+                    f.write(raw)
+                os.replace(tmp_path, object_path)
+
+            with self._lock:
+                self.seq += 1
+                entry = {
+                    'seq': self.seq,
+                    'url': url,
+                    'sha256': digest,
+                    'size': len(raw),
+                    'saved_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'meta': meta
+                }
+                os.makedirs(self.batch_dir, exist_ok=True)
+                with open(self.index_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            return digest
+
+        except Exception as e:
+            print(f"[WARNING] Snapshot save failed ({url[:60] if url else 'N/A'}): {e}")
+            return None
+
+    def save_manifest(self, name, data):
+        """URL 목록 등 재파싱용 부가 정보 저장"""
+        try:
+            os.makedirs(self.batch_dir, exist_ok=True)
+            path = os.path.join(self.batch_dir, f"{self.batch_id}.{name}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+        except Exception as e:
+            print(f"[WARNING] Snapshot manifest save failed ({name}): {e}")
+
+    def load_manifest(self, name, default=None):
+        path = os.path.join(self.batch_dir, f"{self.batch_id}.{name}.json")
+        if not os.path.exists(path):
+            return default
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def exists(self):
+        return os.path.exists(self.index_file)
+
+    def load_index(self):
+        """batch index 전체 (seq 순)"""
+        if self._index is None:
+            entries = []
+            if os.path.exists(self.index_file):
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            entries.append(json.loads(line))
+            entries.sort(key=lambda e: e['seq'])
+            self._index = entries
+        return self._index
+
+    def read(self, digest):
+        """sha256으로 page source 읽기"""
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def entries_by_url(self):
+        """URL -> 저장 순서대로 entry list"""
+        by_url = OrderedDict()
+        for entry in self.load_index():
+            by_url.setdefault(entry['url'], []).append(entry)
+        return by_url
+
+
+class ReplayFetcher:
+    """PageFetcher와 같은 인터페이스로 snapshot을 돌려주는 fetcher (목록 page 재파싱용)"""
+
+    def __init__(self, store):
+        self.store = store
+        self.by_url = store.entries_by_url()
+        self.stats = {'http': 0, 'browser': 0, 'snapshot': 0}
+
+    def fetch(self, url, *browser_args):
+        entries = self.by_url.get(url)
+        if not entries:
+            raise KeyError(f"No snapshot for {url[:80]} in batch {self.store.batch_id}")
+
+        # 마지막으로 저장된 (= 실제로 파싱에 쓰인) snapshot 사용
+        page_source = self.store.read(entries[-1]['sha256'])
+        self.stats['snapshot'] += 1
+        return page_source, html.fromstring(page_source), 'snapshot'
+
+
+class RecordingDriver:
+    """
+    Selenium driver proxy
+    page_source를 읽을 때마다 snapshot으로 저장 (key는 마지막 get() URL)
+    나머지 속성/메서드는 원래 driver로 그대로 전달
+    """
+
+    def __init__(self, driver, store):
+        object.__setattr__(self, '_driver', driver)
+        object.__setattr__(self, '_store', store)
+        object.__setattr__(self, '_requested_url', None)
+
+    def get(self, url):
+        object.__setattr__(self, '_requested_url', url)
+        return self._driver.get(url)
+
+    @property
+    def page_source(self):
+        page_source = self._driver.page_source
+        self._store.save(self._requested_url or self._driver.current_url, page_source)
+        return page_source
+
+    def record(self, page_source, **meta):
+        """page_source 대신 직접 가져온 HTML (dom_capture 등)을 같은 순서로 snapshot 저장"""
+        self._store.save(self._requested_url or self._driver.current_url, page_source, **meta)
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._driver, name, value)
+
+
+class ReplayElement:
+    """ReplayDriver.find_element 결과 (lxml element wrapper)"""
+
+    def __init__(self, element, driver):
+        self._element = element
+        self._driver = driver
+
+    @property
+    def text(self):
+        return self._element.text_content().strip()
+
+    @property
+    def tag_name(self):
+        return self._element.tag
+
+    def get_attribute(self, name):
+        if name in ('textContent', 'innerText'):
+            return self._element.text_content()
+        if name in ('outerHTML', 'innerHTML'):
+            return html.tostring(self._element, encoding='unicode')
+        return self._element.get(name)
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def find_element(self, by=By.ID, value=None):
+        return self._driver._find(self._element, by, value, single=True)
+
+    def find_elements(self, by=By.ID, value=None):
+        return self._driver._find(self._element, by, value, single=False)
+
+    def __getattr__(self, name):
+        # click / send_keys / clear 등 상호작용은 no-op
+        return lambda *args, **kwargs: None
+
+
+class ReplayDriver:
+    """
+    재파싱용 가짜 driver
+    get(url) 후 page_source를 읽을 때마다 live 실행 때 저장된 snapshot을 순서대로 돌려준다.
+    find_element는 현재 snapshot에서 lxml로 찾고, 없으면 기다리지 않고 바로 TimeoutException.
+    """
+
+    replay = True  # page_waits는 replay driver에서 기다리지 않음
+
+    def __init__(self, store):
+        self.store = store
+        self.by_url = store.entries_by_url()
+        self.current_url = None
+        self.title = ''
+        self._queue = []
+        self._current_source = None
+        self._current_tree = None
+
+    def get(self, url):
+        self.current_url = url
+        self._queue = list(self.by_url.get(url, []))
+        self._current_source = None
+        self._current_tree = None
+        if not self._queue:
+            print(f"[WARNING] No snapshot for {url[:80]}")
+
+    @property
+    def page_source(self):
+        if self._queue:
+            entry = self._queue.pop(0)
+            self._current_source = self.store.read(entry['sha256'])
+            self._current_tree = None
+        return self._current_source or '<html><body></body></html>'
+
+    def _tree(self):
+        if self._current_tree is None:
+            if self._current_source is None and self._queue:
+                # 아직 page_source를 읽기 전이면 다음 snapshot 기준으로 찾음
+                source = self.store.read(self._queue[0]['sha256'])
+            else:
+                source = self._current_source or '<html><body></body></html>'
+            self._current_tree = html.fromstring(source)
+        return self._current_tree
+
+    def _to_xpath(self, by, value):
+        if by == By.XPATH:
+            return value
+        if by == By.ID:
+            return f'//*[@id="{value}"]'
+        if by == By.CLASS_NAME:
+            return f'//*[contains(concat(" ", normalize-space(@class), " "), " {value} ")]'
+        if by == By.TAG_NAME:
+            return f'//{value}'
+        if by == By.NAME:
+            return f'//*[@name="{value}"]'
+        if by == By.LINK_TEXT:
+            return f'//a[normalize-space(.)="{value}"]'
+        if by == By.PARTIAL_LINK_TEXT:
+            return f'//a[contains(., "{value}")]'
+        if by == By.CSS_SELECTOR:
+            try:
+                from cssselect import GenericTranslator
+                return GenericTranslator().css_to_xpath(value)
+            except Exception:
+                return None
+        return None
+
+    def _find(self, root, by, value, single):
+        xpath = self._to_xpath(by, value)
+        results = []
+        if xpath:
+            if root is not None and not xpath.startswith('.') and by != By.XPATH:
+                xpath = '.' + xpath if xpath.startswith('/') else xpath
+            try:
+                found = (root if root is not None else self._tree()).xpath(xpath)
+                results = [ReplayElement(e, self) for e in found if hasattr(e, 'tag')]
+            except Exception:
+                results = []
+        if single:
+            if not results:
+                raise TimeoutException(f"[replay] element not in snapshot: {value}")
+            return results[0]
+        return results
+
+    def find_element(self, by=By.ID, value=None):
+        return self._find(None, by, value, single=True)
+
+    def find_elements(self, by=By.ID, value=None):
+        return self._find(None, by, value, single=False)
+
+    def execute_script(self, script, *args):
+        # page 높이 검사 (scrollHeight < 1000 이면 로딩 실패 처리 등)는 통과시키고,
+        # 그 외 숫자를 기대하는 호출에는 0 반환
+        if isinstance(script, str) and 'scrollHeight' in script and script.strip().startswith('return'):
+            return REPLAY_SCROLL_HEIGHT
+        return 0
+
+    def execute_cdp_cmd(self, cmd, params=None):
+        return {}
+
+    def get_cookies(self):
+        return []
+
+    def __getattr__(self, name):
+        # refresh / back / quit / maximize_window / set_page_load_timeout 등은 no-op
+        return lambda *args, **kwargs: None
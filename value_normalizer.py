@@ -0,0 +1,297 @@
+"""
+Value Normalizer
+가격 / 별점 / count 문자열을 적재할 때 한 번만 파싱해서 tv_retail_com의 typed 컬럼에 같이 저장
+
+tv_retail_com의 final_sku_price / original_sku_price / savings (VARCHAR(50)), star_rating (VARCHAR(10))은
+원본 문자열 그대로 두고, 옆에 typed 컬럼을 추가한다:
+
+    final_sku_price_amount     NUMERIC(12,2)
+    original_sku_price_amount  NUMERIC(12,2)
+    savings_amount             NUMERIC(12,2)
+    price_currency             CHAR(3)        ('USD', 'EUR', ...)
+    star_rating_value          NUMERIC(3,2)   (0 ~ 5)
+
+-> 주간 가격 이력 분석 / 집계는 문자열을 row마다 cast 하지 않고 typed 컬럼과 index를 바로 사용
+
+- 파싱 규칙은 여기 한 곳에만 둔다 (bby_tv_dt1, migrate_to_tv_retail_com, backfill, DataValidator 공용)
+  "$1,299.99" / "$1,797 99" (cent가 따로 render) / "Save $200" / "1.299,00 €" / "4.5 out of 5 stars"
+- 파싱할 수 없는 값은 None (원본 문자열은 그대로 남음)
+
+사용법:
+    from value_normalizer import TYPED_COLUMNS, typed_values, parse_price, parse_star_counts
+
+    amount, currency = parse_price('$1,299.99')            # (Decimal('1299.99'), 'USD')
+    row = base_row + typed_values(final, original, savings, star_rating)   # TV_RETAIL_COLUMNS + TYPED_COLUMNS
+
+Usage (CLI):
+    python value_normalizer.py              # typed 컬럼 추가 + 기존 row 전체 normalize (id 순서 chunk)
+    python value_normalizer.py --missing    # typed 값이 비어 있는 row만
+"""
+
+import re
+import sys
+from decimal import Decimal, InvalidOperation
+
+# 한 번에 읽고 UPDATE 하는 row 수
+NORMALIZE_CHUNK_SIZE = 5000
+
+TYPED_COLUMNS = [
+    'final_sku_price_amount', 'original_sku_price_amount', 'savings_amount',
+    'price_currency', 'star_rating_value',
+]
+
+TYPED_COLUMN_TYPES = {
+    'final_sku_price_amount': 'NUMERIC(12,2)',
+    'original_sku_price_amount': 'NUMERIC(12,2)',
+    'savings_amount': 'NUMERIC(12,2)',
+    'price_currency': 'CHAR(3)',
+    'star_rating_value': 'NUMERIC(3,2)',
+}
+
+# 가격 범위 조회용
+TYPED_INDEXES = {
+    'idx_tv_retail_com_final_price_amount': '(account_name, final_sku_price_amount)',
+}
+
+# tv_retail_com account 별 기본 통화 (가격 문자열에 통화 표시가 없을 때)
+ACCOUNT_CURRENCY = {'Bestbuy': 'USD', 'Walmart': 'USD', 'Amazon': 'USD'}
+
+CURRENCY_SYMBOLS = [
+    ('US$', 'USD'), ('$', 'USD'), ('€', 'EUR'), ('£', 'GBP'), ('₹', 'INR'), ('¥', 'JPY'), ('￥', 'JPY'),
+    ('zł', 'PLN'), ('USD', 'USD'), ('EUR', 'EUR'), ('GBP', 'GBP'), ('INR', 'INR'), ('JPY', 'JPY'),
+    ('PLN', 'PLN'), ('Rs', 'INR'),
+]
+
+CENTS = Decimal('0.01')
+EMPTY_VALUES = ('', 'none', 'null', 'n/a', 'na', '-')
+
+# "$1,797 99" - 정수부와 cent가 따로 render된 Walmart 가격
+SPLIT_CENTS_PATTERN = re.compile(r'^\D*?(\d{1,3}(?:,\d{3})*|\d+)\s(\d{2})\D*$')
+NUMBER_PATTERN = re.compile(r'\d[\d.,\s]*\d|\d')
+RATING_PATTERN = re.compile(r'\d+(?:[.,]\d+)?')
+COUNT_PATTERN = re.compile(r'(\d[\d,]*)(?:\.(\d+))?\s*([KkMm])?')
+STAR_COUNT_PATTERN = re.compile(r':\s*(\d[\d,]*)')
+
+
+def _is_empty(value):
+    return value is None or str(value).strip().lower() in EMPTY_VALUES
+
+
+def detect_currency(text):
+    """가격 문자열의 통화 코드 (표시가 없으면 None)"""
+    for symbol, code in CURRENCY_SYMBOLS:
+        if symbol in text:
+            return code
+    return None
+
+
+def _to_decimal(number, currency):
+    """'1,299.99' / '1.299,99' / '1 299' -> Decimal"""
+    number = number.replace(' ', '')
+    if ',' in number and '.' in number:
+        # 뒤에 오는 쪽이 소수점
+        if number.rfind(',') > number.rfind('.'):
+            number = number.replace('.', '').replace(',', '.')
+        else:
+            number = number.replace(',', '')
+    elif ',' in number:
+        head, _, tail = number.rpartition(',')
+        if number.count(',') == 1 and len(tail) == 2:
+            number = f"{head}.{tail}"
+        else:
+            number = number.replace(',', '')
+    elif '.' in number:
+        head, _, tail = number.rpartition('.')
+        # "1.299.000" / 유로 "1.299" 은 천 단위 구분
+        if number.count('.') > 1 or (currency == 'EUR' and len(tail) == 3):
+            number = number.replace('.', '')
+    try:
+        return Decimal(number).quantize(CENTS)
+    except InvalidOperation:
+        return None
+
+
+def parse_price(value, default_currency='USD'):
+    """
+    가격 값 -> (Decimal amount, currency code)
+    파싱할 수 없으면 (None, None)
+    """
+    if _is_empty(value):
+        return None, None
+    if isinstance(value, (int, float, Decimal)):
+        try:
+            return Decimal(str(value)).quantize(CENTS), default_currency
+        except InvalidOperation:
+            return None, None
+
+    text = ' '.join(str(value).split())
+    currency = detect_currency(text) or default_currency
+
+    split = SPLIT_CENTS_PATTERN.match(text)
+    if split:
+        return _to_decimal(f"{split.group(1).replace(',', '')}.{split.group(2)}", currency), currency
+
+    match = NUMBER_PATTERN.search(text)
+    if not match:
+        return None, None
+    amount = _to_decimal(match.group(0), currency)
+    return (amount, currency) if amount is not None else (None, None)
+
+
+def parse_star_rating(value):
+    """'4.5' / '4.5 out of 5 stars' / 'Rating 4,6' -> Decimal (0 ~ 5 밖이면 None)"""
+    if _is_empty(value):
+        return None
+    match = RATING_PATTERN.search(str(value))
+    if not match:
+        return None
+    try:
+        rating = Decimal(match.group(0).replace(',', '.')).quantize(CENTS)
+    except InvalidOperation:
+        return None
+    return rating if 0 <= rating <= 5 else None
+
+
+def parse_count(value):
+    """'1,123' -> 1123, '(2.4K)' -> 2400, 100 -> 100"""
+    if _is_empty(value):
+        return None
+    if isinstance(value, int):
+        return value
+    match = COUNT_PATTERN.search(str(value))
+    if not match:
+        return None
+    whole, fraction, unit = match.groups()
+    count = Decimal(f"{whole.replace(',', '')}.{fraction or 0}")
+    if unit:
+        count *= 1000 if unit.lower() == 'k' else 1000000
+    return int(count)
+
+
+def parse_star_counts(value):
+    """별점 별 개수 문자열의 합계
+    "5star:142, 4star:14, 3star:7, 2star:2, 1star:4" -> 169
+    "5stars:231 4stars:19 3stars:2 2stars:1 1star:8" -> 261
+    """
+    if _is_empty(value):
+        return None
+    numbers = STAR_COUNT_PATTERN.findall(str(value))
+    if not numbers:
+        return None
+    return sum(int(n.replace(',', '')) for n in numbers)
+
+
+def typed_values(final_sku_price, original_sku_price, savings, star_rating, default_currency='USD'):
+    """원본 문자열 -> TYPED_COLUMNS 순서의 tuple"""
+    final_amount, final_currency = parse_price(final_sku_price, default_currency)
+    original_amount, original_currency = parse_price(original_sku_price, default_currency)
+    savings_amount, savings_currency = parse_price(savings, default_currency)
+    currency = final_currency or original_currency or savings_currency
+    return (final_amount, original_amount, savings_amount, currency, parse_star_rating(star_rating))
+
+
+def ensure_typed_columns(cursor):
+    """tv_retail_com에 typed 컬럼 / index가 없으면 추가 (있으면 lock 없이 바로 return)"""
+    cursor.execute("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_name = 'tv_retail_com' AND column_name = ANY(%s)
+    """, (TYPED_COLUMNS,))
+    existing = {row[0] for row in cursor.fetchall()}
+    missing = [column for column in TYPED_COLUMNS if column not in existing]
+    if missing:
+        cursor.execute("ALTER TABLE tv_retail_com " + ', '.join(
+            f"ADD COLUMN IF NOT EXISTS {column} {TYPED_COLUMN_TYPES[column]}" for column in missing))
+        for name, columns in TYPED_INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON tv_retail_com {columns}")
+        print(f"[OK] tv_retail_com typed columns added: {', '.join(missing)}")
+    return missing
+
+
+def normalize_rows(cursor, rows):
+    """
+    (id, account_name, final_sku_price, original_sku_price, savings, star_rating) rows의 typed 컬럼 갱신
+
+    Returns:
+        갱신된 row 수
+    """
+    from psycopg2.extras import execute_values
+
+    if not rows:
+        return 0
+    values = [(row_id,) + typed_values(final, original, savings, star_rating,
+                                       ACCOUNT_CURRENCY.get(account_name, 'USD'))
+              for row_id, account_name, final, original, savings, star_rating in rows]
+    execute_values(cursor, """
+        UPDATE tv_retail_com AS t
+        SET final_sku_price_amount = v.final_amount::NUMERIC(12,2),
+            original_sku_price_amount = v.original_amount::NUMERIC(12,2),
+            savings_amount = v.savings_amount::NUMERIC(12,2),
+            price_currency = v.currency,
+            star_rating_value = v.star_rating::NUMERIC(3,2)
+        FROM (VALUES %s) AS v (id, final_amount, original_amount, savings_amount, currency, star_rating)
+        WHERE t.id = v.id
+    """, values, page_size=1000)
+    return len(values)
+
+
+def normalize_tv_retail_com(cursor, where_sql='TRUE', params=()):
+    """
+    조건에 맞는 tv_retail_com row의 typed 컬럼을 원본 문자열에서 다시 계산
+    (backfill 등으로 원본 가격이 바뀐 row에 사용, 같은 transaction 안에서 실행)
+    """
+    cursor.execute(f"""
+        SELECT id, account_name, final_sku_price, original_sku_price, savings, star_rating
+        FROM tv_retail_com
+        WHERE {where_sql}
+    """, params)
+    return normalize_rows(cursor, cursor.fetchall())
+
+
+def normalize_all(conn, missing_only=False):
+    """전체 tv_retail_com을 id 순서 chunk로 normalize (chunk마다 commit)"""
+    condition = ("AND final_sku_price_amount IS NULL AND original_sku_price_amount IS NULL "
+                 "AND savings_amount IS NULL AND star_rating_value IS NULL" if missing_only else "")
+    last_id = 0
+    total = 0
+    while True:
+        with conn.transaction() as cursor:
+            cursor.execute(f"""
+                SELECT id, account_name, final_sku_price, original_sku_price, savings, star_rating
+                FROM tv_retail_com
+                WHERE id > %s {condition}
+                ORDER BY id
+                LIMIT %s
+            """, (last_id, NORMALIZE_CHUNK_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            total += normalize_rows(cursor, rows)
+            last_id = rows[-1][0]
+        print(f"  [PROGRESS] {total:,} rows normalized (last id {last_id:,})")
+    return total
+
+
+def main():
+    # DB 모듈은 필요할 때만 import (parse 함수는 DataValidator 등에서 DB 없이 사용)
+    from db_manager import get_connection
+
+    conn = get_connection(autocommit=True)
+    try:
+        print("=" * 80)
+        print("tv_retail_com typed price / rating columns")
+        print("=" * 80)
+        with conn.transaction() as cursor:
+            ensure_typed_columns(cursor)
+        total = normalize_all(conn, missing_only='--missing' in sys.argv[1:])
+        print(f"[OK] {total:,} rows normalized")
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
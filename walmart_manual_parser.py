@@ -9,26 +9,34 @@ Walmart TV Manual HTML Parser
 4. 이 스크립트 실행: python walmart_manual_parser.py
 """
 
-import psycopg2
 from lxml import html
 import re
 import os
 import glob
 
-# Import database configuration
-from config import DB_CONFIG
+# Shared pooled database layer
+from db_manager import get_connection
+from selector_registry import get_xpaths, get_field_map
+from xpath_engine import xpath_text
+
+# Fields evaluated against every product container
+CONTAINER_FIELDS = ('product_name', 'product_url', 'final_price', 'original_price', 'offer',
+                    'pickup_availability', 'shipping_availability', 'delivery_availability',
+                    'sku_status_rollback', 'sku_status_sponsored', 'membership_discount',
+                    'available_quantity', 'inventory_status')
 
 class WalmartManualParser:
     def __init__(self):
         self.db_conn = None
         self.xpaths = {}
+        self.fields = None  # Compiled container field map (built in load_xpaths)
         self.total_collected = 0
         self.sequential_id = 1
 
     def connect_db(self):
         """Connect to PostgreSQL database"""
         try:
-            self.db_conn = psycopg2.connect(**DB_CONFIG)
+            self.db_conn = get_connection(autocommit=False)
             print("[OK] Database connected")
             return True
         except Exception as e:
@@ -36,19 +44,10 @@ class WalmartManualParser:
             return False
 
     def load_xpaths(self):
-        """Load XPath selectors from database"""
+        """Load XPath selectors (selector registry cache, refreshed when xpath_selectors changes)"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute("""
-                SELECT data_field, xpath
-                FROM xpath_selectors
-                WHERE mall_name = 'Walmart' AND page_type = 'main' AND is_active = TRUE
-            """)
-
-            for row in cursor.fetchall():
-                self.xpaths[row[0]] = row[1]
-
-            cursor.close()
+            self.xpaths = get_xpaths('Walmart', 'main')
+            self.fields = get_field_map('Walmart', 'main', CONTAINER_FIELDS, name='WalmartContainer')
             print(f"[OK] Loaded {len(self.xpaths)} XPath selectors")
             return True
 
@@ -57,17 +56,8 @@ class WalmartManualParser:
             return False
 
     def extract_text_safe(self, element, xpath):
-        """Safely extract text from element using xpath"""
-        try:
-            result = element.xpath(xpath)
-            if result:
-                if isinstance(result[0], str):
-                    return result[0].strip()
-                else:
-                    return result[0].text_content().strip()
-            return None
-        except Exception as e:
-            return None
+        """Safely extract text from element using xpath (compiled once, cached)"""
+        return xpath_text(element, xpath)
 
     def clean_price_text(self, price_text):
         """Extract clean price from complex price HTML text"""
@@ -101,43 +91,44 @@ class WalmartManualParser:
 
             collected_count = 0
             for idx, product in enumerate(products, 1):
-                # Extract product name
-                product_name = self.extract_text_safe(product, self.xpaths['product_name'])
+                # Extract all container fields in one pass
+                record = self.fields.extract(product)
+                product_name = record.product_name
 
                 if not product_name:
                     print(f"  [{idx}/{len(products)}] SKIP: No product name found")
                     continue
 
                 # Extract product URL
-                product_url_raw = self.extract_text_safe(product, self.xpaths['product_url'])
+                product_url_raw = record.product_url
                 product_url = product_url_raw if product_url_raw else None
 
                 # Extract Final_SKU_Price
-                final_price_raw = self.extract_text_safe(product, self.xpaths['final_price'])
+                final_price_raw = record.final_price
                 final_price = self.clean_price_text(final_price_raw) if final_price_raw else None
 
                 # Extract Original_SKU_Price
-                original_price_raw = self.extract_text_safe(product, self.xpaths['original_price'])
+                original_price_raw = record.original_price
                 original_price = original_price_raw if original_price_raw else None
 
                 # Extract Offer
-                offer = self.extract_text_safe(product, self.xpaths['offer'])
+                offer = record.offer
 
                 # Extract Pick-Up_Availability
-                pickup_raw = self.extract_text_safe(product, self.xpaths['pickup_availability'])
+                pickup_raw = record.pickup_availability
                 pickup = pickup_raw if pickup_raw else None
 
                 # Extract Shipping_Availability
-                shipping_raw = self.extract_text_safe(product, self.xpaths['shipping_availability'])
+                shipping_raw = record.shipping_availability
                 shipping = shipping_raw if shipping_raw else None
 
                 # Extract Delivery_Availability
-                delivery_raw = self.extract_text_safe(product, self.xpaths['delivery_availability'])
+                delivery_raw = record.delivery_availability
                 delivery = delivery_raw if delivery_raw else None
 
                 # Extract SKU_Status
-                rollback = self.extract_text_safe(product, self.xpaths['sku_status_rollback'])
-                sponsored = self.extract_text_safe(product, self.xpaths['sku_status_sponsored'])
+                rollback = record.sku_status_rollback
+                sponsored = record.sku_status_sponsored
 
                 sku_status = None
                 if rollback:
@@ -146,14 +137,14 @@ class WalmartManualParser:
                     sku_status = "Sponsored"
 
                 # Extract Retailer_Membership_Discounts
-                membership_discount_elem = self.extract_text_safe(product, self.xpaths['membership_discount'])
+                membership_discount_elem = record.membership_discount
                 membership_discount = "Walmart Plus" if membership_discount_elem else None
 
                 # Extract Available_Quantity_for_Purchase
-                available_quantity = self.extract_text_safe(product, self.xpaths['available_quantity'])
+                available_quantity = record.available_quantity
 
                 # Extract Inventory_Status
-                inventory_status = self.extract_text_safe(product, self.xpaths['inventory_status'])
+                inventory_status = record.inventory_status
 
                 data = {
                     'page_type': 'main',
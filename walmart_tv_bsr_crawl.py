@@ -1,17 +1,30 @@
 import time
 import random
-import psycopg2
 from datetime import datetime
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from lxml import html
 import re
 from urllib.parse import urlparse, parse_qs, unquote
 
-# Import database configuration
-from config import DB_CONFIG
+# Shared pooled database layer
+from db_manager import get_connection
+from page_fetcher import PageFetcher
+from pacing import get_pacer
+from crawl_schema import mark_batch_complete
+from selector_registry import get_selectors, get_field_map
+from xpath_engine import xpath_text
+from snapshot_store import SnapshotStore, ReplayFetcher, get_reparse_batch_id, disable_delays
+
+# Same User-Agent for the browser and the HTTP fetcher (cookies are shared between them)
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36'
+
+# Fields evaluated against every product container
+CONTAINER_FIELDS = ('product_name', 'product_url', 'final_price', 'original_price', 'offer',
+                    'pickup_availability', 'shipping_availability', 'delivery_availability',
+                    'sku_status_rollback', 'sku_status_sponsored', 'membership_discount',
+                    'available_quantity', 'inventory_status')
 
 class WalmartTVBSRCrawler:
     def __init__(self):
@@ -19,15 +32,21 @@ class WalmartTVBSRCrawler:
         self.wait = None
         self.db_conn = None
         self.xpaths = {}
+        self.fields = None  # Compiled container field map (built in load_xpaths)
         self.total_collected = 0
         self.max_skus = 100  # BSR 1-100
         self.sequential_id = 1  # ID counter for 1-100
-        self.batch_id = int(time.time())  # Batch ID for this session
+        self.reparse_batch_id = get_reparse_batch_id()  # --reparse <batch_id>: rebuild rows from snapshots
+        # Batch ID for this session (re-parse reuses the original batch)
+        self.batch_id = int(self.reparse_batch_id) if self.reparse_batch_id else int(time.time())
+        self.fetcher = None  # HTTP-first page fetcher (browser only as fallback)
+        self.pacer = get_pacer('walmart')  # Adaptive delay between pages
+        self.snapshots = SnapshotStore('walmart_tv_bsr', self.batch_id)  # Raw page source store for --reparse
 
     def connect_db(self):
         """Connect to PostgreSQL database"""
         try:
-            self.db_conn = psycopg2.connect(**DB_CONFIG)
+            self.db_conn = get_connection(autocommit=False)
             print("[OK] Database connected")
             return True
         except Exception as e:
@@ -35,22 +54,10 @@ class WalmartTVBSRCrawler:
             return False
 
     def load_xpaths(self):
-        """Load XPath selectors from database"""
+        """Load XPath selectors (selector registry cache, refreshed when xpath_selectors changes)"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute("""
-                SELECT data_field, xpath, css_selector
-                FROM xpath_selectors
-                WHERE mall_name = 'Walmart' AND page_type = 'main' AND is_active = TRUE
-            """)
-
-            for row in cursor.fetchall():
-                self.xpaths[row[0]] = {
-                    'xpath': row[1],
-                    'css': row[2]
-                }
-
-            cursor.close()
+            self.xpaths = get_selectors('Walmart', 'main')
+            self.fields = get_field_map('Walmart', 'main', CONTAINER_FIELDS, name='WalmartContainer')
             print(f"[OK] Loaded {len(self.xpaths)} XPath selectors")
             return True
 
@@ -88,6 +95,7 @@ class WalmartTVBSRCrawler:
         options.add_argument('--disable-gpu')
         options.add_argument('--window-size=1920,1080')
         options.add_argument('--lang=en-US,en;q=0.9')
+        options.add_argument(f'--user-agent={USER_AGENT}')
 
         # Preferences
         prefs = {
@@ -122,65 +130,63 @@ class WalmartTVBSRCrawler:
             pass  # Silent fail if mouse movement doesn't work
 
     def extract_text_safe(self, element, xpath):
-        """Safely extract text from element using xpath"""
-        try:
-            result = element.xpath(xpath)
-            if result:
-                if isinstance(result[0], str):
-                    return result[0].strip()
-                else:
-                    return result[0].text_content().strip()
-            return None
-        except Exception as e:
-            return None
+        """Safely extract text from element using xpath (compiled once, cached)"""
+        return xpath_text(element, xpath)
 
-    def scrape_page(self, url, page_number):
-        """Scrape a single page"""
-        try:
-            print(f"\n[PAGE {page_number}] Accessing: {url[:80]}...")
+    def load_page_with_browser(self, url, page_number):
+        """Load page in Chrome (fallback when plain HTTP fetch is blocked or incomplete)"""
+        if self.driver is None:
+            self.setup_driver()
 
-            # For page 1, navigate naturally through browse page
-            if page_number == 1:
-                print("[INFO] Navigating to Walmart browse page first...")
-                try:
-                    # Try browse electronics category first
-                    self.driver.get("https://www.walmart.com/browse/electronics/tvs/3944_1060825")
-                    time.sleep(random.uniform(10, 15))
-
-                    print("[OK] Browse page loaded successfully")
-                    # Add human-like behavior
-                    self.add_random_mouse_movements()
-                    time.sleep(random.uniform(2, 4))
-
-                    # Scroll a bit
-                    for _ in range(2):
-                        self.driver.execute_script("window.scrollBy(0, 400);")
-                        time.sleep(random.uniform(1, 2))
-
-                    # Now access the best seller URL directly
-                    print("[INFO] Now navigating to best seller page...")
-                    self.driver.get(url)
-                    time.sleep(random.uniform(8, 12))
-                except Exception as e:
-                    print(f"[WARNING] Browse navigation failed: {e}, using direct URL...")
-                    self.driver.get(url)
-                    time.sleep(random.uniform(12, 18))
-            else:
-                # For other pages, direct access
+        # For page 1, navigate naturally through browse page
+        if page_number == 1:
+            print("[INFO] Navigating to Walmart browse page first...")
+            try:
+                # Try browse electronics category first
+                self.driver.get("https://www.walmart.com/browse/electronics/tvs/3944_1060825")
+                time.sleep(random.uniform(10, 15))
+
+                print("[OK] Browse page loaded successfully")
+                # Add human-like behavior
+                self.add_random_mouse_movements()
+                time.sleep(random.uniform(2, 4))
+
+                # Scroll a bit
+                for _ in range(2):
+                    self.driver.execute_script("window.scrollBy(0, 400);")
+                    time.sleep(random.uniform(1, 2))
+
+                # Now access the best seller URL directly
+                print("[INFO] Now navigating to best seller page...")
                 self.driver.get(url)
                 time.sleep(random.uniform(8, 12))
-
-            # Scroll to load all products
-            print("[INFO] Scrolling to load products...")
-            for _ in range(2):
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-            self.driver.execute_script("window.scrollTo(0, 0);")
+            except Exception as e:
+                print(f"[WARNING] Browse navigation failed: {e}, using direct URL...")
+                self.driver.get(url)
+                time.sleep(random.uniform(12, 18))
+        else:
+            # For other pages, direct access
+            self.driver.get(url)
+            time.sleep(random.uniform(8, 12))
+
+        # Scroll to load all products
+        print("[INFO] Scrolling to load products...")
+        for _ in range(2):
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
             time.sleep(2)
+        self.driver.execute_script("window.scrollTo(0, 0);")
+        time.sleep(2)
+
+        return self.driver.page_source
+
+    def scrape_page(self, url, page_number):
+        """Scrape a single page"""
+        try:
+            print(f"\n[PAGE {page_number}] Accessing: {url[:80]}...")
 
-            # Get page source and parse
-            page_source = self.driver.page_source
-            tree = html.fromstring(page_source)
+            # Plain HTTP first, Chrome only if the product containers are missing
+            page_source, tree, source = self.fetcher.fetch(url, page_number)
+            print(f"[INFO] Page fetched via {source}")
 
             # Find all product containers
             base_xpath = self.xpaths['base_container']['xpath']
@@ -194,40 +200,41 @@ class WalmartTVBSRCrawler:
                     print(f"[INFO] Reached maximum SKU limit ({self.max_skus})")
                     return False
 
-                # Extract product name
-                product_name = self.extract_text_safe(product, self.xpaths['product_name']['xpath'])
+                # Extract all container fields in one pass
+                record = self.fields.extract(product)
+                product_name = record.product_name
                 if not product_name:
                     continue
 
                 # Extract product URL
-                product_url_raw = self.extract_text_safe(product, self.xpaths['product_url']['xpath'])
+                product_url_raw = record.product_url
                 product_url = self.normalize_product_url(product_url_raw) if product_url_raw else None
 
                 # Extract prices
-                final_price_raw = self.extract_text_safe(product, self.xpaths['final_price']['xpath'])
+                final_price_raw = record.final_price
                 final_price = self.clean_price_text(final_price_raw) if final_price_raw else None
 
-                original_price_raw = self.extract_text_safe(product, self.xpaths['original_price']['xpath'])
+                original_price_raw = record.original_price
                 original_price = original_price_raw if original_price_raw else None
 
                 # Extract other fields
-                offer = self.extract_text_safe(product, self.xpaths['offer']['xpath'])
-                pickup = self.extract_text_safe(product, self.xpaths['pickup_availability']['xpath'])
-                shipping = self.extract_text_safe(product, self.xpaths['shipping_availability']['xpath'])
-                delivery = self.extract_text_safe(product, self.xpaths['delivery_availability']['xpath'])
+                offer = record.offer
+                pickup = record.pickup_availability
+                shipping = record.shipping_availability
+                delivery = record.delivery_availability
 
                 # Extract SKU status
-                rollback = self.extract_text_safe(product, self.xpaths['sku_status_rollback']['xpath'])
-                sponsored = self.extract_text_safe(product, self.xpaths['sku_status_sponsored']['xpath'])
+                rollback = record.sku_status_rollback
+                sponsored = record.sku_status_sponsored
                 sku_status = "Rollback" if rollback else ("Sponsored" if sponsored else None)
 
                 # Extract membership discount
-                membership_discount_elem = self.extract_text_safe(product, self.xpaths['membership_discount']['xpath'])
+                membership_discount_elem = record.membership_discount
                 membership_discount = "Walmart Plus" if membership_discount_elem else None
 
                 # Extract availability
-                available_quantity = self.extract_text_safe(product, self.xpaths['available_quantity']['xpath'])
-                inventory_status = self.extract_text_safe(product, self.xpaths['inventory_status']['xpath'])
+                available_quantity = record.available_quantity
+                inventory_status = record.inventory_status
 
                 data = {
                     'page_type': 'bsr',
@@ -368,6 +375,19 @@ class WalmartTVBSRCrawler:
             print(f"[ERROR] Failed to save to DB: {e}")
             return False
 
+    def clear_batch_rows(self):
+        """Delete existing rows of the batch being re-parsed"""
+        try:
+            cursor = self.db_conn.cursor()
+            cursor.execute("DELETE FROM wmart_tv_bsr_crawl WHERE batch_id = %s", (self.batch_id,))
+            deleted = cursor.rowcount
+            self.db_conn.commit()
+            cursor.close()
+            print(f"[INFO] Cleared batch {self.batch_id}: {deleted} rows")
+        except Exception as e:
+            self.db_conn.rollback()
+            print(f"[WARNING] Failed to clear batch {self.batch_id}: {e}")
+
     def run(self):
         """Main execution"""
         try:
@@ -382,13 +402,34 @@ class WalmartTVBSRCrawler:
             if not self.load_xpaths():
                 return
 
-            page_urls = self.load_page_urls()
+            if self.reparse_batch_id:
+                # Re-parse stored pages with the current XPaths - no network access
+                if not self.snapshots.exists():
+                    print(f"[ERROR] No snapshots found for batch {self.batch_id}")
+                    return
+                page_urls = [tuple(item) for item in self.snapshots.load_manifest('page_urls', [])]
+                disable_delays(self.pacer)
+                self.clear_batch_rows()
+                self.fetcher = ReplayFetcher(self.snapshots)
+            else:
+                page_urls = self.load_page_urls()
+                self.snapshots.save_manifest('page_urls', page_urls)
+
+                # WebDriver is started lazily, only if a page needs the browser fallback
+                self.fetcher = PageFetcher(
+                    self.xpaths['base_container']['xpath'],
+                    browser_fetch=self.load_page_with_browser,
+                    get_driver=lambda: self.driver,
+                    user_agent=USER_AGENT,
+                    min_containers=10,
+                    snapshot_store=self.snapshots,
+                    pacer=self.pacer
+                )
+
             if not page_urls:
                 print("[ERROR] No page URLs found")
                 return
 
-            self.setup_driver()
-
             # Scrape each page
             for page_number, url in page_urls:
                 if self.total_collected >= self.max_skus:
@@ -397,10 +438,16 @@ class WalmartTVBSRCrawler:
                 if not self.scrape_page(url, page_number):
                     break
 
-                time.sleep(random.uniform(5, 8))
+                # Adaptive delay between pages
+                self.pacer.wait()
 
             print("\n" + "="*80)
             print(f"Crawling completed! Total collected: {self.total_collected} SKUs")
+            if self.total_collected:
+                mark_batch_complete(self.db_conn, 'wmart_tv_bsr_crawl', self.batch_id)
+            print(f"[INFO] Pages fetched - HTTP: {self.fetcher.stats['http']}, Browser: {self.fetcher.stats['browser']}, "
+                  f"Snapshot: {self.fetcher.stats.get('snapshot', 0)}")
+            print(self.pacer.summary())
             print("="*80)
 
         except Exception as e:
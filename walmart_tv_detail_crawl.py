@@ -4,9 +4,6 @@ Collects detailed product information from URLs stored in:
 - wmart_tv_main_crawl (mother='main')
 - wmart_tv_bsr_crawl (mother='bsr')
 """
-import time
-import random
-import psycopg2
 from datetime import datetime
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
@@ -16,8 +13,61 @@ from selenium.webdriver.common.action_chains import ActionChains
 from lxml import html
 import re
 
-# Import database configuration
-from config import DB_CONFIG
+# Shared pooled database layer
+from db_manager import get_connection
+from detail_worker_pool import get_worker_count, run_detail_workers
+from detail_queue import DetailQueue
+from crawl_schema import clear_batch, ensure_batch_column, get_latest_batches
+from detail_ingest import DetailIngestor
+from review_harvest import SEEN_TABLE, SEEN_TABLE_SPEC, ReviewHarvester, ensure_seen_table, walmart_reviews_url
+from pacing import get_pacer
+from page_waits import PageWaits, enable_network_log
+from resource_policy import apply_resource_policy
+from browser_sessions import attach_session
+from selector_registry import get_xpaths, get_field_map
+from xpath_engine import xpath_text
+from snapshot_store import SnapshotStore, RecordingDriver, ReplayDriver, get_reparse_batch_id, disable_delays
+
+REVIEW_CONTENT_XPATH = '//div[@data-testid="enhanced-review-content"]'
+
+# Basic fields read from the initial page load in one pass
+PAGE_FIELDS = ('product_name', 'discount_type', 'savings')
+
+# Main URLs first (by order), then BSR URLs not already in Main -> detail_crawl_queue
+QUEUE_FILL_SQL = """
+    WITH src AS (
+        SELECT Product_url AS product_url, 1 AS source_order, "order" AS source_rank, 'main' AS mother
+        FROM wmart_tv_main_crawl
+        WHERE batch_id = %(main_batch)s AND Product_url IS NOT NULL AND Product_url != ''
+        UNION ALL
+        SELECT Product_url, 2, "order", 'bsr'
+        FROM wmart_tv_bsr_crawl
+        WHERE batch_id = %(bsr_batch)s AND Product_url IS NOT NULL AND Product_url != ''
+    ),
+    first_seen AS (
+        SELECT DISTINCT ON (product_url) *
+        FROM src
+        ORDER BY product_url, source_order, source_rank
+    )
+    INSERT INTO detail_crawl_queue
+        (retailer, queue_batch, product_url, page_type, seq, main_rank, bsr_rank, source_data)
+    SELECT %(retailer)s, %(queue_batch)s, product_url, mother,
+           ROW_NUMBER() OVER (ORDER BY source_order, source_rank, product_url),
+           CASE WHEN mother = 'main' THEN source_rank::INTEGER END,
+           CASE WHEN mother = 'bsr' THEN source_rank::INTEGER END,
+           jsonb_build_object('mother', mother, 'order', source_rank, 'url', product_url)
+    FROM first_seen
+    ON CONFLICT (retailer, queue_batch, product_url) DO NOTHING
+"""
+
+# Columns written by the ingestor (same order as the save_to_db row)
+DETAIL_COLUMNS = [
+    'mother', '"order"', 'product_url', 'Retailer_SKU_Name', 'Sku', 'Star_Rating',
+    'Number_of_ppl_purchased_yesterday', 'Number_of_ppl_added_to_carts',
+    'SKU_Popularity', 'Savings', 'Discount_Type', 'Shipping_Info',
+    'Count_of_Star_Ratings', 'Retailer_SKU_Name_similar', 'Detailed_Review_Content', 'calendar_week',
+    'batch_id',
+]
 
 class WalmartDetailCrawler:
     def __init__(self):
@@ -25,33 +75,38 @@ class WalmartDetailCrawler:
         self.wait = None
         self.db_conn = None
         self.xpaths = {}
+        self.fields = None  # Compiled PAGE_FIELDS map (built in load_xpaths)
         self.total_collected = 0
+        self.profile_dir = None  # Chrome profile (set per worker in worker-pool mode)
+        self.work_queue = None  # detail_crawl_queue batch (created in load_product_urls)
+        self.pacer = get_pacer('walmart')  # Adaptive delay between detail pages (shared by workers)
+        self.waits = PageWaits()  # Readiness waits after page loads / clicks (shared by workers)
+        # COPY buffer (shared by workers) - new review IDs go in the same record as the detail row
+        self.ingestor = DetailIngestor('walmart', {'Walmart_tv_detail_crawled': DETAIL_COLUMNS, SEEN_TABLE: SEEN_TABLE_SPEC})
+        # Snapshot batch, also written to Walmart_tv_detail_crawled.batch_id (--reparse deletes by it)
+        self.reparse_batch_id = get_reparse_batch_id()
+        self.batch_id = self.reparse_batch_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.snapshots = SnapshotStore('walmart_tv_detail', self.batch_id)  # Raw page source store for --reparse
 
     def connect_db(self):
         """Connect to PostgreSQL database"""
         try:
-            self.db_conn = psycopg2.connect(**DB_CONFIG)
-            self.db_conn.autocommit = True
+            self.db_conn = get_connection(autocommit=True)
             print("[OK] Database connected (autocommit enabled)")
+            # batch_id column so a --reparse can replace the batch's rows
+            with self.db_conn.transaction() as cursor:
+                ensure_batch_column(cursor, 'Walmart_tv_detail_crawled')
+                ensure_seen_table(cursor)
             return True
         except Exception as e:
             print(f"[ERROR] Database connection failed: {e}")
             return False
 
     def load_xpaths(self):
-        """Load XPath selectors from database"""
+        """Load XPath selectors (selector registry cache, refreshed when xpath_selectors changes)"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute("""
-                SELECT data_field, xpath
-                FROM xpath_selectors
-                WHERE mall_name = 'Walmart' AND page_type = 'detail_page' AND is_active = TRUE
-            """)
-
-            for row in cursor.fetchall():
-                self.xpaths[row[0]] = row[1]
-
-            cursor.close()
+            self.xpaths = get_xpaths('Walmart', 'detail_page')
+            self.fields = get_field_map('Walmart', 'detail_page', PAGE_FIELDS, name='WalmartDetailPage')
             print(f"[OK] Loaded {len(self.xpaths)} XPath selectors")
             return True
 
@@ -60,72 +115,27 @@ class WalmartDetailCrawler:
             return False
 
     def load_product_urls(self):
-        """Load product URLs from wmart_tv_main_crawl and wmart_tv_bsr_crawl tables (latest batch only)"""
+        """Queue product URLs of the latest wmart_tv_main_crawl / wmart_tv_bsr_crawl batches and return the URLs left"""
         try:
             cursor = self.db_conn.cursor()
-
-            # Get latest batch_id from wmart_tv_main_crawl
-            cursor.execute("""
-                SELECT batch_id
-                FROM wmart_tv_main_crawl
-                WHERE batch_id IS NOT NULL
-                ORDER BY batch_id DESC
-                LIMIT 1
-            """)
-            main_batch_result = cursor.fetchone()
-            main_batch_id = main_batch_result[0] if main_batch_result else None
-
-            # Get latest batch_id from wmart_tv_bsr_crawl
-            cursor.execute("""
-                SELECT batch_id
-                FROM wmart_tv_bsr_crawl
-                WHERE batch_id IS NOT NULL
-                ORDER BY batch_id DESC
-                LIMIT 1
-            """)
-            bsr_batch_result = cursor.fetchone()
-            bsr_batch_id = bsr_batch_result[0] if bsr_batch_result else None
-
-            print(f"[INFO] Latest batch_id - Main: {main_batch_id}, BSR: {bsr_batch_id}")
-
-            # Load from wmart_tv_main_crawl (main) - latest batch only
-            main_urls = []
-            if main_batch_id:
-                cursor.execute("""
-                    SELECT "order", Product_url
-                    FROM wmart_tv_main_crawl
-                    WHERE batch_id = %s
-                      AND Product_url IS NOT NULL
-                      AND Product_url != ''
-                    ORDER BY "order"
-                """, (main_batch_id,))
-                main_urls = [{'mother': 'main', 'order': row[0], 'url': row[1]} for row in cursor.fetchall()]
-
-            # Load from wmart_tv_bsr_crawl (bsr) - latest batch only
-            bsr_urls = []
-            if bsr_batch_id:
-                cursor.execute("""
-                    SELECT "order", Product_url
-                    FROM wmart_tv_bsr_crawl
-                    WHERE batch_id = %s
-                      AND Product_url IS NOT NULL
-                      AND Product_url != ''
-                    ORDER BY "order"
-                """, (bsr_batch_id,))
-                bsr_urls = [{'mother': 'bsr', 'order': row[0], 'url': row[1]} for row in cursor.fetchall()]
-
+            main_batch_id, bsr_batch_id = get_latest_batches(cursor, ['wmart_tv_main_crawl', 'wmart_tv_bsr_crawl'])
             cursor.close()
+            print(f"[INFO] Latest batch_id - Main: {main_batch_id}, BSR: {bsr_batch_id}")
 
-            # Remove duplicate URLs (keep main, skip duplicates from bsr)
-            main_url_set = {item['url'] for item in main_urls}
-            unique_bsr_urls = [item for item in bsr_urls if item['url'] not in main_url_set]
+            queue_batch = DetailQueue.batch_key(main=main_batch_id, bsr=bsr_batch_id)
+            if not queue_batch:
+                return []
 
-            duplicates_removed = len(bsr_urls) - len(unique_bsr_urls)
-            if duplicates_removed > 0:
-                print(f"[INFO] Removed {duplicates_removed} duplicate URLs from BSR (already in Main)")
+            # Main first, BSR URLs already in Main are skipped (QUEUE_FILL_SQL)
+            self.work_queue = DetailQueue('walmart', queue_batch)
+            inserted = self.work_queue.fill(QUEUE_FILL_SQL, {'main_batch': main_batch_id, 'bsr_batch': bsr_batch_id})
+            all_urls = self.work_queue.items()
 
-            all_urls = main_urls + unique_bsr_urls
-            print(f"[OK] Loaded {len(main_urls)} main URLs + {len(unique_bsr_urls)} unique bsr URLs = {len(all_urls)} total")
+            if inserted:
+                print(f"[OK] Queued {inserted} unique URLs (queue batch {queue_batch})")
+            else:
+                print(f"[INFO] Resuming queue batch {queue_batch}: {len(all_urls)} URLs left")
+            print(self.work_queue.summary())
             return all_urls
 
         except Exception as e:
@@ -152,28 +162,23 @@ class WalmartDetailCrawler:
             "profile.password_manager_enabled": False,
         }
         options.add_experimental_option("prefs", prefs)
-
-        # Use undetected_chromedriver
-        self.driver = uc.Chrome(options=options)
+        enable_network_log(options)  # CDP network events for network-idle waits
+
+        # 실행 중인 warm Chrome 세션에 attach (uc patch된 chromedriver), 없으면 undetected_chromedriver로 새로 띄움
+        driver = attach_session('walmart_detail', 'walmart', options, profile_dir=self.profile_dir, kind='uc')
+        if driver is None:
+            driver = uc.Chrome(options=options, user_data_dir=self.profile_dir)
+        # page_source를 읽을 때마다 snapshot 저장
+        self.driver = RecordingDriver(driver, self.snapshots)
         self.driver.set_page_load_timeout(60)
         self.wait = WebDriverWait(self.driver, 20)
+        apply_resource_policy(self.driver, 'walmart', 'detail')  # media / trackers만 (PerimeterX challenge 이미지 / 폰트는 받음)
 
         print("[OK] WebDriver setup complete")
 
     def extract_text_safe(self, tree, xpath):
-        """Safely extract text from XPath"""
-        if not xpath:
-            return None
-        try:
-            elements = tree.xpath(xpath)
-            if elements:
-                if isinstance(elements[0], str):
-                    return elements[0].strip()
-                else:
-                    return elements[0].text_content().strip()
-            return None
-        except Exception as e:
-            return None
+        """Safely extract text from XPath (compiled once, cached)"""
+        return xpath_text(tree, xpath)
 
     def extract_star_rating(self, tree):
         """Extract star rating number from '4.4 out of 5' format"""
@@ -594,7 +599,7 @@ class WalmartDetailCrawler:
 
             # Scroll down to load Specifications section
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 2);")
-            time.sleep(2)
+            self.pacer.pause(2)
 
             # Step 1: Find and click Specifications arrow button
             specs_arrow_clicked = False
@@ -608,11 +613,11 @@ class WalmartDetailCrawler:
                 try:
                     arrow_btn = self.driver.find_element(By.XPATH, xpath)
                     self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", arrow_btn)
-                    time.sleep(1)
+                    self.pacer.pause(1)
 
                     # Click arrow to expand
                     self.driver.execute_script("arguments[0].click();", arrow_btn)
-                    time.sleep(2)
+                    self.pacer.pause(2)
                     specs_arrow_clicked = True
                     print(f"  [OK] Clicked Specifications arrow button")
                     break
@@ -635,11 +640,13 @@ class WalmartDetailCrawler:
                 try:
                     more_details_btn = self.driver.find_element(By.XPATH, xpath)
                     self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", more_details_btn)
-                    time.sleep(1)
+                    self.pacer.pause(1)
 
-                    # Click to open dialog
+                    # Click to open dialog, wait until the Model row is rendered
                     self.driver.execute_script("arguments[0].click();", more_details_btn)
-                    time.sleep(5)  # Wait for dialog to fully load and render
+                    self.waits.for_count(self.driver, By.XPATH, "//h3[contains(text(), 'Model')]",
+                                         timeout=8, name='specs_dialog')
+                    self.waits.for_dom_quiet(self.driver, quiet=0.5, timeout=3)
                     more_details_clicked = True
                     print(f"  [OK] Clicked More details button - Dialog opened")
                     break
@@ -688,7 +695,7 @@ class WalmartDetailCrawler:
                     try:
                         close_btn = self.driver.find_element(By.XPATH, xpath)
                         self.driver.execute_script("arguments[0].click();", close_btn)
-                        time.sleep(1)
+                        self.pacer.pause(1)
                         print(f"  [OK] Closed More details dialog")
                         break
                     except:
@@ -741,128 +748,143 @@ class WalmartDetailCrawler:
             traceback.print_exc()
             return None
 
-    def extract_detailed_reviews(self):
-        """Click 'View all reviews' and extract up to 20 reviews"""
-        try:
-            # Find and click "View all reviews" button
-            try:
-                # Scroll to reviews section first
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
-
-                # Try multiple XPaths to find the button (there might be 2 on the page)
-                view_all_xpaths = [
-                    # Button with review count in text
-                    "//button[contains(text(), 'View all reviews') and @data-dca-intent='select']",
-                    # Any button with "View all reviews" text
-                    "//button[contains(text(), 'View all reviews')]",
-                    # Database XPath as fallback
-                    self.xpaths.get('view_all_reviews_button')
-                ]
+    def extract_detailed_reviews(self, product_url):
+        """
+        Extract new reviews (newest first, stop at the first review seen in an earlier run)
 
-                view_all_btn = None
-                for xpath in view_all_xpaths:
-                    if xpath:
-                        try:
-                            buttons = self.driver.find_elements(By.XPATH, xpath)
-                            # If multiple buttons found, prefer the one with number in parentheses
-                            for btn in buttons:
-                                if '(' in btn.text and ')' in btn.text:
-                                    view_all_btn = btn
+        Returns:
+            (formatted reviews or None, review ID rows for SEEN_TABLE - recorded with the detail row)
+        """
+        try:
+            harvester = ReviewHarvester('walmart', product_url, self.batch_id)
+
+            reviews_url = walmart_reviews_url(product_url)
+            if reviews_url:
+                # Open the review list sorted by newest directly (no scroll / click on the product page)
+                self.driver.get(reviews_url)
+                if not self.waits.for_count(self.driver, By.XPATH, REVIEW_CONTENT_XPATH, timeout=10, name='reviews'):
+                    print(f"  [WARNING] No reviews on review page")
+                    return None, []
+                self.waits.for_dom_quiet(self.driver, quiet=0.5, timeout=3)
+            else:
+                # Find and click "View all reviews" button
+                try:
+                    # Scroll to reviews section first (lazy-loaded)
+                    self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                    self.waits.for_count(self.driver, By.XPATH, "//button[contains(text(), 'View all reviews')]",
+                                         timeout=5, name='view_all_reviews_button')
+
+                    # Try multiple XPaths to find the button (there might be 2 on the page)
+                    view_all_xpaths = [
+                        # Button with review count in text
+                        "//button[contains(text(), 'View all reviews') and @data-dca-intent='select']",
+                        # Any button with "View all reviews" text
+                        "//button[contains(text(), 'View all reviews')]",
+                        # Database XPath as fallback
+                        self.xpaths.get('view_all_reviews_button')
+                    ]
+
+                    view_all_btn = None
+                    for xpath in view_all_xpaths:
+                        if xpath:
+                            try:
+                                buttons = self.driver.find_elements(By.XPATH, xpath)
+                                # If multiple buttons found, prefer the one with number in parentheses
+                                for btn in buttons:
+                                    if '(' in btn.text and ')' in btn.text:
+                                        view_all_btn = btn
+                                        break
+                                # If no button with number, use the first one found
+                                if not view_all_btn and buttons:
+                                    view_all_btn = buttons[0]
+                                if view_all_btn:
                                     break
-                            # If no button with number, use the first one found
-                            if not view_all_btn and buttons:
-                                view_all_btn = buttons[0]
-                            if view_all_btn:
-                                break
-                        except:
-                            continue
-
-                if not view_all_btn:
-                    print(f"  [WARNING] Could not find View all reviews button")
-                    return None
-
-                # Scroll to button with offset to avoid header
-                self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", view_all_btn)
-                time.sleep(1)
-
-                # Use JavaScript click to avoid interception
-                self.driver.execute_script("arguments[0].click();", view_all_btn)
-                time.sleep(random.uniform(3, 4))
-            except Exception as e:
-                print(f"  [WARNING] Could not click View all reviews: {e}")
-                return None
+                            except:
+                                continue
+
+                    if not view_all_btn:
+                        print(f"  [WARNING] Could not find View all reviews button")
+                        return None, []
 
-            # Extract reviews from multiple pages (up to 20 reviews)
-            reviews = []
+                    # Scroll to button with offset to avoid header
+                    self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", view_all_btn)
+
+                    # Use JavaScript click to avoid interception, then wait for the review list
+                    self.driver.execute_script("arguments[0].click();", view_all_btn)
+                    self.waits.for_count(self.driver, By.XPATH, REVIEW_CONTENT_XPATH, timeout=10, name='reviews')
+                    self.waits.for_dom_quiet(self.driver, quiet=0.5, timeout=3)
+                except Exception as e:
+                    print(f"  [WARNING] Could not click View all reviews: {e}")
+                    return None, []
+
+            # Extract reviews page by page until a known review or the limit
             page_num = 1
             max_pages = 2  # We'll collect from 2 pages to get 20 reviews
 
-            while len(reviews) < 20 and page_num <= max_pages:
+            while page_num <= max_pages:
                 # Get current page HTML
                 page_source = self.driver.page_source
                 tree = html.fromstring(page_source)
 
-                # Get review containers
                 # Find all review containers using data-testid attribute
-                review_content_divs = tree.xpath('//div[@data-testid="enhanced-review-content"]')
+                review_content_divs = tree.xpath(REVIEW_CONTENT_XPATH)
 
                 if not review_content_divs:
                     print(f"  [WARNING] No review content divs found on page {page_num}")
                     break
 
-                # Extract reviews from current page
-                for idx, content_div in enumerate(review_content_divs):
-                    if len(reviews) >= 20:
-                        break
-
-                    # Extract review text
-                    review_xpath = './/p/span[@class="tl-m db-m"]'
-                    review_elem = content_div.xpath(review_xpath)
+                # Extract reviews from current page (no stable review ID in the card -> text hash)
+                cards = []
+                for content_div in review_content_divs:
+                    review_elem = content_div.xpath('.//p/span[@class="tl-m db-m"]')
 
                     if review_elem:
                         review_text = review_elem[0].text_content().strip() if hasattr(review_elem[0], 'text_content') else str(review_elem[0]).strip()
                         if review_text and len(review_text) > 10:
-                            reviews.append(review_text)
-
-                # If we need more reviews and haven't reached max pages, click Next Page
-                if len(reviews) < 20 and page_num < max_pages:
-                    try:
-                        # Find Next Page button using data-testid
-                        next_page_btn = self.driver.find_element(By.XPATH, "//a[@data-testid='NextPage']")
-
-                        # Scroll to button
-                        self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_page_btn)
-                        time.sleep(1)
+                            cards.append((None, review_text))
 
-                        # Click Next Page
-                        self.driver.execute_script("arguments[0].click();", next_page_btn)
+                # Stop paging at the first known review or when the limit is reached
+                if not harvester.add_page(cards) or page_num >= max_pages:
+                    break
 
-                        # Wait for next page to load
-                        time.sleep(random.uniform(3, 4))
-                        page_num += 1
-                    except Exception as e:
-                        print(f"  [WARNING] Could not find or click Next Page button: {e}")
-                        break
-                else:
+                try:
+                    # Find Next Page button using data-testid
+                    next_page_btn = self.driver.find_element(By.XPATH, "//a[@data-testid='NextPage']")
+
+                    # Scroll to button
+                    self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_page_btn)
+                    current_reviews = self.driver.find_elements(By.XPATH, REVIEW_CONTENT_XPATH)
+
+                    # Click Next Page
+                    self.driver.execute_script("arguments[0].click();", next_page_btn)
+
+                    # Wait for the current reviews to be replaced by the next page
+                    if current_reviews:
+                        self.waits.for_stale(self.driver, current_reviews[0], timeout=10, name='reviews_next_page')
+                    self.waits.for_count(self.driver, By.XPATH, REVIEW_CONTENT_XPATH, timeout=10, name='reviews')
+                    self.waits.for_dom_quiet(self.driver, quiet=0.5, timeout=3)
+                    page_num += 1
+                except Exception as e:
+                    print(f"  [WARNING] Could not find or click Next Page button: {e}")
                     break
 
-            # Format as "review1-content, review2-content, ..."
+            print(f"  {harvester.summary()}")
+
+            # Format new reviews as "review1-content, review2-content, ..."
+            reviews = harvester.texts()
             if reviews:
-                print(f"  [INFO] Extracted {len(reviews)} reviews from {page_num} page(s)")
                 formatted = []
-                for idx, review in enumerate(reviews[:20], 1):
+                for idx, review in enumerate(reviews, 1):
                     formatted.append(f"review{idx}-{review}")
-                return ', '.join(formatted)
+                return ', '.join(formatted), harvester.seen_rows()
 
-            print(f"  [WARNING] No reviews extracted")
-            return None
+            return None, []
 
         except Exception as e:
             print(f"  [WARNING] Failed to extract detailed reviews: {e}")
             import traceback
             traceback.print_exc()
-            return None
+            return None, []
 
     def scrape_detail_page(self, url_data):
         """Scrape detail page and extract information"""
@@ -873,17 +895,21 @@ class WalmartDetailCrawler:
 
             print(f"\n[{mother.upper()}][{order}] Accessing: {url[:80]}...")
 
-            self.driver.get(url)
-            time.sleep(random.uniform(4, 6))
+            self.pacer.timed_get(self.driver, url)
+            if self.xpaths.get('product_name'):
+                self.waits.for_count(self.driver, By.XPATH, self.xpaths['product_name'], timeout=15, name='product_name')
+            self.waits.for_network_idle(self.driver, max_inflight=2, timeout=6)
+            self.waits.for_dom_quiet(self.driver, quiet=0.5, timeout=4)
 
             page_source = self.driver.page_source
             tree = html.fromstring(page_source)
 
             # Extract basic data using XPaths (from initial page load)
-            retailer_sku_name = self.extract_text_safe(tree, self.xpaths.get('product_name'))
+            record = self.fields.extract(tree)
+            retailer_sku_name = record.product_name
             star_rating = self.extract_star_rating(tree)
-            discount_type = self.extract_text_safe(tree, self.xpaths.get('discount_type'))
-            savings = self.extract_text_safe(tree, self.xpaths.get('savings'))
+            discount_type = record.discount_type
+            savings = record.savings
 
             # Extract and classify all badges (BEFORE Model extraction)
             badges = self.extract_badges(tree)
@@ -904,7 +930,7 @@ class WalmartDetailCrawler:
             sku_model = self.click_specifications_and_get_model()
 
             # Extract detailed reviews (this will navigate to reviews page) - LAST
-            detailed_review_content = self.extract_detailed_reviews()
+            detailed_review_content, review_seen_rows = self.extract_detailed_reviews(url)
 
             data = {
                 'mother': mother,
@@ -921,7 +947,8 @@ class WalmartDetailCrawler:
                 'Shipping_Info': shipping_info,
                 'Count_of_Star_Ratings': count_of_star_ratings,
                 'Retailer_SKU_Name_similar': similar_products,
-                'Detailed_Review_Content': detailed_review_content
+                'Detailed_Review_Content': detailed_review_content,
+                'review_seen_rows': review_seen_rows
             }
 
             # Save to database
@@ -949,26 +976,12 @@ class WalmartDetailCrawler:
             return False
 
     def save_to_db(self, data):
-        """Save collected data to database"""
-        cursor = None
-        try:
-            # Temporarily disable autocommit for transaction
-            self.db_conn.autocommit = False
-
-            cursor = self.db_conn.cursor()
+        """Buffer collected data for Walmart_tv_detail_crawled (written with COPY by the ingestor)"""
+        # Calculate calendar week
+        calendar_week = f"w{datetime.now().isocalendar().week}"
 
-            # Calculate calendar week
-            calendar_week = f"w{datetime.now().isocalendar().week}"
-
-            # Insert to Walmart_tv_detail_crawled
-            cursor.execute("""
-                INSERT INTO Walmart_tv_detail_crawled
-                (mother, "order", product_url, Retailer_SKU_Name, Sku, Star_Rating,
-                 Number_of_ppl_purchased_yesterday, Number_of_ppl_added_to_carts,
-                 SKU_Popularity, Savings, Discount_Type, Shipping_Info,
-                 Count_of_Star_Ratings, Retailer_SKU_Name_similar, Detailed_Review_Content, calendar_week)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
+        try:
+            self.ingestor.add({'Walmart_tv_detail_crawled': (
                 data['mother'],
                 data['order'],
                 data['product_url'],
@@ -984,38 +997,33 @@ class WalmartDetailCrawler:
                 data['Count_of_Star_Ratings'],
                 data['Retailer_SKU_Name_similar'],
                 data['Detailed_Review_Content'],
-                calendar_week
-            ))
-
-            # Commit transaction
-            self.db_conn.commit()
-
-            cursor.close()
-
-            # Re-enable autocommit
-            self.db_conn.autocommit = True
-
+                calendar_week,
+                self.batch_id
+            ), SEEN_TABLE: data['review_seen_rows']})
             return True
 
         except Exception as e:
-            # Rollback on any error
-            try:
-                self.db_conn.rollback()
-            except:
-                pass
-
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-
-            # Re-enable autocommit
-            self.db_conn.autocommit = True
+            print(f"[ERROR] Failed to save to DB: {e}")
+            return False
 
-            if 'duplicate key' not in str(e):
-                print(f"[ERROR] Failed to save to DB: {e}")
+    def clear_batch_rows(self):
+        """
+        Delete existing Walmart_tv_detail_crawled rows of the batch being re-parsed
 
+        Returns:
+            False if the batch was crawled before the table had batch_id (re-parsing would duplicate rows)
+        """
+        if 'Walmart_tv_detail_crawled' not in self.snapshots.load_manifest('batch_keyed_tables', []):
+            print(f"[ERROR] Batch {self.batch_id} was crawled before Walmart_tv_detail_crawled had batch_id - "
+                  f"re-parsing would duplicate its rows, refusing")
+            return False
+        try:
+            with self.db_conn.transaction() as cursor:
+                deleted = clear_batch(cursor, 'Walmart_tv_detail_crawled', self.batch_id)
+            print(f"[INFO] Cleared batch {self.batch_id}: {deleted} rows")
+            return True
+        except Exception as e:
+            print(f"[ERROR] Failed to clear batch {self.batch_id}: {e}")
             return False
 
     def run(self):
@@ -1034,28 +1042,66 @@ class WalmartDetailCrawler:
                 return
 
             # Load product URLs
-            product_urls = self.load_product_urls()
+            if self.reparse_batch_id:
+                if not self.snapshots.exists():
+                    print(f"[ERROR] No snapshots found for batch {self.batch_id}")
+                    return
+                product_urls = self.snapshots.load_manifest('product_urls', [])
+            else:
+                product_urls = self.load_product_urls()
+                self.snapshots.save_manifest('product_urls', product_urls)
+                self.snapshots.save_manifest('batch_keyed_tables', ['Walmart_tv_detail_crawled'])
             if not product_urls:
                 print("[ERROR] No product URLs found")
                 return
 
-            print(f"[INFO] Loaded {len(product_urls)} product URLs to process")
-
-            # Setup WebDriver
-            self.setup_driver()
-
-            # Scrape each detail page
-            for idx, url_data in enumerate(product_urls, 1):
-                print(f"\n{'='*80}")
-                print(f"Processing {idx}/{len(product_urls)}")
+            print(f"[INFO] Loaded {len(product_urls)} product URLs to process (Snapshot batch: {self.batch_id})")
+
+            num_workers = get_worker_count()
+            if self.reparse_batch_id:
+                # Re-parse mode: stored page sources instead of a browser, no delays
+                # (the batch's previous rows are deleted first)
+                print(f"[INFO] Re-parse mode: replaying snapshots of batch {self.batch_id}")
+                if not self.clear_batch_rows():
+                    return
+                disable_delays(self.pacer, self.waits)
+                self.driver = ReplayDriver(self.snapshots)
+                self.wait = WebDriverWait(self.driver, 1)
+                for idx, url_data in enumerate(product_urls, 1):
+                    print(f"\n{'='*80}")
+                    print(f"Processing {idx}/{len(product_urls)}")
+                    self.scrape_detail_page(url_data)
+            elif num_workers > 1:
+                # Worker-pool mode - each worker sets up its own WebDriver
+                run_detail_workers(self, self.work_queue, num_workers, delay_range=(3, 5),
+                                   profile_name='walmart_detail')
+            else:
+                # Setup WebDriver
+                self.setup_driver()
+
+                # Lease URLs from the queue one by one (an interrupted run resumes here next time)
+                idx = 0
+                while True:
+                    url_data = self.work_queue.claim()
+                    if url_data is None:
+                        break
+                    idx += 1
+                    print(f"\n{'='*80}")
+                    print(f"Processing {idx}/{len(product_urls)}")
 
-                self.scrape_detail_page(url_data)
+                    self.work_queue.finish(url_data, self.scrape_detail_page(url_data))
 
-                # Random delay between requests
-                time.sleep(random.uniform(3, 5))
+                    # Adaptive delay between requests
+                    self.pacer.wait()
 
             print("\n" + "="*80)
             print(f"Detail Crawling completed! Total collected: {self.total_collected}/{len(product_urls)}")
+            self.ingestor.flush()
+            print(self.pacer.summary())
+            print(self.waits.summary())
+            if self.work_queue is not None:
+                print(self.work_queue.summary())
+            print(self.ingestor.summary())
             print("="*80)
 
         except Exception as e:
@@ -1064,6 +1110,8 @@ class WalmartDetailCrawler:
             traceback.print_exc()
 
         finally:
+            # Write remaining records (kept in a spill file if the DB is unreachable)
+            self.ingestor.close()
             if self.driver:
                 self.driver.quit()
             if self.db_conn:
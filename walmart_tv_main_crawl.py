@@ -1,6 +1,5 @@
 import time
 import random
-import psycopg2
 from datetime import datetime
 from playwright.sync_api import sync_playwright
 from lxml import html
@@ -9,12 +8,23 @@ import os
 import json
 from urllib.parse import urlparse, parse_qs, unquote
 
-# Import database configuration
-from config import DB_CONFIG
+# Shared pooled database layer
+from db_manager import get_connection
+from snapshot_store import SnapshotStore, ReplayFetcher, get_reparse_batch_id, disable_delays
+from pacing import get_pacer
+from crawl_schema import mark_batch_complete
+from selector_registry import get_selectors, get_field_map
+from xpath_engine import xpath_text
 
 # Storage state file for cookies and localStorage
 STORAGE_STATE_FILE = "walmart_storage_state.json"
 
+# Fields evaluated against every product container
+CONTAINER_FIELDS = ('product_name', 'product_url', 'final_price', 'original_price', 'offer',
+                    'pickup_availability', 'shipping_availability', 'delivery_availability',
+                    'sku_status_rollback', 'sku_status_sponsored', 'membership_discount',
+                    'available_quantity', 'inventory_status')
+
 class WalmartTVCrawler:
     def __init__(self):
         self.playwright = None
@@ -23,15 +33,21 @@ class WalmartTVCrawler:
         self.page = None
         self.db_conn = None
         self.xpaths = {}
+        self.fields = None  # Compiled container field map (built in load_xpaths)
         self.total_collected = 0
         self.max_skus = 300
         self.sequential_id = 1  # ID counter for 1-300
-        self.batch_id = int(time.time())  # Batch ID for this session
+        self.reparse_batch_id = get_reparse_batch_id()  # --reparse <batch_id>: rebuild rows from snapshots
+        # Batch ID for this session (re-parse reuses the original batch)
+        self.batch_id = int(self.reparse_batch_id) if self.reparse_batch_id else int(time.time())
+        self.snapshots = SnapshotStore('walmart_tv_main', self.batch_id)  # Raw page source store for --reparse
+        self.replay = None  # ReplayFetcher in re-parse mode
+        self.pacer = get_pacer('walmart')  # Adaptive page / retry delays
 
     def connect_db(self):
         """Connect to PostgreSQL database"""
         try:
-            self.db_conn = psycopg2.connect(**DB_CONFIG)
+            self.db_conn = get_connection(autocommit=False)
             print("[OK] Database connected")
             return True
         except Exception as e:
@@ -39,22 +55,10 @@ class WalmartTVCrawler:
             return False
 
     def load_xpaths(self):
-        """Load XPath selectors from database"""
+        """Load XPath selectors (selector registry cache, refreshed when xpath_selectors changes)"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute("""
-                SELECT data_field, xpath, css_selector
-                FROM xpath_selectors
-                WHERE mall_name = 'Walmart' AND page_type = 'main' AND is_active = TRUE
-            """)
-
-            for row in cursor.fetchall():
-                self.xpaths[row[0]] = {
-                    'xpath': row[1],
-                    'css': row[2]
-                }
-
-            cursor.close()
+            self.xpaths = get_selectors('Walmart', 'main')
+            self.fields = get_field_map('Walmart', 'main', CONTAINER_FIELDS, name='WalmartContainer')
             print(f"[OK] Loaded {len(self.xpaths)} XPath selectors")
             return True
 
@@ -316,19 +320,8 @@ class WalmartTVCrawler:
             pass  # Silent fail if mouse movement doesn't work
 
     def extract_text_safe(self, element, xpath):
-        """Safely extract text from element using xpath"""
-        try:
-            result = element.xpath(xpath)
-            if result:
-                # Handle attribute extraction (e.g., @href)
-                if isinstance(result[0], str):
-                    return result[0].strip()
-                # Handle element extraction
-                else:
-                    return result[0].text_content().strip()
-            return None
-        except Exception as e:
-            return None
+        """Safely extract text from element using xpath (compiled once, cached)"""
+        return xpath_text(element, xpath)
 
     def check_robot_page(self, page_source):
         """Check if page is showing 'Robot or human?' challenge"""
@@ -449,145 +442,166 @@ class WalmartTVCrawler:
             print(f"[WARNING] CAPTCHA check failed: {e}")
             return True  # Continue anyway
 
-    def scrape_page(self, url, page_number, retry_count=0):
-        """Scrape a single page"""
-        max_retries = 2
-
-        try:
-            print(f"\n[PAGE {page_number}] Accessing: {url[:80]}...")
+    def load_page_live(self, url, page_number, retry_count=0):
+        """
+        Load a page in the browser (robot check / CAPTCHA / scrolling)
 
-            # For page 1, try different approach - go to simple URL first
-            if page_number == 1 and retry_count == 0:
-                print("[INFO] Navigating to Walmart browse page first...")
-                try:
-                    # Try browse electronics category first
-                    self.page.goto("https://www.walmart.com/browse/electronics/tvs/3944_1060825", wait_until="domcontentloaded", timeout=90000)
-                    time.sleep(random.uniform(10, 15))
-
-                    # Check for robot detection and handle CAPTCHA if needed
-                    if self.check_robot_page(self.page.content()):
-                        print("[WARNING] Robot detected on browse page, handling CAPTCHA...")
-                        self.handle_captcha()
-                        time.sleep(random.uniform(2, 4))
+        Returns:
+            page source, or None if robot detection could not be bypassed
+        """
+        max_retries = 2
 
-                    # If no robot detection (or after handling CAPTCHA)
-                    if not self.check_robot_page(self.page.content()):
-                        print("[OK] Browse page loaded successfully")
-                        # Add human-like behavior
-                        self.add_random_mouse_movements()
-                        time.sleep(random.uniform(2, 4))
+        print(f"\n[PAGE {page_number}] Accessing: {url[:80]}...")
 
-                        # Scroll a bit
-                        for _ in range(2):
-                            self.page.evaluate("window.scrollBy(0, 400)")
-                            time.sleep(random.uniform(1, 2))
+        # For page 1, try different approach - go to simple URL first
+        if page_number == 1 and retry_count == 0:
+            print("[INFO] Navigating to Walmart browse page first...")
+            try:
+                # Try browse electronics category first
+                self.page.goto("https://www.walmart.com/browse/electronics/tvs/3944_1060825", wait_until="domcontentloaded", timeout=90000)
+                time.sleep(random.uniform(10, 15))
 
-                        # Now try search
-                        print("[INFO] Now trying search for TV...")
-                        search_box = self.page.wait_for_selector("input[type='search']", timeout=20000)
-                        search_box.fill('')  # Clear the search box (Playwright method)
+                # Check for robot detection and handle CAPTCHA if needed
+                if self.check_robot_page(self.page.content()):
+                    print("[WARNING] Robot detected on browse page, handling CAPTCHA...")
+                    self.handle_captcha()
+                    time.sleep(random.uniform(2, 4))
+
+                # If no robot detection (or after handling CAPTCHA)
+                if not self.check_robot_page(self.page.content()):
+                    print("[OK] Browse page loaded successfully")
+                    # Add human-like behavior
+                    self.add_random_mouse_movements()
+                    time.sleep(random.uniform(2, 4))
+
+                    # Scroll a bit
+                    for _ in range(2):
+                        self.page.evaluate("window.scrollBy(0, 400)")
                         time.sleep(random.uniform(1, 2))
 
-                        # Type "TV" character by character
-                        for char in "TV":
-                            search_box.type(char, delay=random.uniform(200, 500))
+                    # Now try search
+                    print("[INFO] Now trying search for TV...")
+                    search_box = self.page.wait_for_selector("input[type='search']", timeout=20000)
+                    search_box.fill('')  # Clear the search box (Playwright method)
+                    time.sleep(random.uniform(1, 2))
 
-                        time.sleep(random.uniform(1, 2))
-                        search_box.press("Enter")
-                        time.sleep(random.uniform(8, 12))
-                    else:
-                        print("[WARNING] Robot still detected after CAPTCHA, using direct URL...")
-                        self.page.goto(url, wait_until="domcontentloaded", timeout=90000)
-                        time.sleep(random.uniform(12, 18))
-                except Exception as e:
-                    print(f"[WARNING] Browse navigation failed: {e}, using direct URL...")
+                    # Type "TV" character by character
+                    for char in "TV":
+                        search_box.type(char, delay=random.uniform(200, 500))
+
+                    time.sleep(random.uniform(1, 2))
+                    search_box.press("Enter")
+                    time.sleep(random.uniform(8, 12))
+                else:
+                    print("[WARNING] Robot still detected after CAPTCHA, using direct URL...")
                     self.page.goto(url, wait_until="domcontentloaded", timeout=90000)
                     time.sleep(random.uniform(12, 18))
-            else:
+            except Exception as e:
+                print(f"[WARNING] Browse navigation failed: {e}, using direct URL...")
                 self.page.goto(url, wait_until="domcontentloaded", timeout=90000)
                 time.sleep(random.uniform(12, 18))
+        else:
+            self.page.goto(url, wait_until="domcontentloaded", timeout=90000)
+            time.sleep(random.uniform(12, 18))
 
-            # Check for robot detection and handle CAPTCHA
-            page_source = None
-            try:
-                page_source = self.page.content()
-            except Exception as e:
-                if "navigating" in str(e).lower():
-                    print(f"[WARNING] Page still navigating (likely bot detection)")
-                    print(f"[INFO] Please solve CAPTCHA manually if needed...")
-                    print(f"[INFO] Waiting 60 seconds for manual intervention...")
-                    time.sleep(60)
-
-                    # Try to get content again
-                    try:
-                        page_source = self.page.content()
-                        print("[OK] Page content retrieved after waiting")
-                    except Exception as e2:
-                        print(f"[ERROR] Still cannot get page content: {e2}")
-                        # Will retry this page
-                        raise
-                else:
-                    raise
-            if self.check_robot_page(page_source):
-                print(f"[WARNING] Robot detection page detected.")
+        # Check for robot detection and handle CAPTCHA
+        page_source = None
+        try:
+            page_source = self.page.content()
+        except Exception as e:
+            if "navigating" in str(e).lower():
+                print(f"[WARNING] Page still navigating (likely bot detection)")
+                print(f"[INFO] Please solve CAPTCHA manually if needed...")
+                print(f"[INFO] Waiting 60 seconds for manual intervention...")
+                time.sleep(60)
 
-                # Try to handle CAPTCHA first
-                if self.handle_captcha():
-                    print("[OK] CAPTCHA handled, checking page again...")
-                    time.sleep(random.uniform(3, 5))
+                # Try to get content again
+                try:
                     page_source = self.page.content()
+                    print("[OK] Page content retrieved after waiting")
+                except Exception as e2:
+                    print(f"[ERROR] Still cannot get page content: {e2}")
+                    # Will retry this page
+                    raise
+            else:
+                raise
+        if self.check_robot_page(page_source):
+            print(f"[WARNING] Robot detection page detected.")
 
-                    # Check if robot detection is gone
-                    if not self.check_robot_page(page_source):
-                        print("[OK] Robot detection bypassed after CAPTCHA")
-                        # Continue with scraping (fall through)
-                    else:
-                        print("[WARNING] Robot detection still present after CAPTCHA")
-
-                # If still robot detected, retry
-                if self.check_robot_page(self.page.content()):
-                    if retry_count < max_retries:
-                        print(f"[WARNING] Retrying... {retry_count + 1}/{max_retries}")
-                        wait_time = 30 + retry_count * 15
-                        print(f"[INFO] Waiting {wait_time} seconds before retry...")
-                        time.sleep(wait_time)
+            # Try to handle CAPTCHA first
+            if self.handle_captcha():
+                print("[OK] CAPTCHA handled, checking page again...")
+                time.sleep(random.uniform(3, 5))
+                page_source = self.page.content()
 
-                        print("[INFO] Refreshing page...")
-                        self.page.reload(wait_until="domcontentloaded", timeout=90000)
-                        time.sleep(random.uniform(10, 15))
+                # Check if robot detection is gone
+                if not self.check_robot_page(page_source):
+                    print("[OK] Robot detection bypassed after CAPTCHA")
+                    # Continue with scraping (fall through)
+                else:
+                    print("[WARNING] Robot detection still present after CAPTCHA")
 
-                        return self.scrape_page(url, page_number, retry_count + 1)
-                    else:
-                        print(f"[ERROR] Failed to bypass robot detection after {max_retries} retries")
-                        print("[INFO] Saving page source for debugging...")
-                        with open(f'walmart_robot_page_{page_number}.html', 'w', encoding='utf-8') as f:
-                            f.write(page_source)
-                        return False
-
-            # Wait for page to load
-            print("[INFO] Waiting for products to load...")
-            time.sleep(random.uniform(5, 8))
-
-            # Scroll to load all products
-            print("[INFO] Scrolling to load all products...")
-            last_height = self.page.evaluate("document.body.scrollHeight")
-
-            for scroll_round in range(2):
-                self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                time.sleep(3)
-
-                new_height = self.page.evaluate("document.body.scrollHeight")
-                if new_height == last_height:
-                    break
-                last_height = new_height
+            # If still robot detected, retry
+            if self.check_robot_page(self.page.content()):
+                self.pacer.report_block('robot check')
+                if retry_count < max_retries:
+                    print(f"[WARNING] Retrying... {retry_count + 1}/{max_retries}")
+                    wait_time = self.pacer.wait('retry')
+                    print(f"[INFO] Waited {wait_time:.1f} seconds before retry")
+
+                    print("[INFO] Refreshing page...")
+                    self.page.reload(wait_until="domcontentloaded", timeout=90000)
+                    time.sleep(random.uniform(10, 15))
 
-            # Scroll back to top
-            self.page.evaluate("window.scrollTo(0, 0)")
-            time.sleep(2)
+                    return self.load_page_live(url, page_number, retry_count + 1)
+                else:
+                    print(f"[ERROR] Failed to bypass robot detection after {max_retries} retries")
+                    print("[INFO] Saving page source for debugging...")
+                    with open(f'walmart_robot_page_{page_number}.html', 'w', encoding='utf-8') as f:
+                        f.write(page_source)
+                    return None
+
+        # Wait for page to load
+        print("[INFO] Waiting for products to load...")
+        time.sleep(random.uniform(5, 8))
+
+        # Scroll to load all products
+        print("[INFO] Scrolling to load all products...")
+        last_height = self.page.evaluate("document.body.scrollHeight")
+
+        for scroll_round in range(2):
+            self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            time.sleep(3)
+
+            new_height = self.page.evaluate("document.body.scrollHeight")
+            if new_height == last_height:
+                break
+            last_height = new_height
+
+        # Scroll back to top
+        self.page.evaluate("window.scrollTo(0, 0)")
+        time.sleep(2)
+
+        # Get page source (parsed by scrape_page)
+        page_source = self.page.content()
+        self.pacer.observe(page_source=page_source)
+        self.snapshots.save(url, page_source, page_number=page_number)
+        return page_source
+
+    def scrape_page(self, url, page_number):
+        """Scrape a single page"""
+        try:
+            if self.replay is not None:
+                # Re-parse mode: stored page source instead of the browser
+                print(f"\n[PAGE {page_number}] Re-parsing snapshot: {url[:80]}...")
+                page_source, tree, _ = self.replay.fetch(url)
+            else:
+                page_source = self.load_page_live(url, page_number)
+                if page_source is None:
+                    return False
 
-            # Get page source and parse with lxml
-            page_source = self.page.content()
-            tree = html.fromstring(page_source)
+                # Parse with lxml
+                tree = html.fromstring(page_source)
 
             # Find all product containers
             base_xpath = self.xpaths['base_container']['xpath']
@@ -602,43 +616,44 @@ class WalmartTVCrawler:
                     print(f"[INFO] Reached maximum SKU limit ({self.max_skus})")
                     return False
 
-                # Extract product name (required field)
-                product_name = self.extract_text_safe(product, self.xpaths['product_name']['xpath'])
+                # Extract all container fields in one pass (product name is required)
+                record = self.fields.extract(product)
+                product_name = record.product_name
 
                 if not product_name:
                     print(f"  [{idx}/{len(products)}] SKIP: No product name found")
                     continue
 
                 # Extract product URL and normalize it
-                product_url_raw = self.extract_text_safe(product, self.xpaths['product_url']['xpath'])
+                product_url_raw = record.product_url
                 product_url = self.normalize_product_url(product_url_raw) if product_url_raw else None
 
                 # Extract Final_SKU_Price
-                final_price_raw = self.extract_text_safe(product, self.xpaths['final_price']['xpath'])
+                final_price_raw = record.final_price
                 final_price = self.clean_price_text(final_price_raw) if final_price_raw else None
 
                 # Extract Original_SKU_Price
-                original_price_raw = self.extract_text_safe(product, self.xpaths['original_price']['xpath'])
+                original_price_raw = record.original_price
                 original_price = original_price_raw if original_price_raw else None
 
                 # Extract Offer
-                offer = self.extract_text_safe(product, self.xpaths['offer']['xpath'])
+                offer = record.offer
 
                 # Extract Pick-Up_Availability
-                pickup_raw = self.extract_text_safe(product, self.xpaths['pickup_availability']['xpath'])
+                pickup_raw = record.pickup_availability
                 pickup = pickup_raw if pickup_raw else None
 
                 # Extract Shipping_Availability
-                shipping_raw = self.extract_text_safe(product, self.xpaths['shipping_availability']['xpath'])
+                shipping_raw = record.shipping_availability
                 shipping = shipping_raw if shipping_raw else None
 
                 # Extract Delivery_Availability
-                delivery_raw = self.extract_text_safe(product, self.xpaths['delivery_availability']['xpath'])
+                delivery_raw = record.delivery_availability
                 delivery = delivery_raw if delivery_raw else None
 
                 # Extract SKU_Status (check both Rollback and Sponsored)
-                rollback = self.extract_text_safe(product, self.xpaths['sku_status_rollback']['xpath'])
-                sponsored = self.extract_text_safe(product, self.xpaths['sku_status_sponsored']['xpath'])
+                rollback = record.sku_status_rollback
+                sponsored = record.sku_status_sponsored
 
                 sku_status = None
                 if rollback:
@@ -647,14 +662,14 @@ class WalmartTVCrawler:
                     sku_status = "Sponsored"
 
                 # Extract Retailer_Membership_Discounts
-                membership_discount_elem = self.extract_text_safe(product, self.xpaths['membership_discount']['xpath'])
+                membership_discount_elem = record.membership_discount
                 membership_discount = "Walmart Plus" if membership_discount_elem else None
 
                 # Extract Available_Quantity_for_Purchase
-                available_quantity = self.extract_text_safe(product, self.xpaths['available_quantity']['xpath'])
+                available_quantity = record.available_quantity
 
                 # Extract Inventory_Status
-                inventory_status = self.extract_text_safe(product, self.xpaths['inventory_status']['xpath'])
+                inventory_status = record.inventory_status
 
                 data = {
                     'page_type': 'main',
@@ -958,6 +973,19 @@ class WalmartTVCrawler:
             traceback.print_exc()
             return False
 
+    def clear_batch_rows(self):
+        """Delete existing rows of the batch being re-parsed"""
+        try:
+            cursor = self.db_conn.cursor()
+            cursor.execute("DELETE FROM wmart_tv_main_crawl WHERE batch_id = %s", (self.batch_id,))
+            deleted = cursor.rowcount
+            self.db_conn.commit()
+            cursor.close()
+            print(f"[INFO] Cleared batch {self.batch_id}: {deleted} rows")
+        except Exception as e:
+            self.db_conn.rollback()
+            print(f"[WARNING] Failed to clear batch {self.batch_id}: {e}")
+
     def run(self):
         """Main execution"""
         try:
@@ -974,21 +1002,34 @@ class WalmartTVCrawler:
             if not self.load_xpaths():
                 return
 
-            page_urls = self.load_page_urls()
+            if self.reparse_batch_id:
+                # Re-parse stored pages with the current XPaths - no browser
+                if not self.snapshots.exists():
+                    print(f"[ERROR] No snapshots found for batch {self.batch_id}")
+                    return
+                page_urls = self.snapshots.load_manifest('page_urls', [])
+                disable_delays(self.pacer)
+                self.clear_batch_rows()
+                self.replay = ReplayFetcher(self.snapshots)
+            else:
+                page_urls = self.load_page_urls()
+                self.snapshots.save_manifest('page_urls', page_urls)
+
             if not page_urls:
                 print("[ERROR] No page URLs found")
                 return
 
-            # Setup Playwright
-            if not self.setup_playwright():
-                return
+            if self.replay is None:
+                # Setup Playwright
+                if not self.setup_playwright():
+                    return
 
-            # Try to initialize session, but continue even if it fails
-            print("[INFO] Attempting to initialize session...")
-            if not self.initialize_session():
-                print("[WARNING] Session initialization failed, proceeding anyway...")
-                print("[INFO] Will attempt direct access to search pages...")
-                time.sleep(random.uniform(5, 10))
+                # Try to initialize session, but continue even if it fails
+                print("[INFO] Attempting to initialize session...")
+                if not self.initialize_session():
+                    print("[WARNING] Session initialization failed, proceeding anyway...")
+                    print("[INFO] Will attempt direct access to search pages...")
+                    time.sleep(random.uniform(5, 10))
 
             # Scrape each page with retry logic
             for page_number, url in page_urls:
@@ -1003,7 +1044,7 @@ class WalmartTVCrawler:
                     try:
                         if retry_attempt > 0:
                             print(f"\n[RETRY] Attempting page {page_number} again (attempt {retry_attempt + 1}/{max_page_retries + 1})")
-                            time.sleep(random.uniform(10, 15))
+                            self.pacer.wait('retry')
 
                         if self.scrape_page(url, page_number):
                             page_success = True
@@ -1028,11 +1069,14 @@ class WalmartTVCrawler:
                 if not page_success:
                     print(f"[INFO] Continuing to next page...")
 
-                # Random delay between pages
-                time.sleep(random.uniform(8, 12))
+                # Adaptive delay between pages
+                self.pacer.wait()
 
             print("\n" + "="*80)
             print(f"Crawling completed! Total collected: {self.total_collected} SKUs")
+            if self.total_collected:
+                mark_batch_complete(self.db_conn, 'wmart_tv_main_crawl', self.batch_id)
+            print(self.pacer.summary())
             print("="*80)
 
         except Exception as e:
@@ -19,6 +19,36 @@ import re
 
 # Import database configuration
 from config import DB_CONFIG
+from detail_ingest import DetailIngestor
+from selector_registry import get_xpaths
+from review_store import REVIEW_REF_COLUMNS, REVIEW_TABLE, REVIEW_TABLE_SPEC, ensure_review_store, review_refs
+from value_normalizer import TYPED_COLUMNS, ensure_typed_columns, parse_count, parse_star_counts, typed_values
+
+# Columns written by the ingestor (same order as the save_to_db rows)
+DETAIL_COLUMNS = [
+    'page_type', 'product_url', 'Retailer_SKU_Name', 'item', 'Star_Rating',
+    'Number_of_ppl_purchased_yesterday', 'Number_of_ppl_added_to_carts',
+    'SKU_Popularity', 'Savings', 'Discount_Type', 'Shipping_Info',
+    'Count_of_Star_Ratings', 'Retailer_SKU_Name_similar', 'Detailed_Review_Content',
+    'calendar_week', 'crawl_datetime',
+    'final_sku_price', 'original_sku_price', 'pick_up_availability',
+    'shipping_availability', 'delivery_availability', 'sku_status',
+    'retailer_membership_discounts', 'available_quantity_for_purchase',
+    'inventory_status', 'main_rank', 'bsr_rank', 'screen_size', 'count_of_reviews',
+]
+
+TV_RETAIL_COLUMNS = [
+    'item', 'account_name', 'page_type', 'count_of_reviews', 'retailer_sku_name', 'product_url',
+    'star_rating', 'count_of_star_ratings', 'screen_size', 'sku_popularity',
+    'final_sku_price', 'original_sku_price', 'savings', 'discount_type', 'offer',
+    'pick_up_availability', 'shipping_availability', 'delivery_availability', 'shipping_info',
+    'available_quantity_for_purchase', 'inventory_status', 'sku_status', 'retailer_membership_discounts',
+    'recommendation_intent',
+    'main_rank', 'bsr_rank', 'rank_1', 'rank_2', 'promotion_rank', 'trend_rank',
+    'number_of_ppl_purchased_yesterday', 'number_of_ppl_added_to_carts', 'retailer_sku_name_similar',
+    'estimated_annual_electricity_use', 'promotion_type',
+    'calendar_week', 'crawl_datetime',
+] + TYPED_COLUMNS + REVIEW_REF_COLUMNS  # typed price / rating values + retail_reviews hash references
 
 class WalmartDetailCrawler:
     def __init__(self):
@@ -27,6 +57,10 @@ class WalmartDetailCrawler:
         self.db_conn = None
         self.xpaths = {}
         self.total_collected = 0
+        # Record buffer -> retail_reviews + Walmart_tv_detail_crawled + tv_retail_com (journal / COPY)
+        self.ingestor = DetailIngestor('walmart_dt1', {REVIEW_TABLE: REVIEW_TABLE_SPEC,  # reviews first (stored once)
+                                                       'Walmart_tv_detail_crawled': DETAIL_COLUMNS,
+                                                       'tv_retail_com': TV_RETAIL_COLUMNS})
 
     def connect_db(self):
         """Connect to PostgreSQL database"""
@@ -34,25 +68,21 @@ class WalmartDetailCrawler:
             self.db_conn = psycopg2.connect(**DB_CONFIG)
             self.db_conn.autocommit = True
             print("[OK] Database connected (autocommit enabled)")
+            # retail_reviews table / tv_retail_com reference columns (lookup only if they already exist)
+            cursor = self.db_conn.cursor()
+            ensure_review_store(cursor)
+            # tv_retail_com typed price / rating columns (lookup only if they already exist)
+            ensure_typed_columns(cursor)
+            cursor.close()
             return True
         except Exception as e:
             print(f"[ERROR] Database connection failed: {e}")
             return False
 
     def load_xpaths(self):
-        """Load XPath selectors from database"""
+        """Load XPath selectors (selector registry cache, refreshed when xpath_selectors changes)"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute("""
-                SELECT data_field, xpath
-                FROM xpath_selectors
-                WHERE mall_name = 'Walmart' AND page_type = 'detail_page' AND is_active = TRUE
-            """)
-
-            for row in cursor.fetchall():
-                self.xpaths[row[0]] = row[1]
-
-            cursor.close()
+            self.xpaths = get_xpaths('Walmart', 'detail_page')
             print(f"[OK] Loaded {len(self.xpaths)} XPath selectors")
             return True
 
@@ -1321,18 +1351,12 @@ class WalmartDetailCrawler:
             return False
 
     def save_to_db(self, data):
-        """Save collected data to database"""
-        cursor = None
+        """Buffer Walmart_tv_detail_crawled + tv_retail_com records (written with COPY by the ingestor)"""
         try:
-            print(f"  [DB] Saving to database...")
+            print(f"  [DB] Buffering record...")
             print(f"       Product: {data.get('Retailer_SKU_Name', 'N/A')[:60]}...")
             print(f"       Item (SKU): {data.get('item', 'N/A')}")
 
-            # Temporarily disable autocommit for transaction
-            self.db_conn.autocommit = False
-
-            cursor = self.db_conn.cursor()
-
             # Calculate calendar week
             calendar_week = f"w{datetime.now().isocalendar().week}"
 
@@ -1340,20 +1364,7 @@ class WalmartDetailCrawler:
             now = datetime.now()
             crawl_datetime = now.strftime('%Y-%m-%d %H:%M:%S')
 
-            # Insert to Walmart_tv_detail_crawled
-            cursor.execute("""
-                INSERT INTO Walmart_tv_detail_crawled
-                (page_type, product_url, Retailer_SKU_Name, item, Star_Rating,
-                 Number_of_ppl_purchased_yesterday, Number_of_ppl_added_to_carts,
-                 SKU_Popularity, Savings, Discount_Type, Shipping_Info,
-                 Count_of_Star_Ratings, Retailer_SKU_Name_similar, Detailed_Review_Content,
-                 calendar_week, crawl_datetime,
-                 final_sku_price, original_sku_price, pick_up_availability,
-                 shipping_availability, delivery_availability, sku_status,
-                 retailer_membership_discounts, available_quantity_for_purchase,
-                 inventory_status, main_rank, bsr_rank, screen_size, count_of_reviews)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
+            detail_row = (
                 data['page_type'],  # Changed from 'mother'
                 data['product_url'],
                 data['Retailer_SKU_Name'],
@@ -1384,44 +1395,14 @@ class WalmartDetailCrawler:
                 data['bsr_rank'],
                 data['screen_size'],
                 data['count_of_reviews']
-            ))
+            )
 
-            # Also insert into unified tv_retail_com table
-            # Ensure count_of_reviews is integer
-            count_of_reviews_int = None
-            if data['count_of_reviews']:
-                try:
-                    count_of_reviews_int = int(data['count_of_reviews']) if isinstance(data['count_of_reviews'], int) else int(str(data['count_of_reviews']).replace(',', ''))
-                except:
-                    count_of_reviews_int = None
-
-            # Parse count_of_star_ratings to get total count
+            # tv_retail_com count columns are integers
+            count_of_reviews_int = parse_count(data['count_of_reviews'])
             # Example: "5star:142, 4star:14, 3star:7, 2star:2, 1star:4" -> 169
-            count_of_star_ratings_int = None
-            if data['Count_of_Star_Ratings']:
-                try:
-                    import re
-                    # Extract numbers after colons (handle both comma and space separators)
-                    numbers = re.findall(r':(\d+)', str(data['Count_of_Star_Ratings']))
-                    if numbers:
-                        count_of_star_ratings_int = sum(int(n) for n in numbers)
-                except:
-                    count_of_star_ratings_int = None
+            count_of_star_ratings_int = parse_star_counts(data['Count_of_Star_Ratings'])
 
-            cursor.execute("""
-                INSERT INTO tv_retail_com
-                (item, account_name, page_type, count_of_reviews, retailer_sku_name, product_url,
-                 star_rating, count_of_star_ratings, screen_size, sku_popularity,
-                 final_sku_price, original_sku_price, savings, discount_type, offer,
-                 pick_up_availability, shipping_availability, delivery_availability, shipping_info,
-                 available_quantity_for_purchase, inventory_status, sku_status, retailer_membership_discounts,
-                 detailed_review_content, summarized_review_content, top_mentions, recommendation_intent,
-                 main_rank, bsr_rank, rank_1, rank_2, promotion_rank, trend_rank,
-                 number_of_ppl_purchased_yesterday, number_of_ppl_added_to_carts, retailer_sku_name_similar,
-                 estimated_annual_electricity_use, promotion_type,
-                 calendar_week, crawl_datetime)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
+            retail_row = (
                 data['item'],
                 'Walmart',  # account_name
                 data['page_type'],
@@ -1445,9 +1426,6 @@ class WalmartDetailCrawler:
                 data['inventory_status'],
                 data['sku_status'],
                 data['retailer_membership_discounts'],
-                data['Detailed_Review_Content'],
-                None,  # summarized_review_content (Walmart doesn't have this)
-                None,  # top_mentions (Walmart doesn't have this)
                 None,  # recommendation_intent (Walmart doesn't have this)
                 data['main_rank'],
                 data['bsr_rank'],
@@ -1462,45 +1440,24 @@ class WalmartDetailCrawler:
                 None,  # promotion_type (Walmart doesn't have this)
                 calendar_week,
                 crawl_datetime
-            ))
-
-            # Commit transaction
-            self.db_conn.commit()
+            ) + typed_values(data['final_sku_price'], data['original_sku_price'], data['Savings'], data['Star_Rating'], 'USD')
 
-            cursor.close()
-
-            # Re-enable autocommit
-            self.db_conn.autocommit = True
+            # Review texts are stored once in retail_reviews; tv_retail_com keeps hash references
+            review_ref_values, review_rows = review_refs(
+                'Walmart', data['product_url'], data['Detailed_Review_Content'], None, None)
+            retail_row += review_ref_values
 
-            print(f"  [DB] ✓ Successfully saved to Walmart_tv_detail_crawled + tv_retail_com")
+            # retail_reviews + Walmart_tv_detail_crawled + tv_retail_com go in one transaction (journaled first)
+            self.ingestor.add({REVIEW_TABLE: review_rows, 'Walmart_tv_detail_crawled': detail_row,
+                               'tv_retail_com': retail_row})
+            print(f"  [DB] ✓ Buffered for Walmart_tv_detail_crawled + tv_retail_com ({self.ingestor.pending} pending)")
 
             return True
 
         except Exception as e:
-            # Rollback on any error
-            try:
-                self.db_conn.rollback()
-            except:
-                pass
-
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-
-            # Re-enable autocommit
-            self.db_conn.autocommit = True
-
-            # 모든 에러를 명확하게 출력 (중복 키 포함)
-            if 'duplicate key' in str(e):
-                print(f"  [WARNING] Duplicate key - product already exists in DB")
-                print(f"            URL: {data.get('product_url', 'N/A')[:80]}...")
-            else:
-                print(f"  [ERROR] Failed to save to DB: {e}")
-                import traceback
-                traceback.print_exc()
-
+            print(f"  [ERROR] Failed to buffer record: {e}")
+            import traceback
+            traceback.print_exc()
             return False
 
     def run(self):
@@ -1554,6 +1511,8 @@ class WalmartDetailCrawler:
 
             print("\n" + "="*80)
             print(f"Detail Crawling completed! Total collected: {self.total_collected}/{len(product_urls)}")
+            self.ingestor.flush()
+            print(self.ingestor.summary())
             print("="*80)
 
         except Exception as e:
@@ -1562,6 +1521,8 @@ class WalmartDetailCrawler:
             traceback.print_exc()
 
         finally:
+            # Write remaining records (kept in a spill file if the database is unreachable)
+            self.ingestor.close()
             if self.driver:
                 self.driver.quit()
             if self.db_conn:
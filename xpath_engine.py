@@ -0,0 +1,118 @@
+"""
+Compiled XPath Extraction Engine
+xpath_selectors의 XPath 문자열을 lxml.etree.XPath로 한 번만 compile해서 재사용
+
+기존 extract_text_safe()는 field 마다, container 마다 element.xpath(xpath_string)를 호출해서
+같은 XPath를 매번 다시 parse / compile 했다.
+
+- compile_xpath(expr): XPath 문자열 -> compile된 etree.XPath (thread 별 cache, 잘못된 XPath는 None)
+- xpath_text(element, expr): extract_text_safe와 같은 규칙으로 첫 결과의 text 반환
+- FieldMap: {data_field: xpath} 전체를 load_xpaths() 때 compile 해두고,
+  container 하나에 대해 모든 field를 한 번에 평가해서 namedtuple record로 반환
+
+사용법:
+    from xpath_engine import FieldMap, xpath_text
+
+    # load_xpaths()에서
+    self.fields = FieldMap(self.xpaths, fields=CONTAINER_FIELDS)
+
+    # container 마다
+    record = self.fields.extract(product)
+    record.final_price, record.product_url ...
+
+lxml XPath 객체는 thread 간 공유하지 않도록 thread 별로 compile한다 (detail worker-pool 대응).
+"""
+
+import threading
+from collections import namedtuple
+
+from lxml import etree
+
+_local = threading.local()
+
+
+def _cache():
+    cache = getattr(_local, 'xpaths', None)
+    if cache is None:
+        cache = _local.xpaths = {}
+    return cache
+
+
+def compile_xpath(expr):
+    """XPath 문자열 compile (thread 별 cache). 빈 값 / 잘못된 XPath는 None"""
+    if not expr:
+        return None
+    cache = _cache()
+    if expr not in cache:
+        try:
+            cache[expr] = etree.XPath(expr)
+        except etree.XPathSyntaxError as e:
+            print(f"[WARNING] Invalid XPath ({e}): {expr[:80]}")
+            cache[expr] = None
+    return cache[expr]
+
+
+def first_text(result):
+    """XPath 결과의 첫 항목 text (attribute / text() 결과는 문자열 그대로)"""
+    if not isinstance(result, list) or not result:
+        return None
+    first = result[0]
+    if isinstance(first, str):
+        return first.strip()
+    return first.text_content().strip()
+
+
+def evaluate_text(compiled, element):
+    """compile된 XPath로 text 추출 (실패 시 None)"""
+    if compiled is None:
+        return None
+    try:
+        return first_text(compiled(element))
+    except Exception:
+        return None
+
+
+def xpath_text(element, expr):
+    """extract_text_safe 대체 - compile cache 사용"""
+    return evaluate_text(compile_xpath(expr), element)
+
+
+def _xpath_string(value):
+    """xpaths dict 값 ({'xpath': ..., 'css': ...} 또는 문자열)에서 XPath 문자열"""
+    if isinstance(value, dict):
+        return value.get('xpath')
+    return value
+
+
+class FieldMap:
+    """data_field -> compile된 XPath, container 하나를 한 번에 record로 추출"""
+
+    def __init__(self, xpaths, fields=None, name='Record'):
+        """
+        Args:
+            xpaths: load_xpaths()가 만든 dict ({field: xpath} 또는 {field: {'xpath': ...}})
+            fields: record에 포함할 field (없으면 xpaths 전체). xpaths에 없는 field는 항상 None
+            name: record 타입 이름
+        """
+        self.fields = tuple(fields) if fields else tuple(xpaths)
+        self.expressions = {field: _xpath_string(xpaths.get(field)) for field in self.fields}
+        self.record_type = namedtuple(name, self.fields, rename=True)
+        self._local = threading.local()
+        self.compiled()  # load_xpaths 시점에 compile (잘못된 XPath 경고도 여기서)
+
+    def compiled(self):
+        """현재 thread의 (field, compile된 XPath) 목록"""
+        compiled = getattr(self._local, 'compiled', None)
+        if compiled is None:
+            compiled = self._local.compiled = [
+                (field, compile_xpath(self.expressions[field])) for field in self.fields
+            ]
+        return compiled
+
+    def extract(self, element):
+        """container 하나에 모든 field 평가 -> record"""
+        return self.record_type(*[evaluate_text(xpath, element) for _, xpath in self.compiled()])
+
+    def missing(self):
+        """XPath가 없거나 compile에 실패한 field"""
+        return [field for field, xpath in self.compiled() if xpath is None]